@@ -0,0 +1,8 @@
+"""Offline record/replay benchmarks for the Planogram pipeline.
+
+Modules:
+    replay: Recorded-response stand-ins for the Anthropic and Calendar clients.
+    run:    Benchmark runner and result comparison (``python -m benchmarks.run``).
+    fake_servers: Local HTTP stand-ins for the Anthropic and Calendar APIs.
+    load:   Load-test driver for the running app (``python -m benchmarks.load``).
+"""
@@ -0,0 +1,154 @@
+"""Micro-benchmark for session and pending-push serialization.
+
+Times saving and loading a session of ``--events`` events, and parking and
+reading back the same events as a pending push, through
+``planogram.services.sessions`` (the bulk codec) and through the
+per-object encoding it replaced::
+
+    python -m benchmarks.codec
+    python -m benchmarks.codec --events 10000 --runs 20
+
+Each case reports the median save and load time and the file size.  The
+sessions are also written with ``gzip`` and ``zstd`` transcription
+compression (``zstd`` falls back to ``gzip`` before Python 3.14).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from datetime import time as dtime
+from pathlib import Path
+from typing import Callable
+
+from planogram.config import Settings
+from planogram.models import ParsedSchedule, PendingPush, ScheduleEvent
+from planogram.services import codec, sessions
+
+
+@dataclass
+class CaseResult:
+    """Timings of one serialization case.
+
+    Attributes:
+        name: What was serialized, and how.
+        save_ms: Median time to write the file.
+        load_ms: Median time to read it back.
+        size_bytes: Size of the file.
+    """
+
+    name: str
+    save_ms: float
+    load_ms: float
+    size_bytes: int
+
+
+def make_schedule(events: int) -> ParsedSchedule:
+    """Build a schedule of ``events`` shifts with a transcription of matching size."""
+    shifts = [
+        ScheduleEvent(
+            title=f"Person {i % 40} – Shift",
+            date=date(2025, 1, 6) + timedelta(days=i % 28),
+            start_time=dtime(6 + i % 12, 0),
+            end_time=dtime(14 + i % 8, 30),
+            description="Front of house" if i % 3 else None,
+            location="Store 12" if i % 2 else None,
+        )
+        for i in range(events)
+    ]
+    transcription = "\n".join(
+        f"DATE: {event.date}\n{event.title} | {event.start_time:%H:%M} | {event.end_time:%H:%M}" for event in shifts
+    )
+    return ParsedSchedule(events=shifts, raw_ocr_text=transcription, source_image_name="roster.jpg")
+
+
+def _legacy_save_session(tmp_dir: Path, session_id: str, schedule: ParsedSchedule) -> None:
+    sessions.session_path(tmp_dir, session_id).write_text(schedule.model_dump_json())
+
+
+def _legacy_load_session(tmp_dir: Path, session_id: str) -> ParsedSchedule:
+    return ParsedSchedule.model_validate_json(sessions.session_path(tmp_dir, session_id).read_text())
+
+
+def _legacy_save_pending(tmp_dir: Path, session_id: str, events: list[ScheduleEvent]) -> None:
+    sessions.pending_path(tmp_dir, session_id).write_text(json.dumps([ev.model_dump_json() for ev in events]))
+
+
+def _legacy_load_pending(tmp_dir: Path, session_id: str) -> list[ScheduleEvent]:
+    raw = json.loads(sessions.pending_path(tmp_dir, session_id).read_text())
+    return [ScheduleEvent.model_validate_json(ej) for ej in raw]
+
+
+def _median_ms(fn: Callable[[], object], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run_cases(events: int, runs: int) -> list[CaseResult]:
+    """Time every case and check each one reads back what it wrote."""
+    schedule = make_schedule(events)
+    tmp_dir = Path(tempfile.mkdtemp(prefix="planogram-codec-"))
+    results = []
+
+    def case(name, save, load, path, expected) -> None:
+        save_ms = _median_ms(save, runs)
+        load_ms = _median_ms(load, runs)
+        if load() != expected:
+            raise AssertionError(f"{name} did not round-trip")
+        results.append(CaseResult(name, save_ms, load_ms, path.stat().st_size))
+
+    try:
+        sid = "legacy"
+        case("session, per-object (before)",
+             lambda: _legacy_save_session(tmp_dir, sid, schedule), lambda: _legacy_load_session(tmp_dir, sid),
+             sessions.session_path(tmp_dir, sid), schedule)
+        for compression in dict.fromkeys(codec.available(c) for c in ("none", "gzip", "zstd")):
+            sid = f"codec-{compression}"
+            sessions.configure(Settings.model_construct(session_compression=compression))
+            case(f"session, bulk codec, {compression}",
+                 lambda sid=sid: sessions.save_session(tmp_dir, sid, schedule),
+                 lambda sid=sid: sessions.load_session(tmp_dir, sid),
+                 sessions.session_path(tmp_dir, sid), schedule)
+        sessions.configure(Settings.model_construct())
+
+        sid = "legacy"
+        case("pending, per-event (before)",
+             lambda: _legacy_save_pending(tmp_dir, sid, schedule.events), lambda: _legacy_load_pending(tmp_dir, sid),
+             sessions.pending_path(tmp_dir, sid), schedule.events)
+        sid = "codec"
+        pending = PendingPush(events=schedule.events)
+        case("pending, bulk codec",
+             lambda: sessions.save_pending(tmp_dir, sid, pending), lambda: sessions.load_pending(tmp_dir, sid),
+             sessions.pending_path(tmp_dir, sid), pending)
+    finally:
+        shutil.rmtree(tmp_dir)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="events per session (default 5000)")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per case (default 10)")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.events, args.runs)
+    print(f"{args.events} events, median of {args.runs} run(s)")
+    print(f"  {'case':<32} {'save ms':>9} {'load ms':>9} {'KiB':>9}")
+    for result in results:
+        print(f"  {result.name:<32} {result.save_ms:>9.2f} {result.load_ms:>9.2f} {result.size_bytes / 1024:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
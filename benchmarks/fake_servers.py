@@ -0,0 +1,259 @@
+"""Local HTTP stand-ins for the Anthropic and Google Calendar APIs.
+
+Both servers answer with realistic payloads after a latency drawn from a
+``LatencyModel`` and can inject failures, so the real app — pointed at them via
+``ANTHROPIC_BASE_URL`` and ``GOOGLE_CALENDAR_API_ENDPOINT`` — can be load
+tested on one machine with no network access.
+
+- Anthropic: ``POST /v1/messages``.  Image requests return the recording's
+  Pass 1 transcription; text requests echo their pipe lines back as events.
+- Calendar: insert (409 for a client-chosen id that exists), get, list
+  (filtered by ``privateExtendedProperty``), patch, and delete under ``/calendar/v3/calendars/{calendar_id}/events``.
+
+Failure injection, per server:
+
+- ``error_rate``: share of requests answered with a 500 (Anthropic answers
+  with its 529 ``overloaded_error`` instead).
+- ``rate_limit_rps``: requests per second above which a 429 with
+  ``Retry-After`` is returned, enforced with a token bucket.
+
+Run both with::
+
+    python -m benchmarks.fake_servers --latency-scale 0.1 --error-rate 0.01 --rate-limit-rps 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+import uuid
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from benchmarks.replay import LatencyModel, _echo_events, load_recording
+
+
+class FaultConfig:
+    """Latency and failure behavior for one fake server.
+
+    Args:
+        latency: Latency model sampled for every request.
+        error_rate: Share of requests that fail with a server error.
+        rate_limit_rps: Sustained requests per second allowed before 429s.
+            ``0`` disables rate limiting.
+        seed: Seed for the failure coin flips.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyModel,
+        error_rate: float = 0.0,
+        rate_limit_rps: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rps = rate_limit_rps
+        self._random = random.Random(seed)
+        self._tokens = rate_limit_rps
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def admit(self) -> str | None:
+        """Decide the fate of one request: ``None`` to serve it, or ``"429"``/``"error"``."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit_rps:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit_rps, self._tokens + (now - self._last) * self.rate_limit_rps)
+                self._last = now
+                if self._tokens < 1:
+                    self.rate_limited += 1
+                    return "429"
+                self._tokens -= 1
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return "error"
+        return None
+
+    def stats(self) -> dict[str, int]:
+        return {"requests": self.requests, "rate_limited": self.rate_limited, "errors": self.errors}
+
+
+def _rate_limited() -> JSONResponse:
+    return JSONResponse(
+        {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited (fake)"}},
+        status_code=429,
+        headers={"retry-after": "1"},
+    )
+
+
+def create_anthropic_app(config: FaultConfig, recording: dict[str, Any] | None = None) -> FastAPI:
+    """Build the fake Anthropic Messages API.
+
+    Args:
+        config: Latency and failure behavior.
+        recording: Recording whose Pass 1 transcription is served for image
+            requests.  Defaults to the bundled roster.
+    """
+    recording = recording or load_recording()
+    transcription = recording["pass1"]["content"][0]["text"]
+    app = FastAPI(title="Fake Anthropic")
+
+    @app.get("/stats")
+    async def stats() -> dict[str, int]:
+        return config.stats()
+
+    @app.post("/v1/messages")
+    async def messages(request: Request) -> JSONResponse:
+        body = await request.json()
+        content = body["messages"][0]["content"]
+        is_image = isinstance(content, list) and any(part.get("type") == "image" for part in content)
+        await asyncio.sleep(config.latency.sample("pass1" if is_image else "pass2"))
+
+        fate = config.admit()
+        if fate == "429":
+            return _rate_limited()
+        if fate == "error":
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (fake)"}},
+                status_code=529,
+            )
+
+        text = transcription if is_image else _echo_events(content)
+        input_tokens = 1600 if is_image else len(content) // 4
+        return JSONResponse({
+            "id": f"msg_fake_{uuid.uuid4().hex[:12]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": len(text) // 4},
+        })
+
+    return app
+
+
+def create_calendar_app(config: FaultConfig) -> FastAPI:
+    """Build the fake Google Calendar v3 API.
+
+    Args:
+        config: Latency and failure behavior.
+    """
+    app = FastAPI(title="Fake Google Calendar")
+    events: dict[str, dict[str, Any]] = {}
+
+    @app.get("/stats")
+    async def stats() -> dict[str, int]:
+        return {**config.stats(), "events": len(events)}
+
+    @app.post("/calendar/v3/calendars/{calendar_id}/events")
+    async def insert(calendar_id: str, request: Request) -> JSONResponse:
+        body = await request.json()
+        await asyncio.sleep(config.latency.sample("calendar"))
+
+        fate = config.admit()
+        if fate == "429":
+            return _rate_limited()
+        if fate == "error":
+            return JSONResponse({"error": {"code": 500, "message": "Backend Error (fake)"}}, status_code=500)
+
+        event_id = body.get("id") or uuid.uuid4().hex
+        if event_id in events:
+            return JSONResponse({"error": {"code": 409, "message": "The requested identifier already exists."}},
+                                status_code=409)
+        event = {
+            **body,
+            "id": event_id,
+            "status": "confirmed",
+            "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}",
+        }
+        events[event_id] = event
+        return JSONResponse(event)
+
+    @app.get("/calendar/v3/calendars/{calendar_id}/events")
+    async def list_events(calendar_id: str, request: Request) -> JSONResponse:
+        await asyncio.sleep(config.latency.sample("calendar"))
+        if config.admit() == "429":
+            return _rate_limited()
+        wanted = [f.split("=", 1) for f in request.query_params.getlist("privateExtendedProperty")]
+        items = [
+            event for event in events.values()
+            if event["status"] != "cancelled"
+            and all(event.get("extendedProperties", {}).get("private", {}).get(k) == v for k, v in wanted)
+        ]
+        return JSONResponse({"kind": "calendar#events", "items": items})
+
+    @app.get("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+    async def get(calendar_id: str, event_id: str) -> JSONResponse:
+        await asyncio.sleep(config.latency.sample("calendar"))
+        if event_id not in events:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        return JSONResponse(events[event_id])
+
+    @app.patch("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+    async def patch(calendar_id: str, event_id: str, request: Request) -> JSONResponse:
+        body = await request.json()
+        await asyncio.sleep(config.latency.sample("calendar"))
+        fate = config.admit()
+        if fate == "429":
+            return _rate_limited()
+        if event_id not in events:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        events[event_id].update(body)
+        return JSONResponse(events[event_id])
+
+    @app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+    async def delete(calendar_id: str, event_id: str) -> Response:
+        await asyncio.sleep(config.latency.sample("calendar"))
+        if config.admit() == "429":
+            return _rate_limited()
+        # Like Calendar, deleted events stay behind as cancelled and keep their id
+        if events.get(event_id, {}).get("status", "cancelled") == "cancelled":
+            return JSONResponse({"error": {"code": 410, "message": "Resource has been deleted"}}, status_code=410)
+        events[event_id]["status"] = "cancelled"
+        return Response(status_code=204)
+
+    return app
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_servers", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--anthropic-port", type=int, default=9001)
+    parser.add_argument("--calendar-port", type=int, default=9002)
+    parser.add_argument("--latency-scale", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    recording = load_recording()
+    latency = LatencyModel(recording["latency"], scale=args.latency_scale)
+    anthropic_app = create_anthropic_app(FaultConfig(latency, args.error_rate, args.rate_limit_rps), recording)
+    calendar_app = create_calendar_app(FaultConfig(latency, args.error_rate, args.rate_limit_rps, seed=1))
+
+    async def serve() -> None:
+        servers = [
+            uvicorn.Server(uvicorn.Config(app, host=args.host, port=port, log_level="warning"))
+            for app, port in ((anthropic_app, args.anthropic_port), (calendar_app, args.calendar_port))
+        ]
+        print(f"Fake Anthropic on http://{args.host}:{args.anthropic_port}, "
+              f"fake Calendar on http://{args.host}:{args.calendar_port}/calendar/v3/", flush=True)
+        await asyncio.gather(*(server.serve() for server in servers))
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Load-test driver for the HTTP app against the local fake upstreams.
+
+Starts ``benchmarks.fake_servers`` and ``uvicorn main:app --workers N`` as
+subprocesses, with the app's upstream URLs pointed at the fakes and a
+throwaway credential store, then drives it with async virtual users.  Each
+virtual user is a separate app user with its own seeded OAuth token and user
+cookie, and loops through the real browser flow:
+
+1. ``POST /upload`` with a schedule image, following the redirect
+2. ``GET /review/<session_id>`` and scrape the form fields
+3. ``POST /confirm`` with those fields, which pushes the session's events
+   unedited to the fake Calendar
+
+Concurrency is stepped up level by level.  For each level the driver reports
+throughput, p50/p95/p99 latency and error rate per step, and event-loop lag —
+the latency of a no-op endpoint polled in the background, which grows when
+blocking work starves the loop.  The knee is the last level after which
+adding users raised throughput by less than ``--knee-gain``::
+
+    python -m benchmarks.load --workers 2 --levels 1 2 4 8 16 32 --duration 20 --output bench-results/load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import html
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+from cryptography.fernet import Fernet
+
+from benchmarks.run import _git_commit, make_schedule_image, percentile
+from planogram.routes.identity import USER_COOKIE
+from planogram.services.credentials import CredentialStore
+
+ROOT = Path(__file__).resolve().parent.parent
+STEPS = ("upload", "review", "confirm")
+PROBE_PATH = "/.well-known/appspecific/com.chrome.devtools.json"
+_INPUT_RE = re.compile(r'<input[^>]*\bname="([^"]+)"[^>]*\bvalue="([^"]*)"')
+
+
+def form_fields(page: str) -> dict[str, str]:
+    """Collect the ``name``/``value`` pairs of every input on the review page.
+
+    The two ``<select>`` elements carry no ``value`` attribute and are filled
+    in with their defaults.
+    """
+    fields = {name: html.unescape(value) for name, value in _INPUT_RE.findall(page)}
+    fields.setdefault("notification_minutes", "30")
+    fields.setdefault("repeat_weeks", "0")
+    return fields
+
+
+def load_user(index: int) -> str:
+    """Return the user id of virtual user ``index``."""
+    return f"{index:032x}"
+
+
+def _seed_credentials(db_path: Path, key: bytes, users: int) -> None:
+    """Store an OAuth token that ``get_credentials`` accepts without refreshing for each virtual user."""
+    store = CredentialStore(db_path, key)
+    token = json.dumps({
+        "token": "fake-access-token",
+        "refresh_token": "fake-refresh-token",
+        "client_id": "fake.apps.googleusercontent.com",
+        "client_secret": "fake-secret",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "scopes": ["https://www.googleapis.com/auth/calendar.events"],
+        "expiry": "2099-01-01T00:00:00Z",
+    })
+    for index in range(users):
+        store.save(load_user(index), token)
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+@contextmanager
+def servers(args: argparse.Namespace) -> Iterator[str]:
+    """Run the fakes and the app for the duration of the block.
+
+    Yields:
+        Base URL of the app.
+    """
+    work = Path(tempfile.mkdtemp(prefix="planogram-load-"))
+    key = Fernet.generate_key()
+    credential_db = work / "credentials.db"
+    _seed_credentials(credential_db, key, max(args.levels))
+    multiproc = work / "prometheus"
+    multiproc.mkdir()
+
+    host = "127.0.0.1"
+    env = {
+        **os.environ,
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "sk-ant-load"),
+        "ANTHROPIC_BASE_URL": f"http://{host}:{args.anthropic_port}",
+        "GOOGLE_CALENDAR_API_ENDPOINT": f"http://{host}:{args.calendar_port}/calendar/v3/",
+        "CREDENTIAL_DB_PATH": str(credential_db),
+        "CREDENTIAL_KEY": key.decode(),
+        "USAGE_DB_PATH": str(work / "usage.db"),
+        "PROMETHEUS_MULTIPROC_DIR": str(multiproc),
+        "ANTHROPIC_REQUESTS_PER_MINUTE": str(args.anthropic_rpm),
+        "CALENDAR_REQUESTS_PER_MINUTE": str(args.calendar_rpm),
+    }
+    fakes_cmd = [
+        sys.executable, "-m", "benchmarks.fake_servers",
+        "--host", host,
+        "--anthropic-port", str(args.anthropic_port),
+        "--calendar-port", str(args.calendar_port),
+        "--latency-scale", str(args.latency_scale),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rps", str(args.rate_limit_rps),
+    ]
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", host, "--port", str(args.port),
+        "--workers", str(args.workers),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    log = (work / "app.log").open("w")
+    print(f"App log: {log.name}", flush=True)
+    procs = [
+        subprocess.Popen(fakes_cmd, cwd=ROOT, env=env),
+        subprocess.Popen(app_cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT),
+    ]
+    try:
+        _wait_ready(f"http://{host}:{args.anthropic_port}/stats")
+        _wait_ready(f"http://{host}:{args.calendar_port}/stats")
+        base_url = f"http://{host}:{args.port}"
+        _wait_ready(base_url + PROBE_PATH)
+        yield base_url
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        log.close()
+
+
+class LevelStats:
+    """Samples collected while running one concurrency level."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {step: [] for step in STEPS}
+        self.errors: dict[str, int] = {step: 0 for step in STEPS}
+        self.completed = 0
+        self.loop_lag: list[float] = []
+
+    def summary(self, concurrency: int, wall: float) -> dict[str, Any]:
+        steps = {}
+        for step in STEPS:
+            samples = self.latencies[step]
+            attempts = len(samples) + self.errors[step]
+            steps[step] = {
+                "requests": attempts,
+                "error_rate": round(self.errors[step] / attempts, 4) if attempts else 0.0,
+                **{f"p{pct}_ms": round(percentile(samples, pct) * 1000, 1) if samples else None
+                   for pct in (50, 95, 99)},
+            }
+        return {
+            "concurrency": concurrency,
+            "duration_s": round(wall, 2),
+            "flows_completed": self.completed,
+            "throughput_per_s": round(self.completed / wall, 3),
+            "steps": steps,
+            "loop_lag_p50_ms": round(percentile(self.loop_lag, 50) * 1000, 1) if self.loop_lag else None,
+            "loop_lag_p99_ms": round(percentile(self.loop_lag, 99) * 1000, 1) if self.loop_lag else None,
+        }
+
+
+async def _timed(stats: LevelStats, step: str, request: Any) -> httpx.Response | None:
+    t0 = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        stats.errors[step] += 1
+        return None
+    if response.status_code >= 400:
+        stats.errors[step] += 1
+        return None
+    stats.latencies[step].append(time.perf_counter() - t0)
+    return response
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, user_id: str, image: bytes, stats: LevelStats, deadline: float
+) -> None:
+    """Repeat upload → review → confirm as ``user_id`` until ``deadline``."""
+    # Sent explicitly rather than through the client's cookie jar, which every
+    # virtual user shares
+    headers = {"Cookie": f"{USER_COOKIE}={user_id}"}
+    while time.monotonic() < deadline:
+        upload = await _timed(stats, "upload", client.post(
+            "/upload", files={"file": ("schedule.jpg", image, "image/jpeg")}, headers=headers,
+            follow_redirects=False,
+        ))
+        if upload is None:
+            continue
+        review = await _timed(stats, "review", client.get(upload.headers["location"], headers=headers))
+        if review is None:
+            continue
+        confirm = await _timed(stats, "confirm", client.post(
+            "/confirm", data=form_fields(review.text), headers=headers,
+        ))
+        if confirm is not None:
+            stats.completed += 1
+
+
+async def probe_loop_lag(client: httpx.AsyncClient, stats: LevelStats, deadline: float, interval: float) -> None:
+    """Time a no-op endpoint every ``interval`` seconds until ``deadline``."""
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        try:
+            await client.get(PROBE_PATH)
+            stats.loop_lag.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, image: bytes) -> dict[str, Any]:
+    """Run ``concurrency`` virtual users for ``duration`` seconds."""
+    stats = LevelStats()
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with (
+        httpx.AsyncClient(base_url=base_url, timeout=300.0, limits=limits) as client,
+        httpx.AsyncClient(base_url=base_url, timeout=30.0) as probe,
+    ):
+        t0 = time.monotonic()
+        deadline = t0 + duration
+        await asyncio.gather(
+            probe_loop_lag(probe, stats, deadline, 0.1),
+            *(virtual_user(client, load_user(index), image, stats, deadline) for index in range(concurrency)),
+        )
+        # Users finish the flow they started, so the level may overrun its deadline.
+        return stats.summary(concurrency, time.monotonic() - t0)
+
+
+def find_knee(levels: list[dict[str, Any]], min_gain: float) -> int | None:
+    """Return the concurrency beyond which throughput stopped scaling.
+
+    Args:
+        levels: Level summaries in increasing concurrency order.
+        min_gain: Minimum relative throughput improvement, e.g. ``0.1`` for 10%.
+
+    Returns:
+        The concurrency of the last level that still scaled, or ``None`` if
+        every step scaled.
+    """
+    for previous, current in zip(levels, levels[1:]):
+        before = previous["throughput_per_s"]
+        if before and (current["throughput_per_s"] - before) / before < min_gain:
+            return previous["concurrency"]
+    return None
+
+
+async def drive(base_url: str, args: argparse.Namespace) -> list[dict[str, Any]]:
+    image = make_schedule_image()
+    levels = []
+    for concurrency in args.levels:
+        summary = await run_level(base_url, concurrency, args.duration, image)
+        levels.append(summary)
+        upload = summary["steps"]["upload"]
+        confirm = summary["steps"]["confirm"]
+        print(f"c={concurrency:<4} {summary['throughput_per_s']:>7.2f} flows/s  "
+              f"upload p95={upload['p95_ms']}ms err={upload['error_rate']:.1%}  "
+              f"confirm p95={confirm['p95_ms']}ms err={confirm['error_rate']:.1%}  "
+              f"loop lag p99={summary['loop_lag_p99_ms']}ms", flush=True)
+    return levels
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--anthropic-port", type=int, default=9001)
+    parser.add_argument("--calendar-port", type=int, default=9002)
+    parser.add_argument("--latency-scale", type=float, default=0.1,
+                        help="multiplier on recorded upstream latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls that fail")
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0, help="upstream 429 threshold (0 = off)")
+    parser.add_argument("--anthropic-rpm", type=float, default=0.0,
+                        help="app-side Claude rate limit per worker (0 = off, to measure the app itself)")
+    parser.add_argument("--calendar-rpm", type=float, default=0.0,
+                        help="app-side Calendar rate limit per worker (0 = off)")
+    parser.add_argument("--knee-gain", type=float, default=0.1,
+                        help="throughput gain below which a level counts as past the knee")
+    parser.add_argument("--output", type=Path, help="write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    with servers(args) as base_url:
+        levels = asyncio.run(drive(base_url, args))
+        upstream = {
+            name: httpx.get(f"http://127.0.0.1:{port}/stats").json()
+            for name, port in (("anthropic", args.anthropic_port), ("calendar", args.calendar_port))
+        }
+
+    knee = find_knee(levels, args.knee_gain)
+    print(f"Knee: {knee if knee is not None else 'not reached'}")
+    document = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "workers": args.workers,
+        "latency_scale": args.latency_scale,
+        "error_rate": args.error_rate,
+        "rate_limit_rps": args.rate_limit_rps,
+        "anthropic_rpm": args.anthropic_rpm,
+        "calendar_rpm": args.calendar_rpm,
+        "knee_concurrency": knee,
+        "upstream": upstream,
+        "levels": levels,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Record/replay stand-ins for the Anthropic and Google Calendar clients.
+
+``ReplayAnthropic`` answers ``messages.create`` from a recording file instead
+of the network and sleeps for a latency drawn from the recording's latency
+profile, so the pipeline sees realistic timing without API keys.
+``RecordingAnthropic`` wraps a real client and captures its responses into the
+same format.  ``ReplayCalendar`` plays the part of the object returned by
+``googleapiclient.discovery.build`` for event inserts, patches, deletes, and
+an always-empty list.
+
+Recording format (JSON)::
+
+    {
+      "latency": {"pass1": {"p50": 15.0, "p95": 40.0}, "pass2": {...}, "calendar": {...}},
+      "pass1": <Message dict>,
+      "pass2": {"<sha256 of prompt>": <Message dict>, ...}
+    }
+
+Pass 2 requests with no recorded response — for example after the chunk size
+changes — are answered by echoing the pipe lines back as events and counted in
+``ReplayAnthropic.misses``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from anthropic.types import Message
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+
+class LatencyModel:
+    """Log-normal latency fitted to a p50/p95 pair, scaled for fast runs.
+
+    Args:
+        profile: Mapping of stage name to ``{"p50": seconds, "p95": seconds}``.
+        scale: Multiplier applied to every sampled latency.  ``0`` disables
+            the injected delay entirely.
+        seed: Seed for the random generator so runs are repeatable.
+    """
+
+    def __init__(self, profile: dict[str, dict[str, float]], scale: float = 1.0, seed: int = 0):
+        self.profile = profile
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, stage: str) -> float:
+        """Return a latency in seconds for one call to ``stage``."""
+        if self.scale == 0 or stage not in self.profile:
+            return 0.0
+        p50 = self.profile[stage]["p50"]
+        p95 = self.profile[stage]["p95"]
+        sigma = math.log(p95 / p50) / 1.645 if p95 > p50 else 0.0
+        with self._lock:
+            value = self._random.lognormvariate(math.log(p50), sigma)
+        return value * self.scale
+
+    def wait(self, stage: str) -> None:
+        """Sleep for one sampled latency of ``stage``."""
+        delay = self.sample(stage)
+        if delay:
+            time.sleep(delay)
+
+
+def prompt_key(messages: list[dict[str, Any]]) -> str:
+    """Return the recording key for a text-only request."""
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+
+def _is_image_request(messages: list[dict[str, Any]]) -> bool:
+    content = messages[0]["content"]
+    return isinstance(content, list) and any(part.get("type") == "image" for part in content)
+
+
+def _echo_events(prompt: str) -> str:
+    """Synthesize a Pass 2 answer by turning each pipe line into an event."""
+    events = []
+    for line in prompt.split("Schedule text:\n", 1)[-1].splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) != 4:
+            continue
+        name, day, start, end = parts
+        event = {"title": name, "date": day, "start_time": start}
+        if end:
+            event["end_time"] = end
+        events.append(event)
+    return json.dumps(events)
+
+
+def _message(model: str, text: str, input_tokens: int, output_tokens: int) -> Message:
+    return Message.model_validate({
+        "id": f"msg_replay_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+    })
+
+
+class _Messages:
+    def __init__(self, owner: ReplayAnthropic):
+        self._owner = owner
+
+    def create(self, **kwargs: Any) -> Message:
+        return self._owner._create(**kwargs)
+
+
+class ReplayAnthropic:
+    """Drop-in for ``anthropic.Anthropic`` that serves recorded responses.
+
+    Args:
+        recording: Parsed recording file.
+        latency: Latency model used to delay each response.
+    """
+
+    def __init__(self, recording: dict[str, Any], latency: LatencyModel):
+        self.recording = recording
+        self.latency = latency
+        self.messages = _Messages(self)
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def with_options(self, **_: Any) -> ReplayAnthropic:
+        return self
+
+    def _create(self, **kwargs: Any) -> Message:
+        messages = kwargs["messages"]
+        with self._lock:
+            self.calls += 1
+        if _is_image_request(messages):
+            self.latency.wait("pass1")
+            return Message.model_validate(self.recording["pass1"]).model_copy(update={"model": kwargs["model"]})
+
+        self.latency.wait("pass2")
+        recorded = self.recording.get("pass2", {}).get(prompt_key(messages))
+        if recorded is not None:
+            return Message.model_validate(recorded)
+        with self._lock:
+            self.misses += 1
+        prompt = messages[0]["content"]
+        text = _echo_events(prompt)
+        return _message(kwargs["model"], text, len(prompt) // 4, len(text) // 4)
+
+
+class RecordingAnthropic:
+    """Wrap a real ``Anthropic`` client and capture every response.
+
+    Args:
+        client: Authenticated Anthropic client that makes the real calls.
+    """
+
+    def __init__(self, client: Any):
+        self._client = client
+        self.recording: dict[str, Any] = {"pass2": {}}
+        self.messages = _Messages(self)  # type: ignore[arg-type]
+        self._lock = threading.Lock()
+
+    def with_options(self, **kwargs: Any) -> RecordingAnthropic:
+        wrapped = RecordingAnthropic(self._client.with_options(**kwargs))
+        wrapped.recording = self.recording
+        wrapped._lock = self._lock
+        return wrapped
+
+    def _create(self, **kwargs: Any) -> Message:
+        msg = self._client.messages.create(**kwargs)
+        with self._lock:
+            if _is_image_request(kwargs["messages"]):
+                self.recording["pass1"] = msg.model_dump(mode="json")
+            else:
+                self.recording["pass2"][prompt_key(kwargs["messages"])] = msg.model_dump(mode="json")
+        return msg
+
+    def save(self, path: Path, latency: dict[str, dict[str, float]]) -> None:
+        """Write the captured responses and a latency profile to ``path``."""
+        path.write_text(json.dumps({"latency": latency, **self.recording}, indent=2))
+
+
+class _Request:
+    def __init__(self, result: dict[str, Any], latency: LatencyModel):
+        self._result = result
+        self._latency = latency
+
+    def execute(self) -> dict[str, Any]:
+        self._latency.wait("calendar")
+        return self._result
+
+
+class _Events:
+    def __init__(self, owner: ReplayCalendar):
+        self._owner = owner
+
+    def insert(self, calendarId: str, body: dict[str, Any]) -> _Request:
+        event_id = body.get("id") or uuid.uuid4().hex
+        with self._owner._lock:
+            self._owner.inserted.append(body)
+        return _Request(
+            {"id": event_id, "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}", **body},
+            self._owner.latency,
+        )
+
+    def get(self, calendarId: str, eventId: str) -> _Request:
+        return _Request(
+            {"id": eventId, "htmlLink": f"https://www.google.com/calendar/event?eid={eventId}"},
+            self._owner.latency,
+        )
+
+    def patch(self, calendarId: str, eventId: str, body: dict[str, Any]) -> _Request:
+        return _Request(
+            {"id": eventId, "htmlLink": f"https://www.google.com/calendar/event?eid={eventId}", **body},
+            self._owner.latency,
+        )
+
+    def delete(self, calendarId: str, eventId: str) -> _Request:
+        return _Request({}, self._owner.latency)
+
+    def list(self, **_: Any) -> _Request:
+        # Nothing was pushed before the run, so the sync store starts empty
+        return _Request({"items": []}, self._owner.latency)
+
+    def list_next(self, request: _Request, response: dict[str, Any]) -> None:
+        return None
+
+
+class ReplayCalendar:
+    """Stand-in for the Calendar v3 service returned by ``build``.
+
+    Args:
+        latency: Latency model used to delay each ``execute`` call.
+    """
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.inserted: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def events(self) -> _Events:
+        return _Events(self)
+
+
+def load_recording(name: str = "roster") -> dict[str, Any]:
+    """Load ``recordings/<name>.json``."""
+    return json.loads((RECORDINGS_DIR / f"{name}.json").read_text())
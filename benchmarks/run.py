@@ -0,0 +1,314 @@
+"""Offline benchmark runner for the parsing and push pipeline.
+
+Replays recorded Anthropic and Calendar responses with injected latency and
+drives each stage end to end:
+
+- ``parse_events``  — both Claude passes through ``parser.parse_events``
+- ``upload``        — ``POST /upload`` including resize and session write
+- ``confirm``       — ``POST /api/confirm`` including event validation and push
+- ``push_events``   — ``calendar.push_events`` on its own
+
+Each scenario is first run untraced for latency (p50/p95) and throughput, then
+once under ``tracemalloc`` for net allocations and peak memory.  Results are
+written as JSON so runs from different commits can be compared::
+
+    python -m benchmarks.run --latency-scale 0.01 --output bench-results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run compare bench-results/abc123.json bench-results/def456.json
+
+``--record`` runs ``parse_events`` once against the real API (needs
+``ANTHROPIC_API_KEY``) and saves the responses as a new recording.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from datetime import time as dtime
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from unittest.mock import patch
+
+from PIL import Image, ImageDraw
+
+from benchmarks.replay import LatencyModel, RecordingAnthropic, ReplayAnthropic, ReplayCalendar, load_recording
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-replay")
+
+SCENARIOS = ("parse_events", "upload", "confirm", "push_events")
+
+
+def make_schedule_image(rows: int = 12, columns: int = 7) -> bytes:
+    """Render a ruled schedule grid as JPEG bytes, standing in for a photo."""
+    img = Image.new("RGB", (2400, 1600), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(rows + 1):
+        y = 20 + i * (1560 // rows)
+        draw.line([(0, y), (2400, y)], fill="black", width=4)
+    for i in range(columns + 1):
+        x = 20 + i * (2360 // columns)
+        draw.line([(x, 0), (x, 1600)], fill="black", width=4)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(len(ordered) * pct / 100) - 1))
+    return ordered[index]
+
+
+class Harness:
+    """Builds the replay fakes and runs one iteration of each scenario.
+
+    Args:
+        recording: Parsed recording file.
+        latency_scale: Multiplier applied to every injected latency.
+        events: Number of events pushed by the ``confirm`` and
+            ``push_events`` scenarios.
+    """
+
+    def __init__(self, recording: dict[str, Any], latency_scale: float, events: int):
+        self.latency = LatencyModel(recording["latency"], scale=latency_scale)
+        self.anthropic = ReplayAnthropic(recording, self.latency)
+        self.calendar = ReplayCalendar(self.latency)
+        self.image = make_schedule_image()
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix="planogram-bench-"))
+        # Each confirm starts from an empty sync store so it measures a first push
+        self.sync_state = self.tmp_dir / "pushed_events.db"
+        os.environ["SYNC_STATE_PATH"] = str(self.sync_state)
+        os.environ["USAGE_DB_PATH"] = str(self.tmp_dir / "usage.db")
+        self.events = [_event(i) for i in range(events)]
+
+    @contextmanager
+    def patched(self) -> Iterator[None]:
+        """Route every upstream call to the replay fakes."""
+        with ExitStack() as stack:
+            stack.enter_context(patch("anthropic.Anthropic", return_value=self.anthropic))
+            stack.enter_context(patch("planogram.services.calendar.build_service", return_value=self.calendar))
+            stack.enter_context(patch("planogram.routes.review.cal_service.get_credentials", return_value=object()))
+            for module in ("upload", "review", "api"):
+                stack.enter_context(patch(f"planogram.routes.{module}.TMP_DIR", self.tmp_dir))
+            yield
+
+    def scenario(self, name: str) -> Callable[[], None]:
+        """Return a zero-argument callable running one iteration of ``name``."""
+        from starlette.testclient import TestClient
+
+        from main import app
+        from planogram.models import ParsedSchedule
+        from planogram.services import calendar, parser, sessions
+
+        client = TestClient(app)
+        today = date.today().isoformat()
+        schedule = ParsedSchedule(events=self.events, raw_ocr_text="", source_image_name="bench.jpg")
+
+        def run_parse() -> None:
+            parser.parse_events(self.image, "image/jpeg", "sk-ant-replay", today)
+
+        def run_upload() -> None:
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", self.image, "image/jpeg")},
+                follow_redirects=False,
+            )
+            assert response.status_code == 303, response.text
+
+        def run_confirm() -> None:
+            # A fresh session each time: the push deletes it, and iterations may overlap
+            session_id = str(uuid.uuid4())
+            sessions.save_session(self.tmp_dir, session_id, schedule)
+            body = {
+                "session_id": session_id,
+                "notification_minutes": 30,
+                "events": [event.model_dump(mode="json") for event in self.events],
+            }
+            self.sync_state.unlink(missing_ok=True)
+            response = client.post("/api/confirm", json=body)
+            assert response.status_code == 200, response.text
+
+        def run_push() -> None:
+            calendar.push_events(self.events, object(), "primary", "America/New_York", 30)  # type: ignore[arg-type]
+
+        return {
+            "parse_events": run_parse,
+            "upload": run_upload,
+            "confirm": run_confirm,
+            "push_events": run_push,
+        }[name]
+
+
+def _event(i: int):
+    from planogram.models import ScheduleEvent
+
+    return ScheduleEvent(
+        title=f"Shift {i}",
+        date=date(2025, 1, 6 + i % 7),
+        start_time=dtime(9 + i % 8, 0),
+        end_time=dtime(17, 0),
+        location="Store 12",
+    )
+
+
+def measure(fn: Callable[[], None], iterations: int, concurrency: int, warmup: int) -> dict[str, Any]:
+    """Time ``fn`` and then profile its memory use.
+
+    Args:
+        fn: One iteration of a scenario.
+        iterations: Timed iterations.
+        concurrency: Worker threads running iterations in parallel.
+        warmup: Untimed iterations run first to fill caches.
+
+    Returns:
+        Latency percentiles, throughput, net allocations, and peak memory.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies: list[float] = []
+
+    def timed() -> None:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    wall0 = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(iterations):
+            timed()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda _: timed(), range(iterations)))
+    wall = time.perf_counter() - wall0
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks_before = sys.getallocatedblocks()
+    fn()
+    blocks_after = sys.getallocatedblocks()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_per_s": round(iterations / wall, 3),
+        "net_alloc_kib": round((after - before) / 1024, 1),
+        "net_alloc_blocks": blocks_after - blocks_before,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the selected scenarios and return the results document."""
+    from main import app  # noqa: F401 — configures logging, which is then quietened
+
+    logging.getLogger().setLevel(logging.WARNING)
+    harness = Harness(load_recording(args.recording), args.latency_scale, args.events)
+    results: dict[str, Any] = {}
+    with harness.patched():
+        for name in args.scenarios:
+            results[name] = measure(harness.scenario(name), args.iterations, args.concurrency, args.warmup)
+            print(f"{name:<14} p50={results[name]['p50_ms']:>9.1f}ms  p95={results[name]['p95_ms']:>9.1f}ms  "
+                  f"{results[name]['throughput_per_s']:>8.2f}/s  peak={results[name]['peak_kib']:>9.1f}KiB")
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "recording": args.recording,
+        "latency_scale": args.latency_scale,
+        "replay_misses": harness.anthropic.misses,
+        "scenarios": results,
+    }
+
+
+def compare(baseline: Path, candidate: Path) -> None:
+    """Print the relative change of every metric between two result files."""
+    old = json.loads(baseline.read_text())["scenarios"]
+    new = json.loads(candidate.read_text())["scenarios"]
+    for name in sorted(old.keys() & new.keys()):
+        print(name)
+        for metric in ("p50_ms", "p95_ms", "throughput_per_s", "net_alloc_kib", "peak_kib"):
+            a, b = old[name][metric], new[name][metric]
+            change = (b - a) / a * 100 if a else 0.0
+            print(f"  {metric:<18} {a:>12.2f} → {b:>12.2f}  ({change:+.1f}%)")
+
+
+def record(path: Path) -> None:
+    """Run ``parse_events`` once against the real API and save the responses."""
+    from anthropic import Anthropic
+
+    from planogram.config import get_settings
+    from planogram.services import parser
+
+    settings = get_settings()
+    recorder = RecordingAnthropic(Anthropic(api_key=settings.anthropic_api_key, max_retries=0))
+    with patch("anthropic.Anthropic", return_value=recorder):
+        parser.parse_events(make_schedule_image(), "image/jpeg", settings.anthropic_api_key,
+                            date.today().isoformat(), settings=settings)
+    recorder.save(path, load_recording()["latency"])
+    print(f"Saved recording to {path}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command")
+    cmp = sub.add_parser("compare", help="compare two result files")
+    cmp.add_argument("baseline", type=Path)
+    cmp.add_argument("candidate", type=Path)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--events", type=int, default=100, help="events pushed by confirm/push_events")
+    parser.add_argument("--latency-scale", type=float, default=0.01,
+                        help="multiplier on recorded latencies (1.0 = production-like, 0 = none)")
+    parser.add_argument("--recording", default="roster")
+    parser.add_argument("--output", type=Path, help="write results JSON to this file")
+    parser.add_argument("--record", type=Path, help="record real API responses to this file instead")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+        return
+    if args.record:
+        record(args.record)
+        return
+
+    document = run(args)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(document, indent=2))
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(document, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold-start benchmark: how long ``import main`` takes and what it pulls in.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter, so
+nothing is already in ``sys.modules``, and parses the per-module timings it
+writes to stderr.  Reports the total import time, the slowest top-level
+imports, and whether any of the dependencies that are meant to load lazily
+(``LAZY_MODULES``) were imported at startup::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 15
+
+Exits non-zero if a lazy module was imported.  ``tests/test_startup.py``
+runs the same check in the test suite.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy dependencies that only requests which use them should load
+LAZY_MODULES = (
+    "anthropic",
+    "PIL",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib",
+    "google.oauth2.credentials",
+    "google.auth.transport.requests",
+)
+
+
+@dataclass
+class ImportTiming:
+    """One line of ``-X importtime`` output.
+
+    Attributes:
+        module: Dotted module name.
+        self_us: Microseconds spent in the module itself.
+        cumulative_us: Microseconds including the modules it imported.
+        depth: Nesting level; 0 for modules imported by the ``-c`` script.
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(statement: str = "import main") -> list[ImportTiming]:
+    """Run ``statement`` in a fresh interpreter and return its import timings."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append(ImportTiming(
+            module=name.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            depth=(len(name) - len(name.lstrip()) - 1) // 2,
+        ))
+    return timings
+
+
+def total_seconds(timings: list[ImportTiming]) -> float:
+    """Return the wall time of every top-level import, in seconds."""
+    return sum(t.cumulative_us for t in timings if t.depth == 0) / 1e6
+
+
+def lazy_imports(timings: list[ImportTiming]) -> list[str]:
+    """Return the ``LAZY_MODULES`` (or their submodules) that were imported."""
+    return sorted(
+        {lazy for t in timings for lazy in LAZY_MODULES if t.module == lazy or t.module.startswith(lazy + ".")}
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time (default 3)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list (default 10)")
+    parser.add_argument("--statement", default="import main", help="code to time (default 'import main')")
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.statement) for _ in range(args.runs)]
+    totals = [total_seconds(timings) for timings in runs]
+    print(f"{args.statement}: median {statistics.median(totals) * 1000:.0f} ms "
+          f"over {args.runs} run(s) (min {min(totals) * 1000:.0f} ms)")
+
+    slowest = sorted(runs[-1], key=lambda t: t.cumulative_us, reverse=True)[: args.top]
+    for timing in slowest:
+        print(f"  {timing.cumulative_us / 1000:>8.1f} ms  {'  ' * timing.depth}{timing.module}")
+
+    loaded = lazy_imports(runs[-1])
+    if loaded:
+        print(f"Imported at startup but meant to load lazily: {', '.join(loaded)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
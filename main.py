@@ -1,7 +1,7 @@
 """Planogram FastAPI application entry point.
 
-Mounts the static file directory and registers the upload, review, and auth
-routers.  The OAUTHLIB_INSECURE_TRANSPORT environment variable is set to allow
+Mounts the static file directory and registers the upload, review, auth,
+metrics, and JSON API routers.  The OAUTHLIB_INSECURE_TRANSPORT environment variable is set to allow
 the Google OAuth redirect over plain HTTP during local development — remove or
 guard this for any internet-facing deployment.
 
@@ -9,6 +9,8 @@ Run with:
     uvicorn main:app --reload --port 8080
 """
 
+import asyncio
+import contextlib
 import logging
 import os
 import time
@@ -19,7 +21,9 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from planogram.routes import auth, review, upload
+from planogram.config import get_settings
+from planogram.routes import api, auth, metrics, review, upload
+from planogram.services import admission, calendar, credentials, scheduler, sessions, tracing
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,7 +38,13 @@ _SESSION_MAX_AGE = 24 * 3600  # seconds
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    """Delete session files older than 24 hours on startup."""
+    """Configure tracing, limits and session storage, delete sessions older than 24 hours, and refresh tokens."""
+    settings = get_settings()
+    tracing.set_exporter(tracing.exporter_from_settings(settings.trace_exporter, settings.trace_export_path))
+    scheduler.configure(settings)
+    admission.configure(settings)
+    sessions.configure(settings)
+
     removed = 0
     if _TMP_DIR.exists():
         cutoff = time.time() - _SESSION_MAX_AGE
@@ -44,7 +54,13 @@ async def lifespan(_: FastAPI):
                 removed += 1
     if removed:
         _logger.info("Cleaned up %d expired session file(s)", removed)
+
+    cache = calendar.credential_cache(settings.credential_db_path, settings.credential_key)
+    refresher = asyncio.create_task(credentials.refresh_loop(cache))
     yield
+    refresher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await refresher
 
 
 # Allow OAuth over plain HTTP for local development
@@ -62,3 +78,5 @@ async def chrome_devtools() -> JSONResponse:
 app.include_router(upload.router)
 app.include_router(review.router)
 app.include_router(auth.router)
+app.include_router(metrics.router)
+app.include_router(api.router)
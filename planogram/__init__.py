@@ -6,4 +6,8 @@ using Claude AI, and pushes confirmed events to Google Calendar.
 Packages:
     services: OCR, AI parsing, and Google Calendar integration.
     routes:   FastAPI route handlers for upload, review, and OAuth flows.
+
+Modules:
+    cli:      The ``planogram`` command for headless batch processing.
+    watcher:  The ``planogram-watch`` hot-folder ingestion service.
 """
@@ -0,0 +1,428 @@
+"""Headless batch processing — the ``planogram`` console script.
+
+Runs the same ``resize`` → ``parse_events`` pipeline as ``POST /upload`` over
+many schedule images without the browser, for cron jobs and bulk imports::
+
+    planogram rosters/                     # one JSON file per image in planogram-out/
+    planogram rosters/*.png --output ics --person "Jane Doe"
+    planogram rosters/ --output push --user <id> --concurrency 8
+
+``--output`` chooses what happens to each parsed schedule:
+
+- ``json`` writes the ``ParsedSchedule`` (events, transcription, usage).
+- ``ics`` writes an iCalendar file of the events.
+- ``push`` syncs the events to Google Calendar with the stored OAuth token of
+  ``--user`` (the id in a browser's ``planogram_user`` cookie, after that
+  browser has authorized Calendar once).  The sync store dedupes shifts that
+  were already pushed, by the web app or an earlier run.
+
+Output files are named after their image (``x.png`` → ``x.json``).  When two
+images share a name stem, e.g. ``a/x.png`` and ``b/x.png`` or ``x.png`` and
+``x.jpg``, or an earlier run already wrote that name for another image, the
+stem gets a short hash of the image's path (``x-1f2e3d4c.json``) so neither
+overwrites the other.
+
+Every finished file is recorded in a manifest (``manifest.json`` in the
+output directory by default) with its content hash, outcome, event count,
+timing, and Claude cost.  Rerunning the same command skips files that
+already succeeded and have not changed since, so an interrupted or partly
+failed run resumes where it stopped.  Progress and per-file timings are
+printed as files finish; the exit status is 1 if any file failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from planogram.config import Settings, get_settings
+from planogram.models import ParsedSchedule
+from planogram.routes.upload import MEDIA_TYPE_MAP, resize
+from planogram.services import calendar as cal_service
+from planogram.services import ics, parser, scheduler, tracing, usage
+from planogram.services.sync import SyncStore
+
+logger = logging.getLogger(__name__)
+
+# Usage and rate limits are attributed to this user when no --user is given
+CLI_USER = "cli"
+DEFAULT_OUT_DIR = Path("planogram-out")
+
+
+class ManifestEntry(BaseModel):
+    """Outcome of processing one file.
+
+    Attributes:
+        digest: SHA-256 of the file contents when it was processed.
+        status: ``"done"`` or ``"failed"``.
+        events: Events parsed from the file.
+        seconds: Wall time spent on the file.
+        cost_usd: Claude cost of parsing the file.
+        output: File written, or a summary of the calendar sync.
+        error: Why the file failed.
+    """
+
+    digest: str
+    status: Literal["done", "failed"]
+    events: int = 0
+    seconds: float = 0.0
+    cost_usd: float = 0.0
+    output: str = ""
+    error: str = ""
+
+
+class Manifest(BaseModel):
+    """Per-file outcomes of a batch run, keyed by absolute path."""
+
+    files: dict[str, ManifestEntry] = Field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> Manifest:
+        """Read a manifest, or return an empty one if ``path`` does not exist."""
+        if not path.exists():
+            return cls()
+        return cls.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def save(self, path: Path) -> None:
+        """Write the manifest atomically, so an interrupted run never leaves it half-written."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    def is_done(self, key: str, digest: str) -> bool:
+        """Return whether ``key`` already succeeded with the same contents."""
+        entry = self.files.get(key)
+        return entry is not None and entry.status == "done" and entry.digest == digest
+
+
+def find_images(paths: list[Path]) -> list[Path]:
+    """Expand directories to the images directly inside them.
+
+    Args:
+        paths: Image files and directories, as given on the command line.
+
+    Returns:
+        Distinct files in the order given, each directory's images sorted by
+        name.  Files named explicitly are kept whatever their extension.
+    """
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files += sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower().lstrip(".") in MEDIA_TYPE_MAP)
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def parse_image(
+    image_bytes: bytes, filename: str, person: str | None, user_id: str, settings: Settings, store: usage.UsageStore
+) -> ParsedSchedule:
+    """Resize and parse one schedule image the way ``POST /upload`` does.
+
+    Args:
+        image_bytes: The image file's contents.
+        filename: Name recorded as the schedule's source image.
+        person: Only keep this person's shifts; ``None`` keeps everyone's.
+        user_id: Who the schedule belongs to and whose budget it counts against.
+        settings: Application settings.
+        store: Usage store the Claude calls are recorded in.
+
+    Returns:
+        The parsed schedule, with its Claude usage.
+
+    Raises:
+        OSError: If the image cannot be read.
+        BudgetExceededError: If parsing would exceed a daily Claude budget.
+        ValueError: If Claude's response cannot be parsed into events.
+        UpstreamUnavailableError: If Claude does not respond.
+    """
+    resized, media_type = resize(image_bytes)
+    usage.check_budget(
+        store, user_id, usage.estimate_upload_cost(settings.transcribe_model, settings.extract_model),
+        settings.daily_budget_usd, settings.user_daily_budget_usd,
+    )
+    with usage.recording(user_id, store) as spent:
+        events, raw_response = parser.parse_events(
+            resized, media_type, settings.anthropic_api_key, date.today().isoformat(),
+            person_name=person, settings=settings,
+        )
+    return ParsedSchedule(
+        events=events,
+        raw_ocr_text=raw_response,
+        source_image_name=filename,
+        source_digest=hashlib.sha256(image_bytes).hexdigest()[:32],
+        person_name=person,
+        user_id=user_id,
+        usage=spent,
+    )
+
+
+def push_schedule(
+    schedule: ParsedSchedule,
+    session_id: str,
+    settings: Settings,
+    sync_store: SyncStore,
+    notification_minutes: int | None = None,
+) -> cal_service.SyncResult:
+    """Sync a parsed schedule to its owner's Google Calendar.
+
+    Args:
+        schedule: The schedule; pushed with the stored token of its ``user_id``.
+        session_id: Id the event ids are derived from; reuse it when retrying
+            the same schedule so inserts stay idempotent.
+        settings: Application settings.
+        sync_store: Shared store of previously pushed shifts.
+        notification_minutes: See ``push_events``.
+
+    Returns:
+        What the sync inserted, updated, deleted and left alone.
+
+    Raises:
+        NeedsAuthError: If the owner has never authorized Calendar access.
+        HttpError: On a Calendar API error.
+    """
+    creds = cal_service.get_credentials(schedule.user_id, settings.credential_db_path, settings.credential_key)
+    with scheduler.client(schedule.user_id, scheduler.push_priority(len(schedule.events))):
+        return cal_service.sync_events(
+            schedule.events, creds, settings.google_calendar_id, settings.timezone, sync_store,
+            person=schedule.person_name or "",
+            notification_minutes=notification_minutes,
+            api_endpoint=settings.google_calendar_api_endpoint or None,
+            session_id=session_id,
+            account=schedule.user_id,
+            origin=schedule.source_digest or "",
+        )
+
+
+def output_paths(paths: list[Path], suffix: str, out_dir: Path, manifest: Manifest) -> dict[Path, Path]:
+    """Choose the output file of every image so that no two images share one.
+
+    Args:
+        paths: Every image of the run, including ones the manifest skips.
+        suffix: Extension of the output files, e.g. ``".json"``.
+        out_dir: Directory the files are written to.
+        manifest: Outcomes of earlier runs, whose recorded outputs are
+            already taken by the images that wrote them.
+
+    Returns:
+        The output file of each image: ``<stem><suffix>`` when the stem is
+        unique, otherwise ``<stem>-<hash of the image path><suffix>``.
+    """
+    stems = Counter(path.stem.lower() for path in paths)
+    taken = {entry.output: key for key, entry in manifest.files.items() if entry.output}
+    targets = {}
+    for path in paths:
+        key = str(path.resolve())
+        target = out_dir / f"{path.stem}{suffix}"
+        if stems[path.stem.lower()] > 1 or taken.get(str(target), key) != key:
+            target = out_dir / f"{path.stem}-{hashlib.sha256(key.encode()).hexdigest()[:8]}{suffix}"
+        targets[path] = target
+    return targets
+
+
+def process_file(
+    path: Path,
+    image_bytes: bytes,
+    digest: str,
+    target: Path | None,
+    args: argparse.Namespace,
+    settings: Settings,
+    store: usage.UsageStore,
+    sync_store: SyncStore,
+) -> ManifestEntry:
+    """Parse one image and write or push its events.
+
+    Runs on a worker thread; errors are caught and recorded so one bad file
+    does not stop the batch.
+
+    Args:
+        path: The image file.
+        image_bytes: Its contents.
+        digest: SHA-256 of ``image_bytes``, also used as the push session id
+            so a retried push of the same file reuses its event ids.
+        target: File to write for ``json`` and ``ics`` output; ``None`` for
+            ``push``.
+        args: Parsed command-line options.
+        settings: Application settings.
+        store: Usage store the Claude calls are recorded in.
+        sync_store: Store of previously pushed shifts, shared by all workers.
+
+    Returns:
+        The file's manifest entry.
+    """
+    t0 = time.perf_counter()
+    user_id = args.user or CLI_USER
+    try:
+        with (
+            tracing.span("cli_file", trace_id=digest[:32], filename=path.name) as span,
+            scheduler.client(user_id, "bulk"),
+        ):
+            schedule = parse_image(image_bytes, path.name, args.person, user_id, settings, store)
+            output = _deliver(path, schedule, digest, target, args, settings, sync_store)
+            span.set(events=len(schedule.events))
+    except Exception as exc:
+        logger.warning("Processing %s failed: %s", path, exc)
+        return ManifestEntry(
+            digest=digest, status="failed", seconds=time.perf_counter() - t0, error=f"{type(exc).__name__}: {exc}"
+        )
+    return ManifestEntry(
+        digest=digest, status="done", events=len(schedule.events), seconds=time.perf_counter() - t0,
+        cost_usd=sum(record.cost_usd for record in schedule.usage), output=output,
+    )
+
+
+def _deliver(
+    path: Path, schedule: ParsedSchedule, digest: str, target: Path | None, args: argparse.Namespace,
+    settings: Settings, sync_store: SyncStore,
+) -> str:
+    """Write or push one parsed schedule and describe where it went."""
+    if args.output == "json":
+        target.write_text(schedule.model_dump_json(indent=2), encoding="utf-8")
+        return str(target)
+    if args.output == "ics":
+        calendar_name = args.person or path.stem
+        target.write_text(
+            ics.to_ics(schedule.events, settings.timezone, args.notification_minutes, calendar_name), encoding="utf-8"
+        )
+        return str(target)
+
+    result = push_schedule(schedule, digest[:32], settings, sync_store, args.notification_minutes)
+    return (f"{result.inserted} inserted, {result.patched} updated, "
+            f"{result.deleted} deleted, {result.unchanged} unchanged")
+
+
+def _report(done: int, total: int, path: Path, entry: ManifestEntry) -> None:
+    """Print one progress line for a finished file."""
+    width = len(str(total))
+    detail = f"{entry.events} event(s)" if entry.status == "done" else entry.error
+    print(f"[{done:>{width}}/{total}] {entry.status:<6} {path.name}  {entry.seconds:.1f}s  "
+          f"${entry.cost_usd:.4f}  {detail}", flush=True)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser_ = argparse.ArgumentParser(
+        prog="planogram", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser_.add_argument("paths", nargs="+", type=Path, help="schedule images, or directories of them")
+    parser_.add_argument("--output", choices=("json", "ics", "push"), default="json",
+                         help="what to do with each parsed schedule (default json)")
+    parser_.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR,
+                         help=f"where JSON/ICS files and the manifest go (default {DEFAULT_OUT_DIR})")
+    parser_.add_argument("--manifest", type=Path, help="resume manifest (default OUT_DIR/manifest.json)")
+    parser_.add_argument("--concurrency", type=int, default=4, help="files processed at once (default 4)")
+    parser_.add_argument("--person", help="only keep this person's shifts")
+    parser_.add_argument("--user", help="user id whose Calendar token --output push uses")
+    parser_.add_argument("--notification-minutes", type=int,
+                         help="reminder lead time; 0 for none (default: the calendar's)")
+    parser_.add_argument("--force", action="store_true", help="reprocess files the manifest lists as done")
+    parser_.add_argument("-v", "--verbose", action="store_true", help="log pipeline details")
+    return parser_
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the ``planogram`` command.
+
+    Args:
+        argv: Command-line arguments; defaults to ``sys.argv[1:]``.
+
+    Returns:
+        0 if every file succeeded or was skipped, 1 if any failed, and 2 for
+        invalid arguments or missing Calendar authorization.
+    """
+    arg_parser = _build_parser()
+    args = arg_parser.parse_args(argv)
+    if args.concurrency < 1:
+        arg_parser.error("--concurrency must be at least 1")
+    if args.output == "push" and not args.user:
+        arg_parser.error("--output push needs --user")
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)-8s %(name)s – %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    settings = get_settings()
+    tracing.set_exporter(tracing.exporter_from_settings(settings.trace_exporter, settings.trace_export_path))
+    scheduler.configure(settings)
+    if args.output == "push":
+        try:
+            cal_service.get_credentials(args.user, settings.credential_db_path, settings.credential_key)
+        except cal_service.NeedsAuthError:
+            print(f"No Google Calendar authorization for user {args.user}; "
+                  "confirm a schedule in the web app from that browser first.", file=sys.stderr)
+            return 2
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = args.manifest or args.out_dir / "manifest.json"
+    manifest = Manifest.load(manifest_path)
+    store = usage.usage_store(settings.usage_db_path)
+    sync_store = SyncStore(settings.sync_state_path)
+
+    images = find_images(args.paths)
+    targets: dict[Path, Path] = {}
+    if args.output != "push":
+        targets = output_paths(images, f".{args.output}", args.out_dir, manifest)
+
+    jobs = []
+    skipped = unreadable = 0
+    for path in images:
+        try:
+            image_bytes = path.read_bytes()
+        except OSError as exc:
+            print(f"Cannot read {path}: {exc}", file=sys.stderr)
+            manifest.files[str(path.resolve())] = ManifestEntry(digest="", status="failed", error=str(exc))
+            unreadable += 1
+            continue
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        if not args.force and manifest.is_done(str(path.resolve()), digest):
+            skipped += 1
+            continue
+        jobs.append((path, image_bytes, digest))
+    print(f"{len(jobs)} file(s) to process, {skipped} already done", flush=True)
+
+    t0 = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        futures = {
+            pool.submit(
+                tracing.propagate(process_file), path, image_bytes, digest, targets.get(path), args, settings, store,
+                sync_store,
+            ): path
+            for path, image_bytes, digest in jobs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            entry = future.result()
+            manifest.files[str(path.resolve())] = entry
+            manifest.save(manifest_path)
+            _report(done, len(jobs), path, entry)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        manifest.save(manifest_path)
+        print(f"Interrupted; rerun the same command to resume from {manifest_path}", file=sys.stderr)
+        return 130
+    finally:
+        pool.shutdown()
+    manifest.save(manifest_path)
+
+    entries = [manifest.files[str(path.resolve())] for path, _, _ in jobs]
+    failed = sum(entry.status == "failed" for entry in entries) + unreadable
+    print(f"Processed {len(entries) + unreadable} file(s) in {time.perf_counter() - t0:.1f}s: "
+          f"{len(entries) + unreadable - failed} done, {failed} failed, {skipped} skipped; "
+          f"{sum(entry.events for entry in entries)} event(s), ${sum(entry.cost_usd for entry in entries):.4f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
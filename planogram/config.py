@@ -6,11 +6,31 @@ overridden by setting the corresponding environment variable or adding it to a
 """
 
 from pathlib import Path
+from typing import Literal
 
-from pydantic import Field, field_validator
+from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class WatchFolder(BaseModel):
+    """A hot folder the watcher picks new schedule images up from.
+
+    Attributes:
+        path: Directory to watch.  Only files directly inside it are picked up.
+        user_id: Owner of the sessions created from the folder (the id in a
+            browser's ``planogram_user`` cookie); trusted folders push with
+            this user's Google token.
+        person_name: Only keep this person's shifts.  Empty keeps everyone's.
+        trusted: Push parsed events straight to Google Calendar instead of
+            creating a session for review.
+    """
+
+    path: Path
+    user_id: str
+    person_name: str = ""
+    trusted: bool = False
+
+
 class Settings(BaseSettings):
     """Application settings populated from environment variables or .env.
 
@@ -18,8 +38,11 @@ class Settings(BaseSettings):
         anthropic_api_key: Secret key for the Anthropic Claude API.
         google_oauth_credentials_path: Path to the Google OAuth 2.0 client
             secrets JSON file downloaded from Google Cloud Console.
-        google_token_path: Path where the user's OAuth token is persisted after
-            the first successful authorization.
+        credential_db_path: SQLite database holding each user's OAuth token,
+            encrypted, after their first successful authorization.
+        credential_key: Fernet key (urlsafe base64, 32 bytes) used to encrypt
+            stored tokens.  Empty generates one next to the database on first
+            use; set it explicitly when tokens must survive a lost key file.
         google_calendar_id: Google Calendar to push events to.  Defaults to the
             authenticated user's primary calendar.
         timezone: IANA timezone name used when creating calendar events.
@@ -27,17 +50,128 @@ class Settings(BaseSettings):
             autocomplete suggestions on the review form.
         google_oauth_redirect_uri: Redirect URI registered in the Google Cloud
             Console OAuth client configuration.
+        claude_pass1_timeout: Seconds before a transcription request is
+            abandoned and retried.
+        claude_pass2_timeout: Seconds before an extraction request is
+            abandoned and retried.
+        claude_max_retries: Retries after the first attempt for overloaded,
+            rate-limited, 5xx, or timed-out Claude calls.
+        claude_hedge_requests: Send a duplicate Claude request once the
+            primary has been outstanding longer than the observed p95 latency,
+            and use whichever response arrives first.  Trades extra spend for
+            a shorter latency tail.
+        transcribe_model: Pass 1 model for dense or handwritten schedules, and
+            the escalation target when the fast model's output is unusable.
+        transcribe_fast_model: Pass 1 model for simple printed schedules.
+        extract_model: Pass 2 model that turns the transcription into events.
+        router_enabled: Route Pass 1 by image complexity.  When ``False``
+            every image goes to ``transcribe_model``.
+        router_max_grid_rows: Most ruled rows an image may have to be routed to
+            the fast model.
+        router_max_entropy: Highest grayscale entropy, in bits, routed to the
+            fast model.
+        router_max_handwriting_score: Highest handwriting score (0–1) routed
+            to the fast model.
+        transcribe_repair_max_columns: Most ``DATE:`` blocks of one Pass 1
+            transcription that are re-transcribed from a crop of their column
+            when they fail structural checks.  More failures than this (or
+            every block failing) fall back to escalating the whole image.
+            Zero disables column repair.
+        trace_exporter: Where finished tracing spans go — ``"none"`` to
+            discard them or ``"jsonl"`` to append them to ``trace_export_path``.
+        trace_export_path: Output file for the ``jsonl`` trace exporter.
+        anthropic_base_url: Override for the Anthropic API base URL, e.g. a
+            local stand-in server for load testing.  Empty uses the default.
+        google_calendar_api_endpoint: Override for the Google Calendar API
+            endpoint (including the ``/calendar/v3/`` path).  Empty uses the
+            default.
+        sync_state_path: SQLite database mapping each pushed shift's
+            fingerprint to its Calendar event id, used to update a revised
+            schedule in place instead of duplicating it.
+        anthropic_requests_per_minute: Claude requests each worker may send
+            per minute; calls beyond it wait their turn.  Zero is unlimited.
+        anthropic_tokens_per_minute: Claude input plus output tokens each
+            worker may spend per minute.  Zero is unlimited.
+        calendar_requests_per_minute: Google Calendar API requests each worker
+            may send per minute, counting every call in a batch.  Zero is
+            unlimited.
+        upload_max_in_flight: Uploads each worker processes at once.  Zero
+            disables upload admission control.
+        upload_max_queue: Uploads each worker holds waiting for a slot;
+            further uploads get 429.
+        confirm_max_in_flight: Confirms each worker pushes at once.  Zero
+            disables confirm admission control.
+        confirm_max_queue: Confirms each worker holds waiting for a slot.
+        admission_queue_timeout: Seconds a queued upload or confirm may wait
+            for a slot before it gets 429.
+        usage_db_path: SQLite database of Claude token and cost totals per
+            day, user, model, and stage, shared by every worker.
+        daily_budget_usd: Estimated Claude spend allowed per UTC day across
+            all users; uploads and re-extractions that would exceed it get
+            429.  Zero is unlimited.
+        user_daily_budget_usd: Estimated Claude spend allowed per UTC day for
+            each user.  Zero is unlimited.
+        session_compression: How to compress each session's stored
+            transcription — ``"none"``, ``"gzip"``, or ``"zstd"`` (Python
+            3.14 or later; falls back to gzip).
+        watch_folders: Hot folders for ``planogram-watch``, as a JSON list of
+            ``WatchFolder`` objects.
+        watch_workers: Files the watcher parses at once.
+        watch_settle_seconds: How long a file's size and modification time
+            must stay unchanged before the watcher treats it as fully written.
+        watch_poll_interval: Seconds between directory scans when polling, and
+            between settle checks otherwise.
+        watch_force_polling: Scan the folders instead of using filesystem
+            notifications, e.g. for network shares that do not deliver them.
+        watch_ledger_path: SQLite database of every file the watcher has
+            handled, by content hash, so none is processed twice.
     """
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     anthropic_api_key: str = Field(default="")
     google_oauth_credentials_path: Path = Path("credentials/oauth-client.json")
-    google_token_path: Path = Path("credentials/token.json")
+    credential_db_path: Path = Path("credentials/credentials.db")
+    credential_key: str = ""
     google_calendar_id: str = "primary"
     timezone: str = "America/New_York"
     google_maps_api_key: str = ""
     google_oauth_redirect_uri: str = "http://localhost:8080/auth/callback"
+    claude_pass1_timeout: float = 120.0
+    claude_pass2_timeout: float = 60.0
+    claude_max_retries: int = 3
+    claude_hedge_requests: bool = False
+    transcribe_model: str = "claude-opus-4-7"
+    transcribe_fast_model: str = "claude-haiku-4-5"
+    extract_model: str = "claude-sonnet-4-6"
+    router_enabled: bool = True
+    router_max_grid_rows: int = 12
+    router_max_entropy: float = 4.5
+    router_max_handwriting_score: float = 0.42
+    transcribe_repair_max_columns: int = 4
+    trace_exporter: Literal["none", "jsonl"] = "none"
+    trace_export_path: Path = Path("traces/spans.jsonl")
+    anthropic_base_url: str = ""
+    google_calendar_api_endpoint: str = ""
+    sync_state_path: Path = Path("credentials/pushed_events.db")
+    anthropic_requests_per_minute: float = 50
+    anthropic_tokens_per_minute: float = 0
+    calendar_requests_per_minute: float = 600
+    upload_max_in_flight: int = 4
+    upload_max_queue: int = 16
+    confirm_max_in_flight: int = 8
+    confirm_max_queue: int = 32
+    admission_queue_timeout: float = 30.0
+    usage_db_path: Path = Path("credentials/usage.db")
+    daily_budget_usd: float = 0
+    user_daily_budget_usd: float = 0
+    session_compression: Literal["none", "gzip", "zstd"] = "none"
+    watch_folders: list[WatchFolder] = Field(default_factory=list)
+    watch_workers: int = 2
+    watch_settle_seconds: float = 5.0
+    watch_poll_interval: float = 2.0
+    watch_force_polling: bool = False
+    watch_ledger_path: Path = Path("credentials/watched.db")
 
     @field_validator("anthropic_api_key")
     @classmethod
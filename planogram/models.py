@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+import uuid
 from datetime import date, time
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class ScheduleEvent(BaseModel):
@@ -33,6 +34,30 @@ class ScheduleEvent(BaseModel):
     color_id: Optional[str] = None
 
 
+class StageUsage(BaseModel):
+    """Claude tokens spent and their price, for one call or a sum of calls.
+
+    Attributes:
+        stage: Pipeline stage — ``"pass1"``, ``"pass1_repair"`` or ``"pass2"``.
+        model: Model the calls went to.
+        calls: Number of calls summed.
+        input_tokens: Uncached input tokens.
+        output_tokens: Generated tokens.
+        cache_write_tokens: Input tokens written to the prompt cache.
+        cache_read_tokens: Input tokens served from the prompt cache.
+        cost_usd: Estimated price of the tokens above in US dollars.
+    """
+
+    stage: str
+    model: str
+    calls: int = 1
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_write_tokens: int = 0
+    cache_read_tokens: int = 0
+    cost_usd: float = 0.0
+
+
 class ParsedSchedule(BaseModel):
     """The full result of processing a single uploaded schedule image.
 
@@ -42,8 +67,113 @@ class ParsedSchedule(BaseModel):
             Claude pass, preserved for display on the review page.
         source_image_name: Original filename of the uploaded file, shown on
             the review page for reference.
+        source_digest: SHA-256 of the uploaded file, truncated to 32 hex
+            digits.  Pushes of schedules from the same image may delete each
+            other's shifts; ``None`` for sessions saved before it was kept.
+        person_name: Whose shifts the events are, when the schedule was split
+            across several people from one upload.
+        user_id: The user who uploaded the schedule; only they may review,
+            change, or push it.  ``None`` for sessions saved before users
+            were tracked.
+        usage: Every Claude call made to produce the events, including
+            re-extractions.  For a schedule split across several people only
+            the person's own re-extractions; the upload's calls are stored
+            once on its ``Batch``.
     """
 
     events: list[ScheduleEvent] = Field(default_factory=list)
     raw_ocr_text: str
     source_image_name: str
+    source_digest: Optional[str] = None
+    person_name: Optional[str] = None
+    user_id: Optional[str] = None
+    usage: list[StageUsage] = Field(default_factory=list)
+
+
+class Batch(BaseModel):
+    """The per-person sessions created from one upload.
+
+    Attributes:
+        session_ids: Session id of each person, in display order.
+        usage: Every Claude call the upload made.  Pass 1 read the image once
+            for everyone, so the cost is recorded here once rather than on
+            each person's session.
+    """
+
+    session_ids: dict[str, str]
+    usage: list[StageUsage] = Field(default_factory=list)
+
+
+class EventChanges(BaseModel):
+    """Edits to a session's events, sent instead of the whole edited list.
+
+    Indices refer to the session's stored events, so rows deleted in the
+    browser never renumber the ones after them.
+
+    Attributes:
+        updated: The new version of each edited event, keyed by its index.
+        deleted: Indices of events removed.
+        added: New events, appended after the stored ones.
+    """
+
+    updated: dict[int, ScheduleEvent] = Field(default_factory=dict)
+    deleted: list[int] = Field(default_factory=list)
+    added: list[ScheduleEvent] = Field(default_factory=list)
+
+    def apply(self, events: list[ScheduleEvent]) -> list[ScheduleEvent]:
+        """Return ``events`` with these changes made, leaving ``events`` untouched.
+
+        Raises:
+            ValueError: If an updated or deleted index is outside ``events``.
+        """
+        for index in (*self.updated, *self.deleted):
+            if not 0 <= index < len(events):
+                raise ValueError(f"no event at index {index}; the session has {len(events)}")
+        deleted = set(self.deleted)
+        kept = [self.updated.get(index, event) for index, event in enumerate(events) if index not in deleted]
+        return kept + self.added
+
+
+class PendingPush(BaseModel):
+    """A confirm parked while the user authorizes Google Calendar.
+
+    Attributes:
+        events: The confirmed events, edits applied, before repeating.
+        repeat_weeks: Additional weeks to copy every event into when the
+            push runs.
+        notification_minutes: Popup reminder before each event, ``0`` for
+            none, or ``None`` for the calendar's default.
+    """
+
+    events: list[ScheduleEvent]
+    repeat_weeks: int = 0
+    notification_minutes: Optional[int] = None
+
+
+class ConfirmRequest(BaseModel):
+    """Body of ``POST /api/confirm``.
+
+    Attributes:
+        session_id: The session being confirmed.  It must exist and belong
+            to the caller whichever of ``events`` and ``changes`` is sent.
+        events: The full list of events to push instead of the session's
+            stored events.
+        changes: Edits to apply to the session's stored events before
+            pushing.  Used when ``events`` is absent; neither means push
+            the stored events as they are.
+        notification_minutes: Popup reminder before each event, ``0`` for
+            none, or ``None`` for the calendar's default.
+        repeat_weeks: Additional weeks to copy every event into.
+    """
+
+    session_id: uuid.UUID
+    events: Optional[list[ScheduleEvent]] = None
+    changes: Optional[EventChanges] = None
+    notification_minutes: Optional[int] = Field(default=None, ge=0)
+    repeat_weeks: int = Field(default=0, ge=0, le=52)
+
+    @model_validator(mode="after")
+    def _events_or_changes(self) -> ConfirmRequest:
+        if self.events is not None and self.changes is not None:
+            raise ValueError("send either events or changes, not both")
+        return self
@@ -7,4 +7,11 @@ Modules:
             confirmed events to Google Calendar.
     auth:   GET /auth/start and GET /auth/callback handle the Google OAuth 2.0
             flow.
+    metrics: GET /metrics exposes Prometheus metrics; GET /stats reports
+             Claude tokens and cost per day.
+    api:    GET and PATCH /api/sessions/{id} read and edit a session as JSON;
+            POST /api/confirm pushes an event array or diff to Google
+            Calendar.
+    identity: The per-browser user cookie and session ownership checks.
+    templating: The Jinja2 templates shared by every route module.
 """
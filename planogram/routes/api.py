@@ -0,0 +1,185 @@
+"""JSON API for reading, editing and confirming sessions.
+
+Exposes three endpoints under ``/api``:
+
+- ``GET /api/sessions/{session_id}`` returns a session's schedule as JSON.
+- ``PATCH /api/sessions/{session_id}`` applies an ``EventChanges`` diff to
+  the session's stored events.
+- ``POST /api/confirm`` pushes a session to Google Calendar, taking either
+  the full event array or a diff against the stored events.
+
+Request bodies are validated by pydantic in a single pass over the JSON, and
+the push itself is shared with ``POST /confirm``.  Errors are returned as JSON
+rather than pages: a missing Google token is a 401 carrying the ``auth_url``
+to send the user to, after which the callback pushes the saved events.
+"""
+
+import logging
+import uuid
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from googleapiclient.errors import HttpError
+from starlette.concurrency import run_in_threadpool
+
+from planogram.models import ConfirmRequest, EventChanges, ParsedSchedule
+from planogram.routes.identity import check_owner, ensure_user, remember_user
+from planogram.routes.review import push_session
+from planogram.services import admission, codec, sessions, tracing
+from planogram.services import calendar as cal_service
+from planogram.services.admission import AdmissionRejectedError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+TMP_DIR = Path("tmp")
+
+
+def _owned_session(request: Request, session_id: str) -> ParsedSchedule:
+    """Load a session the requesting user owns.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, or 403
+            if it belongs to another user.
+    """
+    schedule = sessions.load_session(TMP_DIR, session_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+    check_owner(schedule.user_id, request)
+    return schedule
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(request: Request, session_id: uuid.UUID) -> Response:
+    """Return a session's schedule.
+
+    Args:
+        request: The incoming FastAPI request object.
+        session_id: UUID of the session.
+
+    Returns:
+        The stored ``ParsedSchedule`` as JSON, without its ``user_id``.  The
+        indices of ``events`` are the ones ``EventChanges`` refers to.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, or 403
+            if it belongs to another user.
+    """
+    with tracing.span("api_session", trace_id=str(session_id)):
+        schedule = _owned_session(request, str(session_id))
+        body = codec.SCHEDULE.dump_json(schedule, exclude={"user_id"})
+    return Response(content=body, media_type="application/json")
+
+
+@router.patch("/sessions/{session_id}")
+async def edit_session(request: Request, session_id: uuid.UUID, changes: EventChanges) -> dict:
+    """Apply edits to a session's stored events.
+
+    Args:
+        request: The incoming FastAPI request object.
+        session_id: UUID of the session.
+        changes: The edits, as an ``EventChanges`` JSON body.
+
+    Returns:
+        A JSON object with the ``session_id`` and the new event ``count``.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, 403 if
+            it belongs to another user, or 422 if an index is out of range.
+    """
+    session_id = str(session_id)
+    with tracing.span("api_edit", trace_id=session_id) as span:
+        schedule = _owned_session(request, session_id)
+        try:
+            events = changes.apply(schedule.events)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from None
+        sessions.save_session(TMP_DIR, session_id, schedule.model_copy(update={"events": events}))
+        span.set(events=len(events), edited=len(changes.updated), deleted=len(changes.deleted))
+
+    logger.info("Session %s edited: %d updated, %d deleted, %d added", session_id,
+                len(changes.updated), len(changes.deleted), len(changes.added))
+    return {"session_id": session_id, "count": len(events)}
+
+
+@router.post("/confirm")
+async def confirm(request: Request, body: ConfirmRequest) -> Response:
+    """Push a session's events to Google Calendar.
+
+    Args:
+        request: The incoming FastAPI request object.
+        body: A ``ConfirmRequest``.  With ``events`` the array is pushed
+            in place of the session's stored events; otherwise ``changes``,
+            if any, are applied to the stored events first.
+
+    Returns:
+        A JSON object with the ``session_id``, the ``count`` of events pushed,
+        and the ``SyncResult`` fields.  Missing Google authorization returns
+        401 with the ``auth_url`` to visit, after which the events are pushed
+        by the OAuth callback.  A Google Calendar error returns 502 with the
+        ``done`` and ``total`` changes of the interrupted push; confirming
+        again resumes it.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, 403 if
+            it belongs to another user, 422 if ``session_id`` is not a UUID or
+            ``changes`` has an index out of range, or 429 with ``Retry-After``
+            if too many confirms are already running and waiting.
+    """
+    try:
+        async with admission.confirm.admit():
+            with tracing.span("api_confirm", trace_id=str(body.session_id)) as span:
+                response = await run_in_threadpool(_confirm, request, body)
+                span.set(status_code=response.status_code)
+                return response
+    except AdmissionRejectedError as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        ) from None
+
+
+def _confirm(request: Request, body: ConfirmRequest) -> Response:
+    """Run the body of ``confirm`` inside its tracing span."""
+    # The session file, owned by the caller, is what entitles them to the
+    # push checkpoint and pending file named after it
+    session_id = str(body.session_id)
+    schedule = _owned_session(request, session_id)
+    user_id = ensure_user(request)
+
+    if body.events is not None:
+        events = body.events
+    else:
+        try:
+            events = (body.changes or EventChanges()).apply(schedule.events)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from None
+    logger.info("Confirming %d event(s) for session %s via the API (repeat_weeks=%d)",
+                len(events), session_id, body.repeat_weeks)
+    tracing.set_attributes(events=len(events), repeat_weeks=body.repeat_weeks)
+
+    try:
+        result = push_session(
+            TMP_DIR, session_id, schedule, events, user_id, body.notification_minutes, body.repeat_weeks
+        )
+    except cal_service.NeedsAuthError:
+        logger.info("No credentials — session %s needs OAuth", session_id)
+        response = JSONResponse(
+            {"detail": "Connect Google Calendar first.", "auth_url": f"/auth/start?session_id={session_id}"},
+            status_code=401,
+        )
+        return remember_user(response, user_id)
+    except HttpError as exc:
+        logger.error("Google Calendar error for session %s: %s", session_id, exc)
+        progress = sessions.load_progress(TMP_DIR, session_id)
+        return JSONResponse(
+            {
+                "detail": f"Google Calendar error: {exc}",
+                "done": progress.done if progress else 0,
+                "total": progress.total if progress else 0,
+            },
+            status_code=502,
+        )
+
+    logger.info("Session %s complete — %d event(s) synced", session_id, len(result.links))
+    return JSONResponse({"session_id": session_id, "count": len(result.links), **result.model_dump()})
@@ -3,39 +3,49 @@
 Exposes two endpoints that together implement the server-side OAuth flow:
 
 - ``GET /auth/start`` generates the Google consent URL and stores the in-progress
-  ``Flow`` object in an in-memory dict keyed by session ID, then redirects the
-  browser to Google.
+  ``Flow`` object, with the requesting user, in an in-memory dict keyed by
+  session ID, then redirects the browser to Google.  The session ID is sent as
+  the OAuth ``state`` so the callback can find its flow again.
 - ``GET /auth/callback`` receives the authorization code from Google, exchanges
-  it for credentials, persists them to disk, and either pushes any events that
-  were pending before the redirect or returns the user to the review page.
+  it for credentials, stores them for the user, and either pushes any events
+  that were pending before the redirect or returns the user to the review page.
 
-The in-memory flow store (``_pending_flows``) is acceptable for a single-user
-personal tool running as a single process.  It would need a shared cache (e.g.
-Redis) for multi-process or multi-user deployments.
+The in-memory flow store (``_pending_flows``) only lives as long as the
+process, so the callback must reach the worker that started the flow.  It
+would need a shared cache (e.g. Redis) for multi-process deployments.
 """
 
-import json
+from __future__ import annotations
+
 import logging
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from fastapi import APIRouter, Request
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from google_auth_oauthlib.flow import Flow
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response
 from googleapiclient.errors import HttpError
+from starlette.concurrency import run_in_threadpool
 
 from planogram.config import get_settings
-from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.models import ParsedSchedule
+from planogram.routes.identity import check_owner, current_user, ensure_user, remember_user
+from planogram.routes.review import repeat_events
+from planogram.routes.templating import templates
+from planogram.services import admission, scheduler, sessions, tracing
 from planogram.services import calendar as cal_service
+from planogram.services.admission import AdmissionRejectedError
+from planogram.services.sync import SyncStore
+
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import Flow
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="planogram/templates")
 TMP_DIR = Path("tmp")
 
-# In-memory flow store — acceptable for single-user personal tool
-_pending_flows: dict[str, Flow] = {}
+# In-progress flows by session id (the OAuth state), with the user who started them
+_pending_flows: dict[str, tuple[str, Flow]] = {}
 
 
 @router.get("/auth/start")
@@ -44,7 +54,8 @@ async def auth_start(request: Request, session_id: str):
 
     Creates an authorization ``Flow``, stores it under ``session_id``, and
     redirects the browser to the Google consent screen.  The ``session_id`` is
-    used later in the callback to match the flow and locate any pending events.
+    passed as the OAuth state, so the callback can match the flow and locate
+    any pending events.
 
     Args:
         request: The incoming FastAPI request object.
@@ -54,23 +65,34 @@ async def auth_start(request: Request, session_id: str):
 
     Returns:
         A redirect response to the Google OAuth consent URL.
+
+    Raises:
+        HTTPException: 403 if the session belongs to another user.
     """
     settings = get_settings()
-    auth_url, flow = cal_service.initiate_auth_flow(
-        settings.google_oauth_credentials_path,
-        settings.google_oauth_redirect_uri,
-    )
-    _pending_flows[session_id] = flow
+    schedule = sessions.load_session(TMP_DIR, session_id)
+    if schedule is not None:
+        check_owner(schedule.user_id, request)
+    user_id = ensure_user(request)
+    with tracing.span("auth_start", trace_id=session_id):
+        auth_url, flow = cal_service.initiate_auth_flow(
+            settings.google_oauth_credentials_path,
+            settings.google_oauth_redirect_uri,
+            state=session_id,
+        )
+    _pending_flows[session_id] = (user_id, flow)
     logger.info("OAuth flow started for session %s", session_id)
-    return RedirectResponse(url=auth_url)
+    return remember_user(RedirectResponse(url=auth_url), user_id)
 
 
 @router.get("/auth/callback", name="auth_callback")
 async def auth_callback(request: Request):
     """Handle the Google OAuth 2.0 callback and push any pending events.
 
-    Retrieves the stored ``Flow`` for the oldest pending session, exchanges the
-    authorization code for credentials, and persists them to disk.  If events
+    Retrieves the stored ``Flow`` named by the ``state`` query parameter,
+    exchanges the authorization code for credentials, and stores them for the
+    user who started the flow.  A callback from a different browser than the
+    one that started the flow is refused.  If events
     were serialized to a ``_pending.json`` file before the OAuth redirect they
     are pushed to Google Calendar immediately; otherwise the user is sent back
     to the review page to confirm manually.
@@ -84,49 +106,105 @@ async def auth_callback(request: Request):
         An HTML response rendering ``success.html`` if pending events were
         pushed successfully, a redirect to ``/review`` if no pending events
         existed, or a re-rendered review page on Google Calendar API error.
+
+    Raises:
+        HTTPException: 429 with ``Retry-After`` if too many confirms are
+            already running and waiting; the flow is kept for a retry.
     """
-    settings = get_settings()
+    session_id = request.query_params.get("state", "")
+    pending = _pending_flows.get(session_id)
+    if pending is None:
+        logger.warning("OAuth callback received with no pending flow for state %r", session_id)
+        return RedirectResponse(url="/?error=auth_failed")
 
-    session_id = next(iter(_pending_flows), None)
-    if session_id is None:
-        logger.warning("OAuth callback received with no pending flows")
+    user_id, flow = pending
+    if current_user(request) != user_id:
+        logger.warning("OAuth callback for session %s came from a different browser", session_id)
+        _pending_flows.pop(session_id, None)
         return RedirectResponse(url="/?error=auth_failed")
 
-    flow = _pending_flows.pop(session_id)
+    try:
+        async with admission.confirm.admit():
+            # Taken only once admitted, so a callback turned away with 429 can be retried
+            if _pending_flows.pop(session_id, None) is None:
+                return RedirectResponse(url="/?error=auth_failed")
+            with tracing.span("auth_callback", trace_id=session_id) as span:
+                # The code exchange and pending push block on Google and on the
+                # rate scheduler; run them off the event loop like ``/confirm``
+                response = await run_in_threadpool(
+                    tracing.propagate(_complete_auth), request, flow, session_id, user_id
+                )
+                span.set(status_code=response.status_code)
+                return response
+    except AdmissionRejectedError as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        ) from None
+
+
+def _complete_auth(request: Request, flow: Flow, session_id: str, user_id: str) -> Response:
+    """Exchange the code and push pending events inside the callback's tracing span."""
+    settings = get_settings()
     logger.info("OAuth callback received for session %s — exchanging code", session_id)
     creds = cal_service.handle_auth_callback(
         flow,
         authorization_response=str(request.url),
-        token_path=settings.google_token_path,
+        user_id=user_id,
+        db_path=settings.credential_db_path,
+        key=settings.credential_key,
     )
-    logger.info("Authorization complete, credentials saved to %s", settings.google_token_path)
+    logger.info("Authorization complete, credentials saved for user %s", user_id[:8])
 
     # Push any events that were pending before the OAuth redirect
-    pending_path = TMP_DIR / f"{session_id}_pending.json"
-    if pending_path.exists():
-        event_jsons = json.loads(pending_path.read_text())
-        events = [ScheduleEvent.model_validate_json(ej) for ej in event_jsons]
+    pending = sessions.load_pending(TMP_DIR, session_id)
+    if pending is not None:
+        events = repeat_events(pending.events, pending.repeat_weeks)
         logger.info("Pushing %d pending event(s) for session %s", len(events), session_id)
 
+        schedule = sessions.load_session(TMP_DIR, session_id)
+        person = (schedule.person_name or "") if schedule else ""
+        progress = sessions.load_progress(TMP_DIR, session_id)
         try:
-            links = cal_service.push_events(
-                events, creds, settings.google_calendar_id, settings.timezone
-            )
+            with scheduler.client(user_id, scheduler.push_priority(len(events))):
+                result = cal_service.sync_events(
+                    events, creds, settings.google_calendar_id, settings.timezone,
+                    SyncStore(settings.sync_state_path),
+                    person=person,
+                    notification_minutes=pending.notification_minutes,
+                    api_endpoint=settings.google_calendar_api_endpoint or None,
+                    session_id=session_id,
+                    resume=progress if progress and progress.status != "done" else None,
+                    on_progress=lambda p: sessions.save_progress(TMP_DIR, session_id, p),
+                    account=user_id,
+                    origin=(schedule.source_digest or "") if schedule else "",
+                )
         except HttpError as exc:
             logger.error("Google Calendar error pushing pending events for session %s: %s", session_id, exc)
-            schedule = ParsedSchedule(events=events, raw_ocr_text="", source_image_name="")
+            # Kept, with the pending events before repeating, so the re-rendered
+            # page can be confirmed again
+            if schedule is None:
+                schedule = ParsedSchedule(
+                    events=pending.events, raw_ocr_text="", source_image_name="", user_id=user_id
+                )
+            else:
+                schedule = schedule.model_copy(update={"events": pending.events})
+            sessions.delete_session(TMP_DIR, session_id)
+            sessions.save_session(TMP_DIR, session_id, schedule)
             return templates.TemplateResponse(
                 request, "review.html",
-                context={"schedule": schedule, "session_id": session_id, "error": f"Google Calendar error: {exc}"},
+                context={
+                    "schedule": schedule,
+                    "session_id": session_id,
+                    "error": f"Google Calendar error: {exc}",
+                    "progress": sessions.load_progress(TMP_DIR, session_id),
+                },
                 status_code=502,
             )
-        finally:
-            pending_path.unlink(missing_ok=True)
-            (TMP_DIR / f"{session_id}.json").unlink(missing_ok=True)
+        sessions.delete_session(TMP_DIR, session_id)
 
         return templates.TemplateResponse(
             request, "success.html",
-            context={"links": links, "count": len(events)},
+            context={"links": result.links, "count": len(events), "sync": result, "session_id": session_id},
         )
 
     return RedirectResponse(url=f"/review?id={session_id}", status_code=303)
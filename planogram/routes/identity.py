@@ -0,0 +1,69 @@
+"""Who is making a request, identified by a long-lived browser cookie.
+
+Each browser gets a random user id the first time it loads the upload page.
+Sessions record the id of the user who uploaded them, Google tokens are stored
+under it, and calendar syncs are scoped to it, so several people can share one
+server without seeing or pushing each other's schedules.  The id is 128 random
+bits and carries no authority of its own beyond being hard to guess.
+"""
+
+import re
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+
+USER_COOKIE = "planogram_user"
+COOKIE_MAX_AGE = 365 * 24 * 3600
+
+_USER_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def current_user(request: Request) -> Optional[str]:
+    """Return the user id from the request's cookie, or ``None`` if it has none.
+
+    Args:
+        request: The incoming FastAPI request object.
+    """
+    user_id = request.cookies.get(USER_COOKIE, "")
+    return user_id if _USER_ID.match(user_id) else None
+
+
+def ensure_user(request: Request) -> str:
+    """Return the request's user id, minting a new one if it has none.
+
+    A new id only sticks once ``remember_user`` sets it on the response.
+
+    Args:
+        request: The incoming FastAPI request object.
+    """
+    return current_user(request) or uuid.uuid4().hex
+
+
+def remember_user(response: Response, user_id: str) -> Response:
+    """Set (or renew) the user cookie on ``response`` and return it.
+
+    Args:
+        response: The response about to be sent.
+        user_id: Id returned by ``ensure_user``.
+    """
+    response.set_cookie(USER_COOKIE, user_id, max_age=COOKIE_MAX_AGE, httponly=True, samesite="lax")
+    return response
+
+
+def check_owner(owner: Optional[str], request: Request) -> None:
+    """Refuse access to something another user created.
+
+    Sessions saved before users were tracked have no owner and stay open to
+    everyone.
+
+    Args:
+        owner: User id recorded on the session or push, or ``None``.
+        request: The incoming FastAPI request object.
+
+    Raises:
+        HTTPException: 403 if ``owner`` is set and is not the requesting user.
+    """
+    if owner and owner != current_user(request):
+        raise HTTPException(status_code=403, detail="This session belongs to someone else.")
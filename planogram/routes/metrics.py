@@ -0,0 +1,67 @@
+"""Prometheus scrape endpoint and Claude usage statistics.
+
+Exposes ``GET /metrics`` in the Prometheus text exposition format.  See
+``planogram.services.metrics`` for the metric definitions and multi-worker
+setup.  ``GET /stats`` reports Claude tokens and cost per day, stage and
+model from ``planogram.services.usage``, and how much of today's budgets
+is left.
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
+
+from planogram.config import get_settings
+from planogram.routes.identity import current_user
+from planogram.services import metrics, usage
+
+router = APIRouter()
+TMP_DIR = Path("tmp")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint() -> Response:
+    """Return every metric for Prometheus to scrape.
+
+    Returns:
+        A plain-text response in the Prometheus exposition format.
+    """
+    body, content_type = metrics.render(TMP_DIR)
+    return Response(content=body, media_type=content_type)
+
+
+@router.get("/stats")
+async def stats(request: Request, days: int = Query(default=7, ge=1, le=366)) -> dict:
+    """Return Claude usage totals for the last ``days`` UTC days.
+
+    Args:
+        request: The incoming FastAPI request object; the caller's user
+            cookie selects the per-user figures under ``today``.
+        days: How many days to report, today included.
+
+    Returns:
+        A JSON object with ``days`` — per day, the total cost and the tokens
+        and cost of each stage and model — and ``today`` — what everyone and
+        the caller have spent so far against the configured budgets (``null``
+        when uncapped).
+    """
+    settings = get_settings()
+    store = usage.usage_store(settings.usage_db_path)
+    today = usage.today()
+    since = (date.fromisoformat(today) - timedelta(days=days - 1)).isoformat()
+    user_id = current_user(request)
+    return {
+        "days": {
+            day: {"cost_usd": sum(entry.cost_usd for entry in entries), "usage": entries}
+            for day, entries in store.daily(since).items()
+        },
+        "today": {
+            "date": today,
+            "cost_usd": store.spent(today),
+            "budget_usd": settings.daily_budget_usd or None,
+            "user_cost_usd": store.spent(today, user_id) if user_id else None,
+            "user_budget_usd": settings.user_daily_budget_usd or None,
+        },
+    }
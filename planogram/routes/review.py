@@ -1,34 +1,63 @@
 """Review and confirm routes — event editing and Google Calendar push.
 
-Exposes two endpoints:
+Exposes seven endpoints:
 
 - ``GET /review`` loads a previously parsed ``ParsedSchedule`` from the
   temporary session file and renders an editable event table.
-- ``POST /confirm`` reconstructs the edited event list from form data, expands
-  any recurring-week selections, and pushes the events to Google Calendar.
+- ``GET /batch`` lists the per-person sessions created by a multi-person
+  upload, with links to review each one or download it as an ``.ics`` file.
+- ``GET /ics`` downloads a session's events as an iCalendar file.
+- ``POST /reextract`` re-runs name filtering and Pass 2 from the session's
+  stored transcription, so a wrong name can be fixed without re-uploading.
+- ``POST /confirm`` applies the rows edited on the review page, sent as a diff
+  against the session's stored events, expands any recurring-week
+  selections, and pushes the events to Google Calendar.
+  Only the difference from earlier pushes of the same shifts is written.
   If no valid OAuth token exists the user is redirected to the auth flow first.
+  Progress is checkpointed after every event, and confirming a session whose
+  push failed resumes at the first event that did not succeed.
+- ``GET /confirm/progress`` streams a session's push checkpoints as
+  server-sent events while ``POST /confirm`` or ``POST /rollback`` runs.
+- ``POST /rollback`` undoes a session's push: events it created are deleted
+  through batched Calendar requests, events it updated are patched back and
+  events it deleted are restored.
 """
 
-import json
+import asyncio
 import logging
-from datetime import timedelta
+import re
+import uuid
+from collections import Counter
+from datetime import date, timedelta
 from pathlib import Path
 
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from googleapiclient.errors import HttpError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import FormData
 
 from planogram.config import get_settings
-from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.models import EventChanges, ParsedSchedule, PendingPush, ScheduleEvent
+from planogram.routes.identity import check_owner, ensure_user, remember_user
+from planogram.routes.templating import templates
+from planogram.services import admission, ics, parser, scheduler, sessions, tracing, usage
 from planogram.services import calendar as cal_service
+from planogram.services.admission import AdmissionRejectedError
+from planogram.services.resilience import UpstreamUnavailableError
+from planogram.services.sync import SyncStore
+from planogram.services.usage import BudgetExceededError
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="planogram/templates")
 TMP_DIR = Path("tmp")
 
+# How often the progress stream re-reads the checkpoint, and how long it waits
+# without any change before giving up on a push that never started or died
+PROGRESS_POLL_SECONDS = 0.25
+PROGRESS_IDLE_SECONDS = 30.0
+
 
 @router.get("/review")
 async def review(request: Request, id: str):
@@ -36,7 +65,8 @@ async def review(request: Request, id: str):
 
     Loads the ``ParsedSchedule`` stored under the given session ID and passes
     it to the review template where the user can edit, delete, or recolor
-    individual events before confirming.
+    individual events before confirming.  The Claude tokens and cost spent on
+    the session are shown per stage and model.
 
     Args:
         request: The incoming FastAPI request object.
@@ -47,51 +77,272 @@ async def review(request: Request, id: str):
         schedule and per-event form fields.
 
     Raises:
-        HTTPException: 404 if no session file exists for the given ID.
+        HTTPException: 404 if no session file exists for the given ID, or 403
+            if it belongs to another user.
     """
-    tmp_path = TMP_DIR / f"{id}.json"
-    if not tmp_path.exists():
-        logger.warning("Session not found: %s", id)
-        raise HTTPException(status_code=404, detail="Session not found or expired.")
+    with tracing.span("review", trace_id=id) as span:
+        schedule = sessions.load_session(TMP_DIR, id)
+        if schedule is None:
+            logger.warning("Session not found: %s", id)
+            raise HTTPException(status_code=404, detail="Session not found or expired.")
+        check_owner(schedule.user_id, request)
+        span.set(events=len(schedule.events))
 
-    schedule = ParsedSchedule.model_validate_json(tmp_path.read_text())
     logger.info("Loaded session %s (%d event(s))", id, len(schedule.events))
     settings = get_settings()
+    # Re-derived from the stored transcription so a name that matched nothing,
+    # or only fuzzily, is shown to the user rather than silently accepted
+    name_report = None
+    if schedule.person_name and schedule.raw_ocr_text:
+        name_report = parser.select_lines(parser.to_pipe_lines(schedule.raw_ocr_text), schedule.person_name)
     return templates.TemplateResponse(
         request, "review.html",
         context={
             "schedule": schedule,
             "session_id": id,
             "maps_api_key": settings.google_maps_api_key,
+            "name_report": name_report,
+            "usage": usage.summarize(schedule.usage),
+        },
+    )
+
+
+@router.get("/batch")
+async def batch(request: Request, id: str):
+    """Render the list of per-person sessions created by one upload.
+
+    Args:
+        request: The incoming FastAPI request object.
+        id: UUID of the batch created by ``POST /upload``.
+
+    Returns:
+        An HTML response rendering ``batch.html``.
+
+    Raises:
+        HTTPException: 404 if no batch exists for the given ID, or 403 if it
+            belongs to another user.
+    """
+    with tracing.span("batch", trace_id=id) as span:
+        index = sessions.load_batch(TMP_DIR, id)
+        if index is None:
+            logger.warning("Batch not found: %s", id)
+            raise HTTPException(status_code=404, detail="Batch not found or expired.")
+        people = []
+        source_image_name = ""
+        for name, session_id in index.session_ids.items():
+            schedule = sessions.load_session(TMP_DIR, session_id)
+            if schedule is None:
+                # Already confirmed and cleaned up
+                continue
+            check_owner(schedule.user_id, request)
+            source_image_name = schedule.source_image_name
+            people.append({"name": name, "session_id": session_id, "events": len(schedule.events)})
+        span.set(people=len(people))
+
+    return templates.TemplateResponse(
+        request, "batch.html",
+        context={
+            "people": people, "source_image_name": source_image_name, "usage": usage.summarize(index.usage),
         },
     )
 
 
+@router.get("/ics")
+async def download_ics(request: Request, id: str):
+    """Download a session's events as an iCalendar file.
+
+    Args:
+        request: The incoming FastAPI request object.
+        id: UUID of the session to export.
+
+    Returns:
+        A ``text/calendar`` attachment named after the person, if known.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, or 403
+            if it belongs to another user.
+    """
+    with tracing.span("ics", trace_id=id):
+        schedule = sessions.load_session(TMP_DIR, id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired.")
+        check_owner(schedule.user_id, request)
+        settings = get_settings()
+        body = ics.to_ics(schedule.events, settings.timezone, calendar_name=schedule.person_name)
+
+    stem = re.sub(r"[^A-Za-z0-9]+", "-", schedule.person_name or "schedule").strip("-").lower() or "schedule"
+    return Response(
+        content=body,
+        media_type="text/calendar",
+        headers={"Content-Disposition": f'attachment; filename="{stem}.ics"'},
+    )
+
+
+@router.post("/reextract")
+async def reextract(request: Request):
+    """Re-extract a session's events for a different name without re-uploading.
+
+    Runs only filtering and Pass 2 on the stored ``raw_ocr_text``; repeated
+    selections are answered from the Pass 2 memo without calling Claude.  The
+    session is updated in place.
+
+    Args:
+        request: The incoming FastAPI request object, whose form data contains
+            ``session_id`` and ``person_name`` (blank for every shift).
+
+    Returns:
+        For ``Accept: application/json`` clients, a JSON object with the
+        ``added`` and ``removed`` events and the new ``count``; otherwise a
+        303 redirect back to the review page.  Parsing failures return 422,
+        a reached daily Claude budget returns 429, and an unavailable Claude
+        API returns 503, all as JSON.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, or 403
+            if it belongs to another user.
+    """
+    form = await request.form()
+    session_id = str(form.get("session_id", ""))
+    person_name = str(form.get("person_name", "")).strip() or None
+    wants_json = "application/json" in request.headers.get("accept", "")
+
+    with tracing.span("reextract", trace_id=session_id or None, person_name=person_name) as span:
+        schedule = sessions.load_session(TMP_DIR, session_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired.")
+        check_owner(schedule.user_id, request)
+
+        settings = get_settings()
+        user_id = ensure_user(request)
+        store = usage.usage_store(settings.usage_db_path)
+        try:
+            usage.check_budget(
+                store, user_id, usage.estimate_reextract_cost(settings.extract_model),
+                settings.daily_budget_usd, settings.user_daily_budget_usd,
+            )
+            with scheduler.client(user_id), usage.recording(user_id, store) as spent:
+                events, cache_hit = await run_in_threadpool(
+                    parser.reextract_events,
+                    schedule.raw_ocr_text,
+                    settings.anthropic_api_key,
+                    date.today().isoformat(),
+                    person_name=person_name,
+                    settings=settings,
+                )
+        except BudgetExceededError as exc:
+            return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+        except ValueError as exc:
+            logger.warning("Re-extraction failed for session %s: %s", session_id, exc)
+            return JSONResponse({"detail": f"Event parsing failed: {exc}"}, status_code=422)
+        except UpstreamUnavailableError as exc:
+            logger.error("Claude unavailable: %s", exc)
+            return JSONResponse({"detail": f"Claude is not responding right now. ({exc})"}, status_code=503)
+
+        added, removed = diff_events(schedule.events, events)
+        updated = schedule.model_copy(
+            update={"events": events, "person_name": person_name, "usage": schedule.usage + spent}
+        )
+        sessions.save_session(TMP_DIR, session_id, updated)
+        span.set(events=len(events), added=len(added), removed=len(removed), cache_hit=cache_hit)
+
+    logger.info("Session %s re-extracted for %r: +%d −%d event(s)%s", session_id, person_name,
+                len(added), len(removed), " (cached)" if cache_hit else "")
+    if not wants_json:
+        return RedirectResponse(url=f"/review?id={session_id}", status_code=303)
+    return JSONResponse({
+        "session_id": session_id,
+        "person_name": person_name,
+        "count": len(events),
+        "cached": cache_hit,
+        "added": [event.model_dump(mode="json") for event in added],
+        "removed": [event.model_dump(mode="json") for event in removed],
+    })
+
+
+def diff_events(
+    old: list[ScheduleEvent], new: list[ScheduleEvent]
+) -> tuple[list[ScheduleEvent], list[ScheduleEvent]]:
+    """Return the events only in ``new`` and only in ``old``, as multisets.
+
+    Args:
+        old: Events before the change.
+        new: Events after the change.
+
+    Returns:
+        A tuple of ``(added, removed)``, each in its list's original order.
+    """
+    old_keys = Counter(event.model_dump_json() for event in old)
+    new_keys = Counter(event.model_dump_json() for event in new)
+    added = []
+    for event in new:
+        key = event.model_dump_json()
+        if old_keys[key]:
+            old_keys[key] -= 1
+        else:
+            added.append(event)
+    removed = []
+    for event in old:
+        key = event.model_dump_json()
+        if new_keys[key]:
+            new_keys[key] -= 1
+        else:
+            removed.append(event)
+    return added, removed
+
+
 @router.post("/confirm")
 async def confirm(request: Request):
     """Push confirmed events to Google Calendar.
 
-    Reconstructs the edited event list from indexed form fields, optionally
-    duplicates all events across additional weeks for recurring schedules, then
-    inserts them into Google Calendar.  If no valid OAuth token is available the
+    Applies the rows edited on the review page, sent as a JSON diff against
+    the session's stored events, optionally duplicates all events across
+    additional weeks for recurring schedules, then syncs them to Google
+    Calendar: new shifts are inserted, changed ones patched, and shifts dropped
+    from a revised schedule deleted.  If no valid OAuth token is available the
     user is first redirected through the OAuth consent flow; pending events are
     serialized to disk so they can be pushed after authorization completes.
 
     Args:
         request: The incoming FastAPI request object, whose form data contains
-            indexed fields (``title_0``, ``date_0``, …) for each event row plus
-            global options (``notification_minutes``, ``repeat_weeks``,
-            ``session_id``).
+            ``session_id``, ``changes`` (an ``EventChanges`` object as JSON,
+            blank when nothing was edited), ``notification_minutes`` and
+            ``repeat_weeks``.
 
     Returns:
         An HTML response rendering ``success.html`` with links to the created
         calendar events on success, a redirect to ``/auth/start`` if
         authorization is needed, or a re-rendered review page on Google Calendar
-        API error.
+        API error.  Events are pushed with the requesting user's token.
+
+    Raises:
+        HTTPException: 404 if no session file exists for the given ID, 403 if
+            it belongs to another user, 422 if ``changes`` is invalid, or 429
+            with ``Retry-After`` if too many confirms are already running and
+            waiting.
     """
-    settings = get_settings()
     form = await request.form()
     session_id = str(form.get("session_id", ""))
+    try:
+        async with admission.confirm.admit():
+            with tracing.span("confirm", trace_id=session_id or None) as span:
+                # The push blocks on Calendar API calls; run it off the event loop so
+                # the progress stream and other requests are served meanwhile
+                response = await run_in_threadpool(_confirm, request, form, session_id)
+                span.set(status_code=response.status_code)
+                return response
+    except AdmissionRejectedError as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        ) from None
+
+
+def _confirm(request: Request, form: FormData, session_id: str) -> Response:
+    """Run the body of ``confirm`` inside its tracing span."""
+    schedule = sessions.load_session(TMP_DIR, session_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+    check_owner(schedule.user_id, request)
+    user_id = ensure_user(request)
 
     notif_raw = str(form.get("notification_minutes", ""))
     if notif_raw == "":
@@ -99,66 +350,239 @@ async def confirm(request: Request):
     else:
         notification_minutes = int(notif_raw)
 
-    events: list[ScheduleEvent] = []
-    index = 0
-    while f"title_{index}" in form:
-        location_raw = str(form.get(f"location_{index}") or "")
-        events.append(
-            ScheduleEvent.model_validate({
-                "title": str(form[f"title_{index}"]),
-                "date": str(form[f"date_{index}"]),
-                "start_time": str(form[f"start_time_{index}"]),
-                "end_time": str(form.get(f"end_time_{index}") or "") or None,
-                "description": str(form.get(f"description_{index}") or "") or None,
-                "location": location_raw or None,
-                "color_id": str(form.get(f"color_id_{index}") or "") or None,
-            })
-        )
-        index += 1
+    try:
+        changes = EventChanges.model_validate_json(str(form.get("changes") or "{}"))
+        events = changes.apply(schedule.events)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid changes: {exc}") from None
 
     repeat_weeks = int(str(form.get("repeat_weeks") or 0))
-    if repeat_weeks > 0:
-        base_events = events[:]
-        for week in range(1, repeat_weeks + 1):
-            for event in base_events:
-                events.append(event.model_copy(update={"date": event.date + timedelta(weeks=week)}))
-    logger.info("Confirming %d event(s) for session %s (repeat_weeks=%d)", len(events), session_id, repeat_weeks)
+    logger.info("Confirming %d event(s) for session %s (repeat_weeks=%d, %d edited, %d deleted)", len(events),
+                session_id, repeat_weeks, len(changes.updated), len(changes.deleted))
+    tracing.set_attributes(events=len(events), repeat_weeks=repeat_weeks, edited=len(changes.updated))
 
     try:
-        creds = cal_service.get_credentials(
-            settings.google_oauth_credentials_path,
-            settings.google_token_path,
-        )
+        result = push_session(TMP_DIR, session_id, schedule, events, user_id, notification_minutes, repeat_weeks)
     except cal_service.NeedsAuthError:
         logger.info("No credentials — redirecting session %s to OAuth", session_id)
-        pending_path = TMP_DIR / f"{session_id}_pending.json"
-        pending_path.write_text(json.dumps([ev.model_dump_json() for ev in events]))
-        return RedirectResponse(url=f"/auth/start?session_id={session_id}", status_code=303)
-
-    try:
-        links = cal_service.push_events(
-            events, creds, settings.google_calendar_id, settings.timezone, notification_minutes
-        )
+        response = RedirectResponse(url=f"/auth/start?session_id={session_id}", status_code=303)
+        return remember_user(response, user_id)
     except HttpError as exc:
         logger.error("Google Calendar error for session %s: %s", session_id, exc)
+        # The page re-rendered below shows the edited events, so a retry's diff
+        # must be taken against them rather than the events first parsed.
+        # Repeating happens again on the retry, so the copies are not stored.
+        schedule = schedule.model_copy(update={"events": events})
+        sessions.save_session(TMP_DIR, session_id, schedule)
         return templates.TemplateResponse(
             request, "review.html",
             context={
-                "schedule": ParsedSchedule(
-                    events=events, raw_ocr_text="", source_image_name=""
-                ),
+                "schedule": schedule,
                 "session_id": session_id,
                 "error": f"Google Calendar error: {exc}",
+                "progress": sessions.load_progress(TMP_DIR, session_id),
             },
             status_code=502,
         )
 
-    for path in [TMP_DIR / f"{session_id}.json", TMP_DIR / f"{session_id}_pending.json"]:
-        if path.exists():
-            path.unlink()
-
-    logger.info("Session %s complete — %d event(s) pushed", session_id, len(links))
+    logger.info("Session %s complete — %d event(s) synced", session_id, len(result.links))
     return templates.TemplateResponse(
         request, "success.html",
-        context={"links": links, "count": len(events)},
+        context={"links": result.links, "count": len(result.links), "sync": result, "session_id": session_id},
     )
+
+
+def repeat_events(events: list[ScheduleEvent], weeks: int) -> list[ScheduleEvent]:
+    """Return ``events`` followed by a copy of them for each of ``weeks`` following weeks.
+
+    Args:
+        events: The events of the first week.
+        weeks: Number of additional weeks; ``0`` returns ``events`` unchanged.
+    """
+    repeated = list(events)
+    for week in range(1, weeks + 1):
+        repeated.extend(event.model_copy(update={"date": event.date + timedelta(weeks=week)}) for event in events)
+    return repeated
+
+
+def push_session(
+    tmp_dir: Path,
+    session_id: str,
+    schedule: ParsedSchedule,
+    events: list[ScheduleEvent],
+    user_id: str,
+    notification_minutes: int | None,
+    repeat_weeks: int = 0,
+) -> cal_service.SyncResult:
+    """Sync a confirmed session's events to the user's calendar and delete the session.
+
+    ``events`` are repeated into the following weeks only here, so what is
+    parked for OAuth or kept after a failure is the list the user edited.
+    Progress is checkpointed after every event, and a session whose last
+    push failed resumes where it stopped.  Shared by the form and JSON
+    confirm routes.
+
+    Args:
+        tmp_dir: Directory holding the session files.
+        session_id: The session being confirmed.
+        schedule: The stored session; its person and source image scope
+            the sync.
+        events: The events to push, edits applied, before repeating.
+        user_id: Whose calendar and token to use.
+        notification_minutes: Popup reminder override; ``None`` for the
+            calendar's default.
+        repeat_weeks: Additional weeks to copy every event into.
+
+    Raises:
+        NeedsAuthError: If the user has no valid token.  ``events`` and the
+            push options are saved as the session's pending push first.
+        HttpError: If the Calendar API fails; the session is kept.
+    """
+    settings = get_settings()
+    try:
+        creds = cal_service.get_credentials(user_id, settings.credential_db_path, settings.credential_key)
+    except cal_service.NeedsAuthError:
+        pending = PendingPush(events=events, repeat_weeks=repeat_weeks, notification_minutes=notification_minutes)
+        sessions.save_pending(tmp_dir, session_id, pending)
+        raise
+
+    events = repeat_events(events, repeat_weeks)
+    progress = sessions.load_progress(tmp_dir, session_id)
+    with scheduler.client(user_id, scheduler.push_priority(len(events))):
+        result = cal_service.sync_events(
+            events, creds, settings.google_calendar_id, settings.timezone,
+            SyncStore(settings.sync_state_path),
+            person=schedule.person_name or "",
+            notification_minutes=notification_minutes,
+            api_endpoint=settings.google_calendar_api_endpoint or None,
+            session_id=session_id,
+            resume=progress if progress and progress.status != "done" else None,
+            on_progress=lambda p: sessions.save_progress(tmp_dir, session_id, p),
+            account=user_id,
+            origin=schedule.source_digest or "",
+        )
+    sessions.delete_session(tmp_dir, session_id)
+    return result
+
+
+@router.get("/confirm/progress")
+async def confirm_progress(request: Request, session_id: uuid.UUID):
+    """Stream a session's push progress as server-sent events.
+
+    Each ``data:`` message is the latest checkpoint (without the per-event
+    entries) as JSON, sent whenever it changes.  The stream ends once the push
+    is done or has failed, when the client disconnects, or after
+    ``PROGRESS_IDLE_SECONDS`` without any change.  A finished checkpoint
+    already on disk when the stream opens belongs to an earlier push, so it is
+    held back until a new push replaces it.
+
+    Args:
+        request: The incoming FastAPI request object.
+        session_id: UUID of the session being pushed.
+
+    Returns:
+        A ``text/event-stream`` response.
+
+    Raises:
+        HTTPException: 404 if there is neither a push checkpoint nor a session
+            for the ID, 403 if it belongs to another user, or 422 if the ID is
+            not a UUID.
+    """
+    session_id = str(session_id)
+    previous = sessions.load_progress(TMP_DIR, session_id)
+    if previous is not None:
+        owner = previous.account
+    else:
+        # The page opens the stream as it submits a first push, before the
+        # push has written its checkpoint, so the session vouches for it
+        schedule = sessions.load_session(TMP_DIR, session_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Nothing is being pushed for this session.")
+        owner = schedule.user_id
+    check_owner(owner, request)
+
+    async def stream():
+        last = None
+        if previous and previous.status != "running":
+            last = previous.model_dump_json(exclude={"completed"})
+        idle = 0.0
+        while idle < PROGRESS_IDLE_SECONDS and not await request.is_disconnected():
+            progress = sessions.load_progress(TMP_DIR, session_id)
+            message = progress.model_dump_json(exclude={"completed"}) if progress else None
+            if message is not None and message != last:
+                last, idle = message, 0.0
+                yield f"data: {message}\n\n"
+                if progress.status != "running":
+                    return
+            await asyncio.sleep(PROGRESS_POLL_SECONDS)
+            idle += PROGRESS_POLL_SECONDS
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/rollback")
+async def rollback(request: Request):
+    """Undo every change a session's push made to the calendar.
+
+    The changes come from the session's push checkpoint, which outlives the
+    session itself.  Created events are deleted in rate-limited batch
+    requests, updated events are patched back to their earlier body and
+    deleted events are re-inserted, with
+    progress checkpointed so ``GET /confirm/progress`` can follow it and a
+    failed rollback can be retried.
+
+    Args:
+        request: The incoming FastAPI request object, whose form data contains
+            ``session_id``.
+
+    Returns:
+        For ``Accept: application/json`` clients, a JSON object with the
+        number of ``undone`` changes; otherwise ``success.html`` reporting the
+        rollback.  A Google Calendar error returns 502 and missing
+        credentials 401.
+
+    Raises:
+        HTTPException: 404 if ``session_id`` is not a UUID or nothing was
+            pushed for the session, 403 if
+            another user pushed it, or 409 if a push or rollback for it is
+            still running.
+    """
+    form = await request.form()
+    try:
+        session_id = str(uuid.UUID(str(form.get("session_id", ""))))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Nothing was pushed for this session.") from None
+    wants_json = "application/json" in request.headers.get("accept", "")
+
+    with tracing.span("rollback", trace_id=session_id) as span:
+        progress = sessions.load_progress(TMP_DIR, session_id)
+        if progress is None or not progress.completed:
+            raise HTTPException(status_code=404, detail="Nothing was pushed for this session.")
+        check_owner(progress.account, request)
+        if progress.status == "running":
+            raise HTTPException(status_code=409, detail="A push or rollback for this session is still running.")
+
+        settings = get_settings()
+        user_id = progress.account or ensure_user(request)
+        try:
+            creds = cal_service.get_credentials(user_id, settings.credential_db_path, settings.credential_key)
+        except cal_service.NeedsAuthError:
+            return JSONResponse({"detail": "Connect Google Calendar before undoing a push."}, status_code=401)
+
+        try:
+            with scheduler.client(user_id, "bulk"):
+                undone = await run_in_threadpool(
+                    cal_service.rollback_sync,
+                    progress, creds, settings.google_calendar_id, SyncStore(settings.sync_state_path),
+                    api_endpoint=settings.google_calendar_api_endpoint or None,
+                    on_progress=lambda p: sessions.save_progress(TMP_DIR, session_id, p),
+                )
+        except HttpError as exc:
+            logger.error("Google Calendar error rolling back session %s: %s", session_id, exc)
+            return JSONResponse({"detail": f"Google Calendar error: {exc}"}, status_code=502)
+        span.set(undone=undone)
+
+    logger.info("Session %s rolled back — %d change(s) undone", session_id, undone)
+    if wants_json:
+        return JSONResponse({"session_id": session_id, "undone": undone})
+    return templates.TemplateResponse(request, "success.html", context={"rolled_back": undone})
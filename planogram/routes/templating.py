@@ -0,0 +1,21 @@
+"""Jinja2 templates shared by every route module.
+
+One environment for the whole app means each template is parsed and
+compiled once per process, not once per route module that renders it.
+Compiled templates are also written to a ``FileSystemBytecodeCache`` in the
+system temp directory, so a freshly started worker loads bytecode instead of
+compiling the templates again.
+"""
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+TEMPLATE_DIR = "planogram/templates"
+
+templates = Jinja2Templates(
+    env=jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(),
+    )
+)
@@ -5,9 +5,12 @@ Exposes two endpoints:
 - ``GET /`` renders the upload form.
 - ``POST /upload`` receives the image, resizes it if necessary, runs the
   two-pass Claude parsing pipeline, persists the result as a temporary JSON
-  session file, and redirects to the review page.
+  session file, and redirects to the review page.  When several people are
+  named, the one transcription is split into a session per person and the
+  browser is redirected to the batch page instead.
 """
 
+import hashlib
 import io
 import logging
 import uuid
@@ -16,12 +19,16 @@ from pathlib import Path
 
 from fastapi import APIRouter, File, Form, Request, UploadFile
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from PIL import Image
+from starlette.concurrency import run_in_threadpool
 
 from planogram.config import get_settings
-from planogram.models import ParsedSchedule
-from planogram.services import parser
+from planogram.models import Batch, ParsedSchedule
+from planogram.routes.identity import ensure_user, remember_user
+from planogram.routes.templating import templates
+from planogram.services import admission, metrics, parser, scheduler, sessions, tracing, usage
+from planogram.services.admission import AdmissionRejectedError
+from planogram.services.resilience import UpstreamUnavailableError
+from planogram.services.usage import BudgetExceededError
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +43,6 @@ MEDIA_TYPE_MAP = {
 }
 
 router = APIRouter()
-templates = Jinja2Templates(directory="planogram/templates")
 TMP_DIR = Path("tmp")
 
 
@@ -53,7 +59,13 @@ def resize(image_bytes: bytes) -> tuple[bytes, str]:
         A tuple of ``(resized_bytes, media_type)`` where ``media_type`` is the
         MIME type string inferred from the image format.
     """
-    with Image.open(io.BytesIO(image_bytes)) as img:
+    from PIL import Image
+
+    with (
+        tracing.span("resize", image_bytes=len(image_bytes)),
+        metrics.track("resize"),
+        Image.open(io.BytesIO(image_bytes)) as img,
+    ):
         img.thumbnail((MAX_IMAGE_PX, MAX_IMAGE_PX), Image.Resampling.LANCZOS)
         fmt = (img.format or "JPEG").lower()
         buf = io.BytesIO()
@@ -64,7 +76,7 @@ def resize(image_bytes: bytes) -> tuple[bytes, str]:
 
 @router.get("/")
 async def index(request: Request):
-    """Render the schedule upload form.
+    """Render the schedule upload form, giving a new browser its user id.
 
     Args:
         request: The incoming FastAPI request object.
@@ -72,7 +84,7 @@ async def index(request: Request):
     Returns:
         An HTML response rendering ``index.html``.
     """
-    return templates.TemplateResponse(request, "index.html")
+    return remember_user(templates.TemplateResponse(request, "index.html"), ensure_user(request))
 
 
 @router.post("/upload")
@@ -80,28 +92,62 @@ async def upload(
     request: Request,
     file: UploadFile = File(...),
     person_name: str = Form(default=""),
+    people: str = Form(default=""),
 ):
     """Process an uploaded schedule image and redirect to the review page.
 
     Reads the uploaded file, resizes it to fit within ``MAX_IMAGE_PX`` on each
     side, runs the two-pass Claude parsing pipeline, and stores the resulting
-    ``ParsedSchedule`` as a UUID-named JSON file in ``tmp/``.  On success,
-    redirects the browser to ``/review?id=<uuid>``.
+    ``ParsedSchedule`` as a UUID-named JSON file in ``tmp/``, owned by the
+    requesting user.  On success, redirects the browser to ``/review?id=<uuid>``.
 
     Args:
         request: The incoming FastAPI request object.
         file: The multipart-uploaded schedule image (JPEG, PNG, WEBP, or PDF).
         person_name: Optional name used to filter a multi-person schedule down
             to a single individual's shifts.
+        people: Optional comma- or newline-separated list of names, or
+            ``"everyone"``, to split the schedule into one session per person.
+            Takes precedence over ``person_name``.
 
     Returns:
-        A 303 redirect to the review page on success, or a re-rendered upload
-        form with an error message on failure.
+        A 303 redirect to the review page (or the batch page when ``people``
+        is given) on success, or a re-rendered upload form with an error
+        message on failure.  When too many uploads are already running and
+        waiting, or the upload would exceed a daily Claude budget, the form is
+        re-rendered with status 429 and ``Retry-After``.
     """
+    # The session id doubles as the trace id for the whole upload → confirm flow
+    session_id = str(uuid.uuid4())
+    user_id = ensure_user(request)
+    try:
+        async with admission.upload.admit():
+            with (
+                metrics.UPLOADS_IN_FLIGHT.track_inprogress(),
+                tracing.span("upload", trace_id=session_id, filename=file.filename) as span,
+                scheduler.client(user_id),
+            ):
+                response = await _process_upload(request, file, person_name, people, session_id, user_id)
+                span.set(status_code=response.status_code)
+    except AdmissionRejectedError as exc:
+        response = templates.TemplateResponse(
+            request, "index.html",
+            context={"error": f"Planogram is busy, please try again in {exc.retry_after} seconds."},
+            status_code=429,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return remember_user(response, user_id)
+
+
+async def _process_upload(
+    request: Request, file: UploadFile, person_name: str, people: str, session_id: str, user_id: str
+):
+    """Run the body of ``upload``; split out so the in-flight gauge and span wrap every exit path."""
     settings = get_settings()
 
     image_bytes = await file.read()
     logger.info("Upload received: %r (%d bytes)", file.filename, len(image_bytes))
+    tracing.set_attributes(image_bytes=len(image_bytes))
 
     if not image_bytes:
         logger.warning("Upload rejected: empty file")
@@ -111,6 +157,15 @@ async def upload(
             status_code=400,
         )
 
+    if people.strip() and parse_people(people) == []:
+        logger.warning("Upload rejected: no names in %r", people)
+        return templates.TemplateResponse(
+            request, "index.html",
+            context={"error": 'List at least one name, or enter "everyone".'},
+            status_code=422,
+        )
+
+    digest = hashlib.sha256(image_bytes).hexdigest()[:32]
     try:
         image_bytes, media_type = resize(image_bytes)
     except Exception as exc:
@@ -121,14 +176,37 @@ async def upload(
             status_code=422,
         )
 
+    store = usage.usage_store(settings.usage_db_path)
     try:
-        events, raw_response = parser.parse_events(
-            image_bytes,
-            media_type,
-            settings.anthropic_api_key,
-            date.today().isoformat(),
-            person_name=person_name.strip() or None,
+        usage.check_budget(
+            store, user_id, usage.estimate_upload_cost(settings.transcribe_model, settings.extract_model),
+            settings.daily_budget_usd, settings.user_daily_budget_usd,
         )
+    except BudgetExceededError as exc:
+        return templates.TemplateResponse(
+            request, "index.html",
+            context={"error": f"{exc} Please try again tomorrow."},
+            status_code=429,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    # Parsing blocks on Claude calls, and on the rate scheduler when they queue;
+    # run it off the event loop so other requests are served meanwhile
+    try:
+        with usage.recording(user_id, store) as spent:
+            if people.strip():
+                return await run_in_threadpool(
+                    _fan_out, image_bytes, media_type, file.filename or "unknown", digest, people, session_id, user_id
+                )
+            events, raw_response = await run_in_threadpool(
+                parser.parse_events,
+                image_bytes,
+                media_type,
+                settings.anthropic_api_key,
+                date.today().isoformat(),
+                person_name=person_name.strip() or None,
+                settings=settings,
+            )
     except ValueError as exc:
         logger.warning("Parsing failed: %s", exc)
         return templates.TemplateResponse(
@@ -136,16 +214,80 @@ async def upload(
             context={"error": f"Event parsing failed: {exc}"},
             status_code=422,
         )
+    except UpstreamUnavailableError as exc:
+        logger.error("Claude unavailable: %s", exc)
+        return templates.TemplateResponse(
+            request, "index.html",
+            context={"error": f"Claude is not responding right now, please try again. ({exc})"},
+            status_code=503,
+        )
 
     schedule = ParsedSchedule(
         events=events,
         raw_ocr_text=raw_response,
         source_image_name=file.filename or "unknown",
+        source_digest=digest,
+        person_name=person_name.strip() or None,
+        user_id=user_id,
+        usage=spent,
     )
 
-    TMP_DIR.mkdir(exist_ok=True)
-    session_id = str(uuid.uuid4())
-    (TMP_DIR / f"{session_id}.json").write_text(schedule.model_dump_json())
-    logger.info("Session %s created with %d event(s)", session_id, len(events))
+    sessions.save_session(TMP_DIR, session_id, schedule)
+    logger.info("Session %s created with %d event(s) for $%.4f", session_id, len(events),
+                sum(record.cost_usd for record in spent))
 
     return RedirectResponse(url=f"/review?id={session_id}", status_code=303)
+
+
+def parse_people(raw: str) -> list[str] | None:
+    """Turn the ``people`` form field into a list of names.
+
+    Args:
+        raw: Comma- or newline-separated names, or ``"everyone"``/``"all"``.
+
+    Returns:
+        The distinct names in the order given, or ``None`` for everyone.
+    """
+    if raw.strip().lower() in ("everyone", "all"):
+        return None
+    names = (name.strip() for name in raw.replace("\n", ",").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _fan_out(
+    image_bytes: bytes, media_type: str, filename: str, digest: str, people: str, batch_id: str, user_id: str
+) -> RedirectResponse:
+    """Parse one image for several people and store a session for each.
+
+    The upload's own id becomes the batch id, so the batch page shares the
+    upload's trace.  Called inside the upload's ``usage.recording`` block;
+    the upload's usage is stored once on the batch, not on every session.
+    """
+    settings = get_settings()
+    by_person, raw_response = parser.parse_events_by_person(
+        image_bytes,
+        media_type,
+        settings.anthropic_api_key,
+        date.today().isoformat(),
+        person_names=parse_people(people),
+        settings=settings,
+    )
+
+    spent = usage.recorded()
+    session_ids = {}
+    for name, events in by_person.items():
+        session_ids[name] = str(uuid.uuid4())
+        schedule = ParsedSchedule(
+            events=events,
+            raw_ocr_text=raw_response,
+            source_image_name=filename,
+            source_digest=digest,
+            person_name=name,
+            user_id=user_id,
+        )
+        sessions.save_session(TMP_DIR, session_ids[name], schedule)
+    sessions.save_batch(TMP_DIR, batch_id, Batch(session_ids=session_ids, usage=spent))
+    tracing.set_attributes(people=len(session_ids))
+    logger.info("Batch %s created with %d session(s)", batch_id, len(session_ids))
+
+    return RedirectResponse(url=f"/batch?id={batch_id}", status_code=303)
@@ -5,4 +5,25 @@ Modules:
               JSON extraction — that converts a schedule image into ScheduleEvent
               objects.
     calendar: Google Calendar OAuth flow and event push helpers.
+    credentials: Encrypted per-user OAuth token store and an in-memory LRU
+              cache with background, single-flight token refresh.
+    sync:   Diffing of confirmed schedules against previously pushed
+              events, and the store that maps shifts to event ids.
+    ics:    iCalendar export of schedule events.
+    names:  Indexed, typo-tolerant matching of person names to row labels.
+    resilience: Timeouts, jittered retries, request hedging, and a circuit
+              breaker wrapped around upstream API calls.
+    admission: Bounded in-flight limits and wait lines for uploads and
+              confirms, shedding overflow with 429.
+    scheduler: Per-upstream token-bucket rate limits with a fair, prioritized
+              waiting line shared by every Claude and Calendar call.
+    usage:  Claude token and cost accounting per session, stage, model and
+              day, and the daily budget caps checked before new work.
+    metrics: Prometheus histograms, counters, and gauges for each pipeline
+              stage.
+    tracing: Request tracing spans with pluggable exporters.
+    sessions: Temporary on-disk storage for parsed schedules, pending
+              pushes, and multi-person batches.
+    codec:  Single-pass JSON encoding of events and schedules, with optional
+              compression of the stored transcription.
 """
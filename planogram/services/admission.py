@@ -0,0 +1,168 @@
+"""Inbound admission control for the expensive routes.
+
+An upload decodes a full-resolution image and starts at least two Claude
+calls, and a confirm holds a worker thread for the whole calendar push.
+``AdmissionGate`` lets a fixed number of them run at once and parks the rest
+in a bounded FIFO line.  A request that finds the line full, or waits longer
+than ``queue_timeout``, is turned away straight away with a ``Retry-After``
+estimate.  Shedding the overflow keeps the latency of accepted requests
+bounded by the line length instead of growing with the size of the burst.
+
+Gates live on the event loop and count per process.  Queue depth, wait time,
+and rejections are exported as ``planogram_admission_queue_depth``,
+``planogram_admission_wait_seconds``, and ``planogram_admission_rejected_total``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from planogram.config import Settings
+from planogram.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Assumed request duration before any has finished, for Retry-After
+_INITIAL_SERVICE_SECONDS = 5.0
+
+# Weight of the newest duration in the moving average
+_SERVICE_EWMA_ALPHA = 0.2
+
+MAX_RETRY_AFTER = 120
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Raised when a request is turned away instead of being queued.
+
+    Attributes:
+        retry_after: Whole seconds the client should wait before retrying.
+        reason: ``"queue_full"`` or ``"timeout"``.
+    """
+
+    def __init__(self, message: str, retry_after: int, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionGate:
+    """At most ``max_in_flight`` requests at once, with a bounded line for the rest.
+
+    Args:
+        name: Route label used in metrics and logs.
+        max_in_flight: Requests allowed to run at once.  Zero disables the gate.
+        max_queue: Requests allowed to wait for a slot.
+        queue_timeout: Seconds a request may wait before it is rejected.
+    """
+
+    def __init__(self, name: str, max_in_flight: int = 0, max_queue: int = 0, queue_timeout: float = 30.0):
+        self.name = name
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._service_seconds = _INITIAL_SERVICE_SECONDS
+        self.configure(max_in_flight, max_queue, queue_timeout)
+
+    def configure(self, max_in_flight: int, max_queue: int, queue_timeout: float = 30.0) -> None:
+        """Replace the limits; requests already running or waiting keep their place."""
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Requests currently waiting for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> int:
+        """Estimate, in whole seconds, when a slot is likely to be free for a new request."""
+        slots = max(self.max_in_flight, 1)
+        seconds = self._service_seconds * (self.queued + 1) / slots
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(seconds)))
+
+    def _reject(self, reason: str) -> AdmissionRejectedError:
+        metrics.ADMISSION_REJECTED.labels(self.name, reason).inc()
+        retry_after = self.retry_after()
+        logger.warning("Rejected %s request (%s, %d running, %d queued), retry after %ds",
+                       self.name, reason, self._in_flight, self.queued, retry_after)
+        return AdmissionRejectedError(f"Too many {self.name} requests right now.", retry_after, reason)
+
+    def _release(self) -> None:
+        """Hand the slot to the next live waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def _wait_for_slot(self) -> None:
+        if self.queued >= self.max_queue:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        depth = metrics.ADMISSION_QUEUE_DEPTH.labels(self.name)
+        depth.inc()
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("timeout") from None
+        except asyncio.CancelledError:
+            # Client went away while waiting; a slot handed over meanwhile is passed on
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            depth.dec()
+            metrics.ADMISSION_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - t0)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block, waiting in line if needed.
+
+        Raises:
+            AdmissionRejectedError: If the line is full or the wait timed out.
+        """
+        if not self.max_in_flight:
+            yield
+            return
+        if self._in_flight < self.max_in_flight and not self.queued:
+            self._in_flight += 1
+        else:
+            await self._wait_for_slot()
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - t0
+            self._service_seconds += _SERVICE_EWMA_ALPHA * (elapsed - self._service_seconds)
+            self._release()
+
+
+# One gate per route, shared by every request in the process
+upload = AdmissionGate("upload")
+confirm = AdmissionGate("confirm")
+
+
+def configure(settings: Settings) -> None:
+    """Apply the configured admission limits to the shared gates.
+
+    Args:
+        settings: Application settings with the ``*_max_in_flight`` and
+            ``*_max_queue`` limits.
+    """
+    upload.configure(settings.upload_max_in_flight, settings.upload_max_queue, settings.admission_queue_timeout)
+    confirm.configure(settings.confirm_max_in_flight, settings.confirm_max_queue, settings.admission_queue_timeout)
@@ -1,73 +1,143 @@
 """Google Calendar OAuth 2.0 flow and event creation helpers.
 
-Credentials are persisted to disk after the first successful authorization, so
-later runs skip the consent screen entirely. The OAuth flow uses
-``prompt="consent"`` to always request a refresh token, which is required for
-long-lived offline access.
+Each user's credentials are persisted, encrypted, after their first successful
+authorization, so later runs skip the consent screen entirely.  Within a
+process they are kept in memory and refreshed in the background ahead of
+expiry (see ``planogram.services.credentials``).  The OAuth flow uses ``prompt="consent"``
+to always request a refresh token, which is required for long-lived offline
+access.
+
+Every Calendar API request first waits for a slot from the shared
+``scheduler.calendar``, so one user's large push cannot use up the quota
+that every other user's push also draws on.
 """
 
 from __future__ import annotations
 
 import logging
+import threading
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from pydantic import BaseModel
 
 from planogram.models import ScheduleEvent
+from planogram.services import metrics, scheduler, tracing
+from planogram.services.credentials import CredentialCache, CredentialStore, load_key
+from planogram.services.sync import (
+    FINGERPRINT_PROPERTY,
+    ORIGIN_PROPERTY,
+    PERSON_PROPERTY,
+    PushProgress,
+    SyncEntry,
+    SyncStore,
+    content_hash,
+    fingerprint,
+    plan_sync,
+    record_change,
+    stable_event_id,
+)
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import Flow
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
 
+# Extended property carrying the body hash, so a mapping rebuilt from the
+# calendar can still tell changed shifts from unchanged ones
+CONTENT_PROPERTY = "planogramContent"
+
+# Status codes meaning the event is already gone from the calendar
+_GONE = (404, 410)
+
+# Fields of a listed event that make up the body a rollback restores
+_BODY_FIELDS = ("summary", "description", "location", "colorId", "reminders", "start", "end", "extendedProperties")
+
+# Status code for inserting an event id that already exists
+_CONFLICT = 409
+
+# Rollback deletes go out in batch requests of this many calls, at most one
+# batch per interval, so a large undo stays inside Calendar's per-user quota
+DELETE_BATCH_SIZE = 50
+DELETE_BATCH_INTERVAL = 1.0
+
+# Per-call statuses inside a batch that are retried in a later batch
+_RETRYABLE = (403, 429, 500, 502, 503)
+_MAX_DELETE_ROUNDS = 5
+
+
+# One credentials cache per store, shared by every request in this process
+_caches: dict[Path, CredentialCache] = {}
+_caches_lock = threading.Lock()
+
 
 class NeedsAuthError(Exception):
     """Raised when no valid Google OAuth token exists and user authorization is required."""
 
 
-def get_credentials(oauth_credentials_path: Path, token_path: Path) -> Credentials:
-    """Load and return valid Google OAuth credentials from the disk.
+def credential_cache(db_path: Path, key: str = "") -> CredentialCache:
+    """Return this process's credentials cache for the store at ``db_path``.
+
+    Args:
+        db_path: SQLite credential store.
+        key: Fernet key for the store; empty to use a key generated next to it.
+    """
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            store = CredentialStore(db_path, load_key(key, db_path.with_suffix(".key")))
+            cache = _caches[db_path] = CredentialCache(store, SCOPES)
+        return cache
+
+
+def get_credentials(user_id: str, db_path: Path, key: str = "") -> Credentials:
+    """Return valid Google OAuth credentials for a user, from memory whenever possible.
 
-    Attempts to load a previously saved token, refreshing it automatically if it
-    expired.  Raises ``NeedsAuthError`` if no usable token exists, signaling
-    the caller to redirect the user through the OAuth consent flow.
+    Tokens are read from the store once per process and kept fresh by
+    ``credentials.refresh_loop``, so this normally costs no database read and
+    no refresh round-trip.  An expired token is refreshed here as a fallback,
+    single-flight with any other request doing the same.  Raises
+    ``NeedsAuthError`` if the user has no usable token, signaling the caller
+    to redirect them through the OAuth consent flow.
 
     Args:
-        oauth_credentials_path: Path to the OAuth client secrets JSON file.
-        token_path: Path where the user token JSON is stored after authorization.
+        user_id: Who is pushing.
+        db_path: SQLite credential store.
+        key: Fernet key for the store.
 
     Returns:
         Valid ``Credentials`` ready for use with Google API clients.
 
     Raises:
-        NeedsAuthError: If no token file exists or the token cannot be refreshed.
+        NeedsAuthError: If the user has no token or it cannot be refreshed.
     """
-    creds: Optional[Credentials] = None
-
-    if token_path.exists():
-        creds = Credentials.from_authorized_user_file(str(token_path), SCOPES)
+    cache = credential_cache(db_path, key)
+    with tracing.span("get_credentials") as span:
+        creds: Optional[Credentials] = cache.get(user_id)
 
-    if creds and creds.valid:
-        logger.info("Credentials loaded from %s", token_path)
-        return creds
+        if creds and creds.valid:
+            span.set(refreshed=False)
+            return creds
 
-    if creds and creds.expired and creds.refresh_token:
-        logger.info("Refreshing expired credentials")
-        creds.refresh(Request())
-        _save_token(creds, token_path)
-        return creds
+        if creds and creds.refresh_token:
+            logger.info("Refreshing expired credentials for user %s", user_id[:8])
+            creds = cache.refresh(user_id)
+            if creds is not None:
+                span.set(refreshed=True)
+                return creds
 
-    logger.warning("No valid credentials found — authorization required")
-    raise NeedsAuthError("Google Calendar authorization required.")
+        logger.warning("No valid credentials for user %s — authorization required", user_id[:8])
+        raise NeedsAuthError("Google Calendar authorization required.")
 
 
 def initiate_auth_flow(
-    oauth_credentials_path: Path, redirect_uri: str
+    oauth_credentials_path: Path, redirect_uri: str, state: str | None = None
 ) -> tuple[str, Flow]:
     """Create a Google OAuth 2.0 authorization flow and return the consent URL.
 
@@ -78,12 +148,16 @@ def initiate_auth_flow(
         oauth_credentials_path: Path to the OAuth client secrets JSON file.
         redirect_uri: The URI Google will redirect to after the user consents.  Must
             match a URI registered in the Google Cloud Console.
+        state: Opaque value Google echoes back to the callback, used to find
+            the flow again.  ``None`` generates a random one.
 
     Returns:
         A tuple of ``(auth_url, flow)`` where ``auth_url`` is the Google consent
         page URL to redirect the user to and ``flow`` is the in-progress
         ``Flow`` object that must be stored until the callback arrives.
     """
+    from google_auth_oauthlib.flow import Flow
+
     flow = Flow.from_client_secrets_file(
         str(oauth_credentials_path),
         scopes=SCOPES,
@@ -93,12 +167,13 @@ def initiate_auth_flow(
         access_type="offline",
         include_granted_scopes="true",
         prompt="consent",
+        state=state,
     )
     return auth_url, flow
 
 
 def handle_auth_callback(
-    flow: Flow, authorization_response: str, token_path: Path
+    flow: Flow, authorization_response: str, user_id: str, db_path: Path, key: str = ""
 ) -> Credentials:
     """Exchange the OAuth authorization code for credentials and persist them.
 
@@ -107,39 +182,34 @@ def handle_auth_callback(
             from the in-memory pending flows store.
         authorization_response: The full callback URL including the ``code``
             query parameter returned by Google.
-        token_path: Path where the resulting token JSON will be written.
+        user_id: Who authorized.
+        db_path: SQLite credential store the token is saved to.
+        key: Fernet key for the store.
 
     Returns:
         Valid ``Credentials`` containing access and refresh tokens.
     """
     flow.fetch_token(authorization_response=authorization_response)
     creds = flow.credentials
-    _save_token(creds, token_path)
+    credential_cache(db_path, key).put(user_id, creds)
     return creds
 
 
-def _save_token(creds: Credentials, token_path: Path) -> None:
-    """Persist OAuth credentials to disk as JSON.
-
-    Creates parent directories if they do not exist.
-
-    Args:
-        creds: The credentials to serialize.
-        token_path: Destination file path.
-    """
-    token_path.parent.mkdir(parents=True, exist_ok=True)
-    token_path.write_text(creds.to_json())
-
-
 def push_events(
     events: list[ScheduleEvent],
     credentials: Credentials,
     calendar_id: str,
     timezone: str,
     notification_minutes: int | None = None,
+    api_endpoint: str | None = None,
+    session_id: str = "",
 ) -> list[str]:
     """Insert a list of events into Google Calendar and return their HTML links.
 
+    Each event is inserted under an id derived from ``session_id`` and its
+    content, so calling this again after a timeout or a double submit leaves
+    one copy of each event.
+
     Args:
         events: Events to create, in the order they will be inserted.
         credentials: Valid Google OAuth credentials scoped to calendar events.
@@ -149,6 +219,9 @@ def push_events(
         notification_minutes: Override for the popup reminder time in minutes.
             Pass ``None`` to use the calendar default, ``0`` to suppress all
             reminders, or a positive integer for a custom lead time.
+        api_endpoint: Override for the Calendar API endpoint, e.g. a local
+            stand-in server.  ``None`` uses Google's.
+        session_id: Session the events were confirmed from.
 
     Returns:
         List of ``htmlLink`` URLs for the created events, in the same order as
@@ -156,18 +229,450 @@ def push_events(
     """
     logger.info("Pushing %d event(s) to calendar %r", len(events), calendar_id)
     t0 = time.perf_counter()
-    service = build("calendar", "v3", credentials=credentials)
     links = []
-    for event in events:
-        body = build_event_body(event, timezone, notification_minutes)
-        result = service.events().insert(calendarId=calendar_id, body=body).execute()
-        link = result.get("htmlLink", "")
-        logger.info("Created event %r on %s", event.title, event.date)
-        links.append(link)
+    with tracing.span("push_events", events=len(events), calendar_id=calendar_id), metrics.track("calendar_push"):
+        service = build_service(credentials, api_endpoint)
+        for event in events:
+            body = build_event_body(event, timezone, notification_minutes)
+            body["id"] = stable_event_id(session_id, "", body)
+            result = _insert(service, calendar_id, body)
+            logger.info("Created event %r on %s", event.title, event.date)
+            links.append(result.get("htmlLink", ""))
     logger.info("Pushed %d event(s) in %.1fs", len(links), time.perf_counter() - t0)
     return links
 
 
+class SyncResult(BaseModel):
+    """Outcome of ``sync_events``.
+
+    Attributes:
+        links: ``htmlLink`` of every confirmed shift, in schedule order,
+            including shifts that were left unchanged.
+        inserted: Shifts created.
+        patched: Shifts updated in place.
+        deleted: Shifts removed because they left the schedule.
+        unchanged: Shifts already up to date.
+    """
+
+    links: list[str]
+    inserted: int = 0
+    patched: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+def sync_events(
+    events: list[ScheduleEvent],
+    credentials: Credentials,
+    calendar_id: str,
+    timezone: str,
+    store: SyncStore,
+    person: str = "",
+    notification_minutes: int | None = None,
+    api_endpoint: str | None = None,
+    session_id: str = "",
+    resume: PushProgress | None = None,
+    on_progress: Callable[[PushProgress], None] | None = None,
+    account: str = "",
+    origin: str = "",
+) -> SyncResult:
+    """Bring the calendar in line with a confirmed schedule using as few calls as possible.
+
+    Compares ``events`` with the shifts previously pushed for the same person
+    and calendar within the schedule's date range (see
+    ``planogram.services.sync``), then inserts new shifts, patches changed
+    ones, deletes removed ones that came from the same origin, and leaves the
+    rest alone.  When the store has
+    no entries for the range, a single ``events.list`` call rebuilds them from
+    the extended properties written on every pushed event.  Inserts are
+    idempotent (see ``push_events``), so a retry after a lost response does
+    not duplicate the shift even when the store was never updated.
+
+    Progress is reported to ``on_progress`` after every call, with the entry
+    each call produced.  Passing the last report of a failed sync as
+    ``resume`` treats those calls as done, so the sync picks up at the first
+    call that did not succeed.
+
+    Args:
+        events: Confirmed shifts, in display order.
+        credentials: Valid Google OAuth credentials scoped to calendar events.
+        calendar_id: Target calendar identifier.
+        timezone: IANA timezone name applied to all timed events.
+        store: Persistent fingerprint → event id map.
+        person: Whose shifts these are; empty for single-person uploads.
+        notification_minutes: See ``push_events``.
+        api_endpoint: Override for the Calendar API endpoint.
+        session_id: Session the shifts were confirmed from.
+        resume: Checkpoint of an earlier, failed sync of the same session.
+        on_progress: Called with the current checkpoint after planning,
+            after every call, and when the sync finishes or fails.
+        account: User whose Google account ``credentials`` belong to.  Shifts
+            are tracked per account and calendar, since every account has
+            its own ``"primary"``.
+        origin: Digest of the schedule's source image; only shifts earlier
+            pushed from the same origin are deleted.  Empty uses
+            ``session_id``.
+
+    Returns:
+        Links for every shift and the number of each kind of change.
+
+    Raises:
+        HttpError: If a Calendar API call fails for a reason other than the
+            target event already being gone.  Changes made before the failure
+            are kept in the store and reported in the last checkpoint.
+    """
+    if not events:
+        return SyncResult(links=[])
+    start, end = min(e.date for e in events), max(e.date for e in events)
+    person_key = person.strip().lower()
+    source = f"{account}:{calendar_id}" if account else calendar_id
+    origin = origin or session_id
+    bodies = [build_event_body(event, timezone, notification_minutes) for event in events]
+    t0 = time.perf_counter()
+
+    progress = PushProgress(account=account, completed=dict(resume.completed) if resume else {})
+    completed = progress.completed
+    result = SyncResult(links=[])
+    links: dict[str, str] = {}
+
+    def report(**changes) -> None:
+        for name, value in changes.items():
+            setattr(progress, name, value)
+        if on_progress is not None:
+            on_progress(progress)
+
+    with tracing.span("sync_events", events=len(events), calendar_id=calendar_id) as span, \
+            metrics.track("calendar_push"):
+        try:
+            service = build_service(credentials, api_endpoint)
+            previous = store.entries(person_key, source, start, end)
+            if not previous:
+                previous = _list_pushed(service, calendar_id, source, person_key, start, end)
+            for fp, change in completed.items():
+                entry = change.entry
+                if entry is None:
+                    previous.pop(fp, None)
+                elif entry.source == source and start <= entry.date <= end:
+                    previous[fp] = entry
+            if completed:
+                logger.info("Resuming sync for session %s: %d call(s) already done", session_id, len(completed))
+            span.set(resumed=len(completed))
+
+            plan = plan_sync(events, bodies, previous, person_key, source, origin)
+            body_by_fingerprint: dict[str, dict] = {}
+            for event, body in zip(events, bodies):
+                body_by_fingerprint.setdefault(fingerprint(person_key, event, source), body)
+            result.unchanged = len(plan.unchanged)
+            links.update((fp, entry.html_link) for fp, entry in plan.unchanged.items())
+            report(total=len(plan.actions), unchanged=result.unchanged)
+
+            for action in plan.actions:
+                if action.kind == "delete":
+                    _delete(service, calendar_id, action.event_id)
+                    store.remove(action.fingerprint)
+                    result.deleted += 1
+                    record_change(completed, action.fingerprint, None, previous[action.fingerprint])
+                    report(done=progress.done + 1, deleted=result.deleted)
+                    continue
+
+                body = body_by_fingerprint[action.fingerprint]
+                full_body = {**body, "extendedProperties": {"private": {
+                    FINGERPRINT_PROPERTY: action.fingerprint,
+                    PERSON_PROPERTY: person_key or "_",
+                    CONTENT_PROPERTY: content_hash(body),
+                    ORIGIN_PROPERTY: origin,
+                }}}
+                sent = dict(full_body)
+                created = None
+                if action.kind == "patch":
+                    created = _patch(service, calendar_id, action.event_id, full_body)
+                if created is None:
+                    full_body["id"] = stable_event_id(session_id, action.fingerprint, body)
+                    created = _insert(service, calendar_id, full_body)
+                    result.inserted += 1
+                else:
+                    result.patched += 1
+                links[action.fingerprint] = created.get("htmlLink", "")
+                entry = SyncEntry(
+                    event_id=created["id"],
+                    content_hash=content_hash(body),
+                    date=action.event.date,
+                    person=person_key,
+                    source=source,
+                    html_link=links[action.fingerprint],
+                    origin=origin,
+                    body=sent,
+                )
+                store.put(action.fingerprint, entry)
+                record_change(completed, action.fingerprint, entry, previous.get(action.fingerprint))
+                report(done=progress.done + 1, inserted=result.inserted, patched=result.patched)
+        except Exception as exc:
+            report(status="failed", error=str(exc))
+            raise
+        finally:
+            store.save()
+            span.set(inserted=result.inserted, patched=result.patched, deleted=result.deleted,
+                     unchanged=result.unchanged)
+
+    result.links = [links.get(fingerprint(person_key, event, source), "") for event in events]
+    report(status="done")
+    logger.info(
+        "Synced %d event(s) to %r in %.1fs: %d inserted, %d patched, %d deleted, %d unchanged",
+        len(events), calendar_id, time.perf_counter() - t0,
+        result.inserted, result.patched, result.deleted, result.unchanged,
+    )
+    return result
+
+
+def rollback_sync(
+    progress: PushProgress,
+    credentials: Credentials,
+    calendar_id: str,
+    store: SyncStore,
+    api_endpoint: str | None = None,
+    on_progress: Callable[[PushProgress], None] | None = None,
+    batch_size: int = DELETE_BATCH_SIZE,
+    interval: float = DELETE_BATCH_INTERVAL,
+) -> int:
+    """Undo every change a session's sync made.
+
+    The changes come from the session's last push checkpoint.  Shifts the
+    sync inserted are deleted through batch requests of ``batch_size`` calls,
+    one batch per ``interval`` seconds; calls that hit a rate limit or a
+    server error are retried in a later batch.  Shifts it patched are patched
+    back to the body they had before, and shifts it deleted are re-inserted
+    under their old id.  A patched or deleted shift whose earlier body was
+    never recorded is left as it is.
+
+    Args:
+        progress: The session's last push checkpoint.
+        credentials: Valid Google OAuth credentials scoped to calendar events.
+        calendar_id: Calendar the session was pushed to.
+        store: Persistent fingerprint → event id map; rolled-back shifts are
+            removed from it or restored to their earlier entries.
+        api_endpoint: Override for the Calendar API endpoint.
+        on_progress: Called with the rollback checkpoint after every batch
+            and restore and when the rollback finishes or fails.  Undone
+            changes are dropped from its ``completed`` map, so a failed
+            rollback can be retried from that checkpoint.
+        batch_size: Calls per batch request.
+        interval: Minimum seconds between batch requests.
+
+    Returns:
+        The number of changes undone.
+
+    Raises:
+        HttpError: If a call fails for a reason other than the event being
+            gone, or a delete is still rate limited after
+            ``_MAX_DELETE_ROUNDS`` tries.
+    """
+    changes = dict(progress.completed)
+    inserted = {c.entry.event_id: fp for fp, c in changes.items() if c.kind == "insert" and c.entry is not None}
+    restores = [fp for fp, c in changes.items() if c.kind != "insert"]
+    # Inserted and deleted again within the push: nothing left to undo
+    completed = {fp: c for fp, c in changes.items() if c.kind != "insert" or c.entry is not None}
+    rollback = PushProgress(
+        operation="rollback", account=progress.account, total=len(inserted) + len(restores), completed=completed,
+    )
+    t0 = time.perf_counter()
+
+    def report(**changes) -> None:
+        for name, value in changes.items():
+            setattr(rollback, name, value)
+        if on_progress is not None:
+            on_progress(rollback)
+
+    with tracing.span("rollback_sync", events=rollback.total, calendar_id=calendar_id) as span, \
+            metrics.track("calendar_push"):
+        try:
+            report()
+            service = build_service(credentials, api_endpoint)
+            rounds: dict[str, int] = {}
+            queue = list(inserted)
+            last_batch = 0.0
+            while queue:
+                chunk, queue = queue[:batch_size], queue[batch_size:]
+                wait = interval - (time.perf_counter() - last_batch)
+                if last_batch and wait > 0:
+                    time.sleep(wait)
+                last_batch = time.perf_counter()
+                failures = _delete_batch(service, calendar_id, chunk)
+                for event_id in chunk:
+                    exc = failures.get(event_id)
+                    if exc is None:
+                        fp = inserted[event_id]
+                        store.remove(fp)
+                        del rollback.completed[fp]
+                        rollback.deleted += 1
+                        rollback.done += 1
+                        continue
+                    rounds[event_id] = rounds.get(event_id, 1) + 1
+                    if exc.resp.status not in _RETRYABLE or rounds[event_id] > _MAX_DELETE_ROUNDS:
+                        raise exc
+                    queue.append(event_id)
+                report()
+
+            for fp in restores:
+                change = changes[fp]
+                prior = change.prior
+                if prior is None or not prior.body:
+                    logger.warning("Cannot restore shift %s: its earlier body was not recorded", fp)
+                else:
+                    restored = None
+                    if change.entry is not None:
+                        restored = _patch(service, calendar_id, change.entry.event_id, prior.body)
+                    if restored is None:
+                        restored = _insert(service, calendar_id, {**prior.body, "id": prior.event_id})
+                    store.put(fp, prior.model_copy(update={
+                        "event_id": restored["id"], "html_link": restored.get("htmlLink", prior.html_link),
+                    }))
+                    if change.kind == "patch":
+                        rollback.patched += 1
+                    else:
+                        rollback.inserted += 1
+                del rollback.completed[fp]
+                report(done=rollback.done + 1)
+        except Exception as exc:
+            report(status="failed", error=str(exc))
+            raise
+        finally:
+            store.save()
+            span.set(deleted=rollback.deleted, patched=rollback.patched, inserted=rollback.inserted)
+
+    report(status="done")
+    undone = rollback.deleted + rollback.patched + rollback.inserted
+    logger.info(
+        "Rolled back %d change(s) in %r in %.1fs: %d deleted, %d reverted, %d restored",
+        undone, calendar_id, time.perf_counter() - t0, rollback.deleted, rollback.patched, rollback.inserted,
+    )
+    return undone
+
+
+def _execute(request) -> dict:
+    """Send one Calendar API request once the shared rate scheduler admits it."""
+    scheduler.calendar.acquire()
+    return request.execute()
+
+
+def _delete_batch(service, calendar_id: str, event_ids: list[str]) -> dict[str, HttpError]:
+    """Delete events in one batch request and return the calls that failed.
+
+    Events that are already gone count as deleted.
+    """
+    failures: dict[str, HttpError] = {}
+
+    def collect(request_id: str, response, exception: HttpError | None) -> None:
+        if exception is not None and exception.resp.status not in _GONE:
+            failures[request_id] = exception
+
+    batch = service.new_batch_http_request(callback=collect)
+    for event_id in event_ids:
+        batch.add(service.events().delete(calendarId=calendar_id, eventId=event_id), request_id=event_id)
+    scheduler.calendar.acquire(requests=len(event_ids))
+    batch.execute()
+    return failures
+
+
+def _list_pushed(
+    service, calendar_id: str, source: str, person: str, start: date, end: date
+) -> dict[str, SyncEntry]:
+    """Rebuild store entries for a date range from the calendar in one ``events.list`` call."""
+    items: list[dict] = []
+    request = service.events().list(
+        calendarId=calendar_id,
+        privateExtendedProperty=f"{PERSON_PROPERTY}={person or '_'}",
+        timeMin=f"{start - timedelta(days=1)}T00:00:00Z",
+        timeMax=f"{end + timedelta(days=2)}T00:00:00Z",
+        singleEvents=True,
+        maxResults=2500,
+    )
+    while request is not None:
+        response = _execute(request)
+        items.extend(response.get("items", []))
+        request = service.events().list_next(request, response)
+
+    entries = {}
+    for item in items:
+        private = item.get("extendedProperties", {}).get("private", {})
+        fp = private.get(FINGERPRINT_PROPERTY)
+        if not fp:
+            continue
+        day = date.fromisoformat(item["start"].get("date") or item["start"]["dateTime"][:10])
+        if start <= day <= end:
+            entries[fp] = SyncEntry(
+                event_id=item["id"],
+                content_hash=private.get(CONTENT_PROPERTY, ""),
+                date=day,
+                person=person,
+                source=source,
+                html_link=item.get("htmlLink", ""),
+                origin=private.get(ORIGIN_PROPERTY, ""),
+                body={key: item[key] for key in _BODY_FIELDS if key in item},
+            )
+    logger.info("Recovered %d previously pushed event(s) from calendar %r", len(entries), calendar_id)
+    return entries
+
+
+def _insert(service, calendar_id: str, body: dict) -> dict:
+    """Insert an event under its client-chosen id, treating an existing one as success.
+
+    A 409 means an earlier attempt already created the event, so it is
+    fetched instead.  If that event was since deleted it is still reserved as
+    cancelled, so it is restored with the new body.
+    """
+    try:
+        created = _execute(service.events().insert(calendarId=calendar_id, body=body))
+    except HttpError as exc:
+        if exc.resp.status != _CONFLICT:
+            raise
+        existing = _execute(service.events().get(calendarId=calendar_id, eventId=body["id"]))
+        if existing.get("status") != "cancelled":
+            logger.info("Event %s already exists, keeping it", body["id"])
+            return existing
+        logger.info("Event %s was deleted, restoring it", body["id"])
+        return _execute(service.events().patch(
+            calendarId=calendar_id, eventId=body["id"], body={**body, "status": "confirmed"},
+        ))
+    metrics.EVENTS_PUSHED.inc()
+    return created
+
+
+def _patch(service, calendar_id: str, event_id: str, body: dict) -> dict | None:
+    """Patch an event, or return ``None`` if it no longer exists."""
+    try:
+        return _execute(service.events().patch(calendarId=calendar_id, eventId=event_id, body=body))
+    except HttpError as exc:
+        if exc.resp.status in _GONE:
+            logger.info("Event %s is gone, re-inserting", event_id)
+            return None
+        raise
+
+
+def _delete(service, calendar_id: str, event_id: str) -> None:
+    """Delete an event, treating one that is already gone as deleted."""
+    try:
+        _execute(service.events().delete(calendarId=calendar_id, eventId=event_id))
+    except HttpError as exc:
+        if exc.resp.status not in _GONE:
+            raise
+
+
+def build_service(credentials: Credentials, api_endpoint: str | None = None):
+    """Build a Calendar v3 API client from the bundled discovery document.
+
+    Args:
+        credentials: Valid Google OAuth credentials scoped to calendar events.
+        api_endpoint: Override for the API endpoint.  ``None`` uses Google's.
+
+    Returns:
+        A ``googleapiclient`` resource for the Calendar v3 API.
+    """
+    from googleapiclient.discovery import build
+
+    client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+    return build("calendar", "v3", credentials=credentials, client_options=client_options)
+
+
 def build_event_body(
     event: ScheduleEvent,
     timezone: str,
@@ -0,0 +1,137 @@
+"""Bulk JSON encoding of events and schedules for the session store.
+
+Event lists go through one ``TypeAdapter(list[ScheduleEvent])``, so
+thousands of events are serialized or validated in a single call into
+pydantic-core, straight to and from ``bytes``.  Schedules and pending pushes
+go through a ``TypeAdapter`` of their own the same way.
+
+A schedule's ``raw_ocr_text`` can optionally be stored compressed with
+``gzip`` or ``zstd``.  The compressed text is base64-encoded behind a
+``"\\x00<codec>:"`` prefix in the same JSON field, which a transcription
+never starts with.  Decoding recognises the prefix, so files written with
+any setting can be read under any other.  ``zstd`` needs Python 3.14's
+``compression.zstd``; where that is missing, ``gzip`` is used instead.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import logging
+from typing import Literal
+
+from pydantic import TypeAdapter
+
+from planogram.models import ParsedSchedule, PendingPush, ScheduleEvent
+
+logger = logging.getLogger(__name__)
+
+Compression = Literal["none", "gzip", "zstd"]
+
+EVENT_LIST = TypeAdapter(list[ScheduleEvent])
+SCHEDULE = TypeAdapter(ParsedSchedule)
+PENDING = TypeAdapter(PendingPush)
+
+# Shorter transcriptions take more space base64-encoded than they save compressed
+MIN_COMPRESS_CHARS = 512
+
+_PREFIX = "\x00"
+
+
+def _zstd():
+    """Return the stdlib zstd module, or ``None`` before Python 3.14."""
+    try:
+        from compression import zstd
+    except ImportError:
+        return None
+    return zstd
+
+
+def available(compression: Compression) -> Compression:
+    """Return ``compression``, or ``gzip`` when ``zstd`` is asked for but unavailable."""
+    if compression == "zstd" and _zstd() is None:
+        logger.warning("zstd needs Python 3.14 or later; compressing sessions with gzip instead")
+        return "gzip"
+    return compression
+
+
+def compress_text(text: str, compression: Compression) -> str:
+    """Pack ``text`` for storage in a JSON string field.
+
+    Args:
+        text: The text to store.
+        compression: Codec to use; ``"none"`` returns ``text`` unchanged.
+    """
+    if compression == "none":
+        return text
+    raw = text.encode("utf-8")
+    packed = _zstd().compress(raw) if compression == "zstd" else gzip.compress(raw, compresslevel=6, mtime=0)
+    return f"{_PREFIX}{compression}:{base64.b64encode(packed).decode('ascii')}"
+
+
+def decompress_text(stored: str) -> str:
+    """Reverse ``compress_text``; plain text is returned as is."""
+    if not stored.startswith(_PREFIX):
+        return stored
+    codec, _, payload = stored[1:].partition(":")
+    packed = base64.b64decode(payload)
+    if codec == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise ValueError("session was compressed with zstd, which needs Python 3.14 or later")
+        return zstd.decompress(packed).decode("utf-8")
+    if codec == "gzip":
+        return gzip.decompress(packed).decode("utf-8")
+    raise ValueError(f"unknown compression {codec!r}")
+
+
+def encode_events(events: list[ScheduleEvent]) -> bytes:
+    """Serialize events as one JSON array."""
+    return EVENT_LIST.dump_json(events)
+
+
+def decode_events(data: bytes | str) -> list[ScheduleEvent]:
+    """Validate a JSON array of events in one pass.
+
+    Raises:
+        ValidationError: If ``data`` is not a JSON array of valid events.
+    """
+    return EVENT_LIST.validate_json(data)
+
+
+def encode_pending(pending: PendingPush) -> bytes:
+    """Serialize a pending push as one JSON object."""
+    return PENDING.dump_json(pending)
+
+
+def decode_pending(data: bytes | str) -> PendingPush:
+    """Validate a pending push in one pass.
+
+    Raises:
+        ValidationError: If ``data`` is not a valid pending push.
+    """
+    return PENDING.validate_json(data)
+
+
+def encode_schedule(schedule: ParsedSchedule, compression: Compression = "none") -> bytes:
+    """Serialize a schedule, compressing its transcription if asked to and worth it.
+
+    Args:
+        schedule: The schedule to store.
+        compression: Codec for ``raw_ocr_text``.  Must be ``available``.
+    """
+    if compression != "none" and len(schedule.raw_ocr_text) >= MIN_COMPRESS_CHARS:
+        schedule = schedule.model_copy(update={"raw_ocr_text": compress_text(schedule.raw_ocr_text, compression)})
+    return SCHEDULE.dump_json(schedule)
+
+
+def decode_schedule(data: bytes | str) -> ParsedSchedule:
+    """Validate a schedule in one pass and decompress its transcription.
+
+    Raises:
+        ValidationError: If ``data`` is not a valid schedule.
+    """
+    schedule = SCHEDULE.validate_json(data)
+    if schedule.raw_ocr_text.startswith(_PREFIX):
+        schedule.raw_ocr_text = decompress_text(schedule.raw_ocr_text)
+    return schedule
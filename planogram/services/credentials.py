@@ -0,0 +1,290 @@
+"""Per-user OAuth credentials: an encrypted SQLite store with an in-memory LRU.
+
+Every user who authorizes Google Calendar gets a row in ``CredentialStore``,
+a SQLite database whose token column is encrypted with Fernet (AES-128-CBC
+plus HMAC-SHA256).  The key comes from ``CREDENTIAL_KEY``; when that is
+unset a random key is generated once into ``<db>.key`` with owner-only
+permissions.  The database runs in WAL mode, so readers never block and a
+write only holds the lock for the one row it replaces — confirms from
+different users no longer share a token file.
+
+``CredentialCache`` keeps up to ``CACHE_SIZE`` live ``Credentials`` objects,
+least recently used first out, so the confirm path normally touches neither
+the database nor Google's token endpoint.  ``refresh_loop`` runs in the
+background and refreshes cached tokens ``REFRESH_MARGIN`` before they
+expire.  When a request does find an expired token, the refresh is
+single-flight per user: a per-user thread lock plus an ``flock`` on a
+per-user lock file let exactly one thread in one worker refresh, and
+everyone who waited picks up the new token instead of refreshing again.
+
+Refreshes build a new ``Credentials`` object and swap it in, so requests
+still holding the previous one are unaffected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from cryptography.fernet import Fernet
+
+from planogram.services import tracing
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+# Refresh this long before expiry.  Longer than google-auth's own 3m45s
+# threshold, so a cached token never turns invalid between two checks.
+REFRESH_MARGIN = timedelta(minutes=10)
+REFRESH_CHECK_SECONDS = 60.0
+
+# Live Credentials objects kept in memory per process
+CACHE_SIZE = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    user_id TEXT PRIMARY KEY,
+    token BLOB NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def load_key(key: str, key_path: Path) -> bytes:
+    """Return the Fernet key, generating and saving one if none is configured.
+
+    Args:
+        key: Configured urlsafe-base64 Fernet key; empty to use ``key_path``.
+        key_path: File holding the generated key, created with mode 0600.
+    """
+    if key:
+        return key.encode()
+    if not key_path.exists():
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(Fernet.generate_key())
+        logger.warning("Generated a credential encryption key at %s — set CREDENTIAL_KEY in production", key_path)
+    return key_path.read_bytes().strip()
+
+
+class CredentialStore:
+    """OAuth tokens by user id, encrypted at rest in SQLite.
+
+    Args:
+        db_path: SQLite database file.  Created on first use.
+        key: Fernet key used to encrypt every token.
+    """
+
+    def __init__(self, db_path: Path, key: bytes):
+        self.db_path = db_path
+        self._fernet = Fernet(key)
+        self._local = threading.local()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            self._local.conn = conn
+        return conn
+
+    def load(self, user_id: str) -> str | None:
+        """Return the decrypted token JSON for ``user_id``, or ``None``."""
+        row = self._connect().execute("SELECT token FROM credentials WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return self._fernet.decrypt(row[0]).decode()
+
+    def save(self, user_id: str, token_json: str) -> None:
+        """Encrypt and store the token JSON for ``user_id``, replacing any previous one."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO credentials (user_id, token, updated_at) VALUES (?, ?, ?)",
+                (user_id, self._fernet.encrypt(token_json.encode()), time.time()),
+            )
+
+    def delete(self, user_id: str) -> None:
+        """Forget the token for ``user_id``."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+
+    @contextmanager
+    def refresh_lock(self, user_id: str) -> Iterator[None]:
+        """Hold an exclusive ``flock`` shared by every worker refreshing ``user_id``."""
+        lock_dir = self.db_path.parent / f"{self.db_path.stem}.locks"
+        lock_dir.mkdir(exist_ok=True)
+        name = hashlib.sha256(user_id.encode()).hexdigest()[:32]
+        with open(lock_dir / f"{name}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+class CredentialCache:
+    """Live credentials for the most recently active users, refreshed ahead of expiry.
+
+    Args:
+        store: Where tokens are persisted.
+        scopes: OAuth scopes the tokens were granted.
+        margin: How long before expiry a token is refreshed.
+        max_entries: Users kept in memory; the least recently used are dropped.
+    """
+
+    def __init__(
+        self,
+        store: CredentialStore,
+        scopes: list[str],
+        margin: timedelta = REFRESH_MARGIN,
+        max_entries: int = CACHE_SIZE,
+    ):
+        self.store = store
+        self.scopes = scopes
+        self.margin = margin
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Credentials] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_locks: dict[str, threading.Lock] = {}
+
+    def _read(self, user_id: str) -> Credentials | None:
+        from google.oauth2.credentials import Credentials
+
+        token_json = self.store.load(user_id)
+        if token_json is None:
+            return None
+        return Credentials.from_authorized_user_info(json.loads(token_json), self.scopes)
+
+    def _remember(self, user_id: str, creds: Credentials) -> None:
+        with self._lock:
+            self._entries[user_id] = creds
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _due(self, creds: Credentials) -> bool:
+        """Return whether ``creds`` should be refreshed now."""
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        return creds.expiry - self.margin <= datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def get(self, user_id: str) -> Credentials | None:
+        """Return the user's credentials, reading the store only on a miss.
+
+        A user with no token is not cached, so a token saved later by the
+        OAuth callback (possibly in another worker) is picked up.
+        """
+        with self._lock:
+            creds = self._entries.get(user_id)
+            if creds is not None:
+                self._entries.move_to_end(user_id)
+                return creds
+        creds = self._read(user_id)
+        if creds is not None:
+            self._remember(user_id, creds)
+        return creds
+
+    def put(self, user_id: str, creds: Credentials) -> None:
+        """Save new credentials for ``user_id`` and cache them."""
+        self.store.save(user_id, creds.to_json())
+        self._remember(user_id, creds)
+
+    def refresh(self, user_id: str) -> Credentials | None:
+        """Refresh the user's token unless someone else just did.
+
+        Only one caller per user refreshes at a time, across threads and
+        workers.  A caller that waited for the lock first re-checks the cached
+        and stored tokens and returns whichever is already fresh.
+
+        Returns:
+            Fresh credentials, or ``None`` if the user has no token or it has
+            no refresh token.
+
+        Raises:
+            google.auth.exceptions.RefreshError: If Google rejects the
+                refresh token.
+        """
+        with self._lock:
+            lock = self._refresh_locks.setdefault(user_id, threading.Lock())
+        with lock, self.store.refresh_lock(user_id), tracing.span("refresh_credentials") as span:
+            stored = self._read(user_id)
+            with self._lock:
+                cached = self._entries.get(user_id)
+            for candidate in (cached, stored):
+                if candidate is not None and not self._due(candidate):
+                    self._remember(user_id, candidate)
+                    span.set(refreshed=False)
+                    return candidate
+
+            base = stored or cached
+            if base is None or not base.refresh_token:
+                return None
+            from google.auth.transport.requests import Request
+            from google.oauth2.credentials import Credentials
+
+            fresh = Credentials.from_authorized_user_info(json.loads(base.to_json()), self.scopes)
+            fresh.refresh(Request())
+            self.put(user_id, fresh)
+            span.set(refreshed=True)
+            logger.info("Refreshed Google credentials for user %s, valid until %s", user_id[:8], fresh.expiry)
+            return fresh
+
+    def refresh_due(self) -> int:
+        """Refresh every cached token that expires within the margin.
+
+        A failure for one user is logged and does not stop the others.
+
+        Returns:
+            The number of tokens refreshed.
+        """
+        with self._lock:
+            due = [user_id for user_id, creds in self._entries.items() if self._due(creds)]
+        refreshed = 0
+        for user_id in due:
+            try:
+                if self.refresh(user_id) is not None:
+                    refreshed += 1
+            except Exception:
+                logger.warning("Background credential refresh failed for user %s", user_id[:8], exc_info=True)
+        return refreshed
+
+    def clear(self) -> None:
+        """Forget every cached token."""
+        with self._lock:
+            self._entries.clear()
+
+
+async def refresh_loop(cache: CredentialCache, interval: float = REFRESH_CHECK_SECONDS) -> None:
+    """Refresh cached tokens ahead of expiry until cancelled.
+
+    Users who are not in the cache are refreshed on their next confirm
+    instead; a revoked token then surfaces as a re-authorization.
+
+    Args:
+        cache: The cache ``get_credentials`` reads from.
+        interval: Seconds between expiry checks.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(cache.refresh_due)
+        except Exception:
+            logger.warning("Background credential refresh failed", exc_info=True)
+        await asyncio.sleep(interval)
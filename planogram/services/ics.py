@@ -0,0 +1,98 @@
+"""iCalendar (RFC 5545) export of schedule events.
+
+Used when a schedule is split across several people, so each person can
+import their own shifts into any calendar app without going through the
+Google OAuth flow.  Event fields map the same way as ``build_event_body`` in
+``planogram.services.calendar``: timed events carry a ``TZID``, events
+without an end time become all-day events, and ``notification_minutes``
+controls the ``VALARM``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from planogram.models import ScheduleEvent
+
+_PRODID = "-//Planogram//Schedule Export//EN"
+
+
+def _escape(text: str) -> str:
+    """Escape a TEXT property value."""
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """Fold a content line to at most 75 octets per physical line."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts)
+
+
+def _uid(event: ScheduleEvent) -> str:
+    """Derive a stable UID so re-importing the same shift updates it instead of duplicating it."""
+    key = f"{event.title}|{event.date}|{event.start_time}|{event.end_time}"
+    return f"{hashlib.sha256(key.encode()).hexdigest()[:32]}@planogram"
+
+
+def to_ics(
+    events: list[ScheduleEvent],
+    timezone_name: str,
+    notification_minutes: int | None = None,
+    calendar_name: str | None = None,
+) -> str:
+    """Serialize events as an iCalendar document.
+
+    Args:
+        events: Events to export.
+        timezone_name: IANA timezone name applied to timed events.
+        notification_minutes: Popup reminder lead time.  ``None`` or ``0``
+            adds no alarm, so the importing calendar's default applies.
+        calendar_name: Optional display name for the calendar.
+
+    Returns:
+        The ``.ics`` file contents with CRLF line endings.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{_PRODID}", "CALSCALE:GREGORIAN"]
+    if calendar_name:
+        lines.append(f"X-WR-CALNAME:{_escape(calendar_name)}")
+    for event in events:
+        lines += ["BEGIN:VEVENT", f"UID:{_uid(event)}", f"DTSTAMP:{stamp}", f"SUMMARY:{_escape(event.title)}"]
+        if event.end_time:
+            start = datetime.combine(event.date, event.start_time)
+            end = datetime.combine(event.date, event.end_time)
+            if end <= start:
+                # Overnight shift: the end time belongs to the next day
+                end += timedelta(days=1)
+            lines.append(f"DTSTART;TZID={timezone_name}:{start:%Y%m%dT%H%M%S}")
+            lines.append(f"DTEND;TZID={timezone_name}:{end:%Y%m%dT%H%M%S}")
+        else:
+            lines.append(f"DTSTART;VALUE=DATE:{event.date:%Y%m%d}")
+            lines.append(f"DTEND;VALUE=DATE:{event.date + timedelta(days=1):%Y%m%d}")
+        if event.description:
+            lines.append(f"DESCRIPTION:{_escape(event.description)}")
+        if event.location:
+            lines.append(f"LOCATION:{_escape(event.location)}")
+        if notification_minutes:
+            lines += [
+                "BEGIN:VALARM",
+                "ACTION:DISPLAY",
+                f"DESCRIPTION:{_escape(event.title)}",
+                f"TRIGGER:-PT{notification_minutes}M",
+                "END:VALARM",
+            ]
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
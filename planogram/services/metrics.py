@@ -0,0 +1,207 @@
+"""Prometheus metrics for the parsing pipeline, session store, and calendar push.
+
+Metric objects are created once at import time and label children for the
+fixed stages are bound up front, so recording a sample on the hot path is a
+single lock-protected add.
+
+Multiple workers:
+    When ``PROMETHEUS_MULTIPROC_DIR`` is set before the app starts, every
+    worker writes its samples to memory-mapped files in that directory and the
+    ``/metrics`` endpoint aggregates them with ``MultiProcessCollector``.  The
+    directory must be empty when the server starts — wipe it in the process
+    manager's start script.  Without the variable, metrics are kept in the
+    default in-process registry, which is correct for a single worker.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Stage latencies range from milliseconds (session I/O) to minutes (Pass 1)
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180)
+
+STAGE_SECONDS = Histogram(
+    "planogram_stage_duration_seconds",
+    "Wall-clock time spent in each pipeline stage.",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+CLAUDE_TOKENS = Counter(
+    "planogram_claude_tokens_total",
+    "Claude tokens consumed, by model and direction (input, output, cache_write or cache_read).",
+    ["model", "direction"],
+)
+CLAUDE_COST = Counter(
+    "planogram_claude_cost_usd_total",
+    "Estimated Claude spend in US dollars, by model.",
+    ["model"],
+)
+EVENTS_EXTRACTED = Counter("planogram_events_extracted_total", "Events extracted by Pass 2.")
+EXTRACT_CACHE = Counter(
+    "planogram_extract_cache_total",
+    "Pass 2 memo lookups, by result (hit or miss).",
+    ["result"],
+)
+NAME_FILTER = Counter(
+    "planogram_name_filter_total",
+    "Name filter outcomes: matched, or fallback when no row label matched.",
+    ["outcome"],
+)
+EVENTS_PUSHED = Counter("planogram_events_pushed_total", "Events inserted into Google Calendar.")
+ERRORS = Counter(
+    "planogram_errors_total",
+    "Exceptions raised inside an instrumented stage, by stage and exception type.",
+    ["stage", "type"],
+)
+UPLOADS_IN_FLIGHT = Gauge(
+    "planogram_uploads_in_flight",
+    "Uploads currently being processed.",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_QUEUE_DEPTH = Gauge(
+    "planogram_upstream_queue_depth",
+    "Upstream calls waiting for a rate-limit slot, by upstream and priority.",
+    ["upstream", "priority"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_WAIT_SECONDS = Histogram(
+    "planogram_upstream_wait_seconds",
+    "Time upstream calls spent waiting for a rate-limit slot, by upstream and priority.",
+    ["upstream", "priority"],
+    buckets=_BUCKETS,
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "planogram_admission_queue_depth",
+    "Requests waiting for an admission slot, by route.",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "planogram_admission_wait_seconds",
+    "Time requests spent waiting for an admission slot, by route.",
+    ["route"],
+    buckets=_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "planogram_admission_rejected_total",
+    "Requests turned away with 429, by route and reason (queue_full or timeout).",
+    ["route", "reason"],
+)
+COLUMN_REPAIRS = Counter(
+    "planogram_column_repairs_total",
+    "Pass 1 date columns re-transcribed from a crop, by result (repaired or failed).",
+    ["result"],
+)
+BUDGET_REJECTED = Counter(
+    "planogram_budget_rejected_total",
+    "Requests refused because a daily Claude budget was reached, by cap (global or user).",
+    ["cap"],
+)
+
+# Pre-bound children for the fixed stage names
+RESIZE = STAGE_SECONDS.labels("resize")
+PASS1 = STAGE_SECONDS.labels("pass1")
+PASS1_REPAIR = STAGE_SECONDS.labels("pass1_repair")
+PASS2 = STAGE_SECONDS.labels("pass2")
+SESSION_IO = STAGE_SECONDS.labels("session_io")
+CALENDAR_PUSH = STAGE_SECONDS.labels("calendar_push")
+
+_STAGES = {
+    "resize": RESIZE,
+    "pass1": PASS1,
+    "pass1_repair": PASS1_REPAIR,
+    "pass2": PASS2,
+    "session_io": SESSION_IO,
+    "calendar_push": CALENDAR_PUSH,
+}
+
+
+@contextmanager
+def track(stage: str) -> Iterator[None]:
+    """Time a block under ``stage`` and count any exception it raises.
+
+    Args:
+        stage: One of ``resize``, ``pass1``, ``pass1_repair``, ``pass2``,
+            ``session_io``, or ``calendar_push``.
+
+    Raises:
+        Exception: Whatever the block raises, after it has been counted.
+    """
+    histogram = _STAGES[stage]
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        ERRORS.labels(stage, type(exc).__name__).inc()
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - t0)
+
+
+def record_usage(model: str, usage) -> None:
+    """Add the token counts and cost of a Claude response to the per-model counters.
+
+    Args:
+        model: Model name the request was sent to.
+        usage: A ``usage.StageUsage`` for the response.
+    """
+    CLAUDE_TOKENS.labels(model, "input").inc(usage.input_tokens)
+    CLAUDE_TOKENS.labels(model, "output").inc(usage.output_tokens)
+    CLAUDE_TOKENS.labels(model, "cache_write").inc(usage.cache_write_tokens)
+    CLAUDE_TOKENS.labels(model, "cache_read").inc(usage.cache_read_tokens)
+    CLAUDE_COST.labels(model).inc(usage.cost_usd)
+
+
+class _SessionCollector:
+    """Report the number of live session files at scrape time.
+
+    Counting files on each scrape is correct across workers because every
+    worker shares the same session directory.
+    """
+
+    def __init__(self, session_dir: Path):
+        self.session_dir = session_dir
+
+    def collect(self):
+        count = 0
+        if self.session_dir.exists():
+            # Session files are bare UUIDs; pending and batch files carry a suffix
+            count = sum(1 for f in self.session_dir.glob("*.json") if "_" not in f.stem)
+        gauge = GaugeMetricFamily("planogram_live_sessions", "Parsed sessions awaiting review or confirmation.")
+        gauge.add_metric([], count)
+        yield gauge
+
+
+def render(session_dir: Path) -> tuple[bytes, str]:
+    """Serialize every metric in the Prometheus text exposition format.
+
+    Args:
+        session_dir: Directory holding session files, used for the live
+            sessions gauge.
+
+    Returns:
+        A tuple of ``(body, content_type)`` for the HTTP response.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    sessions = CollectorRegistry()
+    sessions.register(_SessionCollector(session_dir))
+    return generate_latest(registry) + generate_latest(sessions), CONTENT_TYPE_LATEST
@@ -0,0 +1,191 @@
+"""Indexed, fuzzy matching of person names against roster row labels.
+
+Pass 1 writes each shift as ``NAME | DATE | START | END``.  ``RosterIndex``
+parses those lines once into a table of rows grouped by row label, and builds
+three lookups over the normalized label tokens:
+
+- exact tokens, so "kent" finds "Clark Kent";
+- initials, so "C" finds "Clark Kent" and "Clark" finds "C. Kent";
+- single-deletion variants (the SymSpell trick), so a token one typo away —
+  a typical OCR slip such as "Kemt" — is found without comparing against
+  every label.
+
+A query only touches the index entries for its own tokens, so matching is
+independent of the roster size, and one index serves any number of names.
+Whole-token matching also removes the substring false positives of the old
+filter, where "Al" matched "Alex" and "Sal".
+
+Each matched label carries a confidence between 0 and 1: the mean, over the
+query's tokens, of the best score each token reached (1.0 exact, 0.8 one edit
+away, 0.6 initial).  When some label matches every token of the query, labels
+that match only some of them are dropped, so "Jane Doe" does not also select
+"Jane Smith" and "John Doe".
+"""
+
+from __future__ import annotations
+
+import unicodedata
+
+from pydantic import BaseModel
+
+# Labels scoring below this are not considered a match.  0.5 keeps a label
+# when half of a two-word query matches exactly, e.g. "Clark Kent" → "Kent".
+MIN_NAME_CONFIDENCE = 0.5
+
+EXACT_SCORE = 1.0
+FUZZY_SCORE = 0.8
+INITIAL_SCORE = 0.6
+
+# Tokens shorter than this must match exactly or as an initial; short names
+# are too easy to confuse with one edit ("Al" → "Ali", "Sal")
+_MIN_FUZZY_LEN = 4
+
+
+class NameMatch(BaseModel):
+    """A row label matched by a name query.
+
+    Attributes:
+        label: The row label exactly as transcribed.
+        confidence: Match strength between 0 and 1.
+        rows: Number of shift lines with this label.
+    """
+
+    label: str
+    confidence: float
+    rows: int
+
+
+def normalize(name: str) -> list[str]:
+    """Lower-case, strip accents and punctuation, and split into tokens."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    cleaned = "".join(
+        ch if ch.isalnum() else " " for ch in decomposed.lower() if not unicodedata.combining(ch)
+    )
+    return cleaned.split()
+
+
+def _deletes(token: str) -> set[str]:
+    """Return every string obtained by deleting one character from ``token``."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def osa_distance(a: str, b: str, limit: int = 1) -> int:
+    """Optimal string alignment distance (edits plus adjacent transpositions).
+
+    Args:
+        a: First string.
+        b: Second string.
+        limit: Distances above this are reported as ``limit + 1`` so the
+            comparison can stop early.
+
+    Returns:
+        The edit distance, capped at ``limit + 1``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+class RosterIndex:
+    """Pipe lines parsed once into rows grouped by label, with a name index.
+
+    Args:
+        lines: Flat ``NAME | DATE | START | END`` lines from ``to_pipe_lines``.
+    """
+
+    def __init__(self, lines: list[str]):
+        self.lines = lines
+        self._rows: dict[str, list[int]] = {}
+        self._by_token: dict[str, set[str]] = {}
+        self._by_initial: dict[str, set[str]] = {}
+        self._by_delete: dict[str, set[str]] = {}
+
+        for i, line in enumerate(lines):
+            label = line.split("|", 1)[0].strip()
+            rows = self._rows.get(label)
+            if rows is not None:
+                rows.append(i)
+                continue
+            self._rows[label] = [i]
+            for token in normalize(label):
+                self._by_token.setdefault(token, set()).add(label)
+                self._by_initial.setdefault(token[0], set()).add(label)
+                if len(token) >= _MIN_FUZZY_LEN:
+                    for key in _deletes(token) | {token}:
+                        self._by_delete.setdefault(key, set()).add(token)
+
+    @property
+    def labels(self) -> list[str]:
+        """Distinct row labels in first-seen order."""
+        return list(self._rows)
+
+    def _token_scores(self, token: str) -> dict[str, float]:
+        """Best score reached by ``token`` against each candidate label."""
+        scores: dict[str, float] = {}
+
+        def offer(labels: set[str], score: float) -> None:
+            for label in labels:
+                if scores.get(label, 0.0) < score:
+                    scores[label] = score
+
+        if len(token) == 1:
+            # A bare initial in the query matches any label token it starts
+            offer(self._by_initial.get(token, set()), INITIAL_SCORE)
+        else:
+            # A bare initial in the label ("C. Kent") matches the query token
+            offer(self._by_token.get(token[0], set()), INITIAL_SCORE)
+        if len(token) >= _MIN_FUZZY_LEN:
+            for key in _deletes(token) | {token}:
+                for candidate in self._by_delete.get(key, ()):
+                    if candidate != token and osa_distance(token, candidate) <= 1:
+                        offer(self._by_token[candidate], FUZZY_SCORE)
+        offer(self._by_token.get(token, set()), EXACT_SCORE)
+        return scores
+
+    def match(self, person_name: str, min_confidence: float = MIN_NAME_CONFIDENCE) -> list[NameMatch]:
+        """Find the row labels that ``person_name`` refers to.
+
+        Args:
+            person_name: Name as typed by the user, e.g. ``"Clark Kent"``.
+            min_confidence: Labels scoring below this are left out.
+
+        Returns:
+            Matching labels, most confident first, then in roster order.  If
+            any label matches every token of ``person_name``, only such
+            labels are returned.
+        """
+        tokens = list(dict.fromkeys(normalize(person_name)))
+        if not tokens:
+            return []
+        totals: dict[str, float] = {}
+        matched: dict[str, int] = {}
+        for token in tokens:
+            for label, score in self._token_scores(token).items():
+                totals[label] = totals.get(label, 0.0) + score
+                matched[label] = matched.get(label, 0) + 1
+        # A label sharing only a first or last name is a partial match; it
+        # counts only when no label has the whole name
+        needed = len(tokens) if len(tokens) in matched.values() else 1
+        matches = [
+            NameMatch(label=label, confidence=round(total / len(tokens), 3), rows=len(self._rows[label]))
+            for label, total in totals.items()
+            if total / len(tokens) >= min_confidence and matched[label] >= needed
+        ]
+        return sorted(matches, key=lambda m: (-m.confidence, self._rows[m.label][0]))
+
+    def lines_for(self, matches: list[NameMatch]) -> list[str]:
+        """Return the lines of the matched labels in their original order."""
+        rows = sorted(i for m in matches for i in self._rows[m.label])
+        return [self.lines[i] for i in rows]
@@ -1,28 +1,52 @@
 """Two-pass Claude AI pipeline for extracting calendar events from schedule images.
 
-Pass 1 (transcription): ``claude-opus-4-7`` reads the image column-by-column and
-produces a structured text representation of every shift it finds.
+Pass 1 (transcription) reads the image column by column into ``DATE:`` blocks
+of ``label | start | end`` lines.  The model is routed by a cheap image
+complexity estimate, a fast-model transcription that fails the structural
+checks is escalated to Opus, and individual malformed blocks are
+re-transcribed from crops of their date column.
 
-Pass 2 (extraction): ``claude-sonnet-4-6`` converts that structured text into a
-validated JSON array of ``ScheduleEvent`` objects.
+Pass 2 (extraction) converts the selected pipe lines into a validated JSON
+array of ``ScheduleEvent`` objects.  Lines are chunked by estimated output
+tokens and extracted concurrently, with results memoized by a hash of the
+lines so ``reextract_events`` can answer repeated selections instantly.
+``parse_events_by_person`` runs Pass 1 once and Pass 2 for several people.
 
-Separating the passes lets the vision-capable Opus model focus purely on
-accurate reading while the faster Sonnet model handles the semantic mapping to
-a calendar schema.
+Every Claude call goes through a shared ``ResilientCaller``, the
+``scheduler.anthropic`` rate limiter, and ``usage.record``.
 """
 
+from __future__ import annotations
+
 import base64
+import hashlib
+import io
 import json
 import logging
+import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import TYPE_CHECKING, Callable, TypeVar
 
-from anthropic import Anthropic
-from anthropic.types import TextBlock
+from pydantic import BaseModel
 
+from planogram.config import Settings
 from planogram.models import ScheduleEvent
+from planogram.services import metrics, scheduler, tracing, usage
+from planogram.services.names import NameMatch, RosterIndex
+from planogram.services.resilience import CircuitBreaker, LatencyTracker, ResilientCaller
+
+if TYPE_CHECKING:
+    from anthropic import Anthropic
+    from PIL import ImageFilter
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 TRANSCRIBE_PROMPT = """\
 Look at this work schedule grid. Read it one date column at a time, left to right.
 
@@ -39,6 +63,22 @@ Skip columns where every cell is blank.
 Skip individual blank cells within a column.
 """
 
+COLUMN_PROMPT = """\
+This image is cut from a work schedule grid.  The leftmost column holds the
+row labels; to its right is {target}.
+
+Transcribe only {target}:
+  - Write the date from the column header on its own line, prefixed with "DATE:"
+  - Then, for every non-blank cell in that column from top to bottom, write one line:
+      [row label] | [start time] | [end time]
+    where [row label] is exactly what is written in the leftmost column of that row.
+    If the leftmost column for that row is blank, empty, or says something like
+    "open" / "available" / "unassigned", use the label UNASSIGNED.
+
+Do NOT borrow a name from a nearby row — use only what is on the same row.
+Skip blank cells.  Write nothing else.
+"""
+
 EXTRACT_PROMPT = """\
 Convert the following schedule text into a JSON array of calendar events.
 
@@ -54,34 +94,453 @@ Schedule text:
 {transcription}
 """
 
+# Output limit of a Pass 1 call.  A transcription cut off here loses its last
+# columns, which the structural checks and column repair then pick up.
+TRANSCRIBE_MAX_TOKENS = 4096
+
+EXTRACT_MAX_TOKENS = 4096
+
+# Output budget per Pass 2 call.  Kept well below ``EXTRACT_MAX_TOKENS`` so an
+# underestimated chunk still fits without truncating the JSON array.
+EXTRACT_CHUNK_TOKENS = 2048
+
+# Upper bound on concurrent Pass 2 calls for a single schedule
+EXTRACT_MAX_WORKERS = 8
+
+# Pass 2 results kept by ``_extract_cached``, most recently used first out
+EXTRACT_CACHE_SIZE = 256
+
+# One extracted event costs roughly the JSON keys and punctuation plus the
+# values copied from its pipe line, at about four characters per token.
+_EVENT_OVERHEAD_TOKENS = 24
+_CHARS_PER_TOKEN = 4
+
+# Input tokens charged for a Pass 1 image before the real count is known:
+# about what a full-size (1568 px) image costs at width × height / 750
+_IMAGE_TOKENS = 3300
+
+# Claude bills an image at about width × height / 750 input tokens
+_PIXELS_PER_IMAGE_TOKEN = 750
+
+# Complexity estimation works on a small grayscale copy of the image
+_ROUTER_MAX_PX = 512
+
+# A row or column counts as a grid line when at least this share of it is dark
+_GRID_LINE_FILL = 0.6
+
+# Share of the image width assumed to be the row-label column when no ruled
+# grid is found
+_LABEL_COLUMN_SHARE = 0.2
+
+# When the ruled date columns cannot be matched one-to-one to DATE: blocks,
+# the image is cut into equal strips widened by this share of a strip on each
+# side, so a misplaced cut still contains the whole column
+_STRIP_MARGIN = 0.5
+
+# Shift times as Pass 1 writes them: "9", "09:00", "9:30 pm", "5p", ...
+_TIME_RE = re.compile(r"^\d{1,2}(:\d{2})?\s*([ap]\.?m?\.?)?$", re.IGNORECASE)
+
+# Share of shift lines that must have a readable start time for a fast-model
+# transcription to be accepted without escalation
+_MIN_VALID_LINE_RATIO = 0.8
+
+# Shared across requests so that failures and latency history seen by one
+# upload inform every other upload
+_anthropic_breaker = CircuitBreaker("Anthropic API")
+_pass1_latency = LatencyTracker()
+_pass2_latency = LatencyTracker()
+
+
+class ImageComplexity(BaseModel):
+    """Cheap visual signals used to pick the Pass 1 model.
+
+    Attributes:
+        grid_rows: Number of horizontal ruled lines detected.
+        grid_columns: Number of vertical ruled lines detected.
+        entropy: Shannon entropy of the grayscale histogram, in bits.  Clean
+            printed pages score low, photos and dense handwriting score high.
+        handwriting_score: Mean ratio of the weaker to the stronger gradient
+            across edges, between 0 and 1.  Axis-aligned printed text and ruled
+            grids score low, diagonal handwritten strokes score high.
+    """
+
+    grid_rows: int
+    grid_columns: int
+    entropy: float
+    handwriting_score: float
+
+
+def _line_positions(profile: bytes, threshold: float) -> list[float]:
+    """Return the centre of each run of dark entries in a row or column mean-brightness profile."""
+    positions = []
+    start = None
+    for index, value in enumerate(profile):
+        dark = value <= threshold
+        if dark and start is None:
+            start = index
+        elif not dark and start is not None:
+            positions.append((start + index - 1) / 2)
+            start = None
+    if start is not None:
+        positions.append((start + len(profile) - 1) / 2)
+    return positions
+
+
+def _count_lines(profile: bytes, threshold: float) -> int:
+    """Count runs of dark entries in a row or column mean-brightness profile."""
+    return len(_line_positions(profile, threshold))
+
 
-def _transcribe(client: Anthropic, image_source: dict) -> str:
-    """Send the schedule image to Claude Opus for column-by-column transcription.
+@cache
+def _sobel_kernels() -> tuple[ImageFilter.Kernel, ImageFilter.Kernel]:
+    """Return the x and y Sobel kernels, built on first use so Pillow loads lazily.
+
+    The kernels have a 128 offset so the sign of the gradient survives 8-bit
+    output.  Printed text and ruled grids have mostly axis-aligned edges (one
+    of the two gradients near zero); handwriting has many diagonal strokes
+    where both gradients are large.
+    """
+    from PIL import ImageFilter
+
+    return (
+        ImageFilter.Kernel((3, 3), [-1, 0, 1, -2, 0, 2, -1, 0, 1], scale=8, offset=128),
+        ImageFilter.Kernel((3, 3), [-1, -2, -1, 0, 0, 0, 1, 2, 1], scale=8, offset=128),
+    )
+
+
+def estimate_complexity(image_bytes: bytes) -> ImageComplexity:
+    """Estimate how hard an image is to transcribe without calling Claude.
+
+    Works on a grayscale copy no larger than ``_ROUTER_MAX_PX`` on each side,
+    so the cost is a few milliseconds regardless of the upload size.
 
     Args:
-        client: Authenticated Anthropic client.
+        image_bytes: Raw bytes of the (already resized) schedule image.
+
+    Returns:
+        The measured ``ImageComplexity`` signals.
+    """
+    from PIL import Image, ImageChops, ImageStat
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.draft("L", (_ROUTER_MAX_PX, _ROUTER_MAX_PX))
+        gray = img.convert("L")
+    gray.thumbnail((_ROUTER_MAX_PX, _ROUTER_MAX_PX))
+
+    entropy = gray.entropy()
+
+    # Ruled lines show up as rows/columns whose mean brightness is mostly ink
+    binary = gray.point(lambda v: 255 if v > 128 else 0)
+    threshold = 255 * (1 - _GRID_LINE_FILL)
+    row_means = binary.resize((1, binary.height), Image.Resampling.BOX).tobytes()
+    col_means = binary.resize((binary.width, 1), Image.Resampling.BOX).tobytes()
+
+    zero = Image.new("L", gray.size, 128)
+    sobel_x, sobel_y = _sobel_kernels()
+    grad_x = ImageChops.difference(gray.filter(sobel_x), zero)
+    grad_y = ImageChops.difference(gray.filter(sobel_y), zero)
+    weaker = ImageStat.Stat(ImageChops.darker(grad_x, grad_y)).mean[0]
+    stronger = ImageStat.Stat(ImageChops.lighter(grad_x, grad_y)).mean[0]
+    handwriting = weaker / stronger if stronger else 0.0
+
+    return ImageComplexity(
+        grid_rows=_count_lines(row_means, threshold),
+        grid_columns=_count_lines(col_means, threshold),
+        entropy=entropy,
+        handwriting_score=handwriting,
+    )
+
+
+def crop_columns(image_bytes: bytes, column_count: int, indices: list[int]) -> dict[int, tuple[bytes, int]]:
+    """Cut date columns out of a schedule image, each next to the row-label column.
+
+    Vertical ruled lines are located on a small grayscale copy.  When the
+    ruled date columns match ``column_count`` one-to-one each crop is that
+    cell with a little margin; otherwise (no grid, or blank columns that Pass
+    1 skipped) the area right of the labels is split into ``column_count``
+    equal strips and each crop is widened by ``_STRIP_MARGIN`` on both sides.
+
+    Args:
+        image_bytes: Raw bytes of the (already resized) schedule image.
+        column_count: Number of date columns Pass 1 transcribed, left to right.
+        indices: Which of those columns to crop.
+
+    Returns:
+        For each index, the crop as PNG bytes and its estimated input tokens.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        image = img.convert("RGB")
+    width, height = image.size
+
+    gray = image.convert("L")
+    gray.thumbnail((_ROUTER_MAX_PX, _ROUTER_MAX_PX))
+    binary = gray.point(lambda v: 255 if v > 128 else 0)
+    col_means = binary.resize((binary.width, 1), Image.Resampling.BOX).tobytes()
+    scale = width / binary.width
+    edges = [x * scale for x in _line_positions(col_means, 255 * (1 - _GRID_LINE_FILL))]
+    cells = list(zip(edges, edges[1:]))
+
+    label = cells[0] if len(cells) >= 2 else (0.0, width * _LABEL_COLUMN_SHARE)
+    columns = cells[1:]
+    if len(columns) == column_count:
+        margin = min(right - left for left, right in columns) * 0.1
+    else:
+        step = (width - label[1]) / column_count
+        columns = [(label[1] + i * step, label[1] + (i + 1) * step) for i in range(column_count)]
+        margin = step * _STRIP_MARGIN
+
+    label_strip = image.crop((int(label[0]), 0, int(label[1]), height))
+    crops = {}
+    for index in indices:
+        left = max(label[1], columns[index][0] - margin)
+        right = min(width, columns[index][1] + margin)
+        column = image.crop((int(left), 0, int(right), height))
+        canvas = Image.new("RGB", (label_strip.width + column.width, height), "white")
+        canvas.paste(label_strip, (0, 0))
+        canvas.paste(column, (label_strip.width, 0))
+        buf = io.BytesIO()
+        canvas.save(buf, format="PNG")
+        crops[index] = (buf.getvalue(), canvas.width * height // _PIXELS_PER_IMAGE_TOKEN)
+    return crops
+
+
+def choose_transcribe_model(complexity: ImageComplexity, settings: Settings) -> str:
+    """Pick the Pass 1 model for an image based on its complexity.
+
+    Args:
+        complexity: Signals from ``estimate_complexity``.
+        settings: Source of the model names and routing thresholds.
+
+    Returns:
+        ``settings.transcribe_fast_model`` when every signal is within its
+        threshold, otherwise ``settings.transcribe_model``.
+    """
+    simple = (
+        complexity.grid_rows <= settings.router_max_grid_rows
+        and complexity.entropy <= settings.router_max_entropy
+        and complexity.handwriting_score <= settings.router_max_handwriting_score
+    )
+    return settings.transcribe_fast_model if simple else settings.transcribe_model
+
+
+def transcription_is_valid(column_text: str, pipe_lines: list[str]) -> bool:
+    """Check that a Pass 1 transcription has the structure ``to_pipe_lines`` expects.
+
+    A transcription is rejected when it has no ``DATE:`` header, produced no
+    shift lines, or too many shift lines lack a readable start time.
+
+    Args:
+        column_text: Raw output from ``_transcribe``.
+        pipe_lines: The result of ``to_pipe_lines(column_text)``.
+
+    Returns:
+        ``True`` if the transcription can be passed on to Pass 2.
+    """
+    if not pipe_lines or "DATE:" not in column_text.upper():
+        return False
+    readable = sum(1 for line in pipe_lines if _TIME_RE.match(line.split("|")[2].strip()))
+    return readable / len(pipe_lines) >= _MIN_VALID_LINE_RATIO
+
+
+class DateBlock(BaseModel):
+    """One ``DATE:`` section of a Pass 1 transcription.
+
+    Attributes:
+        header: The date text after ``DATE:``, or ``None`` for shift lines
+            that appeared before any header.
+        lines: The section's non-blank lines after the header, as written.
+        problems: Why the section cannot be trusted; empty when it is sound.
+    """
+
+    header: str | None
+    lines: list[str]
+    problems: list[str]
+
+    @property
+    def text(self) -> str:
+        """The section as it appears in a transcription."""
+        head = [f"DATE: {self.header}"] if self.header is not None else []
+        return "\n".join(head + self.lines)
+
+
+def _line_problem(line: str) -> str | None:
+    """Return what is wrong with one shift line, or ``None`` if it is well formed."""
+    if "|" not in line:
+        return f"no '|' in {line!r}"
+    parts = [p.strip() for p in line.split("|")]
+    start = parts[1] if len(parts) > 1 else ""
+    end = parts[2] if len(parts) > 2 else ""
+    if not _TIME_RE.match(start):
+        return f"unreadable start time in {line!r}"
+    if any(c.isdigit() for c in end) and not _TIME_RE.match(end):
+        return f"unreadable end time in {line!r}"
+    return None
+
+
+def split_blocks(column_text: str) -> list[DateBlock]:
+    """Split a Pass 1 transcription into ``DATE:`` sections and check each one.
+
+    A section has problems when its header is missing or empty, it has no
+    lines, or any line lacks a ``|`` or has a time that ``_TIME_RE`` cannot
+    read — all cases that ``to_pipe_lines`` would drop or pass on mangled.
+    Text before the first header is only a section if it contains a ``|``,
+    so a model's preamble is not mistaken for a column.
+
+    Args:
+        column_text: Raw output from ``_transcribe``.
+
+    Returns:
+        The sections in transcription order, i.e. date columns left to right.
+    """
+    blocks: list[DateBlock] = []
+    header: str | None = None
+    lines: list[str] = []
+
+    def close() -> None:
+        if header is None and not any("|" in line for line in lines):
+            return
+        problems = []
+        if header is None:
+            problems.append("shift lines before any DATE: header")
+        elif not header:
+            problems.append("empty DATE: header")
+        if not lines:
+            problems.append("no shift lines")
+        problems.extend(problem for problem in map(_line_problem, lines) if problem)
+        blocks.append(DateBlock(header=header, lines=lines, problems=problems))
+
+    for raw in column_text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.upper().startswith("DATE:"):
+            close()
+            header, lines = line[5:].strip(), []
+        else:
+            lines.append(line)
+    close()
+    return blocks
+
+
+class _ExtractCache:
+    """Thread-safe LRU of Pass 2 results keyed by a hash of the input lines."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, list[ScheduleEvent]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(lines: list[str], year: str, model: str) -> str:
+        """Hash the lines together with the year, which changes the prompt, and the model."""
+        return hashlib.sha256("\n".join([model, year, *lines]).encode()).hexdigest()
+
+    def get(self, key: str) -> list[ScheduleEvent] | None:
+        with self._lock:
+            events = self._entries.get(key)
+            if events is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(events)
+
+    def put(self, key: str, events: list[ScheduleEvent]) -> None:
+        with self._lock:
+            self._entries[key] = list(events)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_extract_cache = _ExtractCache(EXTRACT_CACHE_SIZE)
+
+
+def _direct_call(fn: Callable[[], T]) -> T:
+    """Invoke ``fn`` once; stand-in for ``ResilientCaller.call`` when none is given."""
+    return fn()
+
+
+def _scheduled(create: Callable[[], T], estimated_tokens: int) -> Callable[[], T]:
+    """Wrap one ``messages.create`` call so every attempt waits for an Anthropic slot.
+
+    The token bucket is charged ``estimated_tokens`` up front and corrected
+    with the response's real usage.
+    """
+
+    def attempt() -> T:
+        scheduler.anthropic.acquire(tokens=estimated_tokens)
+        try:
+            msg = create()
+        except Exception:
+            # A failed request still counts against the request limit, but
+            # was not billed for tokens
+            scheduler.anthropic.settle(estimated_tokens, 0)
+            raise
+        spent = getattr(msg, "usage", None)
+        if spent is not None:
+            scheduler.anthropic.settle(estimated_tokens, spent.input_tokens + spent.output_tokens)
+        return msg
+
+    return attempt
+
+
+def _transcribe(
+    client: Anthropic,
+    image_source: dict,
+    caller: ResilientCaller | None = None,
+    model: str = "claude-opus-4-7",
+    prompt: str = TRANSCRIBE_PROMPT,
+    stage: str = "pass1",
+    image_tokens: int = _IMAGE_TOKENS,
+) -> str:
+    """Send the schedule image to Claude for column-by-column transcription.
+
+    Args:
+        client: Authenticated Anthropic client, configured with the Pass 1
+            timeout.
         image_source: Base64-encoded image payload in the Anthropic messages API
             format, including ``type``, ``media_type``, and ``data`` keys.
+        caller: Retry and hedging policy for the request.  ``None`` calls the
+            API exactly once.
+        model: Vision-capable Claude model used for the transcription.
+        prompt: Instructions sent with the image; ``COLUMN_PROMPT`` for a
+            single cropped column.
+        stage: Metrics and usage stage — ``"pass1"`` or ``"pass1_repair"``.
+        image_tokens: Estimated input tokens of the image, charged to the
+            rate limiter until the real count is known.
 
     Returns:
         Raw transcription text with ``DATE:`` headers and pipe-delimited shift
         rows as described by ``TRANSCRIBE_PROMPT``.
     """
-    logger.info("Pass 1 – sending image to claude-opus-4-7 for transcription")
+    from anthropic.types import TextBlock
+
+    logger.info("Pass 1 – sending image to %s for transcription", model)
     t0 = time.perf_counter()
-    msg = client.messages.create(
-        model="claude-opus-4-7",
-        max_tokens=4096,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "source": image_source},  # type: ignore[list-item]
-                    {"type": "text", "text": TRANSCRIBE_PROMPT},
-                ],
-            }
-        ],
-    )
+    call = caller.call if caller else _direct_call
+    with tracing.span("transcribe", model=model, stage=stage) as span, metrics.track(stage):
+        msg = call(_scheduled(lambda: client.messages.create(
+            model=model,
+            max_tokens=TRANSCRIBE_MAX_TOKENS,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "source": image_source},  # type: ignore[list-item]
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ],
+        ), image_tokens + len(prompt) // _CHARS_PER_TOKEN + TRANSCRIBE_MAX_TOKENS))
+        span.set(input_tokens=msg.usage.input_tokens, output_tokens=msg.usage.output_tokens)
+    usage.record(stage, model, msg.usage)
+    if msg.stop_reason == "max_tokens":
+        logger.warning("Pass 1 – %s output truncated at %d tokens", model, TRANSCRIBE_MAX_TOKENS)
     logger.info("Pass 1 – complete in %.1fs", time.perf_counter() - t0)
     block = msg.content[0]
     if not isinstance(block, TextBlock):
@@ -89,6 +548,164 @@ def _transcribe(client: Anthropic, image_source: dict) -> str:
     return block.text.strip()
 
 
+def _extract(
+    client: Anthropic, lines: list[str], year: str, model: str, caller: ResilientCaller | None = None
+) -> list[ScheduleEvent]:
+    """Convert one chunk of pipe lines into events with Claude.
+
+    If the response is cut off at ``EXTRACT_MAX_TOKENS`` the chunk is halved
+    and each half is extracted again, so an underestimated chunk costs an extra
+    call instead of silently dropping shifts.
+
+    Args:
+        client: Authenticated Anthropic client, configured with the Pass 2
+            timeout.
+        lines: Pipe-delimited shift lines to convert.
+        year: Four-digit year assumed for dates that omit one.
+        model: Claude model used for the extraction.
+        caller: Retry and hedging policy for each request.  ``None`` calls the
+            API exactly once.
+
+    Returns:
+        Validated events in the order Claude returned them.
+
+    Raises:
+        ValueError: If the response does not contain a valid JSON array, or a
+            single line still overflows the output limit.
+    """
+    from anthropic.types import TextBlock
+
+    call = caller.call if caller else _direct_call
+    prompt = EXTRACT_PROMPT.format(transcription="\n".join(lines), year=year)
+    estimated_tokens = len(prompt) // _CHARS_PER_TOKEN + sum(estimate_output_tokens(line) for line in lines)
+    with tracing.span("extract", model=model, lines=len(lines)) as span:
+        msg = call(_scheduled(lambda: client.messages.create(
+            model=model,
+            max_tokens=EXTRACT_MAX_TOKENS,
+            messages=[{"role": "user", "content": prompt}],
+        ), estimated_tokens))
+        span.set(
+            input_tokens=msg.usage.input_tokens,
+            output_tokens=msg.usage.output_tokens,
+            stop_reason=msg.stop_reason,
+        )
+    usage.record("pass2", model, msg.usage)
+
+    if msg.stop_reason == "max_tokens":
+        if len(lines) < 2:
+            raise ValueError("Pass 2 output exceeded the token limit for a single shift line")
+        mid = len(lines) // 2
+        logger.warning("Pass 2 – output truncated for %d lines, splitting chunk", len(lines))
+        return _extract(client, lines[:mid], year, model, caller) + _extract(client, lines[mid:], year, model, caller)
+
+    block = msg.content[0]
+    if not isinstance(block, TextBlock):
+        raise RuntimeError(f"Unexpected response block type: {type(block).__name__}")
+    raw = block.text.strip()
+    start = raw.find("[")
+    end = raw.rfind("]")
+    if start == -1 or end == -1:
+        logger.error("Pass 2 – no JSON array in response: %.200s", raw)
+        raise ValueError(f"No JSON array found in response:\n{raw}")
+
+    try:
+        event_dicts = json.loads(raw[start : end + 1])
+    except json.JSONDecodeError as exc:
+        logger.error("Pass 2 – invalid JSON: %s", exc)
+        raise ValueError(
+            f"Claude returned invalid JSON: {exc}\n\nRaw response:\n{raw}"
+        ) from exc
+
+    return [ScheduleEvent.model_validate(ev) for ev in event_dicts]
+
+
+def _extract_all(
+    client: Anthropic, lines: list[str], year: str, model: str, caller: ResilientCaller | None = None
+) -> list[ScheduleEvent]:
+    """Run Pass 2 over every chunk of ``lines`` concurrently and merge in order.
+
+    Args:
+        client: Authenticated Anthropic client, shared by all worker threads.
+        lines: Pipe-delimited shift lines to convert.
+        year: Four-digit year assumed for dates that omit one.
+        model: Claude model used for the extraction.
+        caller: Retry and hedging policy applied to each chunk's request.
+
+    Returns:
+        Events from all chunks, concatenated in the original line order.
+    """
+    return _extract_groups(client, {"": lines}, year, model, caller)[""]
+
+
+def _extract_cached(
+    client: Anthropic, lines: list[str], year: str, model: str, caller: ResilientCaller | None = None
+) -> tuple[list[ScheduleEvent], bool]:
+    """Run ``_extract_all`` through the in-process memo.
+
+    Returns:
+        A tuple of ``(events, cache_hit)``.
+    """
+    key = _ExtractCache.key(lines, year, model)
+    cached = _extract_cache.get(key)
+    if cached is not None:
+        metrics.EXTRACT_CACHE.labels("hit").inc()
+        logger.info("Pass 2 – %d line(s) served from cache", len(lines))
+        return cached, True
+    metrics.EXTRACT_CACHE.labels("miss").inc()
+    events = _extract_all(client, lines, year, model, caller)
+    _extract_cache.put(key, events)
+    return events, False
+
+
+def _extract_groups(
+    client: Anthropic,
+    groups: dict[str, list[str]],
+    year: str,
+    model: str,
+    caller: ResilientCaller | None = None,
+) -> dict[str, list[ScheduleEvent]]:
+    """Run Pass 2 for several groups of lines in one shared worker pool.
+
+    Every group is chunked separately so no chunk mixes two people's shifts,
+    then all chunks are extracted concurrently, bounded by
+    ``EXTRACT_MAX_WORKERS`` overall rather than per group.
+
+    Args:
+        client: Authenticated Anthropic client, shared by all worker threads.
+        groups: Pipe-delimited shift lines keyed by group (e.g. person) name.
+        year: Four-digit year assumed for dates that omit one.
+        model: Claude model used for the extraction.
+        caller: Retry and hedging policy applied to each chunk's request.
+
+    Returns:
+        Events for each group, in the original line order.  Groups with no
+        lines map to an empty list without a Claude call.
+    """
+    jobs = [(key, chunk) for key, lines in groups.items() for chunk in chunk_lines(lines)]
+    if not jobs:
+        logger.info("Pass 2 – skipped, no shift lines to extract")
+        return {key: [] for key in groups}
+    line_count = sum(len(lines) for lines in groups.values())
+    logger.info(
+        "Pass 2 – extracting events from %d lines in %d chunk(s) with %s", line_count, len(jobs), model
+    )
+    t0 = time.perf_counter()
+    with metrics.track("pass2"):
+        if len(jobs) == 1:
+            results = [_extract(client, jobs[0][1], year, model, caller)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(jobs), EXTRACT_MAX_WORKERS)) as pool:
+                extract = tracing.propagate(lambda job: _extract(client, job[1], year, model, caller))
+                results = list(pool.map(extract, jobs))
+    events: dict[str, list[ScheduleEvent]] = {key: [] for key in groups}
+    for (key, _), chunk_events in zip(jobs, results):
+        events[key].extend(chunk_events)
+    total = sum(len(group_events) for group_events in events.values())
+    metrics.EVENTS_EXTRACTED.inc(total)
+    logger.info("Pass 2 – complete in %.1fs: %d event(s) extracted", time.perf_counter() - t0, total)
+    return events
+
+
 def to_pipe_lines(column_text: str) -> list[str]:
     """Flatten column-format transcription output into ``NAME | DATE | START | END`` lines.
 
@@ -117,27 +734,138 @@ def to_pipe_lines(column_text: str) -> list[str]:
     return result
 
 
+def estimate_output_tokens(line: str) -> int:
+    """Estimate how many output tokens Pass 2 spends on one pipe line.
+
+    Args:
+        line: A single ``NAME | DATE | START | END`` line from ``to_pipe_lines``.
+
+    Returns:
+        Approximate number of tokens in the JSON object generated for the line.
+    """
+    return _EVENT_OVERHEAD_TOKENS + len(line) // _CHARS_PER_TOKEN
+
+
+def chunk_lines(lines: list[str], max_tokens: int = EXTRACT_CHUNK_TOKENS) -> list[list[str]]:
+    """Split pipe lines into consecutive chunks that fit a Pass 2 output budget.
+
+    Order is preserved both across and within chunks so the merged results
+    come back in the same order as the transcription.  A single line larger
+    than ``max_tokens`` still gets a chunk of its own.
+
+    Args:
+        lines: Flat pipe-delimited shift lines from ``to_pipe_lines``.
+        max_tokens: Estimated output token budget for each chunk.
+
+    Returns:
+        List of non-empty line chunks.  Empty input yields an empty list.
+    """
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_output_tokens(line)
+        if current and used + cost > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 def filter_lines(lines: list[str], person_name: str) -> list[str]:
-    """Keep only shift lines whose name field contains a word from ``person_name``.
+    """Keep only shift lines whose row label matches ``person_name``.
 
-    Matching is case-insensitive and word-based so that "Kent" matches
-    "Clark Kent" and "kent" matches "KENT".
+    Matching is case-insensitive and token-based, tolerates one OCR typo in
+    longer names, and understands initials — see ``RosterIndex``.  "Kent"
+    matches "Clark Kent", but "Al" no longer matches "Alex".
 
     Args:
         lines: Flat pipe-delimited shift lines from ``to_pipe_lines``.
         person_name: Space-separated name to filter by (e.g. ``"Clark Kent"``).
 
     Returns:
-        Subset of ``lines`` where the leading name field contains at least one
-        word from ``person_name``.
+        Subset of ``lines`` whose label matched with at least
+        ``MIN_NAME_CONFIDENCE``, in their original order.
     """
-    name_parts = [p.lower() for p in person_name.split() if p]
-    kept = []
+    index = RosterIndex(lines)
+    return index.lines_for(index.match(person_name))
+
+
+class NameSelection(BaseModel):
+    """The lines chosen for Pass 2 and how they were chosen.
+
+    Attributes:
+        person_name: The name filtered by, or ``None`` for every shift.
+        lines: Pipe lines to extract.
+        matches: Row labels the name matched, most confident first.
+        fell_back: ``True`` when nothing matched and every line was kept.
+    """
+
+    person_name: str | None
+    lines: list[str]
+    matches: list[NameMatch]
+    fell_back: bool
+
+
+def select_lines(pipe_lines: list[str], person_name: str | None) -> NameSelection:
+    """Filter lines to ``person_name``, falling back to every line when nothing matches.
+
+    The fallback keeps a single-person upload useful when the name is
+    misspelled beyond recognition, but it is logged, counted in the
+    ``planogram_name_filter_total`` metric, and reported on the review page
+    rather than passing silently.
+
+    Args:
+        pipe_lines: Flat pipe-delimited shift lines from ``to_pipe_lines``.
+        person_name: Name to filter by, or ``None``/empty for every line.
+
+    Returns:
+        The selected lines with their match details.
+    """
+    if not person_name:
+        return NameSelection(person_name=None, lines=pipe_lines, matches=[], fell_back=False)
+    index = RosterIndex(pipe_lines)
+    matches = index.match(person_name)
+    if not matches:
+        logger.warning("No row label matched %r — falling back to all %d line(s)", person_name, len(pipe_lines))
+        metrics.NAME_FILTER.labels("fallback").inc()
+        tracing.set_attributes(name_filter_fallback=True)
+        return NameSelection(person_name=person_name, lines=pipe_lines, matches=[], fell_back=True)
+    lines = index.lines_for(matches)
+    logger.info("Filtered to %d line(s) for %r: %s", len(lines), person_name,
+                ", ".join(f"{m.label} ({m.confidence:.0%})" for m in matches))
+    metrics.NAME_FILTER.labels("matched").inc()
+    return NameSelection(person_name=person_name, lines=lines, matches=matches, fell_back=False)
+
+
+def split_by_person(lines: list[str], person_names: list[str] | None = None) -> dict[str, list[str]]:
+    """Group shift lines by the person they belong to.
+
+    Args:
+        lines: Flat pipe-delimited shift lines from ``to_pipe_lines``.
+        person_names: Names to select, each matched against one shared
+            ``RosterIndex``.
+            ``None`` selects everyone: lines are grouped by their exact row
+            label, and ``UNASSIGNED`` rows are left out.
+
+    Returns:
+        Lines for each person, keyed by the requested name (or the row label
+        when selecting everyone), in first-seen order.  A requested name that
+        matches nothing maps to an empty list — unlike the single-person
+        upload, fan-out never falls back to the whole roster.
+    """
+    if person_names is not None:
+        index = RosterIndex(lines)
+        return {name: index.lines_for(index.match(name)) for name in person_names}
+    groups: dict[str, list[str]] = {}
     for line in lines:
-        name_field = line.split("|")[0].strip().lower()
-        if any(part in name_field for part in name_parts):
-            kept.append(line)
-    return kept
+        label = line.split("|")[0].strip()
+        if label and label.upper() != "UNASSIGNED":
+            groups.setdefault(label, []).append(line)
+    return groups
 
 
 def parse_events(
@@ -146,6 +874,7 @@ def parse_events(
     api_key: str,
     today: str,
     person_name: str | None = None,
+    settings: Settings | None = None,
 ) -> tuple[list[ScheduleEvent], str]:
     """Extract calendar events from a schedule image using a two-pass Claude pipeline.
 
@@ -157,6 +886,8 @@ def parse_events(
             year-less dates in the schedule.
         person_name: If provided, only shifts whose name field matches this
             value are returned.  Pass ``None`` to return all shifts.
+        settings: Source of the model routing, timeout, retry, and hedging
+            options.  Defaults are used when ``None``.
 
     Returns:
         A tuple of ``(events, raw_transcription)`` where ``events`` is a list
@@ -165,62 +896,270 @@ def parse_events(
 
     Raises:
         ValueError: If the second Claude pass returns a response that does not
-            contain a valid JSON array.
+            contain a valid JSON array for any chunk.
+        UpstreamUnavailableError: If a Claude call still fails after all
+            retries, or the circuit breaker is open.
     """
+    with tracing.span("parse_events", image_bytes=len(image_bytes), person_name=person_name) as span:
+        events, raw_transcription = _parse_events(image_bytes, media_type, api_key, today, person_name, settings)
+        span.set(events=len(events))
+    return events, raw_transcription
+
+
+def _parse_events(
+    image_bytes: bytes,
+    media_type: str,
+    api_key: str,
+    today: str,
+    person_name: str | None,
+    settings: Settings | None,
+) -> tuple[list[ScheduleEvent], str]:
+    """Run the body of ``parse_events`` inside its tracing span."""
     logger.info("Parsing %s image (%d bytes), person_name=%r", media_type, len(image_bytes), person_name)
-    client = Anthropic(api_key=api_key)
-    year = today[:4]
+    settings = settings or Settings.model_construct(anthropic_api_key=api_key)
+    client, pass1, pass2 = _clients(api_key, settings)
+    raw_transcription, pipe_lines = _run_pass1(client, pass1, image_bytes, media_type, settings)
+
+    # Pass 2 — convert to structured JSON, one concurrent call per chunk
+    selected = select_lines(pipe_lines, person_name).lines
+    pass2_client = client.with_options(timeout=settings.claude_pass2_timeout)
+    events, _ = _extract_cached(pass2_client, selected, today[:4], settings.extract_model, pass2)
+    return events, raw_transcription
+
+
+def reextract_events(
+    raw_transcription: str,
+    api_key: str,
+    today: str,
+    person_name: str | None = None,
+    settings: Settings | None = None,
+) -> tuple[list[ScheduleEvent], bool]:
+    """Re-run filtering and Pass 2 on a stored transcription, skipping Pass 1.
+
+    Args:
+        raw_transcription: Pass 1 output saved in ``ParsedSchedule.raw_ocr_text``.
+        api_key: Anthropic API key used for the Pass 2 calls.
+        today: ISO date string (``YYYY-MM-DD``) used to resolve year-less dates.
+        person_name: Name to filter by, or ``None`` for every shift.
+        settings: Source of the Pass 2 model, timeout, retry, and hedging
+            options.
+
+    Returns:
+        A tuple of ``(events, cache_hit)``; ``cache_hit`` is ``True`` when the
+        same selection was extracted before and no Claude call was made.
+
+    Raises:
+        ValueError: If Pass 2 returns a response that is not a valid JSON array.
+        UpstreamUnavailableError: If a Claude call still fails after all
+            retries, or the circuit breaker is open.
+    """
+    with tracing.span("reextract_events", person_name=person_name) as span:
+        settings = settings or Settings.model_construct(anthropic_api_key=api_key)
+        selected = select_lines(to_pipe_lines(raw_transcription), person_name).lines
+        client, _, pass2 = _clients(api_key, settings)
+        events, cache_hit = _extract_cached(
+            client.with_options(timeout=settings.claude_pass2_timeout), selected, today[:4], settings.extract_model,
+            pass2,
+        )
+        span.set(events=len(events), cache_hit=cache_hit)
+    return events, cache_hit
+
+
+def parse_events_by_person(
+    image_bytes: bytes,
+    media_type: str,
+    api_key: str,
+    today: str,
+    person_names: list[str] | None = None,
+    settings: Settings | None = None,
+) -> tuple[dict[str, list[ScheduleEvent]], str]:
+    """Extract events for several people from one schedule image.
+
+    Pass 1 runs once for the whole roster; its lines are split per person with
+    ``split_by_person`` and every person's Pass 2 chunks are extracted
+    concurrently in one shared pool.  A 20-person roster therefore costs one
+    transcription instead of twenty.
+
+    Args:
+        image_bytes: Raw bytes of the uploaded image file.
+        media_type: MIME type of the image (e.g. ``"image/jpeg"``).
+        api_key: Anthropic API key used to authenticate every Claude call.
+        today: ISO date string (``YYYY-MM-DD``) used to resolve year-less
+            dates in the schedule.
+        person_names: Names to extract shifts for, or ``None`` for everyone
+            named in the row labels.
+        settings: Source of the model routing, timeout, retry, and hedging
+            options.  Defaults are used when ``None``.
+
+    Returns:
+        A tuple of ``(events_by_person, raw_transcription)``.  People with no
+        matching shifts map to an empty list.
+
+    Raises:
+        ValueError: If the second Claude pass returns a response that does not
+            contain a valid JSON array for any chunk.
+        UpstreamUnavailableError: If a Claude call still fails after all
+            retries, or the circuit breaker is open.
+    """
+    with tracing.span("parse_events_by_person", image_bytes=len(image_bytes)) as span:
+        logger.info("Parsing %s image (%d bytes) for %s", media_type, len(image_bytes),
+                    f"{len(person_names)} people" if person_names is not None else "everyone")
+        settings = settings or Settings.model_construct(anthropic_api_key=api_key)
+        client, pass1, pass2 = _clients(api_key, settings)
+        raw_transcription, pipe_lines = _run_pass1(client, pass1, image_bytes, media_type, settings)
+
+        groups = split_by_person(pipe_lines, person_names)
+        logger.info("Split %d line(s) across %d people", len(pipe_lines), len(groups))
+        pass2_client = client.with_options(timeout=settings.claude_pass2_timeout)
+        events = _extract_groups(pass2_client, groups, today[:4], settings.extract_model, pass2)
+        span.set(people=len(events), events=sum(len(person_events) for person_events in events.values()))
+    return events, raw_transcription
+
+
+def _clients(api_key: str, settings: Settings) -> tuple[Anthropic, ResilientCaller, ResilientCaller]:
+    """Build the Anthropic client and the Pass 1 and Pass 2 call policies."""
+    # Imported here rather than at module level: the SDK takes over a second to
+    # import, and only requests that actually call Claude should pay for it
+    from anthropic import Anthropic
+
+    # Retries are handled by ResilientCaller, so the SDK's own retries are disabled
+    client = Anthropic(api_key=api_key, max_retries=0, base_url=settings.anthropic_base_url or None)
+    pass1 = ResilientCaller(
+        "Pass 1", _anthropic_breaker, _pass1_latency,
+        max_retries=settings.claude_max_retries, hedge=settings.claude_hedge_requests,
+    )
+    pass2 = ResilientCaller(
+        "Pass 2", _anthropic_breaker, _pass2_latency,
+        max_retries=settings.claude_max_retries, hedge=settings.claude_hedge_requests,
+    )
+    return client, pass1, pass2
+
+
+def _run_pass1(
+    client: Anthropic,
+    caller: ResilientCaller,
+    image_bytes: bytes,
+    media_type: str,
+    settings: Settings,
+) -> tuple[str, list[str]]:
+    """Transcribe the image with the routed model, escalating if the output is invalid.
+
+    Returns:
+        A tuple of ``(raw_transcription, pipe_lines)``.
+    """
     image_source = {
         "type": "base64",
         "media_type": media_type,
         "data": base64.standard_b64encode(image_bytes).decode("utf-8"),
     }
 
-    # Pass 1 — column-by-column visual transcription
-    raw_transcription = _transcribe(client, image_source)
+    # Pass 1 — column-by-column visual transcription, routed by complexity
+    model = settings.transcribe_model
+    if settings.router_enabled:
+        complexity = estimate_complexity(image_bytes)
+        model = choose_transcribe_model(complexity, settings)
+        logger.info("Pass 1 – routed to %s (%s)", model, complexity)
+    pass1_client = client.with_options(timeout=settings.claude_pass1_timeout)
+    raw_transcription = _transcribe(pass1_client, image_source, caller, model)
+    pipe_lines = to_pipe_lines(raw_transcription)
+    blocks = split_blocks(raw_transcription)
+    if (
+        model != settings.transcribe_model
+        and not transcription_is_valid(raw_transcription, pipe_lines)
+        and not _repairable(blocks, settings)
+    ):
+        logger.warning("Pass 1 – %s output failed structural checks, escalating to %s", model,
+                       settings.transcribe_model)
+        raw_transcription = _transcribe(pass1_client, image_source, caller, settings.transcribe_model)
+        blocks = split_blocks(raw_transcription)
+    if _repairable(blocks, settings):
+        raw_transcription = _repair_blocks(pass1_client, caller, image_bytes, raw_transcription, blocks, settings)
     pipe_lines = to_pipe_lines(raw_transcription)
     logger.info("Pass 1 – %d shift lines found", len(pipe_lines))
+    return raw_transcription, pipe_lines
 
-    # Convert to flat NAME | DATE | START | END lines, then optionally filter
-    if person_name:
-        filtered = filter_lines(pipe_lines, person_name)
-        logger.info("Filtered to %d line(s) for %r", len(filtered) if filtered else len(pipe_lines), person_name)
-        transcription = "\n".join(filtered) if filtered else "\n".join(pipe_lines)
-    else:
-        transcription = "\n".join(pipe_lines)
 
-    # Pass 2 — convert to structured JSON
-    logger.info("Pass 2 – extracting events from %d lines with claude-sonnet-4-6", len(pipe_lines))
-    t0 = time.perf_counter()
-    extract_msg = client.messages.create(
-        model="claude-sonnet-4-6",
-        max_tokens=4096,
-        messages=[
-            {
-                "role": "user",
-                "content": EXTRACT_PROMPT.format(transcription=transcription, year=year),
-            }
-        ],
-    )
+def _repairable(blocks: list[DateBlock], settings: Settings) -> bool:
+    """Whether some columns failed, but few enough that re-transcribing just them is worthwhile."""
+    columns = [block for block in blocks if block.header is not None]
+    failed = sum(1 for block in columns if block.problems)
+    return 0 < failed <= settings.transcribe_repair_max_columns and failed < len(columns)
 
-    extract_block = extract_msg.content[0]
-    if not isinstance(extract_block, TextBlock):
-        raise RuntimeError(f"Unexpected response block type: {type(extract_block).__name__}")
-    raw = extract_block.text.strip()
-    start = raw.find("[")
-    end = raw.rfind("]")
-    if start == -1 or end == -1:
-        logger.error("Pass 2 – no JSON array in response: %.200s", raw)
-        raise ValueError(f"No JSON array found in response:\n{raw}")
 
+def _column_target(blocks: list[DateBlock], index: int) -> str:
+    """Describe which date column of a crop to read, for ``COLUMN_PROMPT``."""
+    if blocks[index].header:
+        return f'the date column headed "{blocks[index].header}"'
+    before = next((b.header for b in reversed(blocks[:index]) if b.header), None)
+    after = next((b.header for b in blocks[index + 1:] if b.header), None)
+    if before and after:
+        return f'the date column between the ones headed "{before}" and "{after}"'
+    if after:
+        return f'the date column just before the one headed "{after}"'
+    if before:
+        return f'the date column just after the one headed "{before}"'
+    return "the date column in the middle"
+
+
+def _repair_blocks(
+    client: Anthropic,
+    caller: ResilientCaller,
+    image_bytes: bytes,
+    raw_transcription: str,
+    blocks: list[DateBlock],
+    settings: Settings,
+) -> str:
+    """Re-transcribe the failed blocks from column crops and splice the results in.
+
+    Every failed block's column is cropped and sent to ``transcribe_model``
+    concurrently.  Only ``DATE:`` blocks are columns of the image, so shift
+    lines before the first header are never cropped and are kept as written.
+    A block is replaced only by a re-transcription that passes
+    ``split_blocks`` cleanly; otherwise, or if cropping or the call fails for
+    any reason, the original text is kept, so a repair can never lose shifts
+    that Pass 1 did read or fail an upload that Pass 1 got through.
+
+    Returns:
+        The transcription with every repaired block substituted in place, or
+        ``raw_transcription`` unchanged if none could be repaired.
+    """
+    failed = [index for index, block in enumerate(blocks) if block.problems]
+    for index in failed:
+        logger.warning("Pass 1 – block %d (%s) failed checks: %s", index, blocks[index].header,
+                       "; ".join(blocks[index].problems))
+    columns = [index for index, block in enumerate(blocks) if block.header is not None]
+    column_of = {index: column for column, index in enumerate(columns)}
+    failed = [index for index in failed if index in column_of]
+    if not failed:
+        return raw_transcription
     try:
-        event_dicts = json.loads(raw[start : end + 1])
-    except json.JSONDecodeError as exc:
-        logger.error("Pass 2 – invalid JSON: %s", exc)
-        raise ValueError(
-            f"Claude returned invalid JSON: {exc}\n\nRaw response:\n{raw}"
-        ) from exc
+        crops = crop_columns(image_bytes, len(columns), [column_of[index] for index in failed])
+    except Exception as exc:
+        logger.warning("Pass 1 – could not crop columns for repair: %s", exc)
+        return raw_transcription
 
-    events = [ScheduleEvent.model_validate(ev) for ev in event_dicts]
-    logger.info("Pass 2 – complete in %.1fs: %d event(s) extracted", time.perf_counter() - t0, len(events))
-    return events, raw_transcription
+    def repair(index: int) -> DateBlock | None:
+        data, image_tokens = crops[column_of[index]]
+        source = {"type": "base64", "media_type": "image/png", "data": base64.standard_b64encode(data).decode()}
+        prompt = COLUMN_PROMPT.format(target=_column_target(blocks, index))
+        try:
+            text = _transcribe(client, source, caller, settings.transcribe_model, prompt, "pass1_repair",
+                               image_tokens)
+        except Exception as exc:
+            logger.warning("Pass 1 – repair of block %d abandoned: %s", index, exc)
+            return None
+        return next((block for block in split_blocks(text) if not block.problems), None)
+
+    t0 = time.perf_counter()
+    with tracing.span("repair_columns", columns=len(failed)) as span:
+        with ThreadPoolExecutor(max_workers=min(len(failed), EXTRACT_MAX_WORKERS)) as pool:
+            results = list(pool.map(tracing.propagate(repair), failed))
+        repaired = dict(zip(failed, results))
+        fixed = sum(1 for block in results if block is not None)
+        span.set(repaired=fixed)
+    metrics.COLUMN_REPAIRS.labels("repaired").inc(fixed)
+    metrics.COLUMN_REPAIRS.labels("failed").inc(len(failed) - fixed)
+    logger.info("Pass 1 – repaired %d of %d column(s) in %.1fs", fixed, len(failed), time.perf_counter() - t0)
+    if not fixed:
+        return raw_transcription
+    return "\n".join((repaired.get(index) or block).text for index, block in enumerate(blocks))
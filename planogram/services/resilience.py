@@ -0,0 +1,276 @@
+"""Timeouts, retries, request hedging, and circuit breaking for upstream calls.
+
+Claude calls have a long latency tail: most transcriptions finish in seconds
+but a few stall for a minute or fail with ``overloaded`` errors.  The helpers
+here bound that tail:
+
+- ``ResilientCaller`` retries transient failures with full-jitter exponential
+  backoff and can optionally hedge — send a duplicate request once the primary
+  has been outstanding longer than the observed p95 and use whichever response
+  arrives first.
+- ``CircuitBreaker`` fails fast after repeated upstream failures instead of
+  making every user wait out the full retry schedule while the API is down.
+- ``LatencyTracker`` keeps a rolling window of successful call durations that
+  drives the hedge delay.
+
+Per-call timeouts are enforced by the Anthropic client itself; callers pass the
+configured timeout as a request option.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+from planogram.services import tracing
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limited, server errors, and Anthropic's
+# 529 "overloaded"
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+
+class UpstreamUnavailableError(RuntimeError):
+    """Raised when an upstream call fails after all retries are exhausted."""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return whether ``exc`` is a transient Anthropic failure worth retrying.
+
+    Args:
+        exc: The exception raised by ``client.messages.create``.
+
+    Returns:
+        ``True`` for connection errors, timeouts, and retryable HTTP statuses.
+    """
+    import anthropic
+
+    if isinstance(exc, anthropic.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUSES
+    return False
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """Extract a ``Retry-After`` delay in seconds from an API error, if present."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of recent call durations.
+
+    Args:
+        window: Number of most recent samples to keep.
+        min_samples: Samples required before ``percentile`` returns a value.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add one call duration to the window."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the ``pct`` percentile of the window, or ``None`` if too few samples.
+
+        Args:
+            pct: Percentile between 0 and 100.
+        """
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and every
+    call fails immediately with ``CircuitOpenError``.  Once ``reset_timeout``
+    seconds have passed a single trial call is let through; success closes the
+    circuit, failure opens it again.
+
+    Args:
+        name: Label used in log messages and errors.
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds to stay open before allowing a trial call.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected."""
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self) -> None:
+        """Admit a call or raise ``CircuitOpenError`` if the circuit is open."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open), try again shortly.")
+
+    def record_success(self) -> None:
+        """Reset the failure count and close the circuit."""
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit %s closed", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit once the threshold is reached."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit %s opened after %d consecutive failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """Wrap an upstream call with retries, optional hedging, and a circuit breaker.
+
+    Args:
+        name: Label used in log messages (e.g. ``"Pass 1"``).
+        breaker: Circuit breaker shared by every caller of the same upstream.
+        latency: Latency window for this call type; drives the hedge delay.
+        max_retries: Retries after the first attempt for transient errors.
+        backoff_base: Base delay in seconds for exponential backoff.
+        backoff_max: Upper bound in seconds for a single backoff delay,
+            including one requested by a ``Retry-After`` header.
+        hedge: Send a duplicate request once the primary exceeds the observed
+            p95 latency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        latency: LatencyTracker,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 20.0,
+        hedge: bool = False,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.latency = latency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Invoke ``fn`` until it succeeds, a non-retryable error occurs, or retries run out.
+
+        Args:
+            fn: Zero-argument callable performing one upstream request.
+
+        Returns:
+            The value returned by the first successful attempt.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            UpstreamUnavailableError: If every attempt failed with a transient error.
+            Exception: Any non-retryable error raised by ``fn`` is re-raised as is.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            t0 = time.perf_counter()
+            try:
+                result = self._attempt(fn)
+            except Exception as exc:
+                if not is_retryable(exc):
+                    # A bad request is our fault, not the upstream's
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise UpstreamUnavailableError(
+                        f"{self.name} failed after {attempt + 1} attempt(s): {exc}"
+                    ) from exc
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+                else:
+                    # A server asking for minutes must not hold a request thread that long
+                    delay = max(0.0, min(delay, self.backoff_max))
+                logger.warning(
+                    "%s – attempt %d failed (%s), retrying in %.1fs", self.name, attempt + 1, exc, delay
+                )
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.latency.record(time.perf_counter() - t0)
+            return result
+        raise AssertionError("unreachable")
+
+    def _attempt(self, fn: Callable[[], T]) -> T:
+        """Run one attempt, hedging with a duplicate request if it runs long."""
+        hedge_after = self.latency.percentile(95) if self.hedge else None
+        if hedge_after is None:
+            return fn()
+
+        # Both requests run in the caller's context so the scheduler client and
+        # trace they were issued under follow them into the hedge threads
+        run = tracing.propagate(fn)
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+        try:
+            futures: list[Future[T]] = [pool.submit(run)]
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                logger.info("%s – no response after p95 %.1fs, sending hedged request", self.name, hedge_after)
+                futures.append(pool.submit(run))
+            error: BaseException | None = None
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    exc = future.exception()
+                    if exc is None:
+                        return future.result()
+                    error = exc
+            assert error is not None
+            raise error
+        finally:
+            # Do not wait for the losing request; its own timeout bounds it
+            pool.shutdown(wait=False)
@@ -0,0 +1,235 @@
+"""Outbound rate scheduling shared by every Anthropic and Google Calendar call.
+
+Each upstream has one ``UpstreamScheduler`` per process holding two token
+buckets, one for requests per minute and one for tokens per minute (used by
+Claude calls; Calendar calls only spend requests).  A caller takes a slot
+before every upstream request and waits in line until both buckets can pay
+for it.
+
+The line is not first come, first served.  Waiting calls are grouped by
+priority and then by client, usually a user or session:
+
+- ``"interactive"`` calls, which someone is watching a page for, always go
+  before ``"bulk"`` calls such as a large calendar push or a rollback.
+- Within a priority, clients take turns one call at a time.  A 500-event
+  push then delays another user's push by one call per turn rather than by
+  500 calls.
+
+Which client and priority a call belongs to is taken from the context, set
+once per request with ``client(...)``.  The context follows the request into
+worker threads started through ``tracing.propagate`` and ``run_in_threadpool``.
+
+Limits apply per process.  With several workers, divide the account's
+limits between them.  Queue depth and time spent waiting are exported as
+``planogram_upstream_queue_depth`` and ``planogram_upstream_wait_seconds``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Iterator, Literal
+
+from planogram.config import Settings
+from planogram.services import metrics
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["interactive", "bulk"]
+
+# Highest priority first
+PRIORITIES: tuple[Priority, ...] = ("interactive", "bulk")
+
+# Pushes with more events than this wait behind interactive work
+BULK_PUSH_EVENTS = 50
+
+# A bucket holds this many seconds' worth of its rate, so an idle upstream
+# absorbs a short burst without letting a whole minute's quota out at once
+BURST_SECONDS = 10.0
+
+_client: contextvars.ContextVar[tuple[str, Priority]] = contextvars.ContextVar(
+    "planogram_upstream_client", default=("", "interactive")
+)
+
+
+@contextmanager
+def client(key: str, priority: Priority = "interactive") -> Iterator[None]:
+    """Attribute every upstream call made inside the block to ``key``.
+
+    Args:
+        key: Who the calls are made for, e.g. a user id.  Clients with the
+            same priority take turns.
+        priority: ``"interactive"`` or ``"bulk"``.
+    """
+    token = _client.set((key, priority))
+    try:
+        yield
+    finally:
+        _client.reset(token)
+
+
+def push_priority(events: int) -> Priority:
+    """Return the priority for a calendar push of ``events`` events."""
+    return "bulk" if events > BULK_PUSH_EVENTS else "interactive"
+
+
+class TokenBucket:
+    """A refilling allowance of requests or tokens; not thread-safe on its own.
+
+    Args:
+        per_minute: Refill rate.  Zero or less means unlimited.
+        burst_seconds: Seconds of refill the bucket can hold.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = max(per_minute, 0.0) / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate == 0.0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Return the seconds until ``amount`` can be taken, 0 if it can be now.
+
+        An amount larger than the whole bucket waits for a full bucket.
+        """
+        if self.unlimited or amount <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        """Spend ``amount``.  Callers check ``wait_time`` first."""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Spend ``amount`` more (or refund it, if negative) after the fact.
+
+        The level may go negative, which holds back later callers until the
+        debt is repaid.
+        """
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level - amount)
+
+
+class UpstreamScheduler:
+    """Rate limits and a fair, prioritized waiting line for one upstream API.
+
+    Args:
+        name: Upstream label used in metrics and logs.
+        requests_per_minute: Request limit.  Zero means unlimited.
+        tokens_per_minute: Token limit.  Zero means unlimited.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.name = name
+        self._cond = threading.Condition()
+        self._waiting: dict[Priority, OrderedDict[str, deque[object]]] = {p: OrderedDict() for p in PRIORITIES}
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute: float, tokens_per_minute: float = 0) -> None:
+        """Replace the limits; calls already waiting are re-evaluated against the new ones."""
+        with self._cond:
+            self._requests = TokenBucket(requests_per_minute)
+            self._tokens = TokenBucket(tokens_per_minute)
+            self._cond.notify_all()
+
+    def depth(self) -> int:
+        """Return the number of calls waiting for a slot."""
+        with self._cond:
+            return sum(len(queue) for clients in self._waiting.values() for queue in clients.values())
+
+    def _head(self) -> object | None:
+        """Return the ticket that goes next: highest priority, then the client whose turn it is."""
+        for priority in PRIORITIES:
+            clients = self._waiting[priority]
+            if clients:
+                return next(iter(clients.values()))[0]
+        return None
+
+    def acquire(self, requests: float = 1, tokens: float = 0) -> float:
+        """Block until this call's turn comes and the limits allow it.
+
+        The client and priority come from ``client(...)``.
+
+        Args:
+            requests: Requests the call spends, e.g. the size of a batch.
+            tokens: Estimated tokens the call spends.  Correct the estimate
+                with ``settle`` once the real count is known.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        key, priority = _client.get()
+        ticket = object()
+        depth = metrics.UPSTREAM_QUEUE_DEPTH.labels(self.name, priority)
+        t0 = time.monotonic()
+        with self._cond:
+            clients = self._waiting[priority]
+            clients.setdefault(key, deque()).append(ticket)
+            depth.inc()
+            try:
+                while True:
+                    if self._head() is ticket:
+                        now = time.monotonic()
+                        delay = max(self._requests.wait_time(requests, now), self._tokens.wait_time(tokens, now))
+                        if delay <= 0:
+                            now = time.monotonic()
+                            self._requests.take(requests, now)
+                            self._tokens.take(tokens, now)
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                queue = clients[key]
+                queue.remove(ticket)
+                if queue:
+                    # Served (or gave up): the client goes to the back of the line
+                    clients.move_to_end(key)
+                else:
+                    del clients[key]
+                depth.dec()
+                self._cond.notify_all()
+        waited = time.monotonic() - t0
+        metrics.UPSTREAM_WAIT_SECONDS.labels(self.name, priority).observe(waited)
+        if waited >= 1.0:
+            logger.info("Waited %.1fs for a %s slot (%s, client %s)", waited, self.name, priority, key[:8] or "-")
+        return waited
+
+    def settle(self, estimated: float, actual: float) -> None:
+        """Charge the difference between a call's estimated and actual tokens."""
+        with self._cond:
+            self._tokens.adjust(actual - estimated)
+            if actual < estimated:
+                self._cond.notify_all()
+
+
+# One scheduler per upstream, shared by every request in the process
+anthropic = UpstreamScheduler("anthropic")
+calendar = UpstreamScheduler("calendar")
+
+
+def configure(settings: Settings) -> None:
+    """Apply the configured rate limits to the shared schedulers.
+
+    Args:
+        settings: Application settings with the ``*_per_minute`` limits.
+    """
+    anthropic.configure(settings.anthropic_requests_per_minute, settings.anthropic_tokens_per_minute)
+    calendar.configure(settings.calendar_requests_per_minute)
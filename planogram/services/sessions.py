@@ -0,0 +1,203 @@
+"""Temporary session storage for parsed schedules and pending pushes.
+
+A session is a ``ParsedSchedule`` written to ``<tmp_dir>/<session_id>.json``
+by ``POST /upload`` and read back by the review and confirm routes.  When a
+push has to wait for OAuth authorization the edited events, before repeating,
+and the push options are parked in ``<tmp_dir>/<session_id>_pending.json``
+until the callback arrives.  An
+upload split across several people creates one session per person, indexed
+by ``<tmp_dir>/<batch_id>_batch.json``.  A calendar push checkpoints its
+progress to ``<tmp_dir>/<session_id>_push.json`` after every event; the file
+outlives the session so a progress stream can still report the outcome.
+
+Sessions and pending pushes are encoded by ``planogram.services.codec`` in
+a single pass each, with the transcription optionally compressed
+(``SESSION_COMPRESSION``, applied by ``configure``).  Every read and write is
+timed under the ``session_io`` metrics stage.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from planogram.config import Settings
+from planogram.models import Batch, ParsedSchedule, PendingPush, ScheduleEvent
+from planogram.services import codec, metrics
+from planogram.services.codec import Compression
+from planogram.services.sync import PushProgress
+
+_compression: Compression = "none"
+
+
+def configure(settings: Settings) -> None:
+    """Apply the configured transcription compression to sessions saved from now on.
+
+    Args:
+        settings: Application settings with ``session_compression``.
+    """
+    global _compression
+    _compression = codec.available(settings.session_compression)
+
+
+def session_path(tmp_dir: Path, session_id: str) -> Path:
+    """Return the path of the session file for ``session_id``."""
+    return tmp_dir / f"{session_id}.json"
+
+
+def pending_path(tmp_dir: Path, session_id: str) -> Path:
+    """Return the path of the pending-push file for ``session_id``."""
+    return tmp_dir / f"{session_id}_pending.json"
+
+
+def batch_path(tmp_dir: Path, batch_id: str) -> Path:
+    """Return the path of the batch index file for ``batch_id``."""
+    return tmp_dir / f"{batch_id}_batch.json"
+
+
+def progress_path(tmp_dir: Path, session_id: str) -> Path:
+    """Return the path of the push checkpoint file for ``session_id``."""
+    return tmp_dir / f"{session_id}_push.json"
+
+
+def save_session(tmp_dir: Path, session_id: str, schedule: ParsedSchedule) -> None:
+    """Persist a parsed schedule, creating ``tmp_dir`` if needed.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+        schedule: The schedule to store.
+    """
+    with metrics.track("session_io"):
+        tmp_dir.mkdir(exist_ok=True)
+        session_path(tmp_dir, session_id).write_bytes(codec.encode_schedule(schedule, _compression))
+
+
+def load_session(tmp_dir: Path, session_id: str) -> ParsedSchedule | None:
+    """Load a parsed schedule, or return ``None`` if the session does not exist.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+    """
+    path = session_path(tmp_dir, session_id)
+    with metrics.track("session_io"):
+        if not path.exists():
+            return None
+        return codec.decode_schedule(path.read_bytes())
+
+
+def save_pending(tmp_dir: Path, session_id: str, pending: PendingPush) -> None:
+    """Park a confirm that is waiting for OAuth authorization before being pushed.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+        pending: The confirmed events, before repeating, and the push options.
+    """
+    with metrics.track("session_io"):
+        tmp_dir.mkdir(exist_ok=True)
+        pending_path(tmp_dir, session_id).write_bytes(codec.encode_pending(pending))
+
+
+def load_pending(tmp_dir: Path, session_id: str) -> PendingPush | None:
+    """Load the confirm parked by ``save_pending``, or ``None`` if there is none.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+    """
+    path = pending_path(tmp_dir, session_id)
+    with metrics.track("session_io"):
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        try:
+            return codec.decode_pending(data)
+        except ValidationError:
+            pass
+        # Parked as the already repeated events alone: a JSON array of them, or
+        # before the bulk codec, a JSON list of per-event JSON strings
+        try:
+            events = codec.decode_events(data)
+        except ValidationError:
+            events = [ScheduleEvent.model_validate_json(ej) for ej in json.loads(data)]
+        return PendingPush(events=events)
+
+
+def delete_session(tmp_dir: Path, session_id: str) -> None:
+    """Remove the session and any pending-push file.  Missing files are ignored.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+    """
+    with metrics.track("session_io"):
+        session_path(tmp_dir, session_id).unlink(missing_ok=True)
+        pending_path(tmp_dir, session_id).unlink(missing_ok=True)
+
+
+def save_batch(tmp_dir: Path, batch_id: str, batch: Batch) -> None:
+    """Record the per-person sessions created from one upload.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        batch_id: UUID of the batch.
+        batch: The sessions and the upload's Claude usage.
+    """
+    with metrics.track("session_io"):
+        tmp_dir.mkdir(exist_ok=True)
+        batch_path(tmp_dir, batch_id).write_text(batch.model_dump_json())
+
+
+def load_batch(tmp_dir: Path, batch_id: str) -> Batch | None:
+    """Load a batch index, or return ``None`` if it does not exist.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        batch_id: UUID of the batch.
+    """
+    path = batch_path(tmp_dir, batch_id)
+    with metrics.track("session_io"):
+        if not path.exists():
+            return None
+        raw = json.loads(path.read_text())
+    if not isinstance(raw.get("session_ids"), dict):
+        # Written before usage was kept: the session ids alone
+        return Batch(session_ids=raw)
+    return Batch.model_validate(raw)
+
+
+def save_progress(tmp_dir: Path, session_id: str, progress: PushProgress) -> None:
+    """Checkpoint a calendar push.
+
+    The file is replaced atomically so a concurrent ``load_progress`` never
+    sees a partial write.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session being pushed.
+        progress: The latest checkpoint.
+    """
+    with metrics.track("session_io"):
+        tmp_dir.mkdir(exist_ok=True)
+        path = progress_path(tmp_dir, session_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(progress.model_dump_json())
+        tmp.replace(path)
+
+
+def load_progress(tmp_dir: Path, session_id: str) -> PushProgress | None:
+    """Load the last push checkpoint, or return ``None`` if no push has started.
+
+    Args:
+        tmp_dir: Directory holding session files.
+        session_id: UUID of the session.
+    """
+    path = progress_path(tmp_dir, session_id)
+    with metrics.track("session_io"):
+        if not path.exists():
+            return None
+        return PushProgress.model_validate_json(path.read_text())
@@ -0,0 +1,380 @@
+"""Incremental calendar sync: diff a confirmed schedule against earlier pushes.
+
+Every pushed shift is identified by a fingerprint of ``(person, date, start,
+source)``, where ``source`` is the calendar it was pushed to and the event
+title stands in for the person when the upload was not filtered by person.  ``SyncStore``
+keeps a persistent map from fingerprint to the Calendar event id, a hash of
+the event body that was sent, and the origin of the push: the digest of the
+schedule's source image, or its session id when there is none.  When a
+revised schedule is confirmed, ``plan_sync`` compares it with the stored
+entries whose dates fall inside the new schedule's date range:
+
+- shifts with no stored fingerprint are inserted;
+- shifts whose body hash changed (new end time, title, location, ...) are
+  patched in place;
+- stored shifts in the range that are no longer on the schedule are deleted,
+  but only if they came from the same origin, so pushing a second roster for
+  the same week never removes the first roster's shifts;
+- everything else is left alone.
+
+A shift whose start time moves gets a new fingerprint, so it is deleted and
+re-inserted rather than patched.
+
+``PushProgress`` checkpoints a sync as it runs: every completed call is
+recorded as a ``SyncChange`` with the entry it produced and the entry it
+replaced, so a sync that fails part-way can be resumed from the first call
+that did not succeed, even if the store itself was never saved, and a
+finished one can be undone: inserts deleted, patches reverted to the body
+they overwrote, and deleted shifts re-inserted.
+
+Inserts use a client-chosen event id from ``stable_event_id``, so repeating
+an insert whose response was lost hits the same event and Calendar answers
+409 instead of creating a second copy.
+
+The store is a SQLite table shared by all workers, indexed by ``(person,
+source, date)`` so a sync reads only the entries in its range.  Changes are
+buffered and written in one transaction on save, so concurrent pushes
+neither lose each other's entries nor leave a half-applied sync behind.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel, field_validator
+
+from planogram.models import ScheduleEvent
+
+# Private extended properties written on every pushed event, so the mapping
+# can be rebuilt from the calendar itself when the local store has no entries
+FINGERPRINT_PROPERTY = "planogramFingerprint"
+PERSON_PROPERTY = "planogramPerson"
+ORIGIN_PROPERTY = "planogramOrigin"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shifts (
+    fingerprint TEXT PRIMARY KEY,
+    person TEXT NOT NULL,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    entry TEXT NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS shifts_range ON shifts (person, source, date)"
+
+
+class SyncEntry(BaseModel):
+    """What the store remembers about one pushed shift.
+
+    Attributes:
+        event_id: Google Calendar event id.
+        content_hash: Hash of the event body last sent for the shift.
+        date: Date of the shift, used to scope diffs to a date range.
+        person: Whose shift it is; empty for single-person uploads.
+        source: Calendar the shift was pushed to, prefixed with the account
+            that owns it.
+        html_link: Link to the event in Google Calendar.
+        origin: Source image digest or session id of the push that last
+            wrote the shift; empty if unknown, in which case no sync
+            deletes it.
+        body: Event body last sent, extended properties included, so a
+            rollback can restore it.  Empty for shifts stored before bodies
+            were kept.
+    """
+
+    event_id: str
+    content_hash: str
+    date: date
+    person: str
+    source: str
+    html_link: str = ""
+    origin: str = ""
+    body: dict[str, Any] = {}
+
+
+class SyncChange(BaseModel):
+    """One shift a sync wrote, with what it replaced.
+
+    Attributes:
+        kind: ``"insert"``, ``"patch"``, or ``"delete"``, relative to the
+            shift before the sync.
+        entry: The shift as the sync left it; ``None`` if it was deleted.
+        prior: The shift before the sync; ``None`` if it was inserted.
+    """
+
+    kind: Literal["insert", "patch", "delete"]
+    entry: SyncEntry | None = None
+    prior: SyncEntry | None = None
+
+
+class SyncAction(BaseModel):
+    """One Calendar API call needed to bring the calendar up to date.
+
+    Attributes:
+        kind: ``"insert"``, ``"patch"``, or ``"delete"``.
+        fingerprint: Fingerprint of the shift the action applies to.
+        event: The shift to write; ``None`` for deletes.
+        event_id: Existing Calendar event id; ``None`` for inserts.
+    """
+
+    kind: Literal["insert", "patch", "delete"]
+    fingerprint: str
+    event: ScheduleEvent | None = None
+    event_id: str | None = None
+
+
+class SyncPlan(BaseModel):
+    """The diff between a confirmed schedule and what was already pushed.
+
+    Attributes:
+        actions: API calls to make, inserts and patches in schedule order
+            followed by deletes.
+        unchanged: Fingerprints of shifts that need no call, mapped to their
+            stored entries.
+    """
+
+    actions: list[SyncAction]
+    unchanged: dict[str, SyncEntry]
+
+    def count(self, kind: str) -> int:
+        """Return the number of actions of ``kind``."""
+        return sum(1 for action in self.actions if action.kind == kind)
+
+
+class PushProgress(BaseModel):
+    """Checkpoint of a running or finished sync, or of its rollback.
+
+    Attributes:
+        operation: ``"push"`` while syncing, ``"rollback"`` while undoing it.
+        account: User whose Google account was pushed to.
+        status: ``"running"``, ``"done"``, or ``"failed"``.
+        total: Calls the sync has to make.
+        done: Calls completed so far.
+        inserted: Shifts created so far.
+        patched: Shifts updated in place so far.
+        deleted: Shifts removed so far.
+        unchanged: Shifts that needed no call.
+        error: Why the sync failed, if it did.
+        completed: Fingerprint of every shift written so far, mapped to the
+            change made to it.  Carried over when the sync is resumed, and
+            what a rollback undoes; a rollback drops each change it undoes.
+    """
+
+    operation: Literal["push", "rollback"] = "push"
+    account: str = ""
+    status: Literal["running", "done", "failed"] = "running"
+    total: int = 0
+    done: int = 0
+    inserted: int = 0
+    patched: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    error: str = ""
+    completed: dict[str, SyncChange] = {}
+
+    @field_validator("completed", mode="before")
+    @classmethod
+    def _legacy_completed(cls, value: Any) -> Any:
+        # Checkpoints written before changes were recorded held the new entry,
+        # or None for a delete; without the prior entry they can only be
+        # undone by deleting what was written
+        if not isinstance(value, dict):
+            return value
+        return {
+            fp: {"kind": "delete"} if change is None
+            else {"kind": "insert", "entry": change} if "event_id" in change
+            else change
+            for fp, change in value.items()
+        }
+
+
+def record_change(
+    completed: dict[str, SyncChange], fp: str, entry: SyncEntry | None, prior: SyncEntry | None
+) -> None:
+    """Record a write to a shift in a checkpoint's ``completed`` map.
+
+    A shift written more than once, e.g. across a resumed sync, keeps the
+    entry from before its first write, so undoing it restores the original.
+
+    Args:
+        completed: The checkpoint's map, updated in place.
+        fp: Fingerprint of the shift.
+        entry: The shift after the write; ``None`` for a delete.
+        prior: The shift before the write; ``None`` if it was new.
+    """
+    earlier = completed.get(fp)
+    if earlier is not None:
+        prior = earlier.prior
+    kind = "insert" if prior is None else "delete" if entry is None else "patch"
+    completed[fp] = SyncChange(kind=kind, entry=entry, prior=prior)
+
+
+def fingerprint(person: str, event: ScheduleEvent, source: str) -> str:
+    """Return the stable identity of a shift across schedule revisions.
+
+    Without a person filter a schedule can hold several people's shifts at
+    the same date and time, so the event's title, which names whose shift it
+    is, stands in for the person.
+
+    Args:
+        person: Whose shift it is; empty when the upload was not filtered by
+            person.
+        event: The shift.
+        source: Calendar the shift is pushed to.
+    """
+    who = person.strip().lower() or f"title:{event.title.strip().lower()}"
+    key = f"{who}|{event.date.isoformat()}|{event.start_time.strftime('%H:%M')}|{source}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def content_hash(body: dict[str, Any]) -> str:
+    """Hash an event body so any change to what would be sent is detected."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def stable_event_id(session_id: str, key: str, body: dict[str, Any]) -> str:
+    """Derive the Calendar event id a shift is inserted under.
+
+    Hex digits are a subset of the base32hex alphabet Calendar requires for
+    client-chosen ids.
+
+    Args:
+        session_id: Session the shift was confirmed from.
+        key: Identity of the shift within the session, e.g. its fingerprint.
+        body: Event body being inserted.
+    """
+    raw = f"{session_id}|{key}|{content_hash(body)}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def plan_sync(
+    events: list[ScheduleEvent],
+    bodies: list[dict[str, Any]],
+    previous: dict[str, SyncEntry],
+    person: str,
+    source: str,
+    origin: str,
+) -> SyncPlan:
+    """Diff confirmed shifts against the shifts already pushed for the same range.
+
+    Args:
+        events: Confirmed shifts, in display order.
+        bodies: Calendar event bodies for ``events``, in the same order.
+        previous: Stored entries for ``person`` and ``source`` whose dates fall
+            within the range of ``events``.
+        person: Whose shifts these are.
+        source: Calendar the shifts are pushed to.
+        origin: Source image digest or session id the shifts come from.
+            Only stored shifts from the same origin are deleted when they are
+            missing from ``events``.
+
+    Returns:
+        The actions needed and the shifts left unchanged.  A shift listed
+        twice on the schedule is only written once.
+    """
+    actions: list[SyncAction] = []
+    unchanged: dict[str, SyncEntry] = {}
+    seen: set[str] = set()
+    for event, body in zip(events, bodies):
+        fp = fingerprint(person, event, source)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        entry = previous.get(fp)
+        if entry is None:
+            actions.append(SyncAction(kind="insert", fingerprint=fp, event=event))
+        elif entry.content_hash != content_hash(body):
+            actions.append(SyncAction(kind="patch", fingerprint=fp, event=event, event_id=entry.event_id))
+        else:
+            unchanged[fp] = entry
+    for fp, entry in previous.items():
+        if fp not in seen and origin and entry.origin == origin:
+            actions.append(SyncAction(kind="delete", fingerprint=fp, event_id=entry.event_id))
+    return SyncPlan(actions=actions, unchanged=unchanged)
+
+
+class SyncStore:
+    """Persistent map from shift fingerprint to pushed Calendar event, in SQLite.
+
+    Args:
+        db_path: SQLite database file.  Created on first use.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts: dict[str, SyncEntry] = {}
+        self._removes: set[str] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it (and the database) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+                conn.execute(_INDEX)
+            self._local.conn = conn
+        return conn
+
+    def entries(self, person: str, source: str, start: date, end: date) -> dict[str, SyncEntry]:
+        """Return stored entries for ``person`` and ``source`` dated within ``[start, end]``.
+
+        Args:
+            person: Whose shifts to return.
+            source: Calendar the shifts were pushed to.
+            start: First date of the range, inclusive.
+            end: Last date of the range, inclusive.
+        """
+        person = person.strip().lower()
+        rows = self._connect().execute(
+            "SELECT fingerprint, entry FROM shifts WHERE person = ? AND source = ? AND date BETWEEN ? AND ?",
+            (person, source, start.isoformat(), end.isoformat()),
+        )
+        result = {fp: SyncEntry.model_validate_json(data) for fp, data in rows}
+        with self._lock:
+            for fp in self._removes:
+                result.pop(fp, None)
+            for fp, entry in self._puts.items():
+                if entry.person == person and entry.source == source and start <= entry.date <= end:
+                    result[fp] = entry
+        return result
+
+    def put(self, fp: str, entry: SyncEntry) -> None:
+        """Record a pushed shift; written to the database on the next ``save``."""
+        entry = entry.model_copy(update={"person": entry.person.strip().lower()})
+        with self._lock:
+            self._removes.discard(fp)
+            self._puts[fp] = entry
+
+    def remove(self, fp: str) -> None:
+        """Forget a deleted shift; written to the database on the next ``save``."""
+        with self._lock:
+            self._puts.pop(fp, None)
+            self._removes.add(fp)
+
+    def save(self) -> None:
+        """Write buffered changes in one transaction."""
+        with self._lock:
+            if not self._puts and not self._removes:
+                return
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM shifts WHERE fingerprint = ?", [(fp,) for fp in self._removes])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO shifts VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (fp, entry.person, entry.source, entry.date.isoformat(), entry.model_dump_json())
+                        for fp, entry in self._puts.items()
+                    ],
+                )
+            self._puts.clear()
+            self._removes.clear()
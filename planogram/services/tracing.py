@@ -0,0 +1,219 @@
+"""Lightweight request tracing across upload → review → confirm.
+
+Each stage of a request runs inside a ``span``.  Spans nest through a context
+variable, so a span opened inside another becomes its child, and every span
+carries the trace id of the root — the session id, which ties together the
+separate HTTP requests of one upload's lifetime.
+
+Finished spans are handed to a pluggable exporter.  ``JsonLinesExporter``
+appends one JSON object per span to a local file for environments with no
+collector; ``NullExporter`` (the default) discards them.  Any object with an
+``export(span)`` method can be installed with ``set_exporter``.
+
+Context variables do not cross into worker threads on their own; wrap thread
+pool callables with ``propagate`` so spans opened there keep their parent.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Span:
+    """A timed operation within a trace.
+
+    Attributes:
+        name: Stage name, e.g. ``"parse_events"``.
+        trace_id: Identifier shared by every span of the same session.
+        span_id: Unique identifier of this span.
+        parent_id: ``span_id`` of the enclosing span, or ``None`` for a root.
+        start: Wall-clock start time in seconds since the epoch.
+        duration: Elapsed seconds, set when the span ends.
+        attributes: Free-form key/value details such as model or token counts.
+        error: ``"ExcType: message"`` if the span ended with an exception.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration = 0.0
+        self.attributes = attributes
+        self.error: str | None = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes on the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable representation of the span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter(Protocol):
+    """Receives every finished span."""
+
+    def export(self, span: Span) -> None: ...
+
+
+class NullExporter:
+    """Discard spans.  Used when tracing is disabled."""
+
+    def export(self, span: Span) -> None:
+        pass
+
+
+class JsonLinesExporter:
+    """Append each span as one JSON line to a local file.
+
+    Args:
+        path: Destination file.  Parent directories are created on first use.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+
+_exporter: SpanExporter = NullExporter()
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("planogram_span", default=None)
+
+
+def set_exporter(exporter: SpanExporter) -> None:
+    """Install the exporter that receives every finished span."""
+    global _exporter
+    _exporter = exporter
+
+
+def exporter_from_settings(kind: str, path: Path) -> SpanExporter:
+    """Build the exporter named by ``Settings.trace_exporter``.
+
+    Args:
+        kind: ``"none"`` or ``"jsonl"``.
+        path: Output file for the ``jsonl`` exporter.
+
+    Raises:
+        ValueError: If ``kind`` is not recognized.
+    """
+    if kind == "none":
+        return NullExporter()
+    if kind == "jsonl":
+        return JsonLinesExporter(path)
+    raise ValueError(f"Unknown trace exporter: {kind!r}")
+
+
+def current_span() -> Span | None:
+    """Return the innermost active span, if any."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, trace_id: str | None = None, **attributes: Any) -> Iterator[Span]:
+    """Open a span around a block of code.
+
+    Args:
+        name: Stage name recorded on the span.
+        trace_id: Trace to start or join.  Defaults to the enclosing span's
+            trace, or a fresh id for a root span without one.
+        **attributes: Initial attributes for the span.
+
+    Yields:
+        The open ``Span``; call ``span.set(...)`` to record results.
+    """
+    parent = _current.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+    s = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    token = _current.set(s)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException as exc:
+        s.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        s.duration = time.perf_counter() - t0
+        _current.reset(token)
+        try:
+            _exporter.export(s)
+        except Exception:
+            logger.exception("Failed to export span %s", name)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Record attributes on the innermost active span, if there is one."""
+    s = _current.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    """Bind ``fn`` to the caller's tracing context for use in another thread.
+
+    Args:
+        fn: Callable to run in a worker thread.
+
+    Returns:
+        A wrapper that runs ``fn`` in a copy of the current context, so spans
+        it opens are children of the span active when ``propagate`` was called.
+    """
+    ctx = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def read_trace(path: Path, trace_id: str) -> list[dict[str, Any]]:
+    """Load every exported span of one trace from a JSON-lines file, slowest first.
+
+    Args:
+        path: File written by ``JsonLinesExporter``.
+        trace_id: Session id whose spans to return.
+
+    Returns:
+        Span dictionaries sorted by descending ``duration_ms``.
+    """
+    if not path.exists():
+        return []
+    spans = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if f'"{trace_id}"' in line:
+                record = json.loads(line)
+                if record["trace_id"] == trace_id:
+                    spans.append(record)
+    return sorted(spans, key=lambda r: r["duration_ms"], reverse=True)
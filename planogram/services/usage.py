@@ -0,0 +1,306 @@
+"""Token and cost accounting for Claude calls, with daily budget caps.
+
+Every Claude response's ``usage`` — input, output, cache-write and
+cache-read tokens — is turned into a ``models.StageUsage`` priced from
+``PRICES``.
+Inside a ``recording`` block (one per upload or re-extraction) each record
+is also
+
+- collected into a list the route stores on the session, so the review page
+  can show what that upload cost, and
+- added to ``UsageStore``, a SQLite table of totals per UTC day, user,
+  model and stage, which backs ``GET /stats`` and the budget caps.
+
+``check_budget`` runs before any Claude call is made.  It compares what was
+already spent today plus the expected cost of the new work against the
+global and per-user daily caps, so an upload is refused up front instead of
+after the money is gone.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from planogram.models import StageUsage
+from planogram.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: input, output, cache write, cache read
+PRICES: dict[str, tuple[float, float, float, float]] = {
+    "claude-opus-4-7": (5.0, 25.0, 6.25, 0.50),
+    "claude-sonnet-4-6": (3.0, 15.0, 3.75, 0.30),
+    "claude-haiku-4-5": (1.0, 5.0, 1.25, 0.10),
+}
+
+# Used for a model missing from PRICES, so unknown spend is overestimated
+# rather than ignored
+_FALLBACK_PRICE = PRICES["claude-opus-4-7"]
+
+# Tokens assumed for one upload before it runs: a full-size image and a
+# full transcription on the Pass 1 model, and one full Pass 2 chunk
+_UPLOAD_PASS1_TOKENS = (3300, 4096)
+_UPLOAD_PASS2_TOKENS = (2500, 2048)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_write_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    PRIMARY KEY (day, user_id, model, stage)
+)
+"""
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised before starting work that would take spend past a daily cap.
+
+    Attributes:
+        retry_after: Seconds until the budgets reset at midnight UTC.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def cost(model: str, input_tokens: int, output_tokens: int, cache_write: int = 0, cache_read: int = 0) -> float:
+    """Return the USD price of a call's tokens on ``model``."""
+    price_in, price_out, price_write, price_read = PRICES.get(model, _FALLBACK_PRICE)
+    return (
+        input_tokens * price_in + output_tokens * price_out + cache_write * price_write + cache_read * price_read
+    ) / 1_000_000
+
+
+def from_response(stage: str, model: str, usage) -> StageUsage:
+    """Build a ``StageUsage`` from the ``usage`` of an Anthropic ``Message``."""
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    return StageUsage(
+        stage=stage,
+        model=model,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        cache_write_tokens=cache_write,
+        cache_read_tokens=cache_read,
+        cost_usd=cost(model, usage.input_tokens, usage.output_tokens, cache_write, cache_read),
+    )
+
+
+def summarize(records: list[StageUsage]) -> list[StageUsage]:
+    """Sum records per stage and model, in order of first appearance."""
+    totals: dict[tuple[str, str], StageUsage] = {}
+    for record in records:
+        key = (record.stage, record.model)
+        total = totals.get(key)
+        if total is None:
+            totals[key] = record.model_copy()
+            continue
+        total.calls += record.calls
+        total.input_tokens += record.input_tokens
+        total.output_tokens += record.output_tokens
+        total.cache_write_tokens += record.cache_write_tokens
+        total.cache_read_tokens += record.cache_read_tokens
+        total.cost_usd += record.cost_usd
+    return list(totals.values())
+
+
+def estimate_upload_cost(pass1_model: str, pass2_model: str) -> float:
+    """Return the expected price of one upload whose passes go to ``pass1_model`` and ``pass2_model``."""
+    return cost(pass1_model, *_UPLOAD_PASS1_TOKENS) + cost(pass2_model, *_UPLOAD_PASS2_TOKENS)
+
+
+def estimate_reextract_cost(pass2_model: str) -> float:
+    """Return the expected price of re-running Pass 2 for one selection with ``pass2_model``."""
+    return cost(pass2_model, *_UPLOAD_PASS2_TOKENS)
+
+
+def today() -> str:
+    """Return the current UTC date as ``YYYY-MM-DD``; budgets reset when it changes."""
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+class UsageStore:
+    """Daily Claude usage totals per user, model and stage, in SQLite.
+
+    Args:
+        db_path: SQLite database file.  Created on the first read or write.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it (and the database) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, user_id: str, record: StageUsage, day: str | None = None) -> None:
+        """Add one record to the totals for ``day`` (today by default)."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, user_id, model, stage) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    input_tokens = input_tokens + excluded.input_tokens,
+                    output_tokens = output_tokens + excluded.output_tokens,
+                    cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens,
+                    cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+                    cost_usd = cost_usd + excluded.cost_usd
+                """,
+                (
+                    day or today(), user_id, record.model, record.stage, record.calls, record.input_tokens,
+                    record.output_tokens, record.cache_write_tokens, record.cache_read_tokens, record.cost_usd,
+                ),
+            )
+
+    def spent(self, day: str, user_id: str | None = None) -> float:
+        """Return the USD spent on ``day``, by everyone or by one user."""
+        query = "SELECT COALESCE(SUM(cost_usd), 0) FROM usage WHERE day = ?"
+        params: tuple[str, ...] = (day,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        return self._connect().execute(query, params).fetchone()[0]
+
+    def daily(self, since: str) -> dict[str, list[StageUsage]]:
+        """Return totals per model and stage for every day from ``since`` on, newest first."""
+        rows = self._connect().execute(
+            """
+            SELECT day, stage, model, SUM(calls), SUM(input_tokens), SUM(output_tokens),
+                   SUM(cache_write_tokens), SUM(cache_read_tokens), SUM(cost_usd)
+            FROM usage WHERE day >= ? GROUP BY day, stage, model ORDER BY day DESC, stage, model
+            """,
+            (since,),
+        ).fetchall()
+        days: dict[str, list[StageUsage]] = {}
+        for day, stage, model, calls, input_tokens, output_tokens, cache_write, cache_read, cost_usd in rows:
+            days.setdefault(day, []).append(StageUsage(
+                stage=stage, model=model, calls=calls, input_tokens=input_tokens, output_tokens=output_tokens,
+                cache_write_tokens=cache_write, cache_read_tokens=cache_read, cost_usd=cost_usd,
+            ))
+        return days
+
+
+_stores: dict[Path, UsageStore] = {}
+_stores_lock = threading.Lock()
+
+
+def usage_store(db_path: Path) -> UsageStore:
+    """Return this process's ``UsageStore`` for ``db_path``."""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = UsageStore(db_path)
+        return store
+
+
+def check_budget(
+    store: UsageStore, user_id: str, estimated_cost: float, daily_budget: float, user_daily_budget: float
+) -> None:
+    """Refuse work that would take today's spend past a cap.
+
+    Args:
+        store: Where today's spend is recorded.
+        user_id: Who the work is for.
+        estimated_cost: Expected USD price of the work.
+        daily_budget: Cap on everyone's spend per UTC day.  Zero is no cap.
+        user_daily_budget: Cap on one user's spend per UTC day.  Zero is no cap.
+
+    Raises:
+        BudgetExceededError: If either cap would be exceeded.
+    """
+    day = today()
+    if daily_budget and store.spent(day) + estimated_cost > daily_budget:
+        metrics.BUDGET_REJECTED.labels("global").inc()
+        logger.warning("Daily Claude budget of $%.2f reached", daily_budget)
+        raise BudgetExceededError("Today's Claude budget is used up.", _seconds_until_tomorrow())
+    if user_daily_budget and store.spent(day, user_id) + estimated_cost > user_daily_budget:
+        metrics.BUDGET_REJECTED.labels("user").inc()
+        logger.warning("User %s reached the daily Claude budget of $%.2f", user_id[:8], user_daily_budget)
+        raise BudgetExceededError("You have used up today's Claude budget.", _seconds_until_tomorrow())
+
+
+_recording: contextvars.ContextVar[tuple[str, UsageStore | None, list[StageUsage]] | None] = contextvars.ContextVar(
+    "planogram_usage", default=None
+)
+
+
+@contextmanager
+def recording(user_id: str, store: UsageStore | None) -> Iterator[list[StageUsage]]:
+    """Collect the usage of every Claude call made inside the block.
+
+    Args:
+        user_id: Who the calls are made for.
+        store: Daily totals to add each call to, or ``None`` to only collect.
+
+    Yields:
+        The list that each call's ``StageUsage`` is appended to.
+    """
+    records: list[StageUsage] = []
+    token = _recording.set((user_id, store, records))
+    try:
+        yield records
+    finally:
+        _recording.reset(token)
+
+
+def recorded() -> list[StageUsage]:
+    """Return what the enclosing ``recording`` block has collected so far, or ``[]`` outside one."""
+    current = _recording.get()
+    return list(current[2]) if current is not None else []
+
+
+def record(stage: str, model: str, usage) -> StageUsage:
+    """Account for one Claude response.
+
+    Counts it in the Prometheus token and cost counters and, inside
+    ``recording``, collects it and adds it to the daily totals.  A failure to
+    write the totals is logged rather than failing the request.
+
+    Args:
+        stage: ``"pass1"``, ``"pass1_repair"`` or ``"pass2"``.
+        model: Model the request went to.
+        usage: The ``usage`` of the Anthropic ``Message``.
+    """
+    entry = from_response(stage, model, usage)
+    metrics.record_usage(model, entry)
+    current = _recording.get()
+    if current is not None:
+        user_id, store, records = current
+        records.append(entry)
+        if store is not None:
+            try:
+                store.add(user_id, entry)
+            except sqlite3.Error:
+                logger.warning("Could not record Claude usage", exc_info=True)
+    return entry
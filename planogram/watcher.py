@@ -0,0 +1,387 @@
+"""Hot-folder ingestion — the ``planogram-watch`` service.
+
+Watches the directories in ``WATCH_FOLDERS`` for new schedule images and runs
+each one through the same pipeline as ``POST /upload`` (see
+``planogram.cli.parse_image``), without anyone uploading it by hand::
+
+    WATCH_FOLDERS='[{"path": "/srv/scans/store-12", "user_id": "<user id>"},
+                    {"path": "/srv/scans/trusted", "user_id": "<user id>", "trusted": true}]'
+    planogram-watch
+
+New files are noticed through filesystem notifications (``watchfiles``,
+inotify on Linux) or, with ``WATCH_FORCE_POLLING`` or when ``watchfiles`` is
+not installed, by scanning the folders every ``WATCH_POLL_INTERVAL`` seconds.
+A file is only picked up once its size and modification time have stayed the
+same for ``WATCH_SETTLE_SECONDS``, so a scanner or file copy that is still
+writing it is left alone.
+
+Settled files are parsed by ``WATCH_WORKERS`` worker threads, so a burst of
+hundreds of files is worked through a few at a time at a steady pace, with
+Claude calls queued at bulk priority behind interactive uploads.  Each
+file's schedule becomes a session owned by the folder's ``user_id``, ready
+at ``/review?id=<session id>``; for a ``trusted`` folder the events are
+synced straight to that user's Google Calendar instead.
+
+Every file is recorded by content hash in a ledger (``WATCH_LEDGER_PATH``)
+before it is parsed, so it is never processed twice, whether it is seen
+again after a restart, touched, or copied under another name.  Files that
+fail to parse stay failed until their contents change; files refused by a
+daily budget or while Claude is unavailable are retried later.  Only the
+image types ``POST /upload`` accepts are picked up.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import logging
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from googleapiclient.errors import HttpError
+
+from planogram.cli import parse_image, push_schedule
+from planogram.config import Settings, WatchFolder, get_settings
+from planogram.routes.upload import MEDIA_TYPE_MAP, TMP_DIR
+from planogram.services import scheduler, sessions, tracing, usage
+from planogram.services.calendar import NeedsAuthError
+from planogram.services.resilience import UpstreamUnavailableError
+from planogram.services.sync import SyncStore
+from planogram.services.usage import BudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying a file that could not be parsed because Claude was unavailable
+UPSTREAM_RETRY_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handled (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    detail TEXT NOT NULL DEFAULT '',
+    handled_at REAL NOT NULL
+)
+"""
+
+
+class Ledger:
+    """Every file the watcher has handled, by content hash, in SQLite.
+
+    A file is claimed with status ``processing`` before it is parsed and
+    finished as ``session``, ``pushed`` or ``failed``.
+
+    Args:
+        db_path: SQLite database file.  Created on first use.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it (and the database) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def claim(self, digest: str, path: Path) -> bool:
+        """Mark a file as being processed; return ``False`` if it was handled before."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO handled VALUES (?, ?, 'processing', '', ?)", (digest, str(path), time.time())
+            )
+        return cursor.rowcount == 1
+
+    def finish(self, digest: str, status: str, detail: str = "") -> None:
+        """Record how a claimed file ended."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE handled SET status = ?, detail = ?, handled_at = ? WHERE digest = ?",
+                (status, detail, time.time(), digest),
+            )
+
+    def release(self, digest: str) -> None:
+        """Forget a claim so the file is processed again when next seen."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM handled WHERE digest = ?", (digest,))
+
+    def release_unfinished(self) -> int:
+        """Forget claims left by a watcher that stopped mid-file; return how many."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM handled WHERE status = 'processing'").rowcount
+
+    def status(self, digest: str) -> tuple[str, str] | None:
+        """Return ``(status, detail)`` for a file, or ``None`` if it was never handled."""
+        return self._connect().execute(
+            "SELECT status, detail FROM handled WHERE digest = ?", (digest,)
+        ).fetchone()
+
+
+class SettleTracker:
+    """Decides when files have finished being written.
+
+    Feed it the paths that may have changed on every tick; it returns each
+    file once, after its size and modification time have stayed the same for
+    ``settle_seconds``.  A file that changes after it was returned is returned
+    again once it settles.  Files that were returned are checked on every
+    tick and forgotten once they are gone, so a long-running watcher does not
+    accumulate every file it ever processed.
+
+    Args:
+        settle_seconds: How long a file must stay unchanged.
+        clock: Monotonic time source.
+    """
+
+    def __init__(self, settle_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.settle_seconds = settle_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: dict[Path, tuple[tuple[int, int], float]] = {}
+        self._returned: dict[Path, tuple[int, int]] = {}
+        self._deferred: dict[Path, float] = {}
+
+    def poll(self, paths: set[Path]) -> list[Path]:
+        """Check ``paths`` and every file still settling; return those now ready."""
+        now = self._clock()
+        ready = []
+        with self._lock:
+            for path in paths | self._pending.keys() | self._deferred.keys() | self._returned.keys():
+                if self._deferred.get(path, now) > now:
+                    continue
+                try:
+                    st = path.stat()
+                except OSError:
+                    self._pending.pop(path, None)
+                    self._deferred.pop(path, None)
+                    self._returned.pop(path, None)
+                    continue
+                signature = (st.st_size, st.st_mtime_ns)
+                if self._returned.get(path) == signature:
+                    continue
+                seen = self._pending.get(path)
+                if seen is None or seen[0] != signature:
+                    self._pending[path] = (signature, now)
+                elif st.st_size and now - seen[1] >= self.settle_seconds:
+                    del self._pending[path]
+                    self._deferred.pop(path, None)
+                    self._returned[path] = signature
+                    ready.append(path)
+        return sorted(ready)
+
+    def retry(self, path: Path, delay: float) -> None:
+        """Return ``path`` again once it is settled and ``delay`` seconds have passed."""
+        with self._lock:
+            self._returned.pop(path, None)
+            self._deferred[path] = self._clock() + delay
+
+
+def scan(folders: list[Path]) -> set[Path]:
+    """Return the images directly inside ``folders``."""
+    found = set()
+    for folder in folders:
+        try:
+            found.update(p for p in folder.iterdir() if p.suffix.lower().lstrip(".") in MEDIA_TYPE_MAP and p.is_file())
+        except OSError as exc:
+            logger.warning("Cannot scan %s: %s", folder, exc)
+    return found
+
+
+def poll_changes(folders: list[Path], interval: float, stop: threading.Event) -> Iterator[set[Path]]:
+    """Yield the folders' images every ``interval`` seconds until ``stop`` is set."""
+    while not stop.is_set():
+        yield scan(folders)
+        stop.wait(interval)
+
+
+def notify_changes(folders: list[Path], interval: float, stop: threading.Event) -> Iterator[set[Path]]:
+    """Yield images added or modified in ``folders``, as filesystem notifications report them.
+
+    Starts with every image already there, so files dropped while the watcher
+    was down are picked up, and yields an empty set after ``interval`` seconds
+    without changes so files that are still settling get checked again.
+    """
+    import watchfiles
+
+    yield scan(folders)
+    for changes in watchfiles.watch(
+        *folders, stop_event=stop, rust_timeout=int(interval * 1000), yield_on_timeout=True,
+        recursive=False, raise_interrupt=False,
+    ):
+        yield {
+            Path(raw) for change, raw in changes
+            if change != watchfiles.Change.deleted and Path(raw).suffix.lower().lstrip(".") in MEDIA_TYPE_MAP
+        }
+
+
+def changes(folders: list[Path], settings: Settings, stop: threading.Event) -> Iterator[set[Path]]:
+    """Pick the notification source, falling back to polling when it is unavailable."""
+    if not settings.watch_force_polling:
+        if importlib.util.find_spec("watchfiles") is not None:
+            return notify_changes(folders, settings.watch_poll_interval, stop)
+        logger.info("watchfiles is not installed; polling every %.1fs", settings.watch_poll_interval)
+    return poll_changes(folders, settings.watch_poll_interval, stop)
+
+
+class HotFolderWatcher:
+    """Turns files dropped into the configured folders into sessions or calendar pushes.
+
+    Args:
+        settings: Application settings, including ``watch_folders``.
+        tmp_dir: Where sessions are saved; the web app's session directory.
+    """
+
+    def __init__(self, settings: Settings, tmp_dir: Path = TMP_DIR):
+        self.settings = settings
+        self.tmp_dir = tmp_dir
+        self.folders: dict[Path, WatchFolder] = {folder.path.resolve(): folder for folder in settings.watch_folders}
+        self.ledger = Ledger(settings.watch_ledger_path)
+        self.tracker = SettleTracker(settings.watch_settle_seconds)
+        self.store = usage.usage_store(settings.usage_db_path)
+        self.sync_store = SyncStore(settings.sync_state_path)
+
+    def run(self, stop: threading.Event) -> None:
+        """Watch the folders and process settled files until ``stop`` is set.
+
+        Files still queued when ``stop`` is set are left unclaimed, so they
+        are picked up again on the next start; files being parsed finish.
+        """
+        released = self.ledger.release_unfinished()
+        if released:
+            logger.info("Retrying %d file(s) left unfinished by the last run", released)
+        pool = ThreadPoolExecutor(max_workers=self.settings.watch_workers, thread_name_prefix="planogram-watch")
+        try:
+            for paths in changes(list(self.folders), self.settings, stop):
+                for path in self.tracker.poll(paths):
+                    pool.submit(tracing.propagate(self.process), path)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def process(self, path: Path) -> str:
+        """Parse one settled file and create its session or push it.
+
+        Runs on a worker thread.  Errors are logged and recorded in the ledger
+        rather than raised.
+
+        Args:
+            path: A file directly inside one of the watched folders.
+
+        Returns:
+            How the file ended: ``"session"``, ``"pushed"``, ``"failed"``,
+            ``"retry"``, or ``"skipped"`` when it was handled before.
+        """
+        folder = self.folders[path.parent.resolve()]
+        try:
+            image_bytes = path.read_bytes()
+        except OSError as exc:
+            logger.warning("Cannot read %s: %s", path, exc)
+            return "skipped"
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        if not self.ledger.claim(digest, path):
+            logger.info("Skipping %s: already handled", path)
+            return "skipped"
+
+        session_id = str(uuid.uuid4())
+        with (
+            tracing.span("hotfolder", trace_id=session_id, filename=path.name, trusted=folder.trusted) as span,
+            scheduler.client(folder.user_id, "bulk"),
+        ):
+            try:
+                schedule = parse_image(
+                    image_bytes, path.name, folder.person_name or None, folder.user_id, self.settings, self.store
+                )
+            except (BudgetExceededError, UpstreamUnavailableError) as exc:
+                delay = exc.retry_after if isinstance(exc, BudgetExceededError) else UPSTREAM_RETRY_SECONDS
+                logger.warning("Deferring %s for %.0fs: %s", path, delay, exc)
+                self.ledger.release(digest)
+                self.tracker.retry(path, delay)
+                span.set(result="retry")
+                return "retry"
+            except Exception as exc:
+                logger.warning("Parsing %s failed: %s", path, exc)
+                self.ledger.finish(digest, "failed", f"{type(exc).__name__}: {exc}")
+                span.set(result="failed")
+                return "failed"
+
+            if folder.trusted:
+                try:
+                    result = push_schedule(schedule, digest[:32], self.settings, self.sync_store)
+                except (NeedsAuthError, HttpError) as exc:
+                    logger.warning("Pushing %s failed, saving it for review instead: %s", path, exc)
+                else:
+                    detail = (f"{result.inserted} inserted, {result.patched} updated, "
+                              f"{result.deleted} deleted, {result.unchanged} unchanged")
+                    logger.info("Pushed %s: %s", path, detail)
+                    self.ledger.finish(digest, "pushed", detail)
+                    span.set(result="pushed", events=len(schedule.events))
+                    return "pushed"
+
+            sessions.save_session(self.tmp_dir, session_id, schedule)
+            self.ledger.finish(digest, "session", session_id)
+            logger.info("Session %s created from %s with %d event(s); review at /review?id=%s",
+                        session_id, path, len(schedule.events), session_id)
+            span.set(result="session", events=len(schedule.events))
+            return "session"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the ``planogram-watch`` service until interrupted.
+
+    Args:
+        argv: Command-line arguments; defaults to ``sys.argv[1:]``.
+
+    Returns:
+        0 after a clean shutdown, 2 if no usable folders are configured.
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog="planogram-watch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument("--poll", action="store_true", help="scan the folders instead of using notifications")
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)-8s %(name)s – %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    settings = get_settings()
+    if args.poll:
+        settings = settings.model_copy(update={"watch_force_polling": True})
+    if not settings.watch_folders:
+        print("No WATCH_FOLDERS configured.", file=sys.stderr)
+        return 2
+    missing = [str(folder.path) for folder in settings.watch_folders if not folder.path.is_dir()]
+    if missing:
+        print(f"Watch folder(s) not found: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    tracing.set_exporter(tracing.exporter_from_settings(settings.trace_exporter, settings.trace_export_path))
+    scheduler.configure(settings)
+    sessions.configure(settings)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logger.info("Watching %d folder(s) with %d worker(s)", len(settings.watch_folders), settings.watch_workers)
+    try:
+        HotFolderWatcher(settings).run(stop)
+    except KeyboardInterrupt:
+        stop.set()
+    logger.info("Watcher stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
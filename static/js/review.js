@@ -12,31 +12,60 @@ function calcDuration(startVal, endVal) {
 }
 
 function updateRowDuration(row) {
-    const start = row.querySelector('input[name^="start_time_"]');
-    const end = row.querySelector('input[name^="end_time_"]');
+    const start = row.querySelector('input[data-field="start_time"]');
+    const end = row.querySelector('input[data-field="end_time"]');
     const cell = row.querySelector('td.duration');
     if (start && end && cell) cell.textContent = calcDuration(start.value, end.value);
 }
 
+// Indices of the session's events removed from the table; rows keep their
+// original index, so the ones after a deleted row need no renumbering
+const deletedRows = [];
+
+function rowValues(row) {
+    const values = {};
+    row.querySelectorAll('input[data-field]').forEach(input => {
+        values[input.dataset.field] = input.value;
+    });
+    return values;
+}
+
 function deleteRow(btn) {
-    btn.closest('tr').remove();
-    const tbody = document.getElementById('event-rows');
-    Array.from(tbody.rows).forEach((row, i) => {
-        row.cells[0].textContent = String(i + 1);
-        row.querySelectorAll('input[name]').forEach(input => {
-            input.name = input.name.replace(/_\d+$/, '_' + i);
-        });
+    const row = btn.closest('tr');
+    deletedRows.push(Number(row.dataset.index));
+    row.remove();
+    Array.from(document.getElementById('event-rows').rows).forEach((r, i) => {
+        r.cells[0].textContent = String(i + 1);
+    });
+}
+
+// Only the rows that differ from the page as loaded are sent, as an EventChanges diff
+function collectChanges() {
+    const updated = {};
+    document.querySelectorAll('#event-rows tr').forEach(row => {
+        const values = rowValues(row);
+        if (JSON.stringify(values) === row.dataset.original) return;
+        updated[row.dataset.index] = {
+            title: values.title,
+            date: values.date,
+            start_time: values.start_time,
+            end_time: values.end_time || null,
+            description: values.description || null,
+            location: values.location || null,
+            color_id: values.color_id || null,
+        };
     });
+    return { updated, deleted: deletedRows };
 }
 
 function applyBulkName(value) {
-    document.querySelectorAll('input[name^="title_"]').forEach(input => {
+    document.querySelectorAll('input[data-field="title"]').forEach(input => {
         input.value = value;
     });
 }
 
 function applyBulkColor(colorValue) {
-    document.querySelectorAll('input[name^="color_id_"]').forEach(input => {
+    document.querySelectorAll('input[data-field="color_id"]').forEach(input => {
         input.value = colorValue;
     });
     document.querySelectorAll('#event-rows .color-picker').forEach(picker => {
@@ -47,14 +76,17 @@ function applyBulkColor(colorValue) {
 }
 
 document.querySelectorAll('#event-rows tr').forEach(row => {
+    row.dataset.original = JSON.stringify(rowValues(row));
     updateRowDuration(row);
-    row.querySelectorAll('input[name^="start_time_"], input[name^="end_time_"]').forEach(input => {
+    row.querySelectorAll('input[data-field="start_time"], input[data-field="end_time"]').forEach(input => {
         input.addEventListener('change', () => updateRowDuration(row));
     });
 });
 
 document.querySelectorAll('#event-rows .color-picker').forEach(picker => {
+    const color = picker.parentNode.querySelector('input[type="hidden"]').value;
     picker.querySelectorAll('.swatch').forEach(swatch => {
+        swatch.classList.toggle('active', swatch.dataset.color === color);
         swatch.addEventListener('click', () => {
             picker.querySelectorAll('.swatch').forEach(s => s.classList.remove('active'));
             swatch.classList.add('active');
@@ -78,12 +110,40 @@ if (bulkPicker) {
     });
 }
 
+document.querySelectorAll('form input[name="changes"]').forEach(field => {
+    field.form.addEventListener('submit', () => {
+        field.value = JSON.stringify(collectChanges());
+    });
+});
+
+if (window.EventSource) {
+    document.querySelectorAll('form[data-progress]').forEach(form => {
+        form.addEventListener('submit', () => {
+            // The page stays up until the push or rollback responds, so follow it meanwhile
+            const bar = form.querySelector('.push-progress');
+            const status = form.querySelector('.push-status');
+            const sessionId = form.querySelector('input[name="session_id"]').value;
+            const source = new EventSource(`/confirm/progress?session_id=${encodeURIComponent(sessionId)}`);
+            source.onmessage = msg => {
+                const progress = JSON.parse(msg.data);
+                const verb = progress.operation === 'rollback' ? 'undone' : 'sent';
+                bar.hidden = false;
+                bar.max = Math.max(progress.total, 1);
+                bar.value = progress.done;
+                status.textContent = `${progress.done} of ${progress.total} change(s) ${verb}`;
+                if (progress.status !== 'running') source.close();
+            };
+            source.onerror = () => source.close();
+        });
+    });
+}
+
 async function initAutocomplete() {
     const { AutocompleteSuggestion } = await google.maps.importLibrary('places');
 
-    document.querySelectorAll('input[name^="location_"]').forEach(input => {
+    document.querySelectorAll('input[data-field="location"]').forEach(input => {
         const datalist = document.createElement('datalist');
-        datalist.id = `dl-${input.name}`;
+        datalist.id = `dl-location-${input.closest('tr').dataset.index}`;
         input.setAttribute('list', datalist.id);
         input.parentNode.appendChild(datalist);
 
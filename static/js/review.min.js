@@ -1 +1 @@
-function calcDuration(e,t){var o,r;return!e||!t||([e,o]=e.split(":").map(Number),[t,r]=t.split(":").map(Number),(t=60*t+r-(60*e+o))<=0)?"—":(r=t%60,(e=Math.floor(t/60))&&r?e+`h ${r}m`:e?e+"h":r+"m")}function updateRowDuration(e){var t=e.querySelector('input[name^="start_time_"]'),o=e.querySelector('input[name^="end_time_"]'),e=e.querySelector("td.duration");t&&o&&e&&(e.textContent=calcDuration(t.value,o.value))}function deleteRow(e){e.closest("tr").remove();e=document.getElementById("event-rows");Array.from(e.rows).forEach((e,t)=>{e.cells[0].textContent=String(t+1),e.querySelectorAll("input[name]").forEach(e=>{e.name=e.name.replace(/_\d+$/,"_"+t)})})}function applyBulkName(t){document.querySelectorAll('input[name^="title_"]').forEach(e=>{e.value=t})}function applyBulkColor(t){document.querySelectorAll('input[name^="color_id_"]').forEach(e=>{e.value=t}),document.querySelectorAll("#event-rows .color-picker").forEach(e=>{e.querySelectorAll(".swatch").forEach(e=>{e.classList.toggle("active",e.dataset.color===t)})})}document.querySelectorAll("#event-rows tr").forEach(t=>{updateRowDuration(t),t.querySelectorAll('input[name^="start_time_"], input[name^="end_time_"]').forEach(e=>{e.addEventListener("change",()=>updateRowDuration(t))})}),document.querySelectorAll("#event-rows .color-picker").forEach(o=>{o.querySelectorAll(".swatch").forEach(t=>{t.addEventListener("click",()=>{o.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active")),t.classList.add("active");var e=o.parentNode.querySelector('input[type="hidden"]'),e=(e&&(e.value=t.dataset.color),document.getElementById("bulk-color-picker"));e&&e.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active"))})})});const bulkPicker=document.getElementById("bulk-color-picker");async function initAutocomplete(){const r=(await google.maps.importLibrary("places"))["AutocompleteSuggestion"];document.querySelectorAll('input[name^="location_"]').forEach(t=>{const o=document.createElement("datalist");o.id="dl-"+t.name,t.setAttribute("list",o.id),t.parentNode.appendChild(o);let e;t.addEventListener("input",function(){clearTimeout(e),o.innerHTML="",t.value.length<2||(e=setTimeout(async()=>{try{var e=(await r.fetchAutocompleteSuggestions({input:t.value}))["suggestions"];o.innerHTML=e.slice(0,5).map(e=>`<option value="${e.placePrediction.text.text}"></option>`).join("")}catch(e){console.error("autocomplete error:",e)}},300))})})}bulkPicker&&bulkPicker.querySelectorAll(".swatch").forEach(e=>{e.addEventListener("click",()=>{bulkPicker.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active")),e.classList.add("active"),applyBulkColor(e.dataset.color)})});
\ No newline at end of file
+function calcDuration(e,t){var o,r;return!e||!t||([e,o]=e.split(":").map(Number),[t,r]=t.split(":").map(Number),(t=60*t+r-(60*e+o))<=0)?"—":(r=t%60,(e=Math.floor(t/60))&&r?e+`h ${r}m`:e?e+"h":r+"m")}function updateRowDuration(e){var t=e.querySelector('input[data-field="start_time"]'),o=e.querySelector('input[data-field="end_time"]'),e=e.querySelector("td.duration");t&&o&&e&&(e.textContent=calcDuration(t.value,o.value))}const deletedRows=[];function rowValues(e){const t={};return e.querySelectorAll("input[data-field]").forEach(e=>{t[e.dataset.field]=e.value}),t}function deleteRow(e){e=e.closest("tr");deletedRows.push(Number(e.dataset.index)),e.remove(),Array.from(document.getElementById("event-rows").rows).forEach((e,t)=>{e.cells[0].textContent=String(t+1)})}function collectChanges(){const o={};return document.querySelectorAll("#event-rows tr").forEach(e=>{var t=rowValues(e);JSON.stringify(t)!==e.dataset.original&&(o[e.dataset.index]={title:t.title,date:t.date,start_time:t.start_time,end_time:t.end_time||null,description:t.description||null,location:t.location||null,color_id:t.color_id||null})}),{updated:o,deleted:deletedRows}}function applyBulkName(t){document.querySelectorAll('input[data-field="title"]').forEach(e=>{e.value=t})}function applyBulkColor(t){document.querySelectorAll('input[data-field="color_id"]').forEach(e=>{e.value=t}),document.querySelectorAll("#event-rows .color-picker").forEach(e=>{e.querySelectorAll(".swatch").forEach(e=>{e.classList.toggle("active",e.dataset.color===t)})})}document.querySelectorAll("#event-rows tr").forEach(t=>{t.dataset.original=JSON.stringify(rowValues(t)),updateRowDuration(t),t.querySelectorAll('input[data-field="start_time"], input[data-field="end_time"]').forEach(e=>{e.addEventListener("change",()=>updateRowDuration(t))})}),document.querySelectorAll("#event-rows .color-picker").forEach(o=>{const r=o.parentNode.querySelector('input[type="hidden"]').value;o.querySelectorAll(".swatch").forEach(t=>{t.classList.toggle("active",t.dataset.color===r),t.addEventListener("click",()=>{o.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active")),t.classList.add("active");var e=o.parentNode.querySelector('input[type="hidden"]'),e=(e&&(e.value=t.dataset.color),document.getElementById("bulk-color-picker"));e&&e.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active"))})})});const bulkPicker=document.getElementById("bulk-color-picker");async function initAutocomplete(){const r=(await google.maps.importLibrary("places"))["AutocompleteSuggestion"];document.querySelectorAll('input[data-field="location"]').forEach(t=>{const o=document.createElement("datalist");o.id="dl-location-"+t.closest("tr").dataset.index,t.setAttribute("list",o.id),t.parentNode.appendChild(o);let e;t.addEventListener("input",function(){clearTimeout(e),o.innerHTML="",t.value.length<2||(e=setTimeout(async()=>{try{var e=(await r.fetchAutocompleteSuggestions({input:t.value}))["suggestions"];o.innerHTML=e.slice(0,5).map(e=>`<option value="${e.placePrediction.text.text}"></option>`).join("")}catch(e){console.error("autocomplete error:",e)}},300))})})}bulkPicker&&bulkPicker.querySelectorAll(".swatch").forEach(e=>{e.addEventListener("click",()=>{bulkPicker.querySelectorAll(".swatch").forEach(e=>e.classList.remove("active")),e.classList.add("active"),applyBulkColor(e.dataset.color)})}),document.querySelectorAll('form input[name="changes"]').forEach(e=>{e.form.addEventListener("submit",()=>{e.value=JSON.stringify(collectChanges())})});window.EventSource&&document.querySelectorAll("form[data-progress]").forEach(r=>{r.addEventListener("submit",()=>{const s=r.querySelector(".push-progress"),o=r.querySelector(".push-status");var e=r.querySelector('input[name="session_id"]').value;const t=new EventSource("/confirm/progress?session_id="+encodeURIComponent(e));t.onmessage=e=>{var e=JSON.parse(e.data),r="rollback"===e.operation?"undone":"sent";s.hidden=!1,s.max=Math.max(e.total,1),s.value=e.done,o.textContent=e.done+` of ${e.total} change(s) `+r,"running"!==e.status&&t.close()},t.onerror=()=>t.close()})});
\ No newline at end of file
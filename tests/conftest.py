@@ -19,7 +19,8 @@ def make_image_bytes(width: int = 100, height: int = 100, fmt: str = "JPEG") ->
 TEST_SETTINGS = Settings.model_construct(
     anthropic_api_key="sk-ant-test",
     google_oauth_credentials_path=Path("credentials/oauth-client.json"),
-    google_token_path=Path("credentials/token.json"),
+    credential_db_path=Path("credentials/credentials.db"),
+    credential_key="",
     google_calendar_id="primary",
     timezone="America/New_York",
     google_maps_api_key="",
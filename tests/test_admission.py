@@ -0,0 +1,91 @@
+"""Tests for inbound admission control."""
+
+import asyncio
+
+import pytest
+
+from planogram.services import metrics
+from planogram.services.admission import AdmissionGate, AdmissionRejectedError
+
+
+async def hold(gate: AdmissionGate, release: asyncio.Event, log: list[str], name: str) -> None:
+    async with gate.admit():
+        log.append(name)
+        await release.wait()
+
+
+class TestAdmissionGate:
+    def test_disabled_gate_admits_everything(self):
+        async def scenario():
+            gate = AdmissionGate("test")
+            async with gate.admit(), gate.admit():
+                return gate.in_flight
+
+        assert asyncio.run(scenario()) == 0
+
+    def test_queues_then_rejects_when_line_is_full(self):
+        async def scenario():
+            gate = AdmissionGate("test", max_in_flight=1, max_queue=1)
+            release, log = asyncio.Event(), []
+            first = asyncio.create_task(hold(gate, release, log, "first"))
+            second = asyncio.create_task(hold(gate, release, log, "second"))
+            await asyncio.sleep(0)
+            assert (gate.in_flight, gate.queued) == (1, 1)
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                async with gate.admit():
+                    pass
+            release.set()
+            await asyncio.gather(first, second)
+            return gate, log, rejected.value
+
+        rejected_before = metrics.ADMISSION_REJECTED.labels("test", "queue_full")._value.get()
+        gate, log, rejected = asyncio.run(scenario())
+        assert log == ["first", "second"]
+        assert (gate.in_flight, gate.queued) == (0, 0)
+        assert rejected.reason == "queue_full" and rejected.retry_after >= 1
+        assert metrics.ADMISSION_REJECTED.labels("test", "queue_full")._value.get() == rejected_before + 1
+
+    def test_waiting_too_long_is_rejected(self):
+        async def scenario():
+            gate = AdmissionGate("test", max_in_flight=1, max_queue=4, queue_timeout=0.05)
+            release = asyncio.Event()
+            first = asyncio.create_task(hold(gate, release, [], "first"))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                async with gate.admit():
+                    pass
+            release.set()
+            await first
+            return gate, rejected.value
+
+        gate, rejected = asyncio.run(scenario())
+        assert rejected.reason == "timeout"
+        assert (gate.in_flight, gate.queued) == (0, 0)
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            gate = AdmissionGate("test", max_in_flight=1, max_queue=4)
+            release, log = asyncio.Event(), []
+            first = asyncio.create_task(hold(gate, release, log, "first"))
+            gone = asyncio.create_task(hold(gate, release, log, "gone"))
+            third = asyncio.create_task(hold(gate, release, log, "third"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            release.set()
+            await asyncio.gather(first, third)
+            return gate, log
+
+        gate, log = asyncio.run(scenario())
+        assert log == ["first", "third"]
+        assert gate.in_flight == 0
+
+    def test_retry_after_grows_with_the_line(self):
+        gate = AdmissionGate("test", max_in_flight=2, max_queue=10)
+        gate._service_seconds = 10.0
+        assert gate.retry_after() == 5
+        loop = asyncio.new_event_loop()
+        try:
+            gate._waiters.extend(loop.create_future() for _ in range(3))
+            assert gate.retry_after() == 20
+        finally:
+            loop.close()
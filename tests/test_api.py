@@ -0,0 +1,129 @@
+"""Tests for the JSON session and confirm API."""
+
+from datetime import date, time
+from unittest.mock import patch
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from starlette.testclient import TestClient
+
+from main import app
+from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.routes.identity import USER_COOKIE
+from planogram.services import sessions
+from planogram.services.calendar import NeedsAuthError, SyncResult
+from planogram.services.sync import PushProgress
+from tests.conftest import TEST_SETTINGS
+
+ALICE = "a" * 32
+BOB = "b" * 32
+SID = "0f8b3c1e-5d2a-4c6e-9b7a-1e2d3c4b5a69"
+EVENTS = [ScheduleEvent(title="Work", date=date(2025, 1, day), start_time=time(9, 0)) for day in (6, 7, 8)]
+
+
+@pytest.fixture
+def tmp_dir(tmp_path):
+    sessions.save_session(tmp_path, SID, ParsedSchedule(
+        events=EVENTS, raw_ocr_text="raw", source_image_name="roster.jpg", person_name="Jane", user_id=ALICE,
+    ))
+    with patch("planogram.routes.api.TMP_DIR", tmp_path), \
+         patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS):
+        yield tmp_path
+
+
+def browser(user_id=ALICE) -> TestClient:
+    return TestClient(app, cookies={USER_COOKIE: user_id})
+
+
+def confirm(body, sync=None, credentials=None):
+    with patch("planogram.routes.review.cal_service.get_credentials",
+               side_effect=credentials, return_value=object()), \
+         patch("planogram.routes.review.cal_service.sync_events",
+               side_effect=sync or (lambda events, *a, **k: SyncResult(links=["l"] * len(events)))) as mock_sync:
+        return browser().post("/api/confirm", json=body), mock_sync
+
+
+class TestSessions:
+    def test_get_returns_the_schedule_without_its_owner(self, tmp_dir):
+        body = browser().get(f"/api/sessions/{SID}").json()
+        assert [e["date"] for e in body["events"]] == ["2025-01-06", "2025-01-07", "2025-01-08"]
+        assert body["person_name"] == "Jane" and "user_id" not in body
+
+    def test_patch_applies_changes(self, tmp_dir):
+        response = browser().patch(f"/api/sessions/{SID}", json={
+            "updated": {"1": {"title": "Late", "date": "2025-01-07", "start_time": "13:00"}},
+            "deleted": [0],
+        })
+        assert response.json() == {"session_id": SID, "count": 2}
+        stored = sessions.load_session(tmp_dir, SID)
+        assert [e.title for e in stored.events] == ["Late", "Work"]
+        assert stored.user_id == ALICE
+
+    def test_patch_out_of_range_returns_422(self, tmp_dir):
+        assert browser().patch(f"/api/sessions/{SID}", json={"deleted": [5]}).status_code == 422
+        assert sessions.load_session(tmp_dir, SID).events == EVENTS
+
+    def test_other_users_session_is_forbidden(self, tmp_dir):
+        other = browser(BOB)
+        assert other.get(f"/api/sessions/{SID}").status_code == 403
+        assert other.patch(f"/api/sessions/{SID}", json={}).status_code == 403
+        assert other.post("/api/confirm", json={"session_id": SID}).status_code == 403
+
+    def test_unknown_session_returns_404(self, tmp_dir):
+        assert browser().get("/api/sessions/6a1d7b2e-0c3f-4e5a-8b9c-0d1e2f3a4b5c").status_code == 404
+        assert browser().get("/api/sessions/missing").status_code == 422
+
+
+class TestConfirm:
+    def test_changes_are_applied_and_repeated(self, tmp_dir):
+        response, mock_sync = confirm({"session_id": SID, "changes": {"deleted": [1, 2]}, "repeat_weeks": 2,
+                                       "notification_minutes": 10})
+        assert response.status_code == 200
+        assert response.json() == {"session_id": SID, "count": 3, "links": ["l", "l", "l"], "inserted": 0,
+                                   "patched": 0, "deleted": 0, "unchanged": 0}
+        assert [e.date.day for e in mock_sync.call_args.args[0]] == [6, 13, 20]
+        assert mock_sync.call_args.kwargs["person"] == "Jane"
+        assert mock_sync.call_args.kwargs["notification_minutes"] == 10
+        assert sessions.load_session(tmp_dir, SID) is None
+
+    def test_full_event_array_replaces_the_stored_events(self, tmp_dir):
+        events = [{"title": "Work", "date": "2025-02-03", "start_time": "08:00", "end_time": "16:00"}] * 2
+        response, mock_sync = confirm({"session_id": SID, "events": events})
+        assert response.status_code == 200
+        assert [e.date.day for e in mock_sync.call_args.args[0]] == [3, 3]
+
+    @pytest.mark.parametrize("body", [{"changes": {}}, {"events": []}])
+    def test_missing_session_returns_404(self, tmp_dir, body):
+        response, mock_sync = confirm({"session_id": "6a1d7b2e-0c3f-4e5a-8b9c-0d1e2f3a4b5c", **body})
+        assert response.status_code == 404
+        mock_sync.assert_not_called()
+
+    def test_session_id_must_be_a_uuid(self, tmp_dir):
+        response, mock_sync = confirm({"session_id": "../escape", "events": []})
+        assert response.status_code == 422
+        assert browser().get("/api/sessions/..%2Fescape").status_code in (404, 422)
+        mock_sync.assert_not_called()
+        assert not (tmp_dir.parent / "escape_push.json").exists()
+
+    def test_invalid_event_is_rejected_before_pushing(self, tmp_dir):
+        response, mock_sync = confirm({"session_id": SID, "events": [{"title": "Work", "date": "someday"}]})
+        assert response.status_code == 422
+        mock_sync.assert_not_called()
+
+    def test_missing_authorization_returns_auth_url(self, tmp_dir):
+        response, mock_sync = confirm({"session_id": SID, "changes": {"deleted": [0]}}, credentials=NeedsAuthError)
+        assert response.status_code == 401
+        assert response.json()["auth_url"] == f"/auth/start?session_id={SID}"
+        assert len(sessions.load_pending(tmp_dir, SID).events) == 2
+        mock_sync.assert_not_called()
+
+    def test_calendar_error_reports_progress(self, tmp_dir):
+        def fail(*args, on_progress, **kwargs):
+            on_progress(PushProgress(status="failed", total=3, done=1))
+            raise HttpError(httplib2.Response({"status": 500}), b"")
+
+        response, _ = confirm({"session_id": SID}, sync=fail)
+        assert response.status_code == 502
+        assert response.json()["done"] == 1 and response.json()["total"] == 3
+        assert sessions.load_session(tmp_dir, SID).events == EVENTS
@@ -0,0 +1,167 @@
+"""Smoke tests for the offline benchmark harness."""
+
+import json
+
+from benchmarks import run
+from benchmarks.replay import LatencyModel, ReplayAnthropic, load_recording
+
+
+class TestLatencyModel:
+    def test_zero_scale_disables_latency(self):
+        model = LatencyModel({"pass1": {"p50": 15.0, "p95": 45.0}}, scale=0)
+        assert model.sample("pass1") == 0.0
+
+    def test_samples_center_on_p50(self):
+        model = LatencyModel({"pass1": {"p50": 10.0, "p95": 30.0}}, seed=1)
+        samples = sorted(model.sample("pass1") for _ in range(2001))
+        assert 8.0 < samples[1000] < 12.0
+        assert 20.0 < samples[1900] < 45.0
+
+    def test_unknown_stage_is_instant(self):
+        assert LatencyModel({}).sample("calendar") == 0.0
+
+
+class TestReplayAnthropic:
+    def test_pass1_returns_recorded_transcription(self):
+        recording = load_recording()
+        client = ReplayAnthropic(recording, LatencyModel({}, scale=0))
+        msg = client.messages.create(
+            model="claude-opus-4-7",
+            max_tokens=10,
+            messages=[{"role": "user", "content": [{"type": "image", "source": {}}, {"type": "text", "text": ""}]}],
+        )
+        assert msg.content[0].text.startswith("DATE:")
+
+    def test_unrecorded_pass2_is_echoed_and_counted(self):
+        client = ReplayAnthropic({"pass2": {}}, LatencyModel({}, scale=0))
+        msg = client.messages.create(
+            model="claude-sonnet-4-6",
+            max_tokens=10,
+            messages=[{"role": "user", "content": "Schedule text:\nClark Kent | 2025-01-06 | 09:00 | 17:00"}],
+        )
+        assert json.loads(msg.content[0].text)[0]["title"] == "Clark Kent"
+        assert client.misses == 1
+
+
+class TestRun:
+    def test_all_scenarios_write_results(self, tmp_path):
+        output = tmp_path / "results.json"
+        run.main(["--iterations", "2", "--warmup", "0", "--events", "5", "--latency-scale", "0",
+                  "--output", str(output)])
+        document = json.loads(output.read_text())
+        assert set(document["scenarios"]) == set(run.SCENARIOS)
+        for result in document["scenarios"].values():
+            assert result["p95_ms"] >= result["p50_ms"] > 0
+            assert result["peak_kib"] > 0
+
+    def test_compare(self, tmp_path, capsys):
+        result = {"p50_ms": 10.0, "p95_ms": 20.0, "throughput_per_s": 5.0, "net_alloc_kib": 1.0, "peak_kib": 100.0}
+        a = tmp_path / "a.json"
+        b = tmp_path / "b.json"
+        a.write_text(json.dumps({"scenarios": {"upload": result}}))
+        b.write_text(json.dumps({"scenarios": {"upload": {**result, "p50_ms": 15.0}}}))
+        run.main(["compare", str(a), str(b)])
+        assert "+50.0%" in capsys.readouterr().out
+
+
+class TestFakeServers:
+    def _client(self, **kwargs):
+        from starlette.testclient import TestClient
+
+        from benchmarks.fake_servers import FaultConfig, create_anthropic_app
+
+        return TestClient(create_anthropic_app(FaultConfig(LatencyModel({}, scale=0), **kwargs)))
+
+    def test_anthropic_serves_transcription_for_images(self):
+        response = self._client().post("/v1/messages", json={
+            "model": "claude-haiku-4-5",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": [{"type": "image", "source": {}}]}],
+        })
+        assert response.status_code == 200
+        assert response.json()["content"][0]["text"].startswith("DATE:")
+
+    def test_anthropic_echoes_pass2_lines(self):
+        response = self._client().post("/v1/messages", json={
+            "model": "claude-sonnet-4-6",
+            "max_tokens": 10,
+            "messages": [{"role": "user", "content": "Schedule text:\nClark Kent | 2025-01-06 | 09:00 | 17:00"}],
+        })
+        assert json.loads(response.json()["content"][0]["text"])[0]["title"] == "Clark Kent"
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        client = self._client(rate_limit_rps=1)
+        body = {"model": "m", "max_tokens": 1, "messages": [{"role": "user", "content": ""}]}
+        statuses = [client.post("/v1/messages", json=body).status_code for _ in range(3)]
+        assert statuses[0] == 200
+        assert 429 in statuses
+        assert client.get("/stats").json()["rate_limited"] >= 1
+
+    def test_error_rate_one_always_fails(self):
+        body = {"model": "m", "max_tokens": 1, "messages": [{"role": "user", "content": ""}]}
+        assert self._client(error_rate=1.0).post("/v1/messages", json=body).status_code == 529
+
+    def test_calendar_insert_returns_event(self):
+        from starlette.testclient import TestClient
+
+        from benchmarks.fake_servers import FaultConfig, create_calendar_app
+
+        client = TestClient(create_calendar_app(FaultConfig(LatencyModel({}, scale=0))))
+        response = client.post("/calendar/v3/calendars/primary/events", json={"summary": "Shift"})
+        assert response.json()["htmlLink"].startswith("https://www.google.com/calendar/event?eid=")
+        assert client.get("/stats").json()["events"] == 1
+
+    def test_calendar_list_patch_delete(self):
+        from starlette.testclient import TestClient
+
+        from benchmarks.fake_servers import FaultConfig, create_calendar_app
+
+        client = TestClient(create_calendar_app(FaultConfig(LatencyModel({}, scale=0))))
+        base = "/calendar/v3/calendars/primary/events"
+        tagged = {"extendedProperties": {"private": {"planogramPerson": "_"}}}
+        event_id = client.post(base, json={"summary": "Shift", **tagged}).json()["id"]
+        client.post(base, json={"summary": "Other"})
+        listed = client.get(base, params={"privateExtendedProperty": "planogramPerson=_"}).json()["items"]
+        assert [e["id"] for e in listed] == [event_id]
+        assert client.patch(f"{base}/{event_id}", json={"summary": "Late"}).json()["summary"] == "Late"
+        assert client.delete(f"{base}/{event_id}").status_code == 204
+        assert client.delete(f"{base}/{event_id}").status_code == 410
+        assert client.get(f"{base}/{event_id}").json()["status"] == "cancelled"
+
+    def test_calendar_insert_with_existing_id_conflicts(self):
+        from starlette.testclient import TestClient
+
+        from benchmarks.fake_servers import FaultConfig, create_calendar_app
+
+        client = TestClient(create_calendar_app(FaultConfig(LatencyModel({}, scale=0))))
+        base = "/calendar/v3/calendars/primary/events"
+        assert client.post(base, json={"id": "abc12", "summary": "Shift"}).status_code == 200
+        assert client.post(base, json={"id": "abc12", "summary": "Shift"}).status_code == 409
+
+
+class TestLoad:
+    def test_form_fields_scrapes_inputs_and_defaults_selects(self):
+        from benchmarks.load import form_fields
+
+        page = ('<input type="hidden" name="session_id" value="abc">'
+                '<input type="text" name="title_0" value="Tom &amp; Jerry" required>')
+        fields = form_fields(page)
+        assert fields["session_id"] == "abc"
+        assert fields["title_0"] == "Tom & Jerry"
+        assert fields["repeat_weeks"] == "0"
+
+    def test_find_knee(self):
+        from benchmarks.load import find_knee
+
+        levels = [{"concurrency": c, "throughput_per_s": t} for c, t in ((1, 1.0), (2, 1.9), (4, 2.0))]
+        assert find_knee(levels, 0.1) == 2
+        assert find_knee(levels[:2], 0.1) is None
+
+
+class TestCodec:
+    def test_every_case_round_trips(self, capsys):
+        from benchmarks import codec
+
+        assert codec.main(["--events", "20", "--runs", "1"]) == 0
+        output = capsys.readouterr().out
+        assert "pending, per-event (before)" in output and "pending, bulk codec" in output
@@ -68,3 +68,22 @@ class TestBuildEventBody:
     def test_summary_matches_title(self):
         body = build_event_body(make_event(title="Night Shift"), TZ)
         assert body["summary"] == "Night Shift"
+
+
+class TestBuildService:
+    def test_api_endpoint_override(self):
+        from google.oauth2.credentials import Credentials
+
+        from planogram.services.calendar import build_service
+
+        service = build_service(Credentials(token="t"), "http://127.0.0.1:9002/calendar/v3/")
+        request = service.events().insert(calendarId="primary", body={})
+        assert request.uri.startswith("http://127.0.0.1:9002/calendar/v3/calendars/primary/events")
+
+    def test_default_endpoint_is_google(self):
+        from google.oauth2.credentials import Credentials
+
+        from planogram.services.calendar import build_service
+
+        request = build_service(Credentials(token="t")).events().insert(calendarId="primary", body={})
+        assert request.uri.startswith("https://www.googleapis.com/calendar/v3/")
@@ -0,0 +1,138 @@
+"""Tests for the ``planogram`` batch command."""
+
+import json
+from datetime import date, time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from planogram import cli
+from planogram.models import ScheduleEvent
+from planogram.services.calendar import NeedsAuthError, SyncResult
+from tests.conftest import TEST_SETTINGS, make_image_bytes
+
+EVENTS = [ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0), end_time=time(17, 0))]
+
+
+@pytest.fixture
+def settings(tmp_path):
+    settings = TEST_SETTINGS.model_copy(update={
+        "usage_db_path": tmp_path / "usage.db",
+        "sync_state_path": tmp_path / "pushed.db",
+    })
+    with patch("planogram.cli.get_settings", return_value=settings):
+        yield settings
+
+
+@pytest.fixture
+def rosters(tmp_path):
+    folder = tmp_path / "rosters"
+    folder.mkdir()
+    for name in ("a.jpg", "b.png"):
+        (folder / name).write_bytes(make_image_bytes(fmt="PNG" if name.endswith("png") else "JPEG"))
+    (folder / "notes.txt").write_text("not a schedule")
+    return folder
+
+
+def run(*argv) -> tuple[int, object]:
+    with patch("planogram.cli.parser.parse_events", return_value=(EVENTS, "raw")) as parse:
+        return cli.main([str(arg) for arg in argv]), parse
+
+
+class TestFindImages:
+    def test_directories_expand_to_their_images(self, rosters):
+        assert [p.name for p in cli.find_images([rosters])] == ["a.jpg", "b.png"]
+
+    def test_named_files_are_kept_once(self, rosters):
+        notes = rosters / "notes.txt"
+        assert cli.find_images([notes, rosters, notes]) == [notes, rosters / "a.jpg", rosters / "b.png"]
+
+
+class TestBatch:
+    def test_json_output_and_manifest(self, settings, rosters, tmp_path, capsys):
+        out = tmp_path / "out"
+        status, parse = run(rosters, "--out-dir", out, "--person", "Jane")
+        assert status == 0
+        assert parse.call_count == 2
+        assert parse.call_args.kwargs["person_name"] == "Jane"
+        saved = json.loads((out / "a.json").read_text())
+        assert saved["events"][0]["title"] == "Work" and saved["person_name"] == "Jane"
+        manifest = cli.Manifest.load(out / "manifest.json")
+        assert {entry.status for entry in manifest.files.values()} == {"done"}
+        assert "2 done, 0 failed, 0 skipped" in capsys.readouterr().out
+
+    def test_ics_output(self, settings, rosters, tmp_path):
+        out = tmp_path / "out"
+        status, _ = run(rosters / "a.jpg", "--out-dir", out, "--output", "ics")
+        assert status == 0
+        assert "SUMMARY:Work" in (out / "a.ics").read_text()
+
+    def test_rerun_skips_finished_files(self, settings, rosters, tmp_path):
+        out = tmp_path / "out"
+        run(rosters, "--out-dir", out)
+        status, parse = run(rosters, "--out-dir", out)
+        assert status == 0 and parse.call_count == 0
+        (rosters / "b.png").write_bytes(make_image_bytes(200, 100, fmt="PNG"))
+        _, parse = run(rosters, "--out-dir", out)
+        assert parse.call_count == 1
+
+    def test_failed_files_are_retried(self, settings, rosters, tmp_path, capsys):
+        out = tmp_path / "out"
+        (rosters / "c.jpg").write_bytes(b"not an image")
+        status, _ = run(rosters, "--out-dir", out)
+        assert status == 1
+        entry = cli.Manifest.load(out / "manifest.json").files[str((rosters / "c.jpg").resolve())]
+        assert entry.status == "failed" and entry.error
+        assert "failed" in capsys.readouterr().out
+        (rosters / "c.jpg").write_bytes(make_image_bytes())
+        status, parse = run(rosters, "--out-dir", out)
+        assert status == 0 and parse.call_count == 1
+
+
+    def test_images_with_the_same_stem_get_separate_outputs(self, settings, rosters, tmp_path):
+        out = tmp_path / "out"
+        (rosters / "sub").mkdir()
+        (rosters / "sub" / "b.png").write_bytes(make_image_bytes(fmt="PNG"))
+        (rosters / "a.png").write_bytes(make_image_bytes(fmt="PNG"))
+        status, _ = run(rosters, rosters / "sub", "--out-dir", out)
+        assert status == 0
+        outputs = {entry.output for entry in cli.Manifest.load(out / "manifest.json").files.values()}
+        assert len(outputs) == 4 and all(Path(output).exists() for output in outputs)
+        assert not (out / "a.json").exists() and not (out / "b.json").exists()
+
+    def test_name_written_by_an_earlier_run_is_not_reused(self, settings, rosters, tmp_path):
+        out = tmp_path / "out"
+        run(rosters / "a.jpg", "--out-dir", out)
+        other = tmp_path / "other"
+        other.mkdir()
+        (other / "a.jpg").write_bytes(make_image_bytes(200, 100))
+        run(other / "a.jpg", "--out-dir", out)
+        files = cli.Manifest.load(out / "manifest.json").files
+        assert files[str((rosters / "a.jpg").resolve())].output == str(out / "a.json")
+        assert files[str((other / "a.jpg").resolve())].output != str(out / "a.json")
+
+
+class TestPush:
+    def test_push_syncs_with_the_users_token(self, settings, rosters, tmp_path):
+        result = SyncResult(links=["https://calendar/1"], inserted=1)
+        with patch("planogram.cli.cal_service.get_credentials", return_value="creds") as get_credentials, \
+             patch("planogram.cli.cal_service.sync_events", return_value=result) as sync:
+            status, _ = run(rosters / "a.jpg", "--out-dir", tmp_path / "out", "--output", "push", "--user", "u1")
+        assert status == 0
+        get_credentials.assert_called_with("u1", settings.credential_db_path, settings.credential_key)
+        assert sync.call_args.kwargs["account"] == "u1"
+        # The session id is derived from the file, so a retried push reuses its event ids
+        assert sync.call_args.kwargs["session_id"] == cli.Manifest.load(
+            tmp_path / "out" / "manifest.json"
+        ).files[str((rosters / "a.jpg").resolve())].digest[:32]
+
+    def test_push_without_authorization_stops_early(self, settings, rosters, tmp_path, capsys):
+        with patch("planogram.cli.cal_service.get_credentials", side_effect=NeedsAuthError):
+            status, parse = run(rosters, "--out-dir", tmp_path / "out", "--output", "push", "--user", "u1")
+        assert status == 2 and parse.call_count == 0
+        assert "authorization" in capsys.readouterr().err
+
+    def test_push_needs_a_user(self, settings, rosters):
+        with pytest.raises(SystemExit):
+            run(rosters, "--output", "push")
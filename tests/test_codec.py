@@ -0,0 +1,73 @@
+"""Tests for the bulk session codec."""
+
+import json
+from datetime import date, time
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.services import codec
+
+EVENTS = [
+    ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0), end_time=time(17, 0)),
+    ScheduleEvent(title="Close", date=date(2025, 1, 7), start_time=time(14, 0), location="Store 12"),
+]
+TRANSCRIPTION = "DATE: 2025-01-06\nClark Kent | 09:00 | 17:00\n" * 40
+
+
+def make_schedule(raw_ocr_text: str = TRANSCRIPTION) -> ParsedSchedule:
+    return ParsedSchedule(events=EVENTS, raw_ocr_text=raw_ocr_text, source_image_name="a.jpg", user_id="u1")
+
+
+class TestEvents:
+    def test_round_trip(self):
+        data = codec.encode_events(EVENTS)
+        assert isinstance(data, bytes)
+        assert json.loads(data)[1]["location"] == "Store 12"
+        assert codec.decode_events(data) == EVENTS
+
+    def test_invalid_event_is_rejected(self):
+        with pytest.raises(ValidationError):
+            codec.decode_events(b'[{"title": "Work", "date": "not a date", "start_time": "09:00"}]')
+
+
+class TestSchedule:
+    @pytest.mark.parametrize("compression", ["none", "gzip"])
+    def test_round_trip(self, compression):
+        schedule = make_schedule()
+        assert codec.decode_schedule(codec.encode_schedule(schedule, compression)) == schedule
+
+    def test_gzip_shrinks_the_transcription(self):
+        plain = codec.encode_schedule(make_schedule())
+        packed = codec.encode_schedule(make_schedule(), "gzip")
+        assert len(packed) < len(plain) / 4
+        assert json.loads(packed)["raw_ocr_text"].startswith("\x00gzip:")
+
+    def test_short_transcriptions_are_left_alone(self):
+        data = codec.encode_schedule(make_schedule("DATE: 2025-01-06"), "gzip")
+        assert json.loads(data)["raw_ocr_text"] == "DATE: 2025-01-06"
+
+    def test_encoding_does_not_change_the_schedule(self):
+        schedule = make_schedule()
+        codec.encode_schedule(schedule, "gzip")
+        assert schedule.raw_ocr_text == TRANSCRIPTION
+
+
+class TestCompression:
+    def test_zstd_falls_back_to_gzip_without_the_stdlib_module(self):
+        with patch("planogram.services.codec._zstd", return_value=None):
+            assert codec.available("zstd") == "gzip"
+        assert codec.available("none") == "none"
+
+    def test_zstd_round_trip(self):
+        if codec._zstd() is None:
+            pytest.skip("compression.zstd needs Python 3.14")
+        stored = codec.compress_text(TRANSCRIPTION, "zstd")
+        assert stored.startswith("\x00zstd:")
+        assert codec.decompress_text(stored) == TRANSCRIPTION
+
+    def test_unknown_codec_is_an_error(self):
+        with pytest.raises(ValueError):
+            codec.decompress_text("\x00lz4:AAAA")
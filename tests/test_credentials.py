@@ -0,0 +1,164 @@
+"""Tests for the encrypted credential store and its in-memory cache."""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+from google.oauth2.credentials import Credentials
+
+from planogram.services import calendar
+from planogram.services.credentials import CredentialCache, CredentialStore, load_key
+
+SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
+ALICE = "a" * 32
+BOB = "b" * 32
+
+
+def make_creds(expires_in: timedelta, token: str = "access") -> Credentials:
+    expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+    return Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=SCOPES,
+        expiry=expiry,
+    )
+
+
+def fake_refresh(calls: list, delay: float = 0.0):
+    def refresh(self, request):
+        calls.append(self)
+        time.sleep(delay)
+        self.token = f"fresh-{len(calls)}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    return refresh
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CredentialStore(tmp_path / "credentials" / "credentials.db", Fernet.generate_key())
+
+
+class TestLoadKey:
+    def test_generates_private_key_file_once(self, tmp_path):
+        key_path = tmp_path / "credentials.key"
+        key = load_key("", key_path)
+        assert load_key("", key_path) == key
+        assert key_path.stat().st_mode & 0o777 == 0o600
+        Fernet(key)
+
+    def test_configured_key_wins(self, tmp_path):
+        key = Fernet.generate_key()
+        assert load_key(key.decode(), tmp_path / "credentials.key") == key
+        assert not (tmp_path / "credentials.key").exists()
+
+
+class TestCredentialStore:
+    def test_round_trip_per_user(self, store):
+        store.save(ALICE, '{"token": "alice"}')
+        store.save(BOB, '{"token": "bob"}')
+        assert store.load(ALICE) == '{"token": "alice"}'
+        assert store.load(BOB) == '{"token": "bob"}'
+        store.delete(ALICE)
+        assert store.load(ALICE) is None
+
+    def test_tokens_are_encrypted_at_rest(self, store):
+        store.save(ALICE, '{"token": "very-secret-access-token"}')
+        assert b"very-secret-access-token" not in store.db_path.read_bytes()
+        wal = store.db_path.with_name(store.db_path.name + "-wal")
+        if wal.exists():
+            assert b"very-secret-access-token" not in wal.read_bytes()
+
+    def test_wrong_key_cannot_read(self, store):
+        store.save(ALICE, '{"token": "alice"}')
+        other = CredentialStore(store.db_path, Fernet.generate_key())
+        with pytest.raises(Exception):
+            other.load(ALICE)
+
+
+class TestCredentialCache:
+    def test_reads_store_once(self, store):
+        store.save(ALICE, make_creds(timedelta(hours=1)).to_json())
+        cache = CredentialCache(store, SCOPES)
+        first = cache.get(ALICE)
+        store.delete(ALICE)
+        assert cache.get(ALICE) is first
+
+    def test_missing_token_is_not_cached(self, store):
+        cache = CredentialCache(store, SCOPES)
+        assert cache.get(ALICE) is None
+        store.save(ALICE, make_creds(timedelta(hours=1)).to_json())
+        assert cache.get(ALICE).token == "access"
+
+    def test_least_recently_used_user_is_evicted(self, store):
+        cache = CredentialCache(store, SCOPES, max_entries=2)
+        carol = "c" * 32
+        for user_id in (ALICE, BOB, carol):
+            store.save(user_id, make_creds(timedelta(hours=1), token=user_id[0]).to_json())
+        cache.get(ALICE)
+        cache.get(BOB)
+        cache.get(ALICE)
+        cache.get(carol)
+        store.delete(ALICE)
+        store.delete(BOB)
+        assert cache.get(ALICE).token == "a"
+        assert cache.get(BOB) is None
+
+    def test_refresh_due_only_near_expiry(self, store):
+        calls = []
+        cache = CredentialCache(store, SCOPES, margin=timedelta(minutes=10))
+        with patch.object(Credentials, "refresh", fake_refresh(calls)):
+            cache.put(ALICE, make_creds(timedelta(hours=1)))
+            cache.put(BOB, make_creds(timedelta(minutes=5)))
+            assert cache.refresh_due() == 1
+        assert len(calls) == 1
+        assert cache.get(BOB).token == "fresh-1"
+        assert CredentialCache(store, SCOPES).get(BOB).token == "fresh-1"
+        assert cache.get(ALICE).token == "access"
+
+    def test_concurrent_refreshes_are_single_flight(self, store):
+        calls = []
+        cache = CredentialCache(store, SCOPES)
+        cache.put(ALICE, make_creds(timedelta(minutes=-5)))
+        results = []
+        with patch.object(Credentials, "refresh", fake_refresh(calls, delay=0.05)):
+            threads = [threading.Thread(target=lambda: results.append(cache.refresh(ALICE))) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert len(calls) == 1
+        assert {creds.token for creds in results} == {"fresh-1"}
+
+    def test_picks_up_token_refreshed_by_another_worker(self, store):
+        calls = []
+        cache = CredentialCache(store, SCOPES)
+        cache.put(ALICE, make_creds(timedelta(minutes=-5)))
+        store.save(ALICE, make_creds(timedelta(hours=1), token="other-worker").to_json())
+        with patch.object(Credentials, "refresh", fake_refresh(calls)):
+            assert cache.refresh(ALICE).token == "other-worker"
+        assert calls == []
+
+
+class TestGetCredentials:
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return tmp_path / "credentials.db"
+
+    def test_expired_token_refreshed_in_request(self, db_path):
+        calendar.credential_cache(db_path).put(ALICE, make_creds(timedelta(minutes=-5)))
+        calls = []
+        with patch.object(Credentials, "refresh", fake_refresh(calls)):
+            assert calendar.get_credentials(ALICE, db_path).token == "fresh-1"
+            assert calendar.get_credentials(ALICE, db_path).token == "fresh-1"
+        assert len(calls) == 1
+
+    def test_users_do_not_share_tokens(self, db_path):
+        calendar.credential_cache(db_path).put(ALICE, make_creds(timedelta(hours=1)))
+        with pytest.raises(calendar.NeedsAuthError):
+            calendar.get_credentials(BOB, db_path)
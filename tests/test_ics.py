@@ -0,0 +1,46 @@
+"""Tests for the iCalendar export."""
+
+from datetime import date, time
+
+from planogram.models import ScheduleEvent
+from planogram.services.ics import to_ics
+
+TZ = "America/New_York"
+
+
+def make_event(**kwargs) -> ScheduleEvent:
+    defaults = {"title": "Work", "date": date(2025, 1, 6), "start_time": time(9, 0)}
+    defaults.update(kwargs)
+    return ScheduleEvent(**defaults)
+
+
+class TestToIcs:
+    def test_timed_event(self):
+        body = to_ics([make_event(end_time=time(17, 0))], TZ)
+        assert "DTSTART;TZID=America/New_York:20250106T090000" in body
+        assert "DTEND;TZID=America/New_York:20250106T170000" in body
+        assert body.startswith("BEGIN:VCALENDAR\r\n")
+        assert body.endswith("END:VCALENDAR\r\n")
+
+    def test_overnight_shift_ends_next_day(self):
+        body = to_ics([make_event(start_time=time(22, 0), end_time=time(6, 0))], TZ)
+        assert "DTEND;TZID=America/New_York:20250107T060000" in body
+
+    def test_all_day_event(self):
+        body = to_ics([make_event()], TZ)
+        assert "DTSTART;VALUE=DATE:20250106" in body
+        assert "DTEND;VALUE=DATE:20250107" in body
+
+    def test_alarm_only_with_positive_minutes(self):
+        assert "TRIGGER:-PT30M" in to_ics([make_event()], TZ, notification_minutes=30)
+        assert "VALARM" not in to_ics([make_event()], TZ, notification_minutes=0)
+
+    def test_text_is_escaped_and_folded(self):
+        body = to_ics([make_event(title="A, B; C", description="x" * 200)], TZ)
+        assert r"SUMMARY:A\, B\; C" in body
+        assert all(len(line.encode()) <= 75 for line in body.split("\r\n"))
+
+    def test_uid_is_stable(self):
+        first = [ln for ln in to_ics([make_event()], TZ).split("\r\n") if ln.startswith("UID:")]
+        second = [ln for ln in to_ics([make_event()], TZ).split("\r\n") if ln.startswith("UID:")]
+        assert first == second
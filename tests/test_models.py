@@ -5,7 +5,7 @@ from datetime import date, time
 import pytest
 from pydantic import ValidationError
 
-from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.models import ConfirmRequest, EventChanges, ParsedSchedule, ScheduleEvent
 
 
 class TestScheduleEvent:
@@ -74,3 +74,26 @@ class TestParsedSchedule:
     def test_missing_source_image_name_raises(self):
         with pytest.raises(ValidationError):
             ParsedSchedule(raw_ocr_text="raw")
+
+
+class TestEventChanges:
+    EVENTS = [ScheduleEvent(title=f"Shift {day}", date=date(2025, 1, day), start_time=time(9, 0)) for day in (6, 7, 8)]
+
+    def test_apply_updates_deletes_and_appends(self):
+        late = ScheduleEvent(title="Late", date=date(2025, 1, 8), start_time=time(13, 0))
+        extra = ScheduleEvent(title="Extra", date=date(2025, 1, 9), start_time=time(9, 0))
+        changes = EventChanges.model_validate_json(
+            '{"updated": {"2": %s}, "deleted": [0], "added": [%s]}' % (late.model_dump_json(), extra.model_dump_json())
+        )
+        assert changes.apply(self.EVENTS) == [self.EVENTS[1], late, extra]
+        assert len(self.EVENTS) == 3
+
+    def test_out_of_range_index_raises(self):
+        with pytest.raises(ValueError, match="index 3"):
+            EventChanges(deleted=[3]).apply(self.EVENTS)
+
+    def test_confirm_request_takes_events_or_changes(self):
+        with pytest.raises(ValidationError):
+            ConfirmRequest(session_id="s1", events=[], changes=EventChanges())
+        with pytest.raises(ValidationError):
+            ConfirmRequest(session_id="s1", repeat_weeks=-1)
@@ -0,0 +1,74 @@
+"""Tests for the indexed roster name matcher."""
+
+from planogram.services.names import RosterIndex, normalize, osa_distance
+
+LINES = [
+    "Clark Kent | 2025-01-06 | 09:00 | 17:00",
+    "Lois Lane | 2025-01-06 | 10:00 | 18:00",
+    "Alex Luthor | 2025-01-06 | 11:00 | 19:00",
+    "Sal Vitale | 2025-01-06 | 12:00 | 20:00",
+    "J. Olsen | 2025-01-06 | 13:00 | 21:00",
+    "Clark Kent | 2025-01-07 | 09:00 | 17:00",
+]
+
+
+def labels(matches):
+    return [m.label for m in matches]
+
+
+class TestNormalize:
+    def test_strips_case_accents_and_punctuation(self):
+        assert normalize("  José O'Neil-Smith ") == ["jose", "o", "neil", "smith"]
+
+
+class TestOsaDistance:
+    def test_transposition_is_one_edit(self):
+        assert osa_distance("kent", "knet") == 1
+
+    def test_capped_above_limit(self):
+        assert osa_distance("clark", "lois", limit=1) == 2
+
+
+class TestRosterIndex:
+    index = RosterIndex(LINES)
+
+    def test_rows_grouped_by_label(self):
+        assert self.index.labels == ["Clark Kent", "Lois Lane", "Alex Luthor", "Sal Vitale", "J. Olsen"]
+        assert self.index.match("Clark Kent")[0].rows == 2
+
+    def test_exact_full_name(self):
+        [match] = self.index.match("clark kent")
+        assert match.label == "Clark Kent"
+        assert match.confidence == 1.0
+
+    def test_short_name_is_not_a_substring_match(self):
+        assert self.index.match("Al") == []
+
+    def test_one_ocr_typo_is_tolerated_with_lower_confidence(self):
+        [match] = self.index.match("Kemt")
+        assert match.label == "Clark Kent"
+        assert match.confidence == 0.8
+
+    def test_initials_match_both_ways(self):
+        assert labels(self.index.match("Jimmy Olsen")) == ["J. Olsen"]
+        assert self.index.match("Jimmy Olsen")[0].confidence == 0.8
+        assert labels(self.index.match("C Kent")) == ["Clark Kent"]
+
+    def test_partial_query_below_threshold_is_dropped(self):
+        assert self.index.match("Bruce Lane", min_confidence=0.6) == []
+        assert labels(self.index.match("Bruce Lane")) == ["Lois Lane"]
+
+    def test_shared_first_and_last_names_are_not_selected(self):
+        index = RosterIndex([
+            "Jane Doe | 2025-01-06 | 09:00 | 17:00",
+            "Jane Smith | 2025-01-06 | 10:00 | 18:00",
+            "John Doe | 2025-01-07 | 09:00 | 17:00",
+        ])
+        assert labels(index.match("Jane Doe")) == ["Jane Doe"]
+        assert labels(index.match("J Doe")) == ["Jane Doe", "John Doe"]
+        assert labels(index.match("Jame Doe")) == ["Jane Doe"]
+        assert sorted(labels(index.match("Jane"))) == ["Jane Doe", "Jane Smith"]
+
+    def test_lines_for_preserves_original_order(self):
+        matches = self.index.match("Lois") + self.index.match("Clark")
+        assert self.index.lines_for(matches) == [LINES[0], LINES[1], LINES[5]]
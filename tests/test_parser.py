@@ -1,6 +1,93 @@
 """Tests for the parser service helper functions."""
 
-from planogram.services.parser import filter_lines, to_pipe_lines
+import io
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from anthropic.types import TextBlock
+from PIL import Image, ImageDraw
+
+from planogram.config import Settings
+from planogram.services.parser import (
+    ImageComplexity,
+    _extract,
+    _extract_all,
+    _extract_cache,
+    choose_transcribe_model,
+    chunk_lines,
+    crop_columns,
+    estimate_complexity,
+    estimate_output_tokens,
+    filter_lines,
+    parse_events_by_person,
+    reextract_events,
+    select_lines,
+    split_blocks,
+    split_by_person,
+    to_pipe_lines,
+    transcription_is_valid,
+)
+from tests.conftest import TEST_SETTINGS
+
+
+class FakeExtractClient:
+    """Minimal stand-in for ``Anthropic`` that echoes each pipe line as an event.
+
+    Requests with more than ``max_lines`` lines report a ``max_tokens`` stop to
+    simulate a truncated response.
+    """
+
+    def __init__(self, max_lines: int = 1000):
+        self.max_lines = max_lines
+        self.calls: list[list[str]] = []
+        self.models: list[str] = []
+        self._lock = threading.Lock()
+        self.messages = SimpleNamespace(create=self._create)
+
+    def with_options(self, **_):
+        return self
+
+    def _create(self, **kwargs):
+        text = kwargs["messages"][0]["content"]
+        if isinstance(text, list):
+            with self._lock:
+                self.calls.append(["<image>"])
+            usage = SimpleNamespace(input_tokens=1600, output_tokens=100)
+            return SimpleNamespace(
+                stop_reason="end_turn", content=[TextBlock(type="text", text=ROSTER)], usage=usage
+            )
+        lines = [ln for ln in text.split("Schedule text:\n", 1)[1].splitlines() if "|" in ln]
+        with self._lock:
+            self.calls.append(lines)
+            self.models.append(kwargs["model"])
+        usage = SimpleNamespace(input_tokens=len(text) // 4, output_tokens=len(lines) * 30)
+        if len(lines) > self.max_lines:
+            return SimpleNamespace(stop_reason="max_tokens", content=[TextBlock(type="text", text="[")], usage=usage)
+        events = []
+        for line in lines:
+            name, day, start, end = [p.strip() for p in line.split("|")]
+            events.append({"title": name, "date": day, "start_time": start, "end_time": end or None})
+        return SimpleNamespace(
+            stop_reason="end_turn", content=[TextBlock(type="text", text=json.dumps(events))], usage=usage
+        )
+
+
+ROSTER = (
+    "DATE: 2025-01-06\n"
+    "Clark Kent | 09:00 | 17:00\n"
+    "Lois Lane | 10:00 | 18:00\n"
+    "UNASSIGNED | 12:00 | 20:00\n"
+    "DATE: 2025-01-07\n"
+    "Clark Kent | 12:00 | 20:00\n"
+)
+
+
+def make_lines(count: int) -> list[str]:
+    """Return ``count`` distinct pipe lines on consecutive minutes."""
+    return [f"Person {i} | 2025-01-06 | {9 + i // 60:02d}:{i % 60:02d} | 17:00" for i in range(count)]
 
 
 class TestToPipeLines:
@@ -73,3 +160,323 @@ class TestFilterLines:
 
     def test_empty_lines(self):
         assert filter_lines([], "Clark Kent") == []
+
+    def test_short_name_is_not_a_substring_match(self):
+        lines = ["Alex Luthor | 2025-01-06 | 09:00 | 17:00", "Sal Vitale | 2025-01-06 | 09:00 | 17:00"]
+        assert filter_lines(lines, "Al") == []
+
+
+class TestSelectLines:
+    def test_fallback_is_reported(self):
+        selection = select_lines(TestFilterLines.LINES, "Bruce Wayne")
+        assert selection.fell_back
+        assert selection.lines == TestFilterLines.LINES
+
+    def test_match_carries_confidence(self):
+        selection = select_lines(TestFilterLines.LINES, "Lois Lame")
+        assert not selection.fell_back
+        assert [(m.label, m.confidence) for m in selection.matches] == [("Lois Lane", 0.9)]
+
+    def test_no_name_selects_everything(self):
+        selection = select_lines(TestFilterLines.LINES, None)
+        assert selection.lines == TestFilterLines.LINES
+        assert not selection.fell_back
+
+
+class TestChunkLines:
+    def test_empty_input(self):
+        assert chunk_lines([]) == []
+
+    def test_small_input_single_chunk(self):
+        lines = make_lines(5)
+        assert chunk_lines(lines) == [lines]
+
+    def test_chunks_respect_budget(self):
+        lines = make_lines(200)
+        budget = estimate_output_tokens(lines[0]) * 10
+        chunks = chunk_lines(lines, max_tokens=budget)
+        assert len(chunks) == 20
+        assert all(sum(estimate_output_tokens(ln) for ln in c) <= budget for c in chunks)
+
+    def test_order_preserved(self):
+        lines = make_lines(200)
+        chunks = chunk_lines(lines, max_tokens=300)
+        assert [ln for c in chunks for ln in c] == lines
+
+    def test_oversized_line_gets_own_chunk(self):
+        lines = ["x" * 1000, "Clark Kent | 2025-01-06 | 09:00 | 17:00"]
+        assert chunk_lines(lines, max_tokens=50) == [[lines[0]], [lines[1]]]
+
+
+class TestExtract:
+    def test_truncated_response_is_split(self):
+        client = FakeExtractClient(max_lines=2)
+        events = _extract(client, make_lines(5), "2025", "m")
+        assert [e.title for e in events] == [f"Person {i}" for i in range(5)]
+
+    def test_single_truncated_line_raises(self):
+        client = FakeExtractClient(max_lines=0)
+        with pytest.raises(ValueError, match="token limit"):
+            _extract(client, make_lines(1), "2025", "m")
+
+    def test_extract_all_merges_chunks_in_order(self):
+        client = FakeExtractClient()
+        lines = make_lines(400)
+        events = _extract_all(client, lines, "2025", "m")
+        assert len(client.calls) > 1
+        assert [e.title for e in events] == [f"Person {i}" for i in range(400)]
+
+    def test_extract_all_empty_skips_call(self):
+        client = FakeExtractClient()
+        assert _extract_all(client, [], "2025", "m") == []
+        assert client.calls == []
+
+
+class TestSplitByPerson:
+    LINES = to_pipe_lines(ROSTER)
+
+    def test_everyone_groups_by_row_label(self):
+        groups = split_by_person(self.LINES)
+        assert list(groups) == ["Clark Kent", "Lois Lane"]
+        assert len(groups["Clark Kent"]) == 2
+
+    def test_named_people_use_filter_matching(self):
+        groups = split_by_person(self.LINES, ["kent", "Lois"])
+        assert len(groups["kent"]) == 2
+        assert len(groups["Lois"]) == 1
+
+    def test_unmatched_name_gets_no_lines(self):
+        assert split_by_person(self.LINES, ["Bruce Wayne"]) == {"Bruce Wayne": []}
+
+
+class TestParseEventsByPerson:
+    def test_one_transcription_for_everyone(self):
+        client = FakeExtractClient()
+        settings = Settings.model_construct(anthropic_api_key="sk-ant-test", router_enabled=False)
+        with patch("anthropic.Anthropic", return_value=client):
+            by_person, raw = parse_events_by_person(b"img", "image/png", "sk-ant-test", "2025-01-01",
+                                                    settings=settings)
+        assert raw == ROSTER.strip()
+        assert sum(call == ["<image>"] for call in client.calls) == 1
+        assert {name: len(events) for name, events in by_person.items()} == {"Clark Kent": 2, "Lois Lane": 1}
+        assert all(e.title == "Clark Kent" for e in by_person["Clark Kent"])
+
+
+class TestReextractEvents:
+    def setup_method(self):
+        _extract_cache.clear()
+
+    def _run(self, client, person_name, settings=None):
+        with patch("anthropic.Anthropic", return_value=client):
+            return reextract_events(ROSTER, "sk-ant-test", "2025-01-01", person_name=person_name, settings=settings)
+
+    def test_filters_stored_transcription_without_pass1(self):
+        client = FakeExtractClient()
+        events, cache_hit = self._run(client, "Lois")
+        assert [e.title for e in events] == ["Lois Lane"]
+        assert not cache_hit
+        assert ["<image>"] not in client.calls
+
+    def test_repeat_selection_is_served_from_cache(self):
+        client = FakeExtractClient()
+        first, _ = self._run(client, "Kent")
+        second, cache_hit = self._run(client, "clark")
+        assert cache_hit
+        assert second == first
+        assert len(client.calls) == 1
+
+    def test_uses_the_configured_extract_model(self):
+        client = FakeExtractClient()
+        self._run(client, "Lois")
+        settings = Settings.model_construct(anthropic_api_key="sk-ant-test", extract_model="claude-haiku-4-5")
+        _, cache_hit = self._run(client, "Lois", settings)
+        assert not cache_hit
+        assert client.models == [Settings.model_fields["extract_model"].default, "claude-haiku-4-5"]
+
+
+def make_grid_image(rows: int, columns: int) -> bytes:
+    """Return a PNG of a white page ruled into ``rows`` x ``columns`` cells."""
+    img = Image.new("RGB", (1200, 900), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(rows + 1 if rows else 0):
+        y = 10 + i * (880 // rows)
+        draw.line([(0, y), (1200, y)], fill="black", width=3)
+    for i in range(columns + 1 if columns else 0):
+        x = 10 + i * (1180 // columns)
+        draw.line([(x, 0), (x, 900)], fill="black", width=3)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestEstimateComplexity:
+    def test_blank_image_has_no_grid(self):
+        complexity = estimate_complexity(make_grid_image(rows=0, columns=0))
+        assert complexity.grid_rows == 0
+        assert complexity.grid_columns == 0
+
+    def test_counts_ruled_lines(self):
+        complexity = estimate_complexity(make_grid_image(rows=5, columns=7))
+        assert complexity.grid_rows == 6
+        assert complexity.grid_columns == 8
+
+    def test_ruled_grid_scores_as_printed(self):
+        complexity = estimate_complexity(make_grid_image(rows=5, columns=7))
+        assert complexity.handwriting_score < TEST_SETTINGS.router_max_handwriting_score
+
+
+class TestChooseTranscribeModel:
+    SIMPLE = ImageComplexity(grid_rows=6, grid_columns=8, entropy=1.0, handwriting_score=0.1)
+
+    def test_simple_image_uses_fast_model(self):
+        assert choose_transcribe_model(self.SIMPLE, TEST_SETTINGS) == TEST_SETTINGS.transcribe_fast_model
+
+    def test_dense_grid_uses_default_model(self):
+        dense = self.SIMPLE.model_copy(update={"grid_rows": 41})
+        assert choose_transcribe_model(dense, TEST_SETTINGS) == TEST_SETTINGS.transcribe_model
+
+    def test_handwriting_uses_default_model(self):
+        handwritten = self.SIMPLE.model_copy(update={"handwriting_score": 0.6})
+        assert choose_transcribe_model(handwritten, TEST_SETTINGS) == TEST_SETTINGS.transcribe_model
+
+    def test_noisy_photo_uses_default_model(self):
+        noisy = self.SIMPLE.model_copy(update={"entropy": 7.5})
+        assert choose_transcribe_model(noisy, TEST_SETTINGS) == TEST_SETTINGS.transcribe_model
+
+
+class TestTranscriptionIsValid:
+    def test_well_formed(self):
+        text = "DATE: 2025-01-06\nClark Kent | 09:00 | 17:00\nLois Lane | 9am | 5pm\n"
+        assert transcription_is_valid(text, to_pipe_lines(text))
+
+    def test_no_date_header(self):
+        text = "Clark Kent | 09:00 | 17:00\n"
+        assert not transcription_is_valid(text, to_pipe_lines(text))
+
+    def test_no_shift_lines(self):
+        text = "DATE: 2025-01-06\nI could not read this image.\n"
+        assert not transcription_is_valid(text, to_pipe_lines(text))
+
+    def test_unreadable_times(self):
+        text = "DATE: 2025-01-06\nClark Kent | ?? | 17:00\nLois Lane | smudge | 18:00\n"
+        assert not transcription_is_valid(text, to_pipe_lines(text))
+
+
+class TestSplitBlocks:
+    def test_well_formed_blocks(self):
+        blocks = split_blocks(ROSTER)
+        assert [b.header for b in blocks] == ["2025-01-06", "2025-01-07"]
+        assert not any(b.problems for b in blocks)
+        assert blocks[1].text == "DATE: 2025-01-07\nClark Kent | 12:00 | 20:00"
+
+    def test_each_block_is_checked_separately(self):
+        text = (
+            "DATE: 2025-01-06\nClark Kent | 09:00 | 17:00\n"
+            "DATE: 2025-01-07\nClark Kent 12:00 20:00\n"
+            "DATE: 2025-01-08\nLois Lane | 1O:OO | 18:00\n"
+            "DATE: 2025-01-09\n"
+        )
+        problems = [b.problems for b in split_blocks(text)]
+        assert problems[0] == []
+        assert "no '|'" in problems[1][0]
+        assert "unreadable start time" in problems[2][0]
+        assert problems[3] == ["no shift lines"]
+
+    def test_lines_before_first_header(self):
+        blocks = split_blocks("Clark Kent | 09:00 | 17:00\nDATE: 2025-01-07\nClark Kent | 12:00 | 20:00\n")
+        assert blocks[0].header is None
+        assert blocks[0].problems == ["shift lines before any DATE: header"]
+
+    def test_preamble_is_not_a_block(self):
+        assert len(split_blocks("Here is the transcription:\n" + ROSTER)) == 2
+
+    def test_closing_shift_end_time_is_accepted(self):
+        assert not split_blocks("DATE: 2025-01-06\nClark Kent | 17:00 | close\n")[0].problems
+
+
+class TestCropColumns:
+    def test_ruled_columns_are_cropped_next_to_labels(self):
+        # 1200 px wide, 8 ruled cells of ~147 px: one label column and 7 dates
+        crops = crop_columns(make_grid_image(6, 8), 7, [3])
+        with Image.open(io.BytesIO(crops[3][0])) as img:
+            assert img.height == 900
+            assert 2 * 147 <= img.width <= 2 * 147 + 40
+        assert crops[3][1] == img.width * img.height // 750
+
+    def test_unruled_image_uses_wide_strips(self):
+        crops = crop_columns(make_grid_image(0, 0), 4, [0, 3])
+        with Image.open(io.BytesIO(crops[0][0])) as first, Image.open(io.BytesIO(crops[3][0])) as last:
+            # label strip of 240 px plus a 240 px strip widened by half a strip, clipped at the edges
+            assert first.width == last.width == 240 + 360
+
+
+class RepairClient(FakeExtractClient):
+    """Returns ``transcription`` for the full image and ``column`` for each cropped column."""
+
+    def __init__(self, transcription: str, column: str):
+        super().__init__()
+        self.transcription = transcription
+        self.column = column
+        self.prompts: list[str] = []
+
+    def _create(self, **kwargs):
+        content = kwargs["messages"][0]["content"]
+        if not isinstance(content, list):
+            return super()._create(**kwargs)
+        with self._lock:
+            self.prompts.append(content[1]["text"])
+        text = self.column if "cut from a work schedule" in content[1]["text"] else self.transcription
+        usage = SimpleNamespace(input_tokens=500, output_tokens=50)
+        return SimpleNamespace(stop_reason="end_turn", content=[TextBlock(type="text", text=text)], usage=usage)
+
+
+class TestColumnRepair:
+    GARBLED = (
+        "DATE: 2025-01-06\nClark Kent | 09:00 | 17:00\n"
+        "DATE: 2025-01-07\nClark Kent 12:00 20:00\n"
+        "DATE: 2025-01-08\nLois Lane | 10:00 | 18:00\n"
+    )
+
+    def _parse(self, client, **settings):
+        settings = Settings.model_construct(anthropic_api_key="sk-ant-test", router_enabled=False, **settings)
+        with patch("anthropic.Anthropic", return_value=client):
+            return parse_events_by_person(make_grid_image(6, 4), "image/png", "sk-ant-test", "2025-01-01",
+                                          settings=settings)
+
+    def test_failed_block_is_retranscribed_and_spliced(self):
+        client = RepairClient(self.GARBLED, "DATE: 2025-01-07\nClark Kent | 12:00 | 20:00\n")
+        by_person, raw = self._parse(client)
+        assert len(client.prompts) == 2
+        assert 'headed "2025-01-07"' in client.prompts[1]
+        assert [b.header for b in split_blocks(raw)] == ["2025-01-06", "2025-01-07", "2025-01-08"]
+        assert "Clark Kent | 2025-01-07 | 12:00 | 20:00" in to_pipe_lines(raw)
+        assert len(by_person["Clark Kent"]) == 2
+
+    def test_unusable_repair_keeps_original(self):
+        client = RepairClient(self.GARBLED, "I cannot read this column.")
+        _, raw = self._parse(client)
+        assert raw == self.GARBLED.strip()
+
+    def test_failed_repair_call_keeps_original(self):
+        class BrokenColumnClient(RepairClient):
+            def _create(self, **kwargs):
+                if "cut from a work schedule" in str(kwargs["messages"][0]["content"]):
+                    raise RuntimeError("malformed response")
+                return super()._create(**kwargs)
+
+        _, raw = self._parse(BrokenColumnClient(self.GARBLED, ""))
+        assert raw == self.GARBLED.strip()
+
+    def test_preamble_block_is_not_a_column(self):
+        transcription = "Clark Kent | 07:00 | 15:00\n" + self.GARBLED
+        client = RepairClient(transcription, "DATE: 2025-01-07\nClark Kent | 12:00 | 20:00\n")
+        with patch("planogram.services.parser.crop_columns", wraps=crop_columns) as crop:
+            _, raw = self._parse(client)
+        assert crop.call_args.args[1:] == (3, [1])
+        assert raw.startswith("Clark Kent | 07:00 | 15:00\nDATE: 2025-01-06")
+        assert "Clark Kent | 12:00 | 20:00" in raw
+
+    def test_disabled(self):
+        client = RepairClient(self.GARBLED, "DATE: 2025-01-07\nClark Kent | 12:00 | 20:00\n")
+        self._parse(client, transcribe_repair_max_columns=0)
+        assert len(client.prompts) == 1
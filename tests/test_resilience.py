@@ -0,0 +1,167 @@
+"""Tests for the retry, hedging, and circuit breaker helpers."""
+
+import contextvars
+import threading
+
+import anthropic
+import httpx
+import pytest
+
+from planogram.services import resilience
+from planogram.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientCaller,
+    UpstreamUnavailableError,
+    is_retryable,
+)
+
+
+def make_status_error(status: int, headers: dict[str, str] | None = None) -> anthropic.APIStatusError:
+    """Return an Anthropic API error carrying the given HTTP status."""
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, request=request, headers=headers)
+    return anthropic.APIStatusError(f"status {status}", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(resilience.time, "sleep", lambda _: None)
+
+
+def make_caller(**kwargs) -> ResilientCaller:
+    defaults = {"breaker": CircuitBreaker("test", failure_threshold=100), "latency": LatencyTracker()}
+    defaults.update(kwargs)
+    return ResilientCaller("test", **defaults)
+
+
+class TestIsRetryable:
+    def test_overloaded_is_retryable(self):
+        assert is_retryable(make_status_error(529))
+
+    def test_server_error_is_retryable(self):
+        assert is_retryable(make_status_error(503))
+
+    def test_bad_request_not_retryable(self):
+        assert not is_retryable(make_status_error(400))
+
+    def test_other_exception_not_retryable(self):
+        assert not is_retryable(ValueError("nope"))
+
+
+class TestResilientCaller:
+    def test_success_first_try(self):
+        assert make_caller().call(lambda: "ok") == "ok"
+
+    def test_retries_transient_errors(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise make_status_error(529)
+            return "ok"
+
+        assert make_caller(max_retries=3).call(flaky) == "ok"
+        assert len(attempts) == 3
+
+    def test_gives_up_after_max_retries(self):
+        def always_overloaded():
+            raise make_status_error(529)
+
+        with pytest.raises(UpstreamUnavailableError, match="after 3 attempt"):
+            make_caller(max_retries=2).call(always_overloaded)
+
+    def test_non_retryable_raised_immediately(self):
+        attempts = []
+
+        def bad_request():
+            attempts.append(1)
+            raise make_status_error(400)
+
+        with pytest.raises(anthropic.APIStatusError):
+            make_caller(max_retries=3).call(bad_request)
+        assert len(attempts) == 1
+
+    def test_hedged_request_wins(self):
+        latency = LatencyTracker(min_samples=1)
+        latency.record(0.01)
+        calls = []
+        lock = threading.Lock()
+
+        def slow_then_fast():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            if first:
+                # time.sleep is patched out, so block on an event instead
+                threading.Event().wait(1.0)
+                return "slow"
+            return "fast"
+
+        caller = make_caller(latency=latency, hedge=True)
+        assert caller.call(slow_then_fast) == "fast"
+        assert len(calls) == 2
+
+    def test_hedged_requests_keep_the_callers_context(self):
+        latency = LatencyTracker(min_samples=1)
+        latency.record(10.0)
+        client = contextvars.ContextVar("client", default="")
+        client.set("watcher")
+        assert make_caller(latency=latency, hedge=True).call(client.get) == "watcher"
+
+    def test_retry_after_is_capped(self, monkeypatch):
+        delays = []
+        monkeypatch.setattr(resilience.time, "sleep", delays.append)
+        attempts = []
+
+        def rate_limited():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise make_status_error(429, {"retry-after": "3600"})
+            return "ok"
+
+        assert make_caller(backoff_max=5.0).call(rate_limited) == "ok"
+        assert delays == [5.0]
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_trial_closes_on_success(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert not breaker.is_open
+
+    def test_caller_fails_fast_when_open(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        calls = []
+        with pytest.raises(CircuitOpenError):
+            make_caller(breaker=breaker).call(lambda: calls.append(1))
+        assert calls == []
+
+
+class TestLatencyTracker:
+    def test_no_percentile_until_min_samples(self):
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(1.0)
+        assert tracker.percentile(95) is None
+
+    def test_p95(self):
+        tracker = LatencyTracker(min_samples=1)
+        for i in range(100):
+            tracker.record(float(i))
+        assert tracker.percentile(95) == 95.0
@@ -1,18 +1,34 @@
 """Tests for FastAPI route handlers."""
 
+import asyncio
+import hashlib
 import io
 from datetime import date, time
+from types import SimpleNamespace
 from unittest.mock import patch
 
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
 from PIL import Image
 from starlette.testclient import TestClient
 
 from main import app
-from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.models import ParsedSchedule, PendingPush, ScheduleEvent, StageUsage
+from planogram.routes import auth
+from planogram.routes.identity import USER_COOKIE
 from planogram.routes.upload import MAX_IMAGE_PX, resize
+from planogram.services import admission, sessions, tracing, usage
+from planogram.services.admission import AdmissionGate
+from planogram.services.calendar import SyncResult
+from planogram.services.resilience import UpstreamUnavailableError
+from planogram.services.sync import PushProgress, SyncChange, SyncEntry
 from tests.conftest import TEST_SETTINGS, make_image_bytes
+from tests.test_tracing import CollectingExporter
 
 client = TestClient(app, raise_server_exceptions=False)
+EVENTS = [ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))]
+PUSHED = "0b7c2f4e-5d1a-4c3b-9e8f-1a2b3c4d5e6f"
 
 
 class TestIndexRoute:
@@ -68,6 +84,566 @@ class TestUploadRoute:
             )
         assert response.status_code == 422
 
+    def test_spans_share_session_trace_id(self, tmp_path):
+        exporter = CollectingExporter()
+        tracing.set_exporter(exporter)
+        try:
+            with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+                 patch("planogram.routes.upload.parser.parse_events", return_value=([], "raw")), \
+                 patch("planogram.routes.upload.TMP_DIR", tmp_path):
+                response = client.post(
+                    "/upload",
+                    files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+                    follow_redirects=False,
+                )
+        finally:
+            tracing.set_exporter(tracing.NullExporter())
+        session_id = response.headers["location"].split("id=")[1]
+        assert {s.name for s in exporter.spans} == {"upload", "resize"}
+        assert all(s.trace_id == session_id for s in exporter.spans)
+        assert exporter.named("upload").attributes["image_bytes"] > 0
+
+    def test_upstream_unavailable_returns_503(self):
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events", side_effect=UpstreamUnavailableError("down")):
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+            )
+        assert response.status_code == 503
+
+
+class TestFanOutUpload:
+    def test_people_creates_batch_of_sessions(self, tmp_path):
+        by_person = {
+            "Clark Kent": [ScheduleEvent(title="Clark Kent", date=date(2025, 1, 6), start_time=time(9, 0))],
+            "Lois Lane": [],
+        }
+        image = make_image_bytes()
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events_by_person",
+                   return_value=(by_person, "raw")) as parse, \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", image, "image/jpeg")},
+                data={"people": "Clark Kent, Lois Lane"},
+                follow_redirects=False,
+            )
+            assert response.status_code == 303
+            assert "/batch?id=" in response.headers["location"]
+            assert parse.call_args.kwargs["person_names"] == ["Clark Kent", "Lois Lane"]
+
+            page = client.get(response.headers["location"])
+        assert page.status_code == 200
+        assert "Clark Kent" in page.text and "Lois Lane" in page.text
+        assert page.text.count("/ics?id=") == 2
+        # Every person's pushes share the image as their origin
+        batch = sessions.load_batch(tmp_path, response.headers["location"].split("=")[1])
+        digests = {sessions.load_session(tmp_path, sid).source_digest for sid in batch.session_ids.values()}
+        assert digests == {hashlib.sha256(image).hexdigest()[:32]}
+
+    def test_blank_names_are_rejected(self, tmp_path):
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events_by_person") as parse, \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path):
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+                data={"people": ", ,"},
+                follow_redirects=False,
+            )
+        assert response.status_code == 422
+        parse.assert_not_called()
+        assert not list(tmp_path.iterdir())
+
+    def test_everyone_selects_all_people(self, tmp_path):
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events_by_person", return_value=({}, "raw")) as parse, \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path):
+            client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+                data={"people": "Everyone"},
+                follow_redirects=False,
+            )
+        assert parse.call_args.kwargs["person_names"] is None
+
+    def test_unknown_batch_returns_404(self, tmp_path):
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            assert client.get("/batch?id=missing").status_code == 404
+
+    def test_ics_download(self, tmp_path):
+        schedule = ParsedSchedule(
+            events=[ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0), end_time=time(17, 0))],
+            raw_ocr_text="raw",
+            source_image_name="schedule.jpg",
+            person_name="Clark Kent",
+        )
+        (tmp_path / "s1.json").write_text(schedule.model_dump_json())
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.get("/ics?id=s1")
+        assert response.headers["content-type"].startswith("text/calendar")
+        assert 'filename="clark-kent.ics"' in response.headers["content-disposition"]
+        assert "SUMMARY:Work" in response.text
+
+
+class TestReextractRoute:
+    def _session(self, tmp_path):
+        schedule = ParsedSchedule(
+            events=[
+                ScheduleEvent(title="Clark Kent", date=date(2025, 1, 6), start_time=time(9, 0)),
+                ScheduleEvent(title="Lois Lane", date=date(2025, 1, 6), start_time=time(10, 0)),
+            ],
+            raw_ocr_text="raw",
+            source_image_name="schedule.jpg",
+        )
+        (tmp_path / "s1.json").write_text(schedule.model_dump_json())
+
+    def test_returns_only_changed_events_and_updates_session(self, tmp_path):
+        self._session(tmp_path)
+        new_events = [
+            ScheduleEvent(title="Lois Lane", date=date(2025, 1, 6), start_time=time(10, 0)),
+            ScheduleEvent(title="Lois Lane", date=date(2025, 1, 7), start_time=time(10, 0)),
+        ]
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.parser.reextract_events", return_value=(new_events, False)), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post(
+                "/reextract",
+                data={"session_id": "s1", "person_name": "Lois"},
+                headers={"Accept": "application/json"},
+            )
+        body = response.json()
+        assert body["count"] == 2
+        assert [e["date"] for e in body["added"]] == ["2025-01-07"]
+        assert [e["title"] for e in body["removed"]] == ["Clark Kent"]
+        stored = ParsedSchedule.model_validate_json((tmp_path / "s1.json").read_text())
+        assert stored.events == new_events
+        assert stored.person_name == "Lois"
+
+    def test_form_post_redirects_to_review(self, tmp_path):
+        self._session(tmp_path)
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.parser.reextract_events", return_value=([], True)), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/reextract", data={"session_id": "s1"}, follow_redirects=False)
+        assert response.status_code == 303
+        assert response.headers["location"] == "/review?id=s1"
+
+    def test_unknown_session_returns_404(self, tmp_path):
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/reextract", data={"session_id": "missing"})
+        assert response.status_code == 404
+
+
+class TestConfirmChanges:
+    def _confirm(self, tmp_path, changes, sync=None):
+        events = [
+            ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0)),
+            ScheduleEvent(title="Work", date=date(2025, 1, 7), start_time=time(9, 0)),
+            ScheduleEvent(title="Work", date=date(2025, 1, 8), start_time=time(9, 0)),
+        ]
+        schedule = ParsedSchedule(events=events, raw_ocr_text="", source_image_name="", source_digest="d1")
+        sessions.save_session(tmp_path, "s1", schedule)
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.cal_service.get_credentials", return_value=object()), \
+             patch("planogram.routes.review.cal_service.sync_events",
+                   side_effect=sync or (lambda *a, **k: SyncResult(links=[]))) as mock_sync, \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/confirm", data={"session_id": "s1", "changes": changes, "repeat_weeks": "1"})
+        return response, mock_sync
+
+    def test_diff_is_applied_to_the_stored_events(self, tmp_path):
+        changes = '{"updated": {"2": {"title": "Late", "date": "2025-01-08", "start_time": "13:00"}}, "deleted": [0]}'
+        response, mock_sync = self._confirm(tmp_path, changes)
+        assert response.status_code == 200
+        pushed = mock_sync.call_args.args[0]
+        assert [(e.title, e.date.day) for e in pushed] == [("Work", 7), ("Late", 8), ("Work", 14), ("Late", 15)]
+        assert sessions.load_session(tmp_path, "s1") is None
+
+    def test_blank_changes_push_the_stored_events(self, tmp_path):
+        response, mock_sync = self._confirm(tmp_path, "")
+        assert response.status_code == 200
+        assert len(mock_sync.call_args.args[0]) == 6
+        assert mock_sync.call_args.kwargs["origin"] == "d1"
+
+    @pytest.mark.parametrize("changes", ['{"deleted": [3]}', '{"updated": {"0": {"title": "x"}}}', "not json"])
+    def test_invalid_changes_return_422(self, tmp_path, changes):
+        response, mock_sync = self._confirm(tmp_path, changes)
+        assert response.status_code == 422
+        mock_sync.assert_not_called()
+
+    def test_missing_session_returns_404(self, tmp_path):
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/confirm", data={"session_id": "missing"})
+        assert response.status_code == 404
+
+    def test_failed_push_keeps_the_events_shown(self, tmp_path):
+        def fail(*args, **kwargs):
+            raise HttpError(httplib2.Response({"status": 500}), b"")
+
+        response, _ = self._confirm(tmp_path, '{"deleted": [1, 2]}', fail)
+        assert response.status_code == 502
+        # The re-rendered rows are indexed against what is now stored, and
+        # the repeated week is added again by the retry rather than stored
+        stored = sessions.load_session(tmp_path, "s1")
+        assert [e.date.day for e in stored.events] == [6]
+        assert response.text.count('<tr data-index="') == 1
+
+
+class TestConfirmProgress:
+    def _confirm(self, tmp_path, sync):
+        if sessions.load_session(tmp_path, "s1") is None:
+            sessions.save_session(tmp_path, "s1", ParsedSchedule(events=EVENTS, raw_ocr_text="", source_image_name=""))
+        form = {"session_id": "s1"}
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.cal_service.get_credentials", return_value=object()), \
+             patch("planogram.routes.review.cal_service.sync_events", side_effect=sync) as mock_sync, \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/confirm", data=form)
+        return response, mock_sync
+
+    def test_failed_push_reports_progress_and_resumes(self, tmp_path):
+        def fail(*args, on_progress, **kwargs):
+            on_progress(PushProgress(status="failed", total=3, done=1))
+            raise HttpError(httplib2.Response({"status": 500}), b"")
+
+        response, _ = self._confirm(tmp_path, fail)
+        assert response.status_code == 502
+        assert "1 of 3 change(s) were saved" in response.text
+
+        response, mock_sync = self._confirm(tmp_path, lambda *a, **k: SyncResult(links=["l"]))
+        assert response.status_code == 200
+        assert mock_sync.call_args.kwargs["resume"].done == 1
+
+    def test_stream_sends_running_checkpoint(self, tmp_path):
+        sessions.save_progress(tmp_path, PUSHED, PushProgress(total=3, done=2))
+        with patch("planogram.routes.review.TMP_DIR", tmp_path), \
+             patch("planogram.routes.review.PROGRESS_IDLE_SECONDS", 0.3):
+            response = client.get(f"/confirm/progress?session_id={PUSHED}")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.count("data: ") == 1
+        assert '"done":2' in response.text and "completed" not in response.text
+
+    def test_stream_holds_back_earlier_push(self, tmp_path):
+        sessions.save_progress(tmp_path, PUSHED, PushProgress(status="done", total=3, done=3))
+        with patch("planogram.routes.review.TMP_DIR", tmp_path), \
+             patch("planogram.routes.review.PROGRESS_IDLE_SECONDS", 0.3):
+            response = client.get(f"/confirm/progress?session_id={PUSHED}")
+        assert response.text == ""
+
+    def test_stream_of_other_users_push_is_forbidden(self, tmp_path):
+        sessions.save_progress(tmp_path, PUSHED, PushProgress(total=3, done=2, account="a" * 32))
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = TestClient(app, cookies={USER_COOKIE: "b" * 32}).get(f"/confirm/progress?session_id={PUSHED}")
+        assert response.status_code == 403
+
+    def test_stream_needs_a_push_or_session(self, tmp_path):
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            assert client.get(f"/confirm/progress?session_id={PUSHED}").status_code == 404
+            assert client.get("/confirm/progress?session_id=../s1").status_code == 422
+
+
+class TestRollbackRoute:
+    def test_nothing_pushed_returns_404(self, tmp_path):
+        with patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/rollback", data={"session_id": PUSHED})
+        assert response.status_code == 404
+
+    def test_malformed_session_id_returns_404(self, tmp_path):
+        entry = SyncEntry(event_id="e1", content_hash="h", date=date(2025, 1, 6), person="", source="primary")
+        change = SyncChange(kind="insert", entry=entry)
+        sessions.save_progress(tmp_path, "s1", PushProgress(status="done", total=1, done=1, completed={"fp": change}))
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.cal_service.get_credentials", return_value=object()), \
+             patch("planogram.routes.review.cal_service.rollback_sync", return_value=1) as mock_rollback, \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/rollback", data={"session_id": "s1"})
+        assert response.status_code == 404
+        mock_rollback.assert_not_called()
+
+    def test_rolls_back_from_checkpoint(self, tmp_path):
+        entry = SyncEntry(event_id="e1", content_hash="h", date=date(2025, 1, 6), person="", source="primary")
+        change = SyncChange(kind="insert", entry=entry)
+        sessions.save_progress(tmp_path, PUSHED, PushProgress(status="done", total=1, done=1, completed={"fp": change}))
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.cal_service.get_credentials", return_value=object()), \
+             patch("planogram.routes.review.cal_service.rollback_sync", return_value=1) as mock_rollback, \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post("/rollback", data={"session_id": PUSHED}, headers={"Accept": "application/json"})
+        assert response.json()["undone"] == 1
+        assert mock_rollback.call_args.args[0].completed["fp"].entry.event_id == "e1"
+
+
+class TestUserIdentity:
+    ALICE = "a" * 32
+    BOB = "b" * 32
+
+    def _session(self, tmp_path, owner):
+        schedule = ParsedSchedule(
+            events=[ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))],
+            raw_ocr_text="raw",
+            source_image_name="schedule.jpg",
+            user_id=owner,
+        )
+        (tmp_path / "s1.json").write_text(schedule.model_dump_json())
+
+    def test_upload_sets_cookie_and_owns_session(self, tmp_path):
+        browser = TestClient(app)
+        mock_events = [ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))]
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events", return_value=(mock_events, "raw")), \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path):
+            response = browser.post(
+                "/upload", files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")}, follow_redirects=False,
+            )
+        user_id = response.cookies[USER_COOKIE]
+        session_id = response.headers["location"].split("id=")[1]
+        assert sessions.load_session(tmp_path, session_id).user_id == user_id
+
+    def test_other_users_session_is_forbidden(self, tmp_path):
+        self._session(tmp_path, self.ALICE)
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            owner = TestClient(app, cookies={USER_COOKIE: self.ALICE}).get("/review?id=s1")
+            other = TestClient(app, cookies={USER_COOKIE: self.BOB})
+            assert other.get("/review?id=s1").status_code == 403
+            assert other.get("/ics?id=s1").status_code == 403
+            confirm = other.post("/confirm", data={"session_id": "s1"})
+        assert owner.status_code == 200
+        assert confirm.status_code == 403
+
+    def test_confirm_uses_the_users_token_and_account(self, tmp_path):
+        self._session(tmp_path, self.ALICE)
+        form = {"session_id": "s1"}
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.cal_service.get_credentials", return_value=object()) as mock_creds, \
+             patch("planogram.routes.review.cal_service.sync_events", return_value=SyncResult(links=[])) as mock_sync, \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = TestClient(app, cookies={USER_COOKIE: self.ALICE}).post("/confirm", data=form)
+        assert response.status_code == 200
+        assert mock_creds.call_args.args[0] == self.ALICE
+        assert mock_sync.call_args.kwargs["account"] == self.ALICE
+
+    def test_auth_callback_matches_flow_by_state(self):
+        class Flow:
+            pass
+
+        auth._pending_flows.update({"older": (self.BOB, Flow()), "s1": (self.ALICE, Flow())})
+        try:
+            with patch("planogram.routes.auth.get_settings", return_value=TEST_SETTINGS), \
+                 patch("planogram.routes.auth.cal_service.handle_auth_callback") as mock_callback, \
+                 patch("planogram.routes.auth.sessions.load_pending", return_value=None):
+                browser = TestClient(app, cookies={USER_COOKIE: self.ALICE})
+                response = browser.get("/auth/callback?state=s1&code=c", follow_redirects=False)
+                replay = browser.get("/auth/callback?state=s1&code=c", follow_redirects=False)
+        finally:
+            auth._pending_flows.clear()
+        assert response.headers["location"] == "/review?id=s1"
+        assert mock_callback.call_args.kwargs["user_id"] == self.ALICE
+        assert replay.headers["location"] == "/?error=auth_failed"
+
+    def test_auth_callback_from_another_browser_is_refused(self):
+        auth._pending_flows["s1"] = (self.ALICE, object())
+        try:
+            with patch("planogram.routes.auth.cal_service.handle_auth_callback") as mock_callback:
+                response = TestClient(app, cookies={USER_COOKIE: self.BOB}).get(
+                    "/auth/callback?state=s1&code=c", follow_redirects=False
+                )
+        finally:
+            auth._pending_flows.clear()
+        assert response.headers["location"] == "/?error=auth_failed"
+        mock_callback.assert_not_called()
+
+
+class TestAuthCallbackPush:
+    ALICE = "a" * 32
+
+    def _callback(self, tmp_path, sync):
+        sessions.save_pending(tmp_path, "s1", PendingPush(events=EVENTS[:1], repeat_weeks=1, notification_minutes=5))
+        auth._pending_flows["s1"] = (self.ALICE, object())
+        try:
+            with patch("planogram.routes.auth.get_settings", return_value=TEST_SETTINGS), \
+                 patch("planogram.routes.auth.cal_service.handle_auth_callback", return_value=object()), \
+                 patch("planogram.routes.auth.cal_service.sync_events", side_effect=sync), \
+                 patch("planogram.routes.auth.TMP_DIR", tmp_path):
+                return TestClient(app, cookies={USER_COOKIE: self.ALICE}).get("/auth/callback?state=s1&code=c")
+        finally:
+            auth._pending_flows.clear()
+
+    def test_pending_push_runs_off_the_event_loop(self, tmp_path):
+        def sync(*args, **kwargs):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return SyncResult(links=["l"])
+
+        response = self._callback(tmp_path, sync)
+        assert response.status_code == 200
+        assert sessions.load_pending(tmp_path, "s1") is None
+
+    def test_pending_push_is_repeated_with_its_options(self, tmp_path):
+        pushed = {}
+
+        def sync(events, *args, **kwargs):
+            pushed.update(days=[e.date.day for e in events], minutes=kwargs["notification_minutes"])
+            return SyncResult(links=["l"] * len(events))
+
+        assert self._callback(tmp_path, sync).status_code == 200
+        assert pushed == {"days": [6, 13], "minutes": 5}
+
+    def test_failed_pending_push_keeps_the_events_before_repeating(self, tmp_path):
+        def fail(*args, **kwargs):
+            raise HttpError(httplib2.Response({"status": 500}), b"")
+
+        sessions.save_session(tmp_path, "s1", ParsedSchedule(events=EVENTS, raw_ocr_text="", source_image_name=""))
+        response = self._callback(tmp_path, fail)
+        assert response.status_code == 502
+        assert sessions.load_session(tmp_path, "s1").events == EVENTS[:1]
+
+    def test_over_capacity_keeps_the_flow_for_a_retry(self, tmp_path, monkeypatch):
+        gate = AdmissionGate("confirm", max_in_flight=1, max_queue=0)
+        gate._in_flight = 1
+        monkeypatch.setattr(admission, "confirm", gate)
+        auth._pending_flows["s1"] = (self.ALICE, object())
+        try:
+            with patch("planogram.routes.auth.cal_service.handle_auth_callback") as mock_callback:
+                response = TestClient(app, cookies={USER_COOKIE: self.ALICE}).get(
+                    "/auth/callback?state=s1&code=c", follow_redirects=False
+                )
+            assert response.status_code == 429
+            assert "s1" in auth._pending_flows
+        finally:
+            auth._pending_flows.clear()
+        mock_callback.assert_not_called()
+
+
+class TestAdmission:
+    def _full_gate(self, name):
+        gate = AdmissionGate(name, max_in_flight=1, max_queue=0)
+        gate._in_flight = 1
+        return gate
+
+    def test_upload_over_capacity_gets_429(self, monkeypatch):
+        monkeypatch.setattr(admission, "upload", self._full_gate("upload"))
+        with patch("planogram.routes.upload.parser.parse_events") as mock_parse:
+            response = client.post("/upload", files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert "busy" in response.text
+        mock_parse.assert_not_called()
+
+    def test_confirm_over_capacity_gets_429(self, monkeypatch):
+        monkeypatch.setattr(admission, "confirm", self._full_gate("confirm"))
+        with patch("planogram.routes.review.cal_service.sync_events") as mock_sync:
+            response = client.post("/confirm", data={"session_id": "s1"})
+        assert response.status_code == 429
+        assert "retry-after" in response.headers
+        mock_sync.assert_not_called()
+
+
+class TestClaudeUsage:
+    def _settings(self, tmp_path, **budgets):
+        return TEST_SETTINGS.model_copy(update={"usage_db_path": tmp_path / "usage.db", **budgets})
+
+    def _parse(self, *args, **kwargs):
+        usage.record("pass1", "claude-haiku-4-5", SimpleNamespace(input_tokens=3000, output_tokens=800))
+        usage.record("pass2", "claude-sonnet-4-6", SimpleNamespace(input_tokens=900, output_tokens=400))
+        return [ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))], "raw"
+
+    def _upload(self, settings, tmp_path):
+        with patch("planogram.routes.upload.get_settings", return_value=settings), \
+             patch("planogram.routes.upload.parser.parse_events", side_effect=self._parse) as mock_parse, \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path):
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+                follow_redirects=False,
+            )
+        return response, mock_parse
+
+    def test_upload_usage_is_stored_on_session_and_shown(self, tmp_path):
+        settings = self._settings(tmp_path)
+        response, _ = self._upload(settings, tmp_path)
+        session_id = response.headers["location"].split("id=")[1]
+        stored = sessions.load_session(tmp_path, session_id)
+        assert [(entry.stage, entry.model) for entry in stored.usage] == [
+            ("pass1", "claude-haiku-4-5"), ("pass2", "claude-sonnet-4-6"),
+        ]
+        with patch("planogram.routes.review.get_settings", return_value=settings), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            page = client.get(f"/review?id={session_id}")
+        assert "<strong>5,100</strong> tokens" in page.text
+        assert "Pass 1 · claude-haiku-4-5 · 1 call(s)" in page.text
+
+    def test_fan_out_usage_is_stored_once_on_the_batch(self, tmp_path):
+        def parse(*args, **kwargs):
+            self._parse()
+            event = ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))
+            return {"Clark Kent": [event], "Lois Lane": [event]}, "raw"
+
+        settings = self._settings(tmp_path)
+        with patch("planogram.routes.upload.get_settings", return_value=settings), \
+             patch("planogram.routes.upload.parser.parse_events_by_person", side_effect=parse), \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.post(
+                "/upload",
+                files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")},
+                data={"people": "Clark Kent, Lois Lane"},
+                follow_redirects=False,
+            )
+            page = client.get(response.headers["location"])
+        batch = sessions.load_batch(tmp_path, response.headers["location"].split("id=")[1])
+        assert [entry.stage for entry in batch.usage] == ["pass1", "pass2"]
+        assert all(not sessions.load_session(tmp_path, sid).usage for sid in batch.session_ids.values())
+        assert page.text.count("<strong>5,100</strong> tokens") == 1
+
+    def test_upload_over_budget_gets_429_before_parsing(self, tmp_path):
+        settings = self._settings(tmp_path, daily_budget_usd=0.01)
+        usage.usage_store(settings.usage_db_path).add(
+            "someone", StageUsage(stage="pass1", model="claude-opus-4-7", cost_usd=0.01)
+        )
+        response, mock_parse = self._upload(settings, tmp_path)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert "budget" in response.text
+        mock_parse.assert_not_called()
+
+    def test_reextract_appends_usage(self, tmp_path):
+        schedule = ParsedSchedule(
+            raw_ocr_text="raw",
+            source_image_name="schedule.jpg",
+            usage=[StageUsage(stage="pass1", model="claude-opus-4-7", cost_usd=0.05)],
+        )
+        (tmp_path / "s1.json").write_text(schedule.model_dump_json())
+
+        def reextract(*args, **kwargs):
+            usage.record("pass2", "claude-sonnet-4-6", SimpleNamespace(input_tokens=10, output_tokens=10))
+            return [], False
+
+        with patch("planogram.routes.review.get_settings", return_value=self._settings(tmp_path)), \
+             patch("planogram.routes.review.parser.reextract_events", side_effect=reextract), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            client.post("/reextract", data={"session_id": "s1"}, headers={"Accept": "application/json"})
+        stored = ParsedSchedule.model_validate_json((tmp_path / "s1.json").read_text())
+        assert [entry.stage for entry in stored.usage] == ["pass1", "pass2"]
+
+    def test_stats_reports_daily_totals(self, tmp_path):
+        settings = self._settings(tmp_path, user_daily_budget_usd=2.0)
+        self._upload(settings, tmp_path)
+        with patch("planogram.routes.metrics.get_settings", return_value=settings):
+            body = client.get("/stats").json()
+        today = body["today"]
+        assert today["cost_usd"] == pytest.approx(usage.cost("claude-haiku-4-5", 3000, 800)
+                                                  + usage.cost("claude-sonnet-4-6", 900, 400))
+        assert today["user_cost_usd"] == pytest.approx(today["cost_usd"])
+        assert today["budget_usd"] is None
+        assert today["user_budget_usd"] == 2.0
+        assert {entry["stage"] for entry in body["days"][today["date"]]["usage"]} == {"pass1", "pass2"}
+
 
 class TestReviewRoute:
     def test_unknown_session_id_returns_404(self):
@@ -91,6 +667,21 @@ class TestReviewRoute:
         assert response.status_code == 200
         assert "Work" in response.text
 
+    def test_unmatched_name_is_reported(self, tmp_path):
+        schedule = ParsedSchedule(
+            events=[ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))],
+            raw_ocr_text="DATE: 2025-01-06\nClark Kent | 09:00 | 17:00",
+            source_image_name="schedule.jpg",
+            person_name="Bruce Wayne",
+        )
+        (tmp_path / "s1.json").write_text(schedule.model_dump_json())
+
+        with patch("planogram.routes.review.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.review.TMP_DIR", tmp_path):
+            response = client.get("/review?id=s1")
+
+        assert "No row on the schedule matched <strong>Bruce Wayne</strong>, so every shift is shown" in response.text
+
 
 class TestResizeHelper:
     def test_small_image_unchanged(self):
@@ -112,3 +703,33 @@ class TestResizeHelper:
         with Image.open(io.BytesIO(result)) as img:
             w, h = img.size
             assert abs((w / h) - 2.0) < 0.01
+
+
+class TestMetricsRoute:
+    def test_exposes_stage_histograms(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert "planogram_stage_duration_seconds" in response.text
+        assert "planogram_uploads_in_flight" in response.text
+
+    def test_counts_live_sessions(self, tmp_path):
+        (tmp_path / "one.json").write_text("{}")
+        (tmp_path / "one_pending.json").write_text("[]")
+        (tmp_path / "two.json").write_text("{}")
+        with patch("planogram.routes.metrics.TMP_DIR", tmp_path):
+            response = client.get("/metrics")
+        assert "planogram_live_sessions 2.0" in response.text
+
+    def test_upload_records_resize(self, tmp_path):
+        def resize_count() -> float:
+            text = client.get("/metrics").text
+            prefix = 'planogram_stage_duration_seconds_count{stage="resize"} '
+            line = next(ln for ln in text.splitlines() if ln.startswith(prefix))
+            return float(line[len(prefix):])
+
+        before = resize_count()
+        with patch("planogram.routes.upload.get_settings", return_value=TEST_SETTINGS), \
+             patch("planogram.routes.upload.parser.parse_events", return_value=([], "raw")), \
+             patch("planogram.routes.upload.TMP_DIR", tmp_path):
+            client.post("/upload", files={"file": ("schedule.jpg", make_image_bytes(), "image/jpeg")})
+        assert resize_count() == before + 1
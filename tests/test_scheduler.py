@@ -0,0 +1,117 @@
+"""Tests for the outbound rate scheduler."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from planogram.services import metrics, parser, scheduler
+from planogram.services.scheduler import TokenBucket, UpstreamScheduler
+
+
+def drained(requests_per_minute: float, tokens_per_minute: float = 0) -> UpstreamScheduler:
+    """Return a scheduler whose request bucket is empty."""
+    upstream = UpstreamScheduler("test", requests_per_minute, tokens_per_minute)
+    upstream.acquire(requests=upstream._requests.capacity)
+    return upstream
+
+
+def run_queued(upstream: UpstreamScheduler, callers: list[tuple[str, str]]) -> list[str]:
+    """Queue one call per ``(client, priority)`` in order and return the order they were admitted."""
+    admitted: list[str] = []
+
+    def call(key: str, priority: str) -> None:
+        with scheduler.client(key, priority):
+            upstream.acquire()
+        admitted.append(f"{key}:{priority}")
+
+    threads = []
+    for index, (key, priority) in enumerate(callers):
+        thread = threading.Thread(target=call, args=(key, priority))
+        thread.start()
+        threads.append(thread)
+        deadline = time.monotonic() + 2
+        while upstream.depth() < index + 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    return admitted
+
+
+class TestTokenBucket:
+    def test_waits_for_refill(self):
+        bucket = TokenBucket(per_minute=60, burst_seconds=2)
+        now = time.monotonic()
+        assert bucket.wait_time(2, now) == 0
+        bucket.take(2, now)
+        assert bucket.wait_time(1, now) == pytest.approx(1.0, abs=0.05)
+
+    def test_oversized_amount_waits_for_full_bucket(self):
+        bucket = TokenBucket(per_minute=60, burst_seconds=2)
+        assert bucket.wait_time(100, time.monotonic()) == 0
+
+    def test_adjust_charges_debt(self):
+        bucket = TokenBucket(per_minute=60, burst_seconds=2)
+        bucket.adjust(3)
+        assert bucket.wait_time(1, time.monotonic()) == pytest.approx(2.0, abs=0.05)
+
+    def test_zero_is_unlimited(self):
+        bucket = TokenBucket(per_minute=0)
+        bucket.take(10**9, time.monotonic())
+        assert bucket.wait_time(10**9, time.monotonic()) == 0
+
+
+class TestUpstreamScheduler:
+    def test_unlimited_never_waits(self):
+        upstream = UpstreamScheduler("test")
+        assert max(upstream.acquire(tokens=10**6) for _ in range(100)) < 0.05
+
+    def test_interactive_goes_before_bulk(self):
+        upstream = drained(requests_per_minute=300)
+        order = run_queued(upstream, [("a", "bulk"), ("b", "bulk"), ("c", "interactive")])
+        assert order == ["c:interactive", "a:bulk", "b:bulk"]
+
+    def test_clients_take_turns(self):
+        upstream = drained(requests_per_minute=600)
+        order = run_queued(upstream, [("big", "bulk")] * 3 + [("small", "bulk")])
+        assert order.index("small:bulk") == 1
+
+    def test_waiting_is_measured(self):
+        wait = metrics.UPSTREAM_WAIT_SECONDS.labels("test", "interactive")
+        before = wait._sum.get()
+        upstream = drained(requests_per_minute=600)
+        assert upstream.acquire() == pytest.approx(0.1, abs=0.05)
+        assert wait._sum.get() - before >= 0.05
+        assert metrics.UPSTREAM_QUEUE_DEPTH.labels("test", "interactive")._value.get() == 0
+
+    def test_settle_refunds_overestimate(self):
+        upstream = UpstreamScheduler("test", tokens_per_minute=600)
+        upstream.acquire(tokens=100)
+        upstream.settle(100, 10)
+        assert upstream._tokens.level == pytest.approx(90, abs=1)
+
+
+class TestScheduledClaudeCall:
+    def test_charges_actual_usage(self, monkeypatch):
+        upstream = UpstreamScheduler("test", tokens_per_minute=6000)
+        monkeypatch.setattr(scheduler, "anthropic", upstream)
+        usage = SimpleNamespace(input_tokens=300, output_tokens=200)
+        parser._scheduled(lambda: SimpleNamespace(usage=usage), estimated_tokens=100)()
+        assert upstream._tokens.level == pytest.approx(1000 - 500, abs=1)
+
+    def test_failed_call_is_not_charged_tokens(self, monkeypatch):
+        upstream = UpstreamScheduler("test", tokens_per_minute=6000)
+        monkeypatch.setattr(scheduler, "anthropic", upstream)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            parser._scheduled(fail, estimated_tokens=400)()
+        assert upstream._tokens.level == pytest.approx(1000, abs=1)
+
+
+def test_push_priority():
+    assert scheduler.push_priority(10) == "interactive"
+    assert scheduler.push_priority(scheduler.BULK_PUSH_EVENTS + 1) == "bulk"
@@ -0,0 +1,74 @@
+"""Tests for the temporary session store."""
+
+import json
+from datetime import date, time
+
+from planogram.models import Batch, ParsedSchedule, PendingPush, ScheduleEvent, StageUsage
+from planogram.services import codec, sessions
+from planogram.services.sync import PushProgress
+from tests.conftest import TEST_SETTINGS
+
+EVENT = ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0), end_time=time(17, 0))
+
+
+class TestSessions:
+    def test_round_trip(self, tmp_path):
+        schedule = ParsedSchedule(events=[EVENT], raw_ocr_text="raw", source_image_name="a.jpg")
+        sessions.save_session(tmp_path, "abc", schedule)
+        assert sessions.load_session(tmp_path, "abc") == schedule
+
+    def test_missing_session_returns_none(self, tmp_path):
+        assert sessions.load_session(tmp_path, "missing") is None
+
+    def test_creates_directory(self, tmp_path):
+        target = tmp_path / "tmp"
+        sessions.save_session(target, "abc", ParsedSchedule(raw_ocr_text="", source_image_name=""))
+        assert sessions.session_path(target, "abc").exists()
+
+    def test_pending_round_trip(self, tmp_path):
+        pending = PendingPush(events=[EVENT, EVENT], repeat_weeks=2, notification_minutes=10)
+        sessions.save_pending(tmp_path, "abc", pending)
+        assert sessions.load_pending(tmp_path, "abc") == pending
+
+    def test_loads_pending_event_array(self, tmp_path):
+        sessions.pending_path(tmp_path, "abc").write_bytes(codec.encode_events([EVENT]))
+        assert sessions.load_pending(tmp_path, "abc") == PendingPush(events=[EVENT])
+
+    def test_loads_pending_written_before_the_bulk_codec(self, tmp_path):
+        sessions.pending_path(tmp_path, "abc").write_text(json.dumps([EVENT.model_dump_json()]))
+        assert sessions.load_pending(tmp_path, "abc") == PendingPush(events=[EVENT])
+
+    def test_batch_round_trip(self, tmp_path):
+        batch = Batch(session_ids={"Ann": "s1", "Bob": "s2"}, usage=[StageUsage(stage="pass1", model="m")])
+        sessions.save_batch(tmp_path, "b1", batch)
+        assert sessions.load_batch(tmp_path, "b1") == batch
+
+    def test_loads_batch_written_before_usage_was_kept(self, tmp_path):
+        sessions.batch_path(tmp_path, "b1").write_text(json.dumps({"Ann": "s1"}))
+        assert sessions.load_batch(tmp_path, "b1") == Batch(session_ids={"Ann": "s1"})
+
+    def test_compressed_session_round_trip(self, tmp_path):
+        schedule = ParsedSchedule(events=[EVENT], raw_ocr_text="DATE: 2025-01-06\n" * 100, source_image_name="a.jpg")
+        sessions.configure(TEST_SETTINGS.model_copy(update={"session_compression": "gzip"}))
+        try:
+            sessions.save_session(tmp_path, "abc", schedule)
+        finally:
+            sessions.configure(TEST_SETTINGS)
+        assert "DATE" not in sessions.session_path(tmp_path, "abc").read_text()
+        assert sessions.load_session(tmp_path, "abc") == schedule
+
+    def test_missing_pending_returns_none(self, tmp_path):
+        assert sessions.load_pending(tmp_path, "abc") is None
+
+    def test_delete_removes_session_and_pending(self, tmp_path):
+        sessions.save_session(tmp_path, "abc", ParsedSchedule(raw_ocr_text="", source_image_name=""))
+        sessions.save_pending(tmp_path, "abc", PendingPush(events=[EVENT]))
+        sessions.delete_session(tmp_path, "abc")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_progress_round_trip_outlives_session(self, tmp_path):
+        sessions.save_session(tmp_path, "abc", ParsedSchedule(raw_ocr_text="", source_image_name=""))
+        sessions.save_progress(tmp_path, "abc", PushProgress(status="done", total=2, done=2))
+        sessions.delete_session(tmp_path, "abc")
+        assert sessions.load_progress(tmp_path, "abc").status == "done"
+        assert sessions.load_progress(tmp_path, "other") is None
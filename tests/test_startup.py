@@ -0,0 +1,39 @@
+"""Cold-start checks: heavy dependencies stay out of ``import main``."""
+
+import jinja2
+import pytest
+
+from benchmarks.startup import ImportTiming, lazy_imports, measure
+from planogram.routes import auth, review, upload
+
+# Generous enough for a slow CI runner; importing everything eagerly took
+# about 2.4s on a laptop, the lazy app about 0.7s
+IMPORT_BUDGET_SECONDS = 1.5
+
+
+@pytest.fixture(scope="module")
+def timings() -> list[ImportTiming]:
+    return measure("import main")
+
+
+class TestStartup:
+    def test_heavy_dependencies_load_lazily(self, timings):
+        assert lazy_imports(timings) == []
+
+    def test_import_time_budget(self, timings):
+        main = next(t for t in timings if t.module == "main")
+        assert main.cumulative_us / 1e6 < IMPORT_BUDGET_SECONDS
+
+    def test_lazy_imports_are_detected(self):
+        timings = [ImportTiming("PIL.Image", 1, 1, 1), ImportTiming("pillow_heif", 1, 1, 1)]
+        assert lazy_imports(timings) == ["PIL"]
+
+
+class TestTemplates:
+    def test_route_modules_share_one_environment(self):
+        assert upload.templates is review.templates is auth.templates
+
+    def test_compiled_templates_are_cached(self):
+        env = upload.templates.env
+        assert isinstance(env.bytecode_cache, jinja2.FileSystemBytecodeCache)
+        assert env.get_template("index.html") is env.get_template("index.html")
@@ -0,0 +1,419 @@
+"""Tests for incremental calendar sync."""
+
+from datetime import date, time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from planogram.models import ScheduleEvent
+from planogram.services import calendar
+from planogram.services.calendar import build_event_body, push_events, rollback_sync, sync_events
+from planogram.services.sync import (
+    PushProgress,
+    SyncEntry,
+    SyncStore,
+    content_hash,
+    fingerprint,
+    plan_sync,
+    stable_event_id,
+)
+
+TZ = "America/New_York"
+CAL = "primary"
+ORIGIN = "img1"
+
+
+def make_event(**kwargs) -> ScheduleEvent:
+    defaults = {"title": "Work", "date": date(2025, 1, 6), "start_time": time(9, 0), "end_time": time(17, 0)}
+    defaults.update(kwargs)
+    return ScheduleEvent(**defaults)
+
+
+def entry_for(event: ScheduleEvent, event_id: str = "e1") -> SyncEntry:
+    return SyncEntry(
+        event_id=event_id,
+        content_hash=content_hash(build_event_body(event, TZ)),
+        date=event.date,
+        person="",
+        source=CAL,
+        origin=ORIGIN,
+    )
+
+
+class TestPlanSync:
+    def plan(self, events, previous):
+        return plan_sync(events, [build_event_body(e, TZ) for e in events], previous, "", CAL, ORIGIN)
+
+    def test_new_shift_is_inserted(self):
+        plan = self.plan([make_event()], {})
+        assert [a.kind for a in plan.actions] == ["insert"]
+
+    def test_identical_shift_is_unchanged(self):
+        event = make_event()
+        plan = self.plan([event], {fingerprint("", event, CAL): entry_for(event)})
+        assert plan.actions == []
+        assert len(plan.unchanged) == 1
+
+    def test_changed_end_time_is_patched(self):
+        old = make_event()
+        new = make_event(end_time=time(18, 0))
+        plan = self.plan([new], {fingerprint("", old, CAL): entry_for(old, "e1")})
+        assert [(a.kind, a.event_id) for a in plan.actions] == [("patch", "e1")]
+
+    def test_removed_shift_is_deleted(self):
+        gone = make_event(date=date(2025, 1, 7))
+        plan = self.plan([make_event()], {fingerprint("", gone, CAL): entry_for(gone, "e2")})
+        assert sorted(a.kind for a in plan.actions) == ["delete", "insert"]
+
+    def test_shift_from_another_origin_is_kept(self):
+        other = make_event(date=date(2025, 1, 7))
+        entry = entry_for(other, "e2").model_copy(update={"origin": "img2"})
+        plan = self.plan([make_event()], {fingerprint("", other, CAL): entry})
+        assert [a.kind for a in plan.actions] == ["insert"]
+
+    def test_duplicate_shift_written_once(self):
+        plan = self.plan([make_event(), make_event()], {})
+        assert plan.count("insert") == 1
+
+    def test_shifts_of_different_people_at_the_same_time_are_kept(self):
+        plan = self.plan([make_event(title="Alice"), make_event(title="Bob")], {})
+        assert [(a.kind, a.event.title) for a in plan.actions] == [("insert", "Alice"), ("insert", "Bob")]
+
+    def test_fingerprint_depends_on_person_and_calendar(self):
+        event = make_event()
+        assert fingerprint("Ann", event, CAL) == fingerprint(" ann ", event, CAL)
+        assert fingerprint("Ann", event, CAL) != fingerprint("Bob", event, CAL)
+        assert fingerprint("Ann", event, CAL) != fingerprint("Ann", event, "other")
+
+
+class TestStableEventId:
+    def test_depends_on_session_and_content(self):
+        body = build_event_body(make_event(), TZ)
+        changed = build_event_body(make_event(end_time=time(18, 0)), TZ)
+        assert stable_event_id("s1", "k", body) == stable_event_id("s1", "k", dict(body))
+        assert stable_event_id("s1", "k", body) != stable_event_id("s2", "k", body)
+        assert stable_event_id("s1", "k", body) != stable_event_id("s1", "k", changed)
+
+    def test_uses_base32hex_alphabet(self):
+        assert set(stable_event_id("s", "k", {})) <= set("0123456789abcdefghijklmnopqrstuv")
+
+
+class TestSyncStore:
+    def test_round_trip_scoped_by_range(self, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        store.put("a", entry_for(make_event()))
+        store.put("b", entry_for(make_event(date=date(2025, 2, 1))))
+        store.save()
+        entries = SyncStore(tmp_path / "pushed.db").entries("", CAL, date(2025, 1, 1), date(2025, 1, 31))
+        assert list(entries) == ["a"]
+
+    def test_concurrent_stores_merge(self, tmp_path):
+        path = tmp_path / "pushed.db"
+        first, second = SyncStore(path), SyncStore(path)
+        first.put("a", entry_for(make_event()))
+        second.put("b", entry_for(make_event(date=date(2025, 1, 7))))
+        first.save()
+        second.save()
+        assert set(SyncStore(path).entries("", CAL, date(2025, 1, 1), date(2025, 1, 31))) == {"a", "b"}
+
+    def test_remove(self, tmp_path):
+        path = tmp_path / "pushed.db"
+        store = SyncStore(path)
+        store.put("a", entry_for(make_event()))
+        store.save()
+        store.remove("a")
+        store.save()
+        assert SyncStore(path).entries("", CAL, date(2025, 1, 1), date(2025, 1, 31)) == {}
+
+
+class _Request:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+def _failing(status: int) -> _Request:
+    def run():
+        raise HttpError(httplib2.Response({"status": status}), b"")
+    return _Request(run)
+
+
+class FakeEvents:
+    """In-memory stand-in for ``service.events()``."""
+
+    def __init__(self):
+        self.items: dict[str, dict] = {}
+        self.calls: list[str] = []
+
+    def live(self) -> list[dict]:
+        return [e for e in self.items.values() if e["status"] != "cancelled"]
+
+    def insert(self, calendarId, body):
+        def run():
+            self.calls.append("insert")
+            event_id = body["id"]
+            if event_id in self.items:
+                raise HttpError(httplib2.Response({"status": 409}), b"")
+            self.items[event_id] = {**body, "status": "confirmed", "htmlLink": f"https://cal/{event_id}"}
+            return self.items[event_id]
+        return _Request(run)
+
+    def get(self, calendarId, eventId):
+        def run():
+            self.calls.append("get")
+            return self.items[eventId]
+        return _Request(run)
+
+    def patch(self, calendarId, eventId, body):
+        def run():
+            self.calls.append("patch")
+            if eventId not in self.items:
+                raise HttpError(httplib2.Response({"status": 404}), b"")
+            self.items[eventId].update(body)
+            return self.items[eventId]
+        return _Request(run)
+
+    def delete(self, calendarId, eventId):
+        def run():
+            self.calls.append("delete")
+            if self.items.get(eventId, {}).get("status", "cancelled") == "cancelled":
+                raise HttpError(httplib2.Response({"status": 410}), b"")
+            self.items[eventId]["status"] = "cancelled"
+        return _Request(run)
+
+    def list(self, **kwargs):
+        def run():
+            self.calls.append("list")
+            return {"items": self.live()}
+        return _Request(run)
+
+    def list_next(self, request, response):
+        return None
+
+
+class FakeBatch:
+    def __init__(self, events, callback):
+        self.events = events
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.events.batches += 1
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as exc:
+                self.callback(request_id, None, exc)
+
+
+class FakeService:
+    def __init__(self):
+        self.fake_events = FakeEvents()
+        self.fake_events.batches = 0
+
+    def events(self):
+        return self.fake_events
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self.fake_events, callback)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeService()
+    monkeypatch.setattr(calendar, "build_service", lambda credentials, api_endpoint=None: fake)
+    return fake.fake_events
+
+
+class TestSyncEvents:
+    def sync(self, events, store):
+        return sync_events(events, None, CAL, TZ, store, origin=ORIGIN)
+
+    def test_resync_makes_no_calls(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        events = [make_event(), make_event(date=date(2025, 1, 7))]
+        first = self.sync(events, store)
+        service.calls.clear()
+        second = self.sync(events, store)
+        assert first.inserted == 2
+        assert second.unchanged == 2 and service.calls == []
+        assert second.links == first.links
+
+    def test_revision_patches_and_deletes(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        self.sync([make_event(), make_event(date=date(2025, 1, 7))], store)
+        result = self.sync([make_event(end_time=time(18, 0))], store)
+        assert (result.patched, result.deleted, result.inserted) == (1, 0, 0)
+        result = self.sync([make_event(end_time=time(18, 0)), make_event(date=date(2025, 1, 8))], store)
+        assert (result.inserted, result.deleted) == (1, 1)
+        assert len(service.live()) == 2
+
+    def test_unfiltered_roster_pushes_everyone_at_the_same_time(self, service, tmp_path):
+        result = self.sync([make_event(title="Alice"), make_event(title="Bob")], SyncStore(tmp_path / "pushed.db"))
+        assert result.inserted == 2
+        assert sorted(e["summary"] for e in service.live()) == ["Alice", "Bob"]
+        assert len(set(result.links)) == 2 and all(result.links)
+
+    def test_empty_store_recovers_from_calendar(self, service, tmp_path):
+        self.sync([make_event()], SyncStore(tmp_path / "a.db"))
+        service.calls.clear()
+        result = self.sync([make_event()], SyncStore(tmp_path / "b.db"))
+        assert service.calls == ["list"]
+        assert result.unchanged == 1
+
+    def test_patch_of_deleted_event_reinserts(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        self.sync([make_event()], store)
+        service.items.clear()
+        result = self.sync([make_event(end_time=time(18, 0))], store)
+        assert result.inserted == 1 and result.patched == 0
+        assert len(service.live()) == 1
+
+    def test_retry_after_lost_state_does_not_duplicate(self, service, tmp_path):
+        events = [make_event(), make_event(date=date(2025, 1, 7))]
+        sync_events(events, None, CAL, TZ, SyncStore(tmp_path / "a.db"), session_id="s1")
+        # Neither the store nor the list call knows about the first attempt
+        service.list = lambda **kwargs: _Request(lambda: {"items": []})
+        result = sync_events(events, None, CAL, TZ, SyncStore(tmp_path / "b.db"), session_id="s1")
+        assert result.inserted == 2
+        assert len(service.live()) == 2
+        assert result.links == [f"https://cal/{e['id']}" for e in service.live()]
+
+    def test_second_roster_for_the_same_week_keeps_the_first(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        self.sync([make_event(), make_event(date=date(2025, 1, 8))], store)
+        result = sync_events([make_event(date=date(2025, 1, 7), title="Other job")], None, CAL, TZ, store,
+                             session_id="s2", origin="img2")
+        assert (result.inserted, result.deleted) == (1, 0)
+        assert len(service.live()) == 3
+
+    def test_recovered_shifts_keep_their_origin(self, service, tmp_path):
+        self.sync([make_event(), make_event(date=date(2025, 1, 7))], SyncStore(tmp_path / "a.db"))
+        result = self.sync([make_event()], SyncStore(tmp_path / "b.db"))
+        assert result.unchanged == 1
+        result = self.sync([make_event(), make_event(date=date(2025, 1, 8))], SyncStore(tmp_path / "c.db"))
+        assert (result.inserted, result.deleted) == (1, 1)
+
+    def test_readded_shift_restores_deleted_event(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        kept, dropped = make_event(), make_event(date=date(2025, 1, 7))
+        self.sync([kept, dropped], store)
+        self.sync([kept, make_event(date=date(2025, 1, 7), start_time=time(10, 0))], store)
+        self.sync([kept, dropped], store)
+        assert sorted(e["start"]["dateTime"] for e in service.live()) == [
+            "2025-01-06T09:00:00", "2025-01-07T09:00:00",
+        ]
+
+
+class TestPushEvents:
+    def test_double_submit_creates_each_event_once(self, service):
+        events = [make_event(), make_event(date=date(2025, 1, 7))]
+        first = push_events(events, None, CAL, TZ, session_id="s1")
+        second = push_events(events, None, CAL, TZ, session_id="s1")
+        assert first == second
+        assert len(service.items) == 2
+        assert service.calls.count("get") == 2
+
+
+class TestResume:
+    def test_failed_sync_resumes_from_checkpoint(self, service, tmp_path):
+        events = [make_event(date=date(2025, 1, d)) for d in (6, 7, 8)]
+        insert = service.insert
+
+        def flaky_insert(calendarId, body):
+            if len(service.items) == 1:
+                raise HttpError(httplib2.Response({"status": 503}), b"")
+            return insert(calendarId, body)
+
+        service.insert = flaky_insert
+        checkpoints = []
+        with pytest.raises(HttpError):
+            sync_events(events, None, CAL, TZ, SyncStore(tmp_path / "a.db"),
+                        on_progress=lambda p: checkpoints.append(p.model_copy(deep=True)))
+        assert [(c.status, c.done) for c in checkpoints] == [("running", 0), ("running", 1), ("failed", 1)]
+
+        # Neither the store nor the calendar listing is needed to resume
+        service.insert = insert
+        service.list = lambda **kwargs: _Request(lambda: {"items": []})
+        service.calls.clear()
+        result = sync_events(events, None, CAL, TZ, SyncStore(tmp_path / "b.db"), resume=checkpoints[-1])
+        assert service.calls.count("insert") == 2
+        assert (result.inserted, result.unchanged) == (2, 1)
+        assert len(service.live()) == 3
+
+
+class TestRollback:
+    def push(self, service, tmp_path, count):
+        checkpoints = []
+        events = [make_event(date=date(2025, 1, 1 + d)) for d in range(count)]
+        sync_events(events, None, CAL, TZ, SyncStore(tmp_path / "pushed.db"), on_progress=checkpoints.append)
+        return checkpoints[-1]
+
+    def test_deletes_everything_pushed_in_batches(self, service, tmp_path):
+        pushed = self.push(service, tmp_path, 12)
+        store = SyncStore(tmp_path / "pushed.db")
+        deleted = rollback_sync(pushed, None, CAL, store, batch_size=5, interval=0)
+        assert deleted == 12
+        assert service.live() == [] and service.batches == 3
+        assert store.entries("", CAL, date(2025, 1, 1), date(2025, 1, 31)) == {}
+
+    def test_rate_limited_deletes_are_retried(self, service, tmp_path):
+        pushed = self.push(service, tmp_path, 3)
+        delete = service.delete
+        limited = set()
+
+        def rate_limited_once(calendarId, eventId):
+            if eventId not in limited:
+                limited.add(eventId)
+                return _failing(429)
+            return delete(calendarId, eventId)
+
+        service.delete = rate_limited_once
+        checkpoints = []
+        deleted = rollback_sync(pushed, None, CAL, SyncStore(tmp_path / "pushed.db"), interval=0,
+                                on_progress=lambda p: checkpoints.append(p.model_copy(deep=True)))
+        assert deleted == 3 and service.batches == 2
+        assert checkpoints[-1].operation == "rollback" and checkpoints[-1].status == "done"
+        assert not checkpoints[-1].completed
+
+    def test_revision_is_reverted_not_deleted(self, service, tmp_path):
+        store = SyncStore(tmp_path / "pushed.db")
+        sync_events([make_event(), make_event(date=date(2025, 1, 7))], None, CAL, TZ, store, origin=ORIGIN)
+        original = {e["id"]: e["end"] for e in service.live()}
+        checkpoints = []
+        revised = [make_event(end_time=time(18, 0)), make_event(date=date(2025, 1, 8))]
+        result = sync_events(revised, None, CAL, TZ, store, origin=ORIGIN, on_progress=checkpoints.append)
+        assert (result.patched, result.deleted, result.inserted) == (1, 1, 1)
+
+        undone = rollback_sync(checkpoints[-1], None, CAL, store, interval=0)
+        assert undone == 3
+        assert {e["id"]: e["end"] for e in service.live()} == original
+        kept = store.entries("", CAL, date(2025, 1, 1), date(2025, 1, 31))
+        assert sorted(e.event_id for e in kept.values()) == sorted(original)
+
+        # The store matches the calendar again, so the original push is a no-op
+        service.calls.clear()
+        result = sync_events([make_event(), make_event(date=date(2025, 1, 7))], None, CAL, TZ, store, origin=ORIGIN)
+        assert result.unchanged == 2 and service.calls == []
+
+    def test_old_checkpoint_undoes_as_inserts(self):
+        entry = entry_for(make_event())
+        old = {"status": "done", "completed": {"a": entry.model_dump(mode="json"), "b": None}}
+        progress = PushProgress.model_validate(old)
+        assert progress.completed["a"].kind == "insert" and progress.completed["a"].entry == entry
+        assert progress.completed["b"].kind == "delete" and progress.completed["b"].prior is None
+
+    def test_permanent_failure_raises_with_checkpoint(self, service, tmp_path):
+        pushed = self.push(service, tmp_path, 2)
+        service.delete = lambda calendarId, eventId: _failing(400)
+        checkpoints = []
+        with pytest.raises(HttpError):
+            rollback_sync(pushed, None, CAL, SyncStore(tmp_path / "pushed.db"), interval=0,
+                          on_progress=checkpoints.append)
+        assert checkpoints[-1].status == "failed"
@@ -0,0 +1,111 @@
+"""Tests for the request tracing helpers."""
+
+import json
+import threading
+
+import pytest
+
+from planogram.services import tracing
+
+
+class CollectingExporter:
+    """Exporter that keeps finished spans in memory."""
+
+    def __init__(self):
+        self.spans: list[tracing.Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: tracing.Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def named(self, name: str) -> tracing.Span:
+        return next(s for s in self.spans if s.name == name)
+
+
+@pytest.fixture
+def exporter():
+    collector = CollectingExporter()
+    tracing.set_exporter(collector)
+    yield collector
+    tracing.set_exporter(tracing.NullExporter())
+
+
+class TestSpan:
+    def test_children_share_trace_and_link_parent(self, exporter):
+        with tracing.span("root", trace_id="session-1") as root:
+            with tracing.span("child", model="m"):
+                pass
+        child = exporter.named("child")
+        assert child.trace_id == "session-1"
+        assert child.parent_id == root.span_id
+        assert child.attributes == {"model": "m"}
+
+    def test_root_without_trace_id_gets_one(self, exporter):
+        with tracing.span("root"):
+            pass
+        assert exporter.named("root").trace_id
+
+    def test_error_recorded_and_reraised(self, exporter):
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+        assert exporter.named("failing").error == "ValueError: boom"
+
+    def test_set_attributes_targets_innermost(self, exporter):
+        with tracing.span("outer"):
+            with tracing.span("inner"):
+                tracing.set_attributes(events=3)
+        assert exporter.named("inner").attributes == {"events": 3}
+        assert exporter.named("outer").attributes == {}
+
+    def test_set_attributes_without_span_is_noop(self):
+        tracing.set_attributes(events=3)
+
+    def test_propagate_keeps_parent_in_threads(self, exporter):
+        def work():
+            with tracing.span("worker"):
+                pass
+
+        with tracing.span("root", trace_id="t") as root:
+            thread = threading.Thread(target=tracing.propagate(work))
+            thread.start()
+            thread.join()
+        worker = exporter.named("worker")
+        assert worker.trace_id == "t"
+        assert worker.parent_id == root.span_id
+
+
+class TestJsonLinesExporter:
+    def test_writes_and_reads_back_slowest_first(self, tmp_path):
+        path = tmp_path / "traces" / "spans.jsonl"
+        tracing.set_exporter(tracing.JsonLinesExporter(path))
+        try:
+            with tracing.span("confirm", trace_id="abc"):
+                with tracing.span("push_events"):
+                    pass
+            with tracing.span("other", trace_id="xyz"):
+                pass
+        finally:
+            tracing.set_exporter(tracing.NullExporter())
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r["name"] for r in records] == ["push_events", "confirm", "other"]
+        spans = tracing.read_trace(path, "abc")
+        assert [s["name"] for s in spans] == ["confirm", "push_events"]
+
+    def test_read_missing_file(self, tmp_path):
+        assert tracing.read_trace(tmp_path / "none.jsonl", "abc") == []
+
+
+class TestExporterFromSettings:
+    def test_none(self, tmp_path):
+        assert isinstance(tracing.exporter_from_settings("none", tmp_path), tracing.NullExporter)
+
+    def test_jsonl(self, tmp_path):
+        exporter = tracing.exporter_from_settings("jsonl", tmp_path / "s.jsonl")
+        assert isinstance(exporter, tracing.JsonLinesExporter)
+
+    def test_unknown_raises(self, tmp_path):
+        with pytest.raises(ValueError):
+            tracing.exporter_from_settings("zipkin", tmp_path)
@@ -0,0 +1,115 @@
+"""Tests for Claude token and cost accounting."""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from planogram.models import StageUsage
+from planogram.services import metrics, tracing, usage
+from planogram.services.usage import BudgetExceededError, UsageStore
+
+
+def response_usage(input_tokens=1000, output_tokens=500, cache_write=None, cache_read=None) -> SimpleNamespace:
+    return SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cache_creation_input_tokens=cache_write,
+        cache_read_input_tokens=cache_read,
+    )
+
+
+class TestPricing:
+    def test_cost_per_million_tokens(self):
+        assert usage.cost("claude-sonnet-4-6", 1_000_000, 1_000_000) == pytest.approx(18.0)
+        assert usage.cost("claude-haiku-4-5", 0, 0, cache_write=1_000_000, cache_read=1_000_000) == pytest.approx(1.35)
+
+    def test_unknown_model_is_priced_as_the_dearest(self):
+        assert usage.cost("claude-future", 1000, 1000) == usage.cost("claude-opus-4-7", 1000, 1000)
+
+    def test_from_response_reads_cache_tokens(self):
+        entry = usage.from_response("pass1", "claude-opus-4-7", response_usage(cache_write=200, cache_read=300))
+        assert (entry.cache_write_tokens, entry.cache_read_tokens) == (200, 300)
+        assert entry.cost_usd == pytest.approx(usage.cost("claude-opus-4-7", 1000, 500, 200, 300))
+
+    def test_from_response_without_cache_fields(self):
+        entry = usage.from_response("pass2", "claude-sonnet-4-6", SimpleNamespace(input_tokens=10, output_tokens=5))
+        assert entry.cache_write_tokens == entry.cache_read_tokens == 0
+
+    def test_summarize_sums_per_stage_and_model(self):
+        records = [
+            StageUsage(stage="pass1", model="claude-haiku-4-5", input_tokens=10, cost_usd=0.1),
+            StageUsage(stage="pass2", model="claude-sonnet-4-6", input_tokens=20, cost_usd=0.2),
+            StageUsage(stage="pass2", model="claude-sonnet-4-6", input_tokens=30, cost_usd=0.3),
+        ]
+        summary = usage.summarize(records)
+        assert [(s.stage, s.calls, s.input_tokens) for s in summary] == [("pass1", 1, 10), ("pass2", 2, 50)]
+        assert summary[1].cost_usd == pytest.approx(0.5)
+        assert records[1].calls == 1
+
+
+class TestUsageStore:
+    def test_adds_up_per_day_user_model_and_stage(self, tmp_path):
+        store = UsageStore(tmp_path / "usage.db")
+        entry = StageUsage(stage="pass2", model="claude-sonnet-4-6", input_tokens=100, output_tokens=10, cost_usd=0.5)
+        store.add("alice", entry, day="2026-01-01")
+        store.add("alice", entry, day="2026-01-01")
+        store.add("bob", entry, day="2026-01-01")
+        store.add("bob", entry, day="2026-01-02")
+        assert store.spent("2026-01-01") == pytest.approx(1.5)
+        assert store.spent("2026-01-01", "alice") == pytest.approx(1.0)
+        days = store.daily("2026-01-01")
+        assert list(days) == ["2026-01-02", "2026-01-01"]
+        assert days["2026-01-01"][0].calls == 3
+        assert days["2026-01-01"][0].input_tokens == 300
+
+    def test_database_is_created_lazily(self, tmp_path):
+        db_path = tmp_path / "nested" / "usage.db"
+        store = UsageStore(db_path)
+        assert not db_path.exists()
+        assert store.spent("2026-01-01") == 0
+        assert db_path.exists()
+
+
+class TestCheckBudget:
+    def _store(self, tmp_path, spent_by_alice: float) -> UsageStore:
+        store = UsageStore(tmp_path / "usage.db")
+        store.add("alice", StageUsage(stage="pass1", model="claude-opus-4-7", cost_usd=spent_by_alice))
+        return store
+
+    def test_no_caps_never_rejects(self, tmp_path):
+        usage.check_budget(self._store(tmp_path, 100.0), "alice", 1.0, 0, 0)
+
+    def test_global_cap(self, tmp_path):
+        store = self._store(tmp_path, 0.95)
+        usage.check_budget(store, "bob", 0.04, daily_budget=1.0, user_daily_budget=0)
+        with pytest.raises(BudgetExceededError) as exc_info:
+            usage.check_budget(store, "bob", 0.1, daily_budget=1.0, user_daily_budget=0)
+        assert 0 < exc_info.value.retry_after <= 86400
+
+    def test_user_cap_only_counts_that_user(self, tmp_path):
+        store = self._store(tmp_path, 0.95)
+        rejected = metrics.BUDGET_REJECTED.labels("user")
+        before = rejected._value.get()
+        usage.check_budget(store, "bob", 0.1, daily_budget=0, user_daily_budget=1.0)
+        with pytest.raises(BudgetExceededError):
+            usage.check_budget(store, "alice", 0.1, daily_budget=0, user_daily_budget=1.0)
+        assert rejected._value.get() == before + 1
+
+
+class TestRecording:
+    def test_collects_and_stores_calls_from_worker_threads(self, tmp_path):
+        store = UsageStore(tmp_path / "usage.db")
+        with usage.recording("alice", store) as spent:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                record = tracing.propagate(lambda _: usage.record("pass2", "claude-sonnet-4-6", response_usage()))
+                list(pool.map(record, range(4)))
+        assert len(spent) == 4
+        assert store.spent(usage.today(), "alice") == pytest.approx(sum(entry.cost_usd for entry in spent))
+
+    def test_outside_recording_only_counts_metrics(self):
+        counter = metrics.CLAUDE_TOKENS.labels("claude-haiku-4-5", "cache_read")
+        before = counter._value.get()
+        usage.record("pass1", "claude-haiku-4-5", response_usage(cache_read=50))
+        assert counter._value.get() == before + 50
+        assert usage.recorded() == []
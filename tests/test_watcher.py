@@ -0,0 +1,258 @@
+"""Tests for the hot-folder watcher."""
+
+import hashlib
+import os
+import threading
+import time as time_module
+from datetime import date, time
+from unittest.mock import patch
+
+import pytest
+
+from planogram.config import WatchFolder
+from planogram.models import ParsedSchedule, ScheduleEvent
+from planogram.services import sessions
+from planogram.services.calendar import NeedsAuthError, SyncResult
+from planogram.services.resilience import UpstreamUnavailableError
+from planogram.services.usage import BudgetExceededError
+from planogram.watcher import HotFolderWatcher, Ledger, SettleTracker, scan
+from tests.conftest import TEST_SETTINGS, make_image_bytes
+
+EVENTS = [ScheduleEvent(title="Work", date=date(2025, 1, 6), start_time=time(9, 0))]
+
+
+def parsed(image_bytes, filename, person, user_id, settings, store) -> ParsedSchedule:
+    return ParsedSchedule(events=EVENTS, raw_ocr_text="raw", source_image_name=filename,
+                          person_name=person, user_id=user_id)
+
+
+def watcher_digest(path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    folder = tmp_path / "inbox"
+    folder.mkdir()
+    return folder
+
+
+def make_watcher(tmp_path, inbox, trusted=False, **overrides) -> HotFolderWatcher:
+    settings = TEST_SETTINGS.model_copy(update={
+        "watch_folders": [WatchFolder(path=inbox, user_id="owner", person_name="Jane", trusted=trusted)],
+        "watch_ledger_path": tmp_path / "watched.db",
+        "usage_db_path": tmp_path / "usage.db",
+        "sync_state_path": tmp_path / "pushed.db",
+        "watch_workers": 2,
+        "watch_settle_seconds": 5.0,
+        "watch_poll_interval": 2.0,
+        "watch_force_polling": True,
+        **overrides,
+    })
+    return HotFolderWatcher(settings, tmp_dir=tmp_path / "sessions")
+
+
+class TestLedger:
+    def test_a_file_is_claimed_once(self, tmp_path):
+        ledger = Ledger(tmp_path / "watched.db")
+        assert ledger.claim("abc", tmp_path / "a.jpg")
+        assert not ledger.claim("abc", tmp_path / "copy.jpg")
+        ledger.finish("abc", "session", "s1")
+        assert ledger.status("abc") == ("session", "s1")
+
+    def test_unfinished_claims_are_released(self, tmp_path):
+        ledger = Ledger(tmp_path / "watched.db")
+        ledger.claim("abc", tmp_path / "a.jpg")
+        ledger.claim("def", tmp_path / "b.jpg")
+        ledger.finish("def", "failed")
+        assert ledger.release_unfinished() == 1
+        assert ledger.claim("abc", tmp_path / "a.jpg")
+        assert not ledger.claim("def", tmp_path / "b.jpg")
+
+
+class TestSettleTracker:
+    def test_waits_until_the_file_stops_changing(self, inbox):
+        clock = FakeClock()
+        tracker = SettleTracker(5.0, clock)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"part")
+        assert tracker.poll({path}) == []
+        clock.now = 3.0
+        with path.open("ab") as f:
+            f.write(b"more")
+        assert tracker.poll(set()) == []
+        clock.now = 7.0
+        assert tracker.poll(set()) == []
+        clock.now = 8.0
+        assert tracker.poll(set()) == [path]
+        clock.now = 20.0
+        assert tracker.poll({path}) == []
+
+    def test_empty_files_are_not_ready(self, inbox):
+        clock = FakeClock()
+        tracker = SettleTracker(0.0, clock)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"")
+        tracker.poll({path})
+        clock.now = 10.0
+        assert tracker.poll({path}) == []
+
+    def test_rewritten_file_is_returned_again(self, inbox):
+        clock = FakeClock()
+        tracker = SettleTracker(1.0, clock)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"one")
+        tracker.poll({path})
+        clock.now = 1.0
+        assert tracker.poll({path}) == [path]
+        path.write_bytes(b"two!")
+        os.utime(path, ns=(0, 10**9))
+        clock.now = 2.0
+        assert tracker.poll({path}) == []
+        clock.now = 3.0
+        assert tracker.poll({path}) == [path]
+
+    def test_deleted_file_is_forgotten(self, inbox):
+        clock = FakeClock()
+        tracker = SettleTracker(1.0, clock)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"one")
+        tracker.poll({path})
+        clock.now = 1.0
+        assert tracker.poll({path}) == [path]
+        st = path.stat()
+        path.unlink()
+        clock.now = 2.0
+        assert tracker.poll(set()) == []
+        assert tracker._returned == {}
+        path.write_bytes(b"one")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        clock.now = 3.0
+        assert tracker.poll({path}) == []
+        clock.now = 4.0
+        assert tracker.poll({path}) == [path]
+
+    def test_retry_waits_for_the_delay(self, inbox):
+        clock = FakeClock()
+        tracker = SettleTracker(1.0, clock)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"one")
+        tracker.poll({path})
+        clock.now = 1.0
+        assert tracker.poll({path}) == [path]
+        tracker.retry(path, 60.0)
+        clock.now = 30.0
+        assert tracker.poll({path}) == []
+        clock.now = 61.0
+        tracker.poll(set())
+        clock.now = 62.0
+        assert tracker.poll(set()) == [path]
+
+    def test_scan_only_picks_up_images(self, inbox):
+        for name in ("a.jpg", "b.PNG", "notes.txt", "scan.pdf"):
+            (inbox / name).write_bytes(b"x")
+        (inbox / "nested.jpg").mkdir()
+        assert {p.name for p in scan([inbox])} == {"a.jpg", "b.PNG"}
+
+
+class TestProcess:
+    def test_creates_a_session_for_the_folder_owner(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox)
+        path = inbox / "a.jpg"
+        path.write_bytes(make_image_bytes())
+        with patch("planogram.watcher.parse_image", side_effect=parsed) as parse:
+            assert watcher.process(path) == "session"
+        assert parse.call_args.args[2:4] == ("Jane", "owner")
+        session_id = watcher.ledger.status(watcher_digest(path))[1]
+        schedule = sessions.load_session(tmp_path / "sessions", session_id)
+        assert schedule.user_id == "owner" and schedule.events == EVENTS
+
+    def test_never_processes_the_same_contents_twice(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox)
+        (inbox / "a.jpg").write_bytes(make_image_bytes())
+        (inbox / "copy.jpg").write_bytes(make_image_bytes())
+        with patch("planogram.watcher.parse_image", side_effect=parsed) as parse:
+            assert watcher.process(inbox / "a.jpg") == "session"
+            assert watcher.process(inbox / "a.jpg") == "skipped"
+            assert make_watcher(tmp_path, inbox).process(inbox / "copy.jpg") == "skipped"
+        assert parse.call_count == 1
+
+    def test_parse_failures_are_recorded(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox)
+        path = inbox / "a.jpg"
+        path.write_bytes(b"not an image")
+        with patch("planogram.watcher.parse_image", side_effect=ValueError("bad json")):
+            assert watcher.process(path) == "failed"
+        assert watcher.ledger.status(watcher_digest(path)) == ("failed", "ValueError: bad json")
+
+    @pytest.mark.parametrize("error", [BudgetExceededError("over budget", 3600), UpstreamUnavailableError("down")])
+    def test_transient_failures_are_retried(self, tmp_path, inbox, error):
+        watcher = make_watcher(tmp_path, inbox)
+        path = inbox / "a.jpg"
+        path.write_bytes(make_image_bytes())
+        with patch("planogram.watcher.parse_image", side_effect=error), \
+             patch.object(watcher.tracker, "retry") as retry:
+            assert watcher.process(path) == "retry"
+        assert watcher.ledger.status(watcher_digest(path)) is None
+        retry.assert_called_once()
+
+    def test_trusted_folders_push(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox, trusted=True)
+        path = inbox / "a.jpg"
+        path.write_bytes(make_image_bytes())
+        with patch("planogram.watcher.parse_image", side_effect=parsed), \
+             patch("planogram.watcher.push_schedule", return_value=SyncResult(links=[], inserted=1)) as push:
+            assert watcher.process(path) == "pushed"
+        schedule, session_id = push.call_args.args[:2]
+        assert schedule.user_id == "owner" and session_id == watcher_digest(path)[:32]
+        assert watcher.ledger.status(watcher_digest(path))[0] == "pushed"
+
+    def test_trusted_folder_without_authorization_saves_a_session(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox, trusted=True)
+        path = inbox / "a.jpg"
+        path.write_bytes(make_image_bytes())
+        with patch("planogram.watcher.parse_image", side_effect=parsed), \
+             patch("planogram.watcher.push_schedule", side_effect=NeedsAuthError):
+            assert watcher.process(path) == "session"
+
+
+class TestRun:
+    def test_burst_is_processed_once_with_bounded_workers(self, tmp_path, inbox):
+        watcher = make_watcher(tmp_path, inbox, watch_settle_seconds=0.0, watch_poll_interval=0.02)
+        for index in range(20):
+            (inbox / f"roster-{index:02}.png").write_bytes(make_image_bytes(10 + index, 10, fmt="PNG"))
+        lock = threading.Lock()
+        running = peak = 0
+        done = threading.Semaphore(0)
+
+        def slow_parse(*args):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time_module.sleep(0.01)
+            with lock:
+                running -= 1
+            done.release()
+            return parsed(*args)
+
+        stop = threading.Event()
+        with patch("planogram.watcher.parse_image", side_effect=slow_parse) as parse:
+            thread = threading.Thread(target=watcher.run, args=(stop,))
+            thread.start()
+            for _ in range(20):
+                assert done.acquire(timeout=5)
+            time_module.sleep(0.1)
+            stop.set()
+            thread.join(timeout=5)
+        assert parse.call_count == 20
+        assert peak <= 2
+        assert len(list((tmp_path / "sessions").glob("*.json"))) == 20